@@ -0,0 +1,21 @@
+"""
+Paginación de la API REST
+Portal Interno de Contrapartes – App Pacífico (Cotizador Web)
+"""
+
+from rest_framework.pagination import CursorPagination
+
+
+class CursorPaginacion(CursorPagination):
+    """
+    Paginación por cursor ordenada por ID descendente.
+
+    A diferencia de PageNumberPagination no usa OFFSET ni COUNT(*): cada
+    página es un WHERE id < cursor ORDER BY id DESC LIMIT n sobre la clave
+    primaria, por lo que las páginas profundas cuestan lo mismo que la
+    primera y los registros nuevos no desplazan los resultados.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = '-id'
@@ -0,0 +1,23 @@
+"""
+Permisos de la API REST
+Portal Interno de Contrapartes – App Pacífico (Cotizador Web)
+"""
+
+from rest_framework.permissions import SAFE_METHODS, DjangoModelPermissions
+
+
+class EscrituraStaffOPermisos(DjangoModelPermissions):
+    """
+    Lectura para cualquier usuario autenticado; escritura solo para staff.
+
+    Un usuario que no es staff puede escribir si tiene el permiso del modelo
+    correspondiente al método (add para POST y lote, change para PUT/PATCH,
+    delete para DELETE), asignado directamente o por grupo.
+    """
+
+    def has_permission(self, request, view):
+        if not request.user or not request.user.is_authenticated:
+            return False
+        if request.method in SAFE_METHODS or request.user.is_staff:
+            return True
+        return super().has_permission(request, view)
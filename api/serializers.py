@@ -0,0 +1,388 @@
+"""
+Serializers de la API REST
+Portal Interno de Contrapartes – App Pacífico (Cotizador Web)
+
+CAMPOS DINÁMICOS:
+- ?fields=id,nombre,tipo   Devuelve solo esos campos (el viewset además
+                            limita las columnas del SELECT con .only())
+- ?expand=tipo,miembros    Reemplaza el ID de la relación por el objeto
+                            anidado (el viewset agrega select_related o
+                            prefetch_related según corresponda)
+
+Cada serializer declara en `expandibles` las relaciones que pueden
+expandirse y, en Meta.campos_requeridos, las columnas que necesitan los
+campos calculados.
+
+CREACIÓN MASIVA:
+Los serializers con Meta.list_serializer_class = CreacionMasivaListSerializer
+aceptan un arreglo de objetos (many=True). Todos se validan antes de
+insertar, los errores se reportan por posición y la inserción es un único
+bulk_create.
+"""
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db import models
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+from rest_framework.validators import UniqueTogetherValidator
+
+from contrapartes.models import (
+    BalanceSheet, BalanceSheetItem, Calificacion, Calificador, Contraparte, Documento,
+    EstadoContraparte, Miembro, Moneda, Outlook, TipoCambio, TipoContraparte, TipoDocumento,
+)
+
+
+class CamposDinamicosMixin:
+    """
+    Aplica ?fields= y ?expand= a partir del contexto del serializer.
+
+    El viewset coloca en el contexto los conjuntos 'campos' y 'expandir'.
+    Los serializers anidados se construyen sin contexto propio, por lo que
+    solo el serializer principal se recorta o expande.
+    """
+    expandibles = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        campos = self.context.get('campos')
+        expandir = self.context.get('expandir') or set()
+
+        for nombre in expandir & set(self.expandibles):
+            relacion = self.Meta.model._meta.get_field(nombre)
+            self.fields[nombre] = self.expandibles[nombre](
+                read_only=True, many=relacion.one_to_many or relacion.many_to_many
+            )
+
+        if campos:
+            for nombre in set(self.fields) - campos - {'id'}:
+                self.fields.pop(nombre)
+
+    @classmethod
+    def columnas_para(cls, campos):
+        """
+        Retorna las columnas del modelo necesarias para los campos pedidos.
+
+        Args:
+            campos: Conjunto de nombres de campos del serializer
+
+        Returns:
+            list: Nombres de campos para QuerySet.only()
+        """
+        opciones = cls.Meta.model._meta
+        requeridos = getattr(cls.Meta, 'campos_requeridos', {})
+        columnas = [opciones.pk.name]
+        for nombre in campos:
+            if nombre in requeridos:
+                columnas.extend(requeridos[nombre])
+                continue
+            try:
+                campo = opciones.get_field(nombre)
+            except FieldDoesNotExist:
+                continue
+            # Relaciones inversas (miembros, items...) se resuelven con prefetch
+            if campo.concrete and not campo.many_to_many:
+                columnas.append(nombre)
+        return columnas
+
+
+# =============================================================================
+# CREACIÓN MASIVA
+# =============================================================================
+
+class RelacionPrecargadaField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField que reutiliza los objetos precargados por el
+    CreacionMasivaListSerializer en lugar de ejecutar un .get() por elemento.
+
+    Fuera de un lote (o si el ID no fue precargado) se comporta igual que
+    PrimaryKeyRelatedField, incluidos sus mensajes de error.
+    """
+
+    def to_internal_value(self, data):
+        precargados = getattr(self.root, 'precargados', {}).get(self.field_name)
+        if precargados is not None:
+            try:
+                pk = self.get_queryset().model._meta.pk.to_python(data)
+            except (DjangoValidationError, TypeError, ValueError):
+                pk = None
+            if pk in precargados:
+                return precargados[pk]
+        return super().to_internal_value(data)
+
+
+class CreacionMasivaListSerializer(serializers.ListSerializer):
+    """
+    Valida e inserta un lote de objetos con un número fijo de consultas.
+
+    - Las relaciones (FK) de todo el lote se cargan con una consulta
+      in_bulk() por campo.
+    - Las restricciones unique_together se verifican con una consulta por
+      restricción contra la base de datos y, además, entre los propios
+      elementos del lote.
+    - La inserción es un solo bulk_create. Como bulk_create no envía
+      post_save, la vista que lo usa debe invalidar lo que dependa de esa
+      señal.
+
+    Los errores se devuelven como una lista alineada con la entrada: {}
+    para los elementos válidos y el detalle del error para los demás.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Las restricciones unique_together se verifican para todo el lote
+        # en lugar de una consulta por elemento
+        self.child.validators = [
+            validador for validador in self.child.validators
+            if not isinstance(validador, UniqueTogetherValidator)
+        ]
+
+    def _restricciones_unicas(self):
+        opciones = self.child.Meta.model._meta
+        conjuntos = list(opciones.unique_together)
+        conjuntos.extend(restriccion.fields for restriccion in opciones.total_unique_constraints)
+        return [
+            [opciones.get_field(nombre) for nombre in campos]
+            for campos in conjuntos if len(campos) > 1
+        ]
+
+    @staticmethod
+    def _convertir(item, nombre, campo_modelo):
+        """Convierte un valor del payload al tipo de la columna, o None si no es válido"""
+        if not isinstance(item, dict):
+            return None
+        valor = item.get(nombre, campo_modelo.get_default())
+        try:
+            return campo_modelo.to_python(valor) if valor is not None else None
+        except (DjangoValidationError, TypeError, ValueError):
+            return None
+
+    def _precargar(self, data):
+        """Carga las relaciones y las claves únicas existentes para todo el lote"""
+        items = data if isinstance(data, list) else []
+        self.posicion = -1
+
+        self.precargados = {}
+        for nombre, campo in self.child.fields.items():
+            if isinstance(campo, RelacionPrecargadaField) and not campo.read_only:
+                queryset = campo.get_queryset()
+                pks = {self._convertir(item, nombre, queryset.model._meta.pk) for item in items} - {None}
+                self.precargados[nombre] = queryset.in_bulk(pks) if pks else {}
+
+        modelo = self.child.Meta.model
+        self.claves_existentes = {}
+        for campos in self._restricciones_unicas():
+            valores = [
+                {self._convertir(item, campo.name, campo) for item in items} - {None}
+                for campo in campos
+            ]
+            existentes = set()
+            if all(valores):
+                filtros = {f'{campo.attname}__in': conjunto for campo, conjunto in zip(campos, valores)}
+                existentes = set(
+                    modelo._base_manager.filter(**filtros).values_list(*[campo.attname for campo in campos])
+                )
+            self.claves_existentes[tuple(campos)] = existentes
+        self.claves_lote = {campos: {} for campos in self.claves_existentes}
+
+    def to_internal_value(self, data):
+        self._precargar(data)
+        return super().to_internal_value(data)
+
+    def run_child_validation(self, data):
+        self.posicion += 1
+        validado = super().run_child_validation(data)
+
+        errores = []
+        for campos, existentes in self.claves_existentes.items():
+            clave = []
+            for campo in campos:
+                valor = validado.get(campo.name, campo.get_default())
+                clave.append(valor.pk if isinstance(valor, models.Model) else valor)
+            clave = tuple(clave)
+            if None in clave:
+                continue
+
+            nombres = ', '.join(campo.name for campo in campos)
+            vistas = self.claves_lote[campos]
+            if clave in existentes:
+                errores.append(UniqueTogetherValidator.message.format(field_names=nombres))
+            elif clave in vistas:
+                errores.append(f'Repetido en el lote: coincide con el elemento {vistas[clave]} ({nombres}).')
+            else:
+                vistas[clave] = self.posicion
+        if errores:
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: errores}, code='unique')
+        return validado
+
+    def create(self, validated_data):
+        modelo = self.child.Meta.model
+        return modelo._default_manager.bulk_create([modelo(**attrs) for attrs in validated_data])
+
+
+# =============================================================================
+# CATÁLOGOS (solo lectura, usados al expandir)
+# =============================================================================
+
+class TipoContraparteSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TipoContraparte
+        fields = ['id', 'codigo', 'nombre']
+
+
+class EstadoContraparteSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = EstadoContraparte
+        fields = ['id', 'codigo', 'nombre', 'color']
+
+
+class TipoDocumentoSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TipoDocumento
+        fields = ['id', 'codigo', 'nombre', 'requiere_expiracion']
+
+
+class CalificadorSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Calificador
+        fields = ['id', 'nombre']
+
+
+class OutlookSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Outlook
+        fields = ['id', 'outlook']
+
+
+class MonedaSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Moneda
+        fields = ['id', 'codigo', 'nombre', 'simbolo']
+
+
+class TipoCambioSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TipoCambio
+        fields = ['id', 'moneda', 'tasa_usd', 'fecha']
+
+
+class ContraparteResumenSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Contraparte
+        fields = ['id', 'nombre', 'full_company_name']
+
+
+# =============================================================================
+# RECURSOS
+# =============================================================================
+
+class MiembroSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    serializer_related_field = RelacionPrecargadaField
+    expandibles = {
+        'contraparte': ContraparteResumenSerializer,
+    }
+
+    class Meta:
+        model = Miembro
+        fields = [
+            'id', 'contraparte', 'tipo_persona', 'nombre', 'numero_identificacion',
+            'nacionalidad', 'fecha_nacimiento', 'categoria', 'es_pep', 'posicion_pep',
+            'activo', 'fecha_creacion', 'fecha_actualizacion',
+        ]
+        read_only_fields = ['fecha_creacion', 'fecha_actualizacion']
+        list_serializer_class = CreacionMasivaListSerializer
+
+
+class DocumentoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    expandibles = {
+        'contraparte': ContraparteResumenSerializer,
+        'tipo': TipoDocumentoSerializer,
+    }
+    esta_vencido = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = Documento
+        fields = [
+            'id', 'contraparte', 'tipo', 'categoria', 'descripcion', 'archivo',
+            'fecha_emision', 'fecha_expiracion', 'esta_vencido', 'activo',
+            'subido_por', 'fecha_subida', 'fecha_actualizacion',
+        ]
+        read_only_fields = ['subido_por', 'fecha_subida', 'fecha_actualizacion']
+        campos_requeridos = {
+            'esta_vencido': ['fecha_expiracion'],
+        }
+
+
+class CalificacionSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    serializer_related_field = RelacionPrecargadaField
+    expandibles = {
+        'contraparte': ContraparteResumenSerializer,
+        'calificador': CalificadorSerializer,
+        'outlook': OutlookSerializer,
+    }
+
+    class Meta:
+        model = Calificacion
+        fields = [
+            'id', 'contraparte', 'calificador', 'outlook', 'calificacion', 'tipo', 'fecha',
+            'documento_soporte', 'activo', 'creado_por', 'fecha_creacion', 'fecha_actualizacion',
+        ]
+        read_only_fields = ['creado_por', 'fecha_creacion', 'fecha_actualizacion']
+        list_serializer_class = CreacionMasivaListSerializer
+
+
+class BalanceSheetItemSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    serializer_related_field = RelacionPrecargadaField
+
+    class Meta:
+        model = BalanceSheetItem
+        fields = [
+            'id', 'balance_sheet', 'descripcion', 'nota', 'categoria',
+            'monto_usd', 'monto_local', 'orden', 'activo',
+        ]
+        list_serializer_class = CreacionMasivaListSerializer
+
+
+class BalanceSheetSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    expandibles = {
+        'contraparte': ContraparteResumenSerializer,
+        'moneda_local': MonedaSerializer,
+        'tipo_cambio': TipoCambioSerializer,
+        'items': BalanceSheetItemSerializer,
+    }
+
+    class Meta:
+        model = BalanceSheet
+        fields = [
+            'id', 'contraparte', 'año', 'moneda_local', 'tipo_cambio', 'solo_usd',
+            'activo', 'creado_por', 'fecha_creacion', 'fecha_actualizacion',
+        ]
+        read_only_fields = ['creado_por', 'fecha_creacion', 'fecha_actualizacion']
+
+
+class ContraparteSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    expandibles = {
+        'tipo': TipoContraparteSerializer,
+        'estado_nuevo': EstadoContraparteSerializer,
+        'miembros': MiembroSerializer,
+        'documentos': DocumentoSerializer,
+        'calificaciones': CalificacionSerializer,
+        'balance_sheets': BalanceSheetSerializer,
+    }
+    dias_hasta_proxima_dd = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Contraparte
+        fields = [
+            'id', 'nombre', 'full_company_name', 'trading_name', 'company_website',
+            'home_regulatory_body', 'is_licensed_by_regulatory_body', 'is_publicly_listed',
+            'publicly_listed_country', 'is_holding_company', 'external_auditors',
+            'registered_address', 'business_address', 'contact_telephone', 'contact_email',
+            'company_nature_business', 'domicile', 'company_incorporation_registration',
+            'date_incorporation', 'number_of_employees', 'nacionalidad', 'tipo', 'estado_nuevo',
+            'fecha_proxima_dd', 'dias_hasta_proxima_dd', 'descripcion', 'notas',
+            'creado_por', 'fecha_creacion', 'fecha_actualizacion',
+        ]
+        read_only_fields = ['creado_por', 'fecha_creacion', 'fecha_actualizacion']
+        campos_requeridos = {
+            'dias_hasta_proxima_dd': ['fecha_proxima_dd'],
+        }
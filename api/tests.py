@@ -1,3 +1,232 @@
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import Permission, User
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.serializers import CreacionMasivaListSerializer
+
+from contrapartes.models import (
+    BalanceSheet, BalanceSheetItem, Calificacion, Calificador, Contraparte, Miembro, Outlook,
+    TipoContraparte,
+)
+
+
+class APIContrapartesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='testuser', password='testpass123', is_staff=True)
+        tipo = TipoContraparte.objects.create(codigo='banco', nombre='Banco', creado_por=cls.user)
+        calificador = Calificador.objects.create(nombre='Fitch', creado_por=cls.user)
+        outlook = Outlook.objects.create(outlook='Estable', creado_por=cls.user)
+        for numero in range(4):
+            contraparte = Contraparte.objects.create(
+                nombre=f'Banco {numero}', tipo=tipo, creado_por=cls.user, notas='x' * 500
+            )
+            Miembro.objects.create(
+                contraparte=contraparte, nombre=f'Director {numero}', numero_identificacion=str(numero),
+                nacionalidad='CO', fecha_nacimiento=date(1970, 1, 1)
+            )
+            Calificacion.objects.create(
+                contraparte=contraparte, calificador=calificador, outlook=outlook,
+                calificacion='AA', fecha=date(2024, 1, 1), creado_por=cls.user
+            )
+            balance = BalanceSheet.objects.create(contraparte=contraparte, año=2024, creado_por=cls.user)
+            BalanceSheetItem.objects.create(
+                balance_sheet=balance, descripcion='Caja', categoria='assets',
+                monto_usd=Decimal('10.00'), creado_por=cls.user
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_consultas_por_endpoint(self):
+        """Test that each list endpoint runs a fixed number of queries with expansions"""
+        # Versión (ETag) + página + una versión y un prefetch por relación inversa
+        casos = [
+            ('api:contraparte-list', 'tipo,estado_nuevo,miembros,calificaciones', 6),
+            ('api:miembro-list', 'contraparte', 2),
+            ('api:documento-list', 'contraparte,tipo', 2),
+            ('api:calificacion-list', 'contraparte,calificador,outlook', 2),
+            ('api:balance_sheet-list', 'contraparte,moneda_local,tipo_cambio,items', 4),
+        ]
+        for nombre, expandir, consultas in casos:
+            with self.subTest(nombre):
+                with self.assertNumQueries(consultas):
+                    response = self.client.get(reverse(nombre), {'expand': expandir, 'page_size': 2})
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('next', response.data)
+
+    def test_campos_parciales_limitan_select(self):
+        """Test that ?fields= trims both the payload and the SELECT column list"""
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('api:contraparte-list'), {'fields': 'nombre,tipo', 'expand': 'tipo'})
+
+        self.assertEqual(set(response.data['results'][0]), {'id', 'nombre', 'tipo'})
+        self.assertEqual(response.data['results'][0]['tipo']['codigo'], 'banco')
+        self.assertNotIn('notas', consultas.captured_queries[0]['sql'])
+
+    def test_filtros_validan_el_valor(self):
+        """Test that filter values are converted with the model field and invalid ones return 400"""
+        contraparte = Contraparte.objects.first()
+        response = self.client.get(reverse('api:miembro-list'), {'contraparte': contraparte.pk, 'es_pep': 'false'})
+        self.assertEqual(len(response.data['results']), 1)
+
+        casos = [
+            ('api:miembro-list', 'contraparte', 'abc'),
+            ('api:miembro-list', 'es_pep', 'yes'),
+            ('api:balance_sheet-list', 'año', 'abc'),
+        ]
+        for nombre, parametro, valor in casos:
+            with self.subTest(parametro):
+                response = self.client.get(reverse(nombre), {parametro: valor})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(parametro, response.data)
+
+    def test_paginacion_por_cursor(self):
+        """Test that cursor pages walk the whole collection without repeats"""
+        vistos = []
+        url = reverse('api:contraparte-list') + '?page_size=3&fields=id'
+        while url:
+            response = self.client.get(url)
+            vistos.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+
+        self.assertEqual(sorted(vistos), sorted(Contraparte.objects.values_list('id', flat=True)))
+
+    def test_etag_responde_304_hasta_que_cambian_los_datos(self):
+        """Test conditional GET on a collection with an expanded reverse relation"""
+        url = reverse('api:contraparte-list') + '?expand=miembros'
+        etag = self.client.get(url)['ETag']
+
+        with self.assertNumQueries(2):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        miembro = Miembro.objects.first()
+        miembro.nombre = 'Otro nombre'
+        miembro.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_expand_excluye_hijos_inactivos(self):
+        """Test that expanded reverse relations leave out soft-deleted children"""
+        contraparte = Contraparte.objects.first()
+        inactivo = Miembro.objects.create(
+            contraparte=contraparte, nombre='Retirado', numero_identificacion='R-1',
+            nacionalidad='CO', fecha_nacimiento=date(1970, 1, 1), activo=False
+        )
+        url = reverse('api:contraparte-detail', args=[contraparte.pk]) + '?expand=miembros'
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        ids = [miembro['id'] for miembro in response.data['miembros']]
+        self.assertEqual(len(ids), 1)
+        self.assertNotIn(inactivo.pk, ids)
+
+    def test_etag_cambia_con_la_fecha(self):
+        """Test that the ETag changes from one day to the next without data changes"""
+        url = reverse('api:documento-list')
+        etag = self.client.get(url)['ETag']
+
+        with mock.patch('django.utils.timezone.localdate', return_value=date(2099, 1, 1)):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_detalle_con_id_invalido_responde_404(self):
+        """Test that a non-numeric id in a detail URL returns 404"""
+        response = self.client.get('/api/v1/contrapartes/abc/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_lote_de_miembros_en_una_peticion(self):
+        """Test that a batch of members is validated and inserted with a fixed number of queries"""
+        contraparte = Contraparte.objects.first()
+        lote = [
+            {
+                'contraparte': contraparte.pk, 'nombre': f'Accionista {numero}',
+                'numero_identificacion': f'ID-{numero}', 'nacionalidad': 'PA',
+                'fecha_nacimiento': '1980-05-01',
+            }
+            for numero in range(30)
+        ]
+        # Contrapartes precargadas + claves únicas existentes + savepoint + INSERT + release
+        with self.assertNumQueries(5):
+            response = self.client.post(reverse('api:miembro-lote'), lote, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 30)
+        self.assertEqual(contraparte.miembros.count(), 31)
+
+    def test_lote_reporta_errores_por_elemento(self):
+        """Test that an invalid batch reports errors by position and inserts nothing"""
+        contraparte = Contraparte.objects.first()
+        existente = contraparte.miembros.get()
+        base = {'contraparte': contraparte.pk, 'nacionalidad': 'PA', 'fecha_nacimiento': '1980-05-01'}
+        lote = [
+            {**base, 'nombre': 'Nuevo', 'numero_identificacion': 'N-1'},
+            {**base, 'nombre': 'Existente', 'numero_identificacion': existente.numero_identificacion},
+            {**base, 'nombre': 'Repetido', 'numero_identificacion': 'N-1'},
+            {**base, 'nombre': 'Sin contraparte', 'contraparte': 999999},
+        ]
+        response = self.client.post(reverse('api:miembro-lote'), lote, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('non_field_errors', response.data[1])
+        self.assertIn('elemento 0', response.data[2]['non_field_errors'][0])
+        self.assertIn('contraparte', response.data[3])
+        self.assertEqual(Miembro.objects.count(), 4)
+
+    def test_lote_con_clave_creada_en_paralelo_responde_409(self):
+        """Test that a unique key inserted after validation returns 409 instead of 500"""
+        contraparte = Contraparte.objects.first()
+        existente = contraparte.miembros.get()
+        lote = [{
+            'contraparte': contraparte.pk, 'nombre': 'Concurrente', 'nacionalidad': 'PA',
+            'fecha_nacimiento': '1980-05-01', 'numero_identificacion': existente.numero_identificacion,
+        }]
+        # Sin restricciones que verificar la validación no ve la fila, como si otra petición
+        # la hubiera insertado después de la consulta de claves existentes
+        with mock.patch.object(CreacionMasivaListSerializer, '_restricciones_unicas', return_value=[]):
+            response = self.client.post(reverse('api:miembro-lote'), lote, format='json')
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Miembro.objects.count(), 4)
+
+    def test_escritura_requiere_staff_o_permiso(self):
+        """Test that non-staff users can read but only write with the model permission"""
+        usuario = User.objects.create_user(username='lector', password='testpass123')
+        self.client.force_authenticate(usuario)
+        miembro = Miembro.objects.first()
+        detalle = reverse('api:miembro-detail', args=[miembro.pk])
+
+        self.assertEqual(self.client.get(reverse('api:miembro-list')).status_code, 200)
+        self.assertEqual(self.client.delete(detalle).status_code, 403)
+        self.assertEqual(self.client.post(reverse('api:miembro-lote'), [{}], format='json').status_code, 403)
+
+        usuario.user_permissions.add(Permission.objects.get(codename='delete_miembro'))
+        self.client.force_authenticate(User.objects.get(pk=usuario.pk))
+        self.assertEqual(self.client.delete(detalle).status_code, 204)
+
+    def test_delete_marca_inactivo_y_no_borra_contrapartes(self):
+        """Test that DELETE soft-deletes children and is not allowed on counterparties"""
+        miembro = Miembro.objects.first()
+        response = self.client.delete(reverse('api:miembro-detail', args=[miembro.pk]))
+
+        self.assertEqual(response.status_code, 204)
+        miembro.refresh_from_db()
+        self.assertFalse(miembro.activo)
 
-# Create your tests here.
+        contraparte = Contraparte.objects.first()
+        response = self.client.delete(reverse('api:contraparte-detail', args=[contraparte.pk]))
+        self.assertEqual(response.status_code, 405)
+        self.assertTrue(Contraparte.objects.filter(pk=contraparte.pk).exists())
@@ -1,12 +1,24 @@
 """
-URLs para la API REST - Temporal simplificado
+URLs para la API REST
 """
-from django.urls import path
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
 from . import views
 
 app_name = 'api'
 
+router = DefaultRouter()
+router.register('contrapartes', views.ContraparteViewSet, basename='contraparte')
+router.register('miembros', views.MiembroViewSet, basename='miembro')
+router.register('documentos', views.DocumentoViewSet, basename='documento')
+router.register('calificaciones', views.CalificacionViewSet, basename='calificacion')
+router.register('balance-sheets', views.BalanceSheetViewSet, basename='balance_sheet')
+router.register('balance-sheet-items', views.BalanceSheetItemViewSet, basename='balance_sheet_item')
+
 urlpatterns = [
     # Endpoints básicos temporales
     path('v1/test/', views.TestAPIView.as_view(), name='test'),
+
+    # Recursos REST
+    path('v1/', include(router.urls)),
 ]
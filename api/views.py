@@ -1,10 +1,327 @@
 """
-Vistas API REST - implementación básica temporal
+Vistas API REST
+Portal Interno de Contrapartes – App Pacífico (Cotizador Web)
+
+Viewsets para el Cotizador Web y otros sistemas internos. Todos usan
+paginación por cursor, admiten ?fields= (campos y columnas del SELECT) y
+?expand= (relaciones anidadas con select_related/prefetch_related), y
+responden 304 Not Modified cuando el ETag del cliente sigue vigente.
+
+Miembros, calificaciones e items de balance sheet admiten además creación
+masiva: POST <recurso>/lote/ con un arreglo de objetos.
+
+La lectura está abierta a cualquier usuario autenticado; la escritura
+requiere staff o el permiso del modelo (EscrituraStaffOPermisos). DELETE
+marca el registro como inactivo (activo=False) en lugar de borrarlo; las
+contrapartes no tienen soft delete y no se eliminan por la API.
 """
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import BooleanField, Prefetch
+from django.http import Http404
+from django.utils import timezone
+from rest_framework import permissions, serializers, status, viewsets
+from rest_framework.decorators import action
 from rest_framework.views import APIView
 from rest_framework.response import Response
 
+from contrapartes import fragmentos
+from contrapartes.calificaciones import invalidar_calificaciones_vigentes
+from contrapartes.models import (
+    BalanceSheet, BalanceSheetItem, Calificacion, Contraparte, Documento, Miembro,
+)
+from itico.condicional import aplicar_cabeceras, huella, respuesta_no_modificada, version_queryset
+
+from .pagination import CursorPaginacion
+from .permissions import EscrituraStaffOPermisos
+from .serializers import (
+    BalanceSheetItemSerializer, BalanceSheetSerializer, CalificacionSerializer, ContraparteSerializer,
+    DocumentoSerializer, MiembroSerializer,
+)
+
 
 class TestAPIView(APIView):
     def get(self, request):
         return Response({'status': 'API working'})
+
+
+class ConsultaOptimizadaMixin:
+    """
+    Ajusta el queryset a los parámetros ?fields=, ?expand= y de filtro.
+
+    - Las relaciones directas expandidas se cargan con select_related y las
+      inversas con prefetch_related (una consulta adicional por relación,
+      solo con los registros activos).
+    - En lecturas, ?fields= se traduce a .only() para no leer columnas que
+      la respuesta no incluye (direcciones, notas y demás textos largos).
+    - `filtros` mapea parámetros de la URL a lookups del modelo. Cada valor
+      se convierte con el campo del lookup; uno inválido responde 400.
+    """
+    pagination_class = CursorPaginacion
+    permission_classes = [EscrituraStaffOPermisos]
+    filtros = {}
+
+    def _parametro_lista(self, nombre):
+        valor = self.request.query_params.get(nombre)
+        if not valor:
+            return None
+        return {parte.strip() for parte in valor.split(',') if parte.strip()}
+
+    def get_campos(self):
+        # Los campos parciales solo aplican a lecturas
+        if self.request.method not in permissions.SAFE_METHODS:
+            return None
+        return self._parametro_lista('fields')
+
+    def get_expandir(self):
+        serializer_class = self.get_serializer_class()
+        expandir = (self._parametro_lista('expand') or set()) & set(serializer_class.expandibles)
+        campos = self.get_campos()
+        # Una relación expandida que no está en ?fields= no se devuelve
+        return expandir & campos if campos else expandir
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['campos'] = self.get_campos()
+        context['expandir'] = self.get_expandir()
+        return context
+
+    def _valor_filtro(self, modelo, parametro, lookup, valor):
+        # Campo al que apunta el lookup (ej: 'tipo__codigo' -> TipoContraparte.codigo)
+        for nombre in lookup.split('__'):
+            campo = modelo._meta.get_field(nombre)
+            modelo = campo.related_model
+        if isinstance(campo, BooleanField) and valor.lower() in ('true', 'false'):
+            return valor.lower() == 'true'
+        try:
+            return campo.to_python(valor)
+        except DjangoValidationError:
+            raise serializers.ValidationError({parametro: [f'Valor no válido: {valor}']})
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        modelo = queryset.model
+        serializer_class = self.get_serializer_class()
+
+        for parametro, lookup in self.filtros.items():
+            valor = self.request.query_params.get(parametro)
+            if valor not in (None, ''):
+                queryset = queryset.filter(**{lookup: self._valor_filtro(modelo, parametro, lookup, valor)})
+
+        for nombre in self.get_expandir():
+            relacion = modelo._meta.get_field(nombre)
+            if relacion.one_to_many or relacion.many_to_many:
+                # objects y no _default_manager (all_objects en los modelos con
+                # soft delete): los hijos expandidos excluyen los eliminados
+                queryset = queryset.prefetch_related(
+                    Prefetch(nombre, queryset=relacion.related_model.objects.order_by('pk'))
+                )
+            else:
+                queryset = queryset.select_related(nombre)
+
+        campos = self.get_campos()
+        if campos:
+            queryset = queryset.only(*serializer_class.columnas_para(campos))
+        return queryset
+
+
+class RespuestaCondicionalMixin:
+    """
+    Respuestas condicionales para list y retrieve.
+
+    La huella se calcula antes de serializar: COUNT/MAX(id)/MAX(fecha) del
+    recurso o colección filtrada (incluyendo las FK expandidas en la misma
+    consulta) y una consulta similar por cada relación inversa expandida.
+    La URL completa forma parte del ETag, de modo que cada página, cursor y
+    combinación de ?fields=/?expand= tiene el suyo. También la fecha local:
+    campos calculados como Documento.esta_vencido o
+    Contraparte.dias_hasta_proxima_dd (anidados al expandir relaciones)
+    cambian de un día a otro sin que cambien los registros.
+    """
+
+    def _huella(self, queryset):
+        modelo = queryset.model
+        directas, inversas = [], []
+        for nombre in self.get_expandir():
+            relacion = modelo._meta.get_field(nombre)
+            (inversas if relacion.one_to_many or relacion.many_to_many else directas).append(relacion)
+
+        versiones = [version_queryset(queryset, relaciones=[relacion.name for relacion in directas])]
+        for relacion in inversas:
+            relacionados = relacion.related_model.objects.filter(
+                **{f'{relacion.field.name}__in': queryset.values('pk')}
+            )
+            versiones.append(version_queryset(relacionados))
+        return huella(*versiones, extra=(self.request.get_full_path(), timezone.localdate()))
+
+    def _responder_condicional(self, queryset, vista, request, *args, **kwargs):
+        etag, ultima_modificacion = self._huella(queryset)
+        respuesta = respuesta_no_modificada(request, etag, ultima_modificacion)
+        if respuesta is not None:
+            return respuesta
+        respuesta = vista(request, *args, **kwargs)
+        if respuesta.status_code == 200:
+            aplicar_cabeceras(respuesta, etag, ultima_modificacion)
+        return respuesta
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self._responder_condicional(queryset, super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = self.lookup_url_kwarg or self.lookup_field
+        try:
+            queryset = self.filter_queryset(self.get_queryset()).filter(
+                **{self.lookup_field: kwargs[lookup]}
+            )
+        except (TypeError, ValueError, DjangoValidationError):
+            # Mismo criterio que get_object_or_404 de DRF (ej: /contrapartes/abc/)
+            raise Http404
+        return self._responder_condicional(queryset, super().retrieve, request, *args, **kwargs)
+
+
+class CreacionMasivaMixin:
+    """
+    Agrega POST <recurso>/lote/ para crear varios objetos en una petición.
+
+    El arreglo completo se valida antes de escribir nada; si algún elemento
+    es inválido se responde 400 con una lista de errores alineada con la
+    entrada ({} para los elementos válidos). Si todos son válidos se
+    insertan con un solo bulk_create dentro de una transacción, usando el
+    mismo perform_create() que la creación individual. Si otra petición
+    inserta una clave única entre la validación y el INSERT, el lote
+    completo se descarta y se responde 409.
+    """
+    tamano_maximo_lote = 500
+
+    @action(detail=False, methods=['post'], url_path='lote')
+    def lote(self, request):
+        serializer = self.get_serializer(
+            data=request.data, many=True, allow_empty=False, max_length=self.tamano_maximo_lote
+        )
+        serializer.is_valid(raise_exception=True)
+        try:
+            with transaction.atomic():
+                self.perform_create(serializer)
+                self.despues_de_lote(serializer.instance)
+        except IntegrityError:
+            return Response(
+                {'detail': 'Otro registro con la misma clave se creó durante la petición; reintente el lote.'},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def despues_de_lote(self, objetos):
+        """Gancho para lo que normalmente haría post_save (bulk_create no lo envía)"""
+
+
+class EliminacionLogicaMixin:
+    """
+    DELETE marca el registro como inactivo en lugar de borrarlo, igual que
+    las vistas del portal. save() envía post_save, que invalida los
+    fragmentos y cachés de la contraparte.
+    """
+
+    def perform_destroy(self, instance):
+        instance.activo = False
+        instance.save()
+
+
+class ContraparteViewSet(RespuestaCondicionalMixin, ConsultaOptimizadaMixin, viewsets.ModelViewSet):
+    """Contrapartes. Filtros: ?tipo=<codigo>, ?estado=<codigo>"""
+    # Sin DELETE: Contraparte no tiene soft delete y borrarla eliminaría en
+    # cascada miembros, documentos, calificaciones y balance sheets
+    http_method_names = ['get', 'post', 'put', 'patch', 'head', 'options']
+    queryset = Contraparte.objects.all()
+    serializer_class = ContraparteSerializer
+    filtros = {
+        'tipo': 'tipo__codigo',
+        'estado': 'estado_nuevo__codigo',
+    }
+
+    def perform_create(self, serializer):
+        serializer.save(creado_por=self.request.user)
+
+
+class MiembroViewSet(CreacionMasivaMixin, EliminacionLogicaMixin, RespuestaCondicionalMixin,
+                     ConsultaOptimizadaMixin, viewsets.ModelViewSet):
+    """Miembros de contrapartes. Filtros: ?contraparte=<id>, ?es_pep=, ?activo="""
+    queryset = Miembro.all_objects.all()
+    serializer_class = MiembroSerializer
+    filtros = {
+        'contraparte': 'contraparte_id',
+        'es_pep': 'es_pep',
+        'activo': 'activo',
+    }
+
+    def despues_de_lote(self, objetos):
+        # Equivalente a la señal post_save de Miembro
+        for contraparte_id in {objeto.contraparte_id for objeto in objetos}:
+            fragmentos.invalidar_seccion(contraparte_id, 'miembros')
+
+
+class DocumentoViewSet(EliminacionLogicaMixin, RespuestaCondicionalMixin, ConsultaOptimizadaMixin,
+                       viewsets.ModelViewSet):
+    """Documentos. Filtros: ?contraparte=<id>, ?tipo=<id>, ?categoria=, ?activo="""
+    queryset = Documento.all_objects.all()
+    serializer_class = DocumentoSerializer
+    filtros = {
+        'contraparte': 'contraparte_id',
+        'tipo': 'tipo_id',
+        'categoria': 'categoria',
+        'activo': 'activo',
+    }
+
+    def perform_create(self, serializer):
+        serializer.save(subido_por=self.request.user)
+
+
+class CalificacionViewSet(CreacionMasivaMixin, EliminacionLogicaMixin, RespuestaCondicionalMixin,
+                          ConsultaOptimizadaMixin, viewsets.ModelViewSet):
+    """Calificaciones. Filtros: ?contraparte=<id>, ?calificador=<id>, ?activo="""
+    queryset = Calificacion.all_objects.all()
+    serializer_class = CalificacionSerializer
+    filtros = {
+        'contraparte': 'contraparte_id',
+        'calificador': 'calificador_id',
+        'activo': 'activo',
+    }
+
+    def perform_create(self, serializer):
+        serializer.save(creado_por=self.request.user)
+
+    def despues_de_lote(self, objetos):
+        # Equivalente a la señal post_save de Calificacion
+        for contraparte_id in {objeto.contraparte_id for objeto in objetos}:
+            transaction.on_commit(lambda pk=contraparte_id: invalidar_calificaciones_vigentes(pk))
+            fragmentos.invalidar_seccion(contraparte_id, 'calificaciones')
+
+
+class BalanceSheetViewSet(EliminacionLogicaMixin, RespuestaCondicionalMixin, ConsultaOptimizadaMixin,
+                          viewsets.ModelViewSet):
+    """Balance sheets. Filtros: ?contraparte=<id>, ?año=, ?activo="""
+    queryset = BalanceSheet.all_objects.all()
+    serializer_class = BalanceSheetSerializer
+    filtros = {
+        'contraparte': 'contraparte_id',
+        'año': 'año',
+        'activo': 'activo',
+    }
+
+    def perform_create(self, serializer):
+        serializer.save(creado_por=self.request.user)
+
+
+class BalanceSheetItemViewSet(CreacionMasivaMixin, EliminacionLogicaMixin, RespuestaCondicionalMixin,
+                              ConsultaOptimizadaMixin, viewsets.ModelViewSet):
+    """Items de balance sheet. Filtros: ?balance_sheet=<id>, ?categoria=, ?activo="""
+    queryset = BalanceSheetItem.all_objects.all()
+    serializer_class = BalanceSheetItemSerializer
+    filtros = {
+        'balance_sheet': 'balance_sheet_id',
+        'categoria': 'categoria',
+        'activo': 'activo',
+    }
+
+    def perform_create(self, serializer):
+        serializer.save(creado_por=self.request.user)
@@ -1,8 +1,19 @@
 """
 Configuración del Django Admin para Contrapartes
+
+Los changelists ejecutan un número fijo de consultas sin importar cuántas
+filas muestren: las columnas de relaciones se cargan con
+list_select_related, los conteos y totales se anotan en get_queryset() y
+las tablas grandes usan PaginadorEstimado.
 """
+from decimal import Decimal
+
 from django.contrib import admin
+from django.db.models import Count
 from django.utils.html import format_html
+
+from itico.paginacion import PaginadorEstimado
+
 from .models import (
     TipoContraparte, EstadoContraparte, TipoDocumento, Contraparte, 
     Miembro, Documento, Comentario, Calificacion, Calificador, Outlook,
@@ -10,6 +21,16 @@ from .models import (
 )
 
 
+class FiltroPorNombre(admin.RelatedFieldListFilter):
+    """
+    Filtro por relación que obtiene las opciones (pk, nombre) en una sola
+    consulta, en lugar de llamar a __str__ (que accede a otras relaciones)
+    por cada objeto.
+    """
+    def field_choices(self, field, request, model_admin):
+        return list(field.related_model._default_manager.order_by('nombre').values_list('pk', 'nombre'))
+
+
 @admin.register(TipoContraparte)
 class TipoContraparteAdmin(admin.ModelAdmin):
     list_display = [
@@ -28,6 +49,7 @@ class TipoContraparteAdmin(admin.ModelAdmin):
     search_fields = ['codigo', 'nombre', 'descripcion']
     ordering = ['nombre']
     readonly_fields = ['fecha_creacion', 'fecha_actualizacion']
+    list_select_related = ['creado_por']
     
     fieldsets = (
         ('Información Básica', {
@@ -51,14 +73,17 @@ class TipoContraparteAdmin(admin.ModelAdmin):
             )
     activo_badge.short_description = 'Estado'
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(num_contrapartes=Count('contrapartes'))
+    
     def contrapartes_count(self, obj):
         """Muestra el número de contrapartes de este tipo"""
-        count = obj.contrapartes.count()
         return format_html(
             '<span style="font-weight: bold;">{} contrapartes</span>',
-            count
+            obj.num_contrapartes
         )
     contrapartes_count.short_description = 'Contrapartes'
+    contrapartes_count.admin_order_field = 'num_contrapartes'
     
     def save_model(self, request, obj, form, change):
         if not change:  # If creating new tipo
@@ -92,6 +117,7 @@ class EstadoContraparteAdmin(admin.ModelAdmin):
         'fecha_creacion',
         'fecha_actualizacion'
     ]
+    list_select_related = ['creado_por']
     fieldsets = (
         ('Información Básica', {
             'fields': (
@@ -136,14 +162,17 @@ class EstadoContraparteAdmin(admin.ModelAdmin):
             )
     activo_badge.short_description = 'Estado'
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(num_contrapartes=Count('contrapartes'))
+    
     def contrapartes_count(self, obj):
         """Muestra el número de contrapartes con este estado"""
-        count = obj.contrapartes.count()
         return format_html(
             '<span style="font-weight: bold;">{} contrapartes</span>',
-            count
+            obj.num_contrapartes
         )
     contrapartes_count.short_description = 'Contrapartes'
+    contrapartes_count.admin_order_field = 'num_contrapartes'
     
     def save_model(self, request, obj, form, change):
         if not change:  # If creating new estado
@@ -171,6 +200,7 @@ class TipoDocumentoAdmin(admin.ModelAdmin):
     search_fields = ['codigo', 'nombre', 'descripcion']
     ordering = ['nombre']
     readonly_fields = ['fecha_creacion', 'fecha_actualizacion']
+    list_select_related = ['creado_por']
     
     fieldsets = (
         ('Información Básica', {
@@ -206,14 +236,17 @@ class TipoDocumentoAdmin(admin.ModelAdmin):
             )
     activo_badge.short_description = 'Estado'
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(num_documentos=Count('documentos'))
+    
     def documentos_count(self, obj):
         """Muestra el número de documentos de este tipo"""
-        count = obj.documentos.count()
         return format_html(
             '<span style="font-weight: bold;">{} documentos</span>',
-            count
+            obj.num_documentos
         )
     documentos_count.short_description = 'Documentos'
+    documentos_count.admin_order_field = 'num_documentos'
     
     def save_model(self, request, obj, form, change):
         if not change:  # If creating new tipo
@@ -242,6 +275,9 @@ class ContraparteAdmin(admin.ModelAdmin):
     search_fields = ['nombre', 'descripcion', 'notas']
     ordering = ['-fecha_creacion']
     readonly_fields = ['fecha_creacion', 'fecha_actualizacion']
+    list_select_related = ['tipo', 'estado_nuevo', 'creado_por']
+    paginator = PaginadorEstimado
+    show_full_result_count = False
     
     fieldsets = (
         ('Información Básica', {
@@ -276,6 +312,7 @@ class ContraparteAdmin(admin.ModelAdmin):
                 '<span style="color: gray; font-style: italic;">Sin estado</span>'
             )
     estado_badge.short_description = 'Estado'
+    estado_badge.admin_order_field = 'estado_nuevo__nombre'
 
 
 class MiembroInline(admin.TabularInline):
@@ -319,6 +356,9 @@ class MiembroAdmin(admin.ModelAdmin):
     ]
     ordering = ['contraparte__nombre', 'nombre']
     readonly_fields = ['fecha_creacion', 'fecha_actualizacion']
+    list_select_related = ['contraparte__tipo']
+    paginator = PaginadorEstimado
+    show_full_result_count = False
     
     fieldsets = (
         ('Información Personal', {
@@ -392,6 +432,9 @@ class DocumentoAdmin(admin.ModelAdmin):
     search_fields = ['tipo__nombre', 'descripcion', 'contraparte__nombre']
     ordering = ['-fecha_subida']
     readonly_fields = ['fecha_subida', 'fecha_actualizacion', 'tamaño_legible']
+    list_select_related = ['tipo', 'contraparte__tipo', 'subido_por']
+    paginator = PaginadorEstimado
+    show_full_result_count = False
     
     fieldsets = (
         ('Información del Documento', {
@@ -484,6 +527,9 @@ class ComentarioAdmin(admin.ModelAdmin):
     ]
     ordering = ['-fecha_creacion']
     readonly_fields = ['fecha_creacion', 'fecha_actualizacion']
+    list_select_related = ['contraparte__tipo', 'usuario']
+    paginator = PaginadorEstimado
+    show_full_result_count = False
     
     fieldsets = (
         ('Información del Comentario', {
@@ -540,6 +586,7 @@ class CalificadorAdmin(admin.ModelAdmin):
     search_fields = ['nombre']
     ordering = ['nombre']
     readonly_fields = ['creado_por', 'fecha_creacion', 'fecha_actualizacion']
+    list_select_related = ['creado_por']
     
     def save_model(self, request, obj, form, change):
         if not change:  # Only set created_by for new objects
@@ -554,6 +601,7 @@ class OutlookAdmin(admin.ModelAdmin):
     search_fields = ['outlook']
     ordering = ['outlook']
     readonly_fields = ['creado_por', 'fecha_creacion', 'fecha_actualizacion']
+    list_select_related = ['creado_por']
     
     def save_model(self, request, obj, form, change):
         if not change:  # Only set created_by for new objects
@@ -569,6 +617,9 @@ class CalificacionAdmin(admin.ModelAdmin):
     ordering = ['-fecha']
     readonly_fields = ['creado_por', 'fecha_creacion', 'fecha_actualizacion']
     date_hierarchy = 'fecha'
+    list_select_related = ['contraparte__tipo', 'calificador', 'outlook', 'creado_por']
+    paginator = PaginadorEstimado
+    show_full_result_count = False
     
     fieldsets = (
         ('Información de Calificación', {
@@ -609,6 +660,7 @@ class MonedaAdmin(admin.ModelAdmin):
     search_fields = ['codigo', 'nombre']
     ordering = ['codigo']
     readonly_fields = ['fecha_creacion', 'fecha_actualizacion']
+    list_select_related = ['creado_por']
     
     fieldsets = (
         ('Información de Moneda', {
@@ -658,6 +710,9 @@ class TipoCambioAdmin(admin.ModelAdmin):
     ordering = ['-fecha', 'moneda__codigo']
     readonly_fields = ['fecha_creacion']
     date_hierarchy = 'fecha'
+    list_select_related = ['moneda', 'creado_por']
+    paginator = PaginadorEstimado
+    show_full_result_count = False
     
     fieldsets = (
         ('Tipo de Cambio', {
@@ -719,6 +774,7 @@ class BalanceSheetAdmin(admin.ModelAdmin):
     ordering = ['-año', 'contraparte__nombre']
     readonly_fields = ['fecha_creacion', 'fecha_actualizacion']
     inlines = [BalanceSheetItemInline]
+    list_select_related = ['contraparte', 'moneda_local', 'creado_por']
     
     fieldsets = (
         ('Balance Sheet', {
@@ -741,6 +797,26 @@ class BalanceSheetAdmin(admin.ModelAdmin):
         """Muestra el nombre de la contraparte"""
         return obj.contraparte.nombre or obj.contraparte.full_company_name or "Sin nombre"
     contraparte_name.short_description = 'Contraparte'
+    contraparte_name.admin_order_field = 'contraparte__nombre'
+    
+    def get_queryset(self, request):
+        """Anota los totales por categoría en lugar de sumar los items por fila"""
+        return super().get_queryset(request).con_totales()
+    
+    def total_assets_usd(self, obj):
+        return obj.suma_assets or Decimal('0.00')
+    total_assets_usd.short_description = 'Total assets USD'
+    total_assets_usd.admin_order_field = 'suma_assets'
+    
+    def total_liabilities_usd(self, obj):
+        return obj.suma_liabilities or Decimal('0.00')
+    total_liabilities_usd.short_description = 'Total liabilities USD'
+    total_liabilities_usd.admin_order_field = 'suma_liabilities'
+    
+    def total_equity_usd(self, obj):
+        return obj.suma_equity or Decimal('0.00')
+    total_equity_usd.short_description = 'Total equity USD'
+    total_equity_usd.admin_order_field = 'suma_equity'
     
     def moneda_display(self, obj):
         """Muestra la configuración de moneda"""
@@ -790,7 +866,7 @@ class BalanceSheetItemAdmin(admin.ModelAdmin):
         'categoria',
         'activo',
         'balance_sheet__año',
-        'balance_sheet__contraparte'
+        ('balance_sheet__contraparte', FiltroPorNombre)
     ]
     search_fields = [
         'descripcion',
@@ -800,6 +876,9 @@ class BalanceSheetItemAdmin(admin.ModelAdmin):
     ]
     ordering = ['balance_sheet', 'categoria', 'orden', 'descripcion']
     readonly_fields = ['fecha_creacion', 'fecha_actualizacion']
+    list_select_related = ['balance_sheet__contraparte', 'creado_por']
+    paginator = PaginadorEstimado
+    show_full_result_count = False
     
     fieldsets = (
         ('Item de Balance', {
@@ -5,7 +5,8 @@ Handles AJAX requests for document CRUD operations from detalle.html template
 
 import os
 from collections import defaultdict
-from django.http import JsonResponse
+from django.core.validators import FileExtensionValidator
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404
 from django.template.loader import render_to_string
 from django.contrib.auth.decorators import login_required
@@ -14,7 +15,11 @@ from django.views.decorators.csrf import csrf_exempt
 from django.core.files.storage import default_storage
 from django.conf import settings
 
-from .models import Contraparte, Documento, TipoDocumento
+from itico.asincrono import login_requerido
+from itico.condicional import condicional, huella
+
+from .catalogos import TIPOS_DOCUMENTO
+from .models import Contraparte, Documento
 from .forms import DocumentoForm
 
 
@@ -38,7 +43,7 @@ def load_document_form(request, contraparte_pk):
         form = DocumentoForm()
         
         # Get active document types for the form
-        tipos_documento = TipoDocumento.objects.filter(activo=True).order_by('nombre')
+        tipos_documento = TIPOS_DOCUMENTO.registros()
         
         # Render the form template
         form_html = render_to_string('contrapartes/documento_form_modal.html', {
@@ -105,7 +110,7 @@ def save_document_form(request, contraparte_pk):
             })
         else:
             # Form has errors, return form with errors
-            tipos_documento = TipoDocumento.objects.filter(activo=True).order_by('nombre')
+            tipos_documento = TIPOS_DOCUMENTO.registros()
             form_html = render_to_string('contrapartes/documento_form_modal.html', {
                 'form': form,
                 'contraparte': contraparte,
@@ -153,7 +158,7 @@ def load_document_edit_form(request, documento_pk):
         form = DocumentoForm(instance=documento)
         
         # Get active document types for the form
-        tipos_documento = TipoDocumento.objects.filter(activo=True).order_by('nombre')
+        tipos_documento = TIPOS_DOCUMENTO.registros()
         
         # Render the form template
         form_html = render_to_string('contrapartes/documento_form_modal.html', {
@@ -222,7 +227,7 @@ def save_document_edit_form(request, documento_pk):
             })
         else:
             # Form has errors, return form with errors
-            tipos_documento = TipoDocumento.objects.filter(activo=True).order_by('nombre')
+            tipos_documento = TIPOS_DOCUMENTO.registros()
             form_html = render_to_string('contrapartes/documento_form_modal.html', {
                 'form': form,
                 'contraparte': documento.contraparte,
@@ -294,12 +299,15 @@ def delete_document(request, documento_pk):
         })
 
 
-@login_required
+@login_requerido
 @require_http_methods(["POST"])
-def upload_progress(request, contraparte_pk):
+async def upload_progress(request, contraparte_pk):
     """
     Handle file upload progress and validation
     This can be used for real-time upload feedback
+
+    Asíncrona: valida el archivo sin ocupar un hilo del worker con ASGI.
+    Las extensiones permitidas son las del validador de Documento.archivo.
     
     Args:
         request: HTTP request object
@@ -308,9 +316,10 @@ def upload_progress(request, contraparte_pk):
     Returns:
         JsonResponse with upload status
     """
+    if not await Contraparte.objects.filter(pk=contraparte_pk).aexists():
+        raise Http404('Contraparte no encontrada')
+
     try:
-        contraparte = get_object_or_404(Contraparte, pk=contraparte_pk)
-        
         if 'archivo' not in request.FILES:
             return JsonResponse({
                 'success': False,
@@ -321,7 +330,7 @@ def upload_progress(request, contraparte_pk):
         
         # Basic file validation
         max_size = getattr(settings, 'MAX_UPLOAD_SIZE', 10 * 1024 * 1024)  # 10MB default
-        allowed_extensions = ['pdf', 'doc', 'docx', 'xls', 'xlsx', 'txt', 'jpg', 'jpeg', 'png']
+        allowed_extensions = _extensiones_permitidas()
         
         # Check file size
         if archivo.size > max_size:
@@ -353,6 +362,13 @@ def upload_progress(request, contraparte_pk):
         })
 
 
+def _extensiones_permitidas():
+    for validador in Documento._meta.get_field('archivo').validators:
+        if isinstance(validador, FileExtensionValidator):
+            return validador.allowed_extensions
+    return []
+
+
 def _get_documentos_agrupados(contraparte):
     """
     Helper function to group documents by category
@@ -383,6 +399,7 @@ def _get_documentos_agrupados(contraparte):
 
 @login_required
 @require_http_methods(["GET"])
+@condicional(lambda request: huella(TIPOS_DOCUMENTO.version()))
 def get_document_types(request):
     """
     Get all active document types (useful for dynamic form updates)
@@ -391,7 +408,7 @@ def get_document_types(request):
         JsonResponse with list of document types
     """
     try:
-        tipos = TipoDocumento.objects.filter(activo=True).order_by('nombre')
+        tipos = TIPOS_DOCUMENTO.registros()
         tipos_data = []
         
         for tipo in tipos:
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ContrapartesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'contrapartes'
+
+    def ready(self):
+        # Conectar signals de invalidación de caché
+        from . import signals  # noqa: F401
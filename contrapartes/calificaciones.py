@@ -0,0 +1,309 @@
+"""
+Consultas y reportes sobre calificaciones de contrapartes
+Portal Interno de Contrapartes – App Pacífico (Cotizador Web)
+
+CALIFICACIONES VIGENTES:
+La calificación vigente de una contraparte para una agencia es la última
+calificación activa (por fecha) de ese par (contraparte, calificador).
+
+- PostgreSQL: SELECT DISTINCT ON (contraparte, calificador) ... ORDER BY fecha DESC
+- Otros motores: ROW_NUMBER() OVER (PARTITION BY contraparte, calificador)
+
+Ambas variantes se apoyan en el índice compuesto
+(contraparte, calificador, -fecha) de Calificacion. El resultado por
+contraparte se guarda en caché y se invalida al guardar o eliminar una
+calificación (ver contrapartes/signals.py).
+
+HISTORIAL Y MATRICES DE MIGRACIÓN:
+Las calificaciones se traducen a una escala numérica común (1 = AAA/Aaa)
+para construir la trayectoria de cada contraparte por agencia y la matriz
+de migración de la cartera entre dos fechas. Las matrices se calculan con
+NumPy en una sola pasada sobre una consulta iterada por lotes.
+"""
+
+import re
+
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from itico import cache as cache_itico
+from itico.conexiones import iterar_por_lotes
+
+from .models import Calificacion, Outlook
+
+
+# Tiempo de vida del caché de calificaciones vigentes (segundos)
+CACHE_TIMEOUT_VIGENTES = 60 * 60
+
+
+def _clave_cache_vigentes(contraparte_id):
+    return f'contrapartes:calificaciones_vigentes:{contraparte_id}'
+
+
+def calificaciones_vigentes(contrapartes=None):
+    """
+    Retorna un QuerySet con la calificación vigente por contraparte y agencia.
+
+    Args:
+        contrapartes: Contrapartes o IDs a los que limitar la consulta
+            (opcional; None para toda la cartera)
+
+    Returns:
+        QuerySet: Calificaciones vigentes con calificador y outlook
+        precargados, ordenadas por contraparte y nombre de la agencia
+    """
+    base = Calificacion.objects.all()
+    if contrapartes is not None:
+        base = base.filter(contraparte__in=contrapartes)
+
+    if connections[base.db].vendor == 'postgresql':
+        vigentes = base.order_by(
+            'contraparte_id', 'calificador_id', '-fecha', '-id'
+        ).distinct('contraparte_id', 'calificador_id')
+    else:
+        vigentes = base.annotate(
+            posicion=Window(
+                expression=RowNumber(),
+                partition_by=[F('contraparte_id'), F('calificador_id')],
+                order_by=[F('fecha').desc(), F('id').desc()],
+            )
+        ).filter(posicion=1)
+
+    return Calificacion.objects.filter(
+        id__in=vigentes.values('id')
+    ).select_related('calificador', 'outlook').order_by('contraparte_id', 'calificador__nombre')
+
+
+def adjuntar_calificaciones_vigentes(contrapartes, atributo='calificaciones_vigentes'):
+    """
+    Asigna a cada contraparte la lista de sus calificaciones vigentes.
+
+    Consulta el caché por contraparte y resuelve todos los faltantes con una
+    sola consulta, por lo que listas, detalle y exportaciones evitan el N+1.
+
+    Args:
+        contrapartes: Iterable de instancias de Contraparte (ej: una página)
+        atributo: Nombre del atributo donde se guarda la lista
+
+    Returns:
+        list: Las mismas contrapartes, con el atributo asignado
+    """
+    contrapartes = list(contrapartes)
+    if not contrapartes:
+        return contrapartes
+
+    claves = {c.pk: _clave_cache_vigentes(c.pk) for c in contrapartes}
+    en_cache = cache.get_many(claves.values())
+    resultado = {pk: en_cache[clave] for pk, clave in claves.items() if clave in en_cache}
+
+    faltantes = [pk for pk in claves if pk not in resultado]
+    if faltantes:
+        nuevos = {pk: [] for pk in faltantes}
+        for calificacion in calificaciones_vigentes(faltantes):
+            nuevos[calificacion.contraparte_id].append(calificacion)
+        cache.set_many(
+            {claves[pk]: lista for pk, lista in nuevos.items()},
+            CACHE_TIMEOUT_VIGENTES
+        )
+        resultado.update(nuevos)
+
+    for contraparte in contrapartes:
+        setattr(contraparte, atributo, resultado[contraparte.pk])
+    return contrapartes
+
+
+def invalidar_calificaciones_vigentes(contraparte_id):
+    """Elimina del caché las calificaciones vigentes de una contraparte"""
+    cache.delete(_clave_cache_vigentes(contraparte_id))
+
+
+# =============================================================================
+# ESCALA NUMÉRICA DE CALIFICACIONES
+# =============================================================================
+
+# Escala de largo plazo S&P / Fitch (de mejor a peor)
+ESCALA_SP = [
+    'AAA', 'AA+', 'AA', 'AA-', 'A+', 'A', 'A-',
+    'BBB+', 'BBB', 'BBB-', 'BB+', 'BB', 'BB-', 'B+', 'B', 'B-',
+    'CCC+', 'CCC', 'CCC-', 'CC', 'C', 'D',
+]
+
+# Escala de largo plazo Moody's equivalente notch a notch
+ESCALA_MOODYS = [
+    'AAA', 'AA1', 'AA2', 'AA3', 'A1', 'A2', 'A3',
+    'BAA1', 'BAA2', 'BAA3', 'BA1', 'BA2', 'BA3', 'B1', 'B2', 'B3',
+    'CAA1', 'CAA2', 'CAA3', 'CA', 'C',
+]
+
+NIVELES_CALIFICACION = {nota: nivel for nivel, nota in enumerate(ESCALA_SP, start=1)}
+for _nivel, _nota in enumerate(ESCALA_MOODYS, start=1):
+    NIVELES_CALIFICACION.setdefault(_nota, _nivel)
+# Moody's no publica "D": el incumplimiento se expresa con "C"
+NIVELES_CALIFICACION['SD'] = NIVELES_CALIFICACION['RD'] = NIVELES_CALIFICACION['D']
+
+# Categorías amplias para la matriz de migración (sin modificadores +/-)
+CATEGORIAS = ['AAA', 'AA', 'A', 'BBB', 'BB', 'B', 'CCC', 'CC', 'C', 'D']
+SIN_CALIFICACION = 'NR'
+
+# Prefijos y sufijos de escalas nacionales: "AA+(col)", "AAA.co", "F1+ col"
+_PATRON_CALIFICACION = re.compile(r'^[^A-Z]*([A-Z]+[0-9]?[+-]?)')
+
+
+def nivel_calificacion(calificacion):
+    """
+    Convierte una calificación textual a su nivel en la escala numérica.
+
+    Args:
+        calificacion: Calificación otorgada (ej: 'AA-', 'Baa2', 'A+(col)')
+
+    Returns:
+        int | None: Nivel (1 = AAA) o None si no es reconocible
+    """
+    if not calificacion:
+        return None
+    coincidencia = _PATRON_CALIFICACION.match(calificacion.strip().upper())
+    if not coincidencia:
+        return None
+    return NIVELES_CALIFICACION.get(coincidencia.group(1))
+
+
+def categoria_nivel(nivel):
+    """Retorna la categoría amplia (AAA, AA, A, BBB...) de un nivel numérico"""
+    if nivel is None:
+        return SIN_CALIFICACION
+    return ESCALA_SP[nivel - 1].rstrip('+-')
+
+
+# =============================================================================
+# TRAYECTORIAS Y MIGRACIONES
+# =============================================================================
+
+def trayectoria_calificaciones(contraparte):
+    """
+    Construye la trayectoria de calificaciones de una contraparte por agencia.
+
+    Args:
+        contraparte: Contraparte o ID
+
+    Returns:
+        dict: {nombre del calificador: [ {fecha, calificacion, nivel, outlook}, ... ]}
+        con los puntos ordenados cronológicamente
+    """
+    filas = Calificacion.objects.filter(
+        contraparte=contraparte
+    ).order_by('calificador__nombre', 'fecha', 'id').values_list(
+        'calificador__nombre', 'fecha', 'calificacion', 'outlook__outlook'
+    )
+
+    trayectorias = {}
+    for calificador, fecha, calificacion, outlook in filas:
+        trayectorias.setdefault(calificador, []).append({
+            'fecha': fecha,
+            'calificacion': calificacion,
+            'nivel': nivel_calificacion(calificacion),
+            'outlook': outlook,
+        })
+    return trayectorias
+
+
+def matriz_migracion(fecha_inicio, fecha_fin, calificador=None, detalle=False):
+    """
+    Calcula la matriz de migración de calificaciones de la cartera.
+
+    Para cada par (contraparte, calificador) toma la última calificación
+    activa vigente a cada fecha y cuenta las transiciones origen → destino.
+    Los pares sin calificación a alguna de las fechas se cuentan como "NR".
+
+    Args:
+        fecha_inicio: Fecha de corte inicial
+        fecha_fin: Fecha de corte final
+        calificador: Calificador o ID para limitar el reporte (opcional)
+        detalle: True para usar notches (AA+, AA, AA-) en lugar de categorías
+
+    Returns:
+        dict: {
+            'etiquetas': [...], 'matriz': ndarray (origen × destino),
+            'outlooks': [...], 'matriz_outlook': ndarray,
+            'resumen': {'pares', 'estables', 'mejoras', 'deterioros'}
+        }
+    """
+    etiquetas = (ESCALA_SP if detalle else CATEGORIAS) + [SIN_CALIFICACION]
+    posicion_etiqueta = {etiqueta: i for i, etiqueta in enumerate(etiquetas)}
+    outlooks = list(cache_itico.obtener(
+        cache_itico.espacio_modelo(Outlook), 'codigos',
+        lambda: list(Outlook.objects.order_by('outlook').values_list('outlook', flat=True)),
+    ))
+    outlooks.append(SIN_CALIFICACION)
+    posicion_outlook = {outlook: i for i, outlook in enumerate(outlooks)}
+    sin_calificacion = posicion_etiqueta[SIN_CALIFICACION]
+    sin_outlook = posicion_outlook[SIN_CALIFICACION]
+
+    def posicion(calificacion):
+        nivel = nivel_calificacion(calificacion)
+        if nivel is None:
+            return sin_calificacion
+        etiqueta = ESCALA_SP[nivel - 1] if detalle else categoria_nivel(nivel)
+        return posicion_etiqueta[etiqueta]
+
+    filas = Calificacion.objects.filter(fecha__lte=fecha_fin)
+    if calificador is not None:
+        filas = filas.filter(calificador=calificador)
+    filas = filas.order_by('contraparte_id', 'calificador_id', 'fecha', 'id').values_list(
+        'contraparte_id', 'calificador_id', 'fecha', 'calificacion', 'outlook__outlook'
+    )
+
+    # Índices origen/destino acumulados en la pasada; se suman al final con NumPy
+    origen, destino, outlook_origen, outlook_destino = [], [], [], []
+    par_actual = None
+    inicial = final = (sin_calificacion, sin_outlook)
+
+    def cerrar_par():
+        origen.append(inicial[0])
+        destino.append(final[0])
+        outlook_origen.append(inicial[1])
+        outlook_destino.append(final[1])
+
+    for contraparte_id, calificador_id, fecha, calificacion, outlook in iterar_por_lotes(filas, 2000):
+        par = (contraparte_id, calificador_id)
+        if par != par_actual:
+            if par_actual is not None:
+                cerrar_par()
+            par_actual = par
+            inicial = final = (sin_calificacion, sin_outlook)
+        estado = (posicion(calificacion), posicion_outlook.get(outlook, sin_outlook))
+        if fecha <= fecha_inicio:
+            inicial = estado
+        final = estado
+    if par_actual is not None:
+        cerrar_par()
+
+    # NumPy se importa aquí: este módulo se carga al arrancar (signals) y la
+    # matriz solo se calcula bajo demanda
+    import numpy as np
+
+    matriz = np.zeros((len(etiquetas), len(etiquetas)), dtype=np.int64)
+    matriz_outlook = np.zeros((len(outlooks), len(outlooks)), dtype=np.int64)
+    np.add.at(matriz, (np.asarray(origen, dtype=np.intp), np.asarray(destino, dtype=np.intp)), 1)
+    np.add.at(
+        matriz_outlook,
+        (np.asarray(outlook_origen, dtype=np.intp), np.asarray(outlook_destino, dtype=np.intp)),
+        1
+    )
+
+    # Mejoras y deterioros entre pares calificados en ambas fechas
+    calificadas = matriz[:-1, :-1]
+
+    return {
+        'etiquetas': etiquetas,
+        'matriz': matriz,
+        'outlooks': outlooks,
+        'matriz_outlook': matriz_outlook,
+        'resumen': {
+            'pares': len(origen),
+            'estables': int(np.trace(calificadas)),
+            'mejoras': int(calificadas[np.tril_indices_from(calificadas, -1)].sum()),
+            'deterioros': int(calificadas[np.triu_indices_from(calificadas, 1)].sum()),
+        },
+    }
@@ -0,0 +1,142 @@
+"""
+Catálogos activos en caché
+Portal Interno de Contrapartes – App Pacífico (Cotizador Web)
+
+Los formularios y modales muestran siempre las mismas listas (tipos de
+documento, tipos y estados de contraparte, monedas). Cada Catalogo guarda
+sus registros activos en itico/cache.py, de modo que abrir un modal o
+validar un formulario no consulta la base de datos. La caché se invalida
+al guardar o eliminar un registro del modelo (ver signals.py).
+
+Uso:
+    from .catalogos import TIPOS_DOCUMENTO
+    TIPOS_DOCUMENTO.registros()       # lista ordenada de instancias activas
+    TIPOS_DOCUMENTO.opciones()        # ((pk, etiqueta), ...) para choices
+
+    # En el __init__ de un ModelForm
+    self.fields['moneda'] = campo_catalogo(self.fields['moneda'], MONEDAS)
+"""
+
+import copy
+
+from django import forms
+from django.forms.models import ModelChoiceIterator
+
+from itico import cache as cache_itico
+
+from .models import EstadoContraparte, Moneda, TipoContraparte, TipoDocumento
+
+
+def version_modelo(modelo):
+    """
+    Versión en caché de un modelo de referencia, en el formato de
+    itico.condicional.version_queryset() pero sin consultar la base de datos.
+    """
+    return f'{modelo._meta.label}:v{cache_itico.version(cache_itico.espacio_modelo(modelo))}', None
+
+
+class Catalogo:
+    """Registros activos de un modelo de referencia, servidos desde caché"""
+
+    def __init__(self, modelo):
+        self.modelo = modelo
+        self.espacio = cache_itico.espacio_modelo(modelo)
+
+    def queryset(self):
+        """Registros activos en el orden por defecto del modelo"""
+        return self.modelo.objects.filter(activo=True)
+
+    def registros(self):
+        """
+        Retorna las instancias activas.
+
+        Son compartidas entre peticiones: no deben modificarse.
+        """
+        return cache_itico.obtener(self.espacio, 'activos', lambda: list(self.queryset()))
+
+    def por_id(self):
+        """Diccionario {str(pk): instancia} de los registros activos"""
+        return cache_itico.obtener(
+            self.espacio, 'por_id', lambda: {str(obj.pk): obj for obj in self.registros()}
+        )
+
+    def obtener(self, pk):
+        """
+        Retorna una copia del registro activo con ese pk, o None.
+        """
+        obj = self.por_id().get(str(pk))
+        return copy.copy(obj) if obj is not None else None
+
+    def opciones(self):
+        """Tupla de (pk, etiqueta) para choices de formularios"""
+        return cache_itico.obtener(
+            self.espacio, 'opciones', lambda: tuple((obj.pk, str(obj)) for obj in self.registros())
+        )
+
+    def version(self):
+        return version_modelo(self.modelo)
+
+
+TIPOS_CONTRAPARTE = Catalogo(TipoContraparte)
+ESTADOS_CONTRAPARTE = Catalogo(EstadoContraparte)
+TIPOS_DOCUMENTO = Catalogo(TipoDocumento)
+MONEDAS = Catalogo(Moneda)
+
+CATALOGOS = {
+    catalogo.modelo: catalogo
+    for catalogo in (TIPOS_CONTRAPARTE, ESTADOS_CONTRAPARTE, TIPOS_DOCUMENTO, MONEDAS)
+}
+
+
+class IteradorCatalogo(ModelChoiceIterator):
+    """Opciones de un CatalogoChoiceField desde la caché, sin consultas"""
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        for obj in self.field.catalogo.registros():
+            yield self.choice(obj)
+
+    def __len__(self):
+        return len(self.field.catalogo.registros()) + (self.field.empty_label is not None)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(self.field.catalogo.registros())
+
+
+class CatalogoChoiceField(forms.ModelChoiceField):
+    """ModelChoiceField que muestra y valida contra un Catalogo en caché"""
+
+    iterator = IteradorCatalogo
+
+    def __init__(self, catalogo, **kwargs):
+        self.catalogo = catalogo
+        super().__init__(queryset=catalogo.queryset(), **kwargs)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        if isinstance(value, self.catalogo.modelo):
+            value = value.pk
+        obj = self.catalogo.obtener(value)
+        if obj is None:
+            raise forms.ValidationError(
+                self.error_messages['invalid_choice'], code='invalid_choice', params={'value': value}
+            )
+        return obj
+
+
+def campo_catalogo(campo, catalogo, **kwargs):
+    """
+    Reemplaza un ModelChoiceField generado por un ModelForm por un
+    CatalogoChoiceField que conserva su widget, etiqueta y ayuda.
+    """
+    opciones = {
+        'required': campo.required,
+        'widget': campo.widget,
+        'label': campo.label,
+        'help_text': campo.help_text,
+        'empty_label': campo.empty_label,
+    }
+    opciones.update(kwargs)
+    return CatalogoChoiceField(catalogo, **opciones)
@@ -0,0 +1,455 @@
+"""
+Exportación masiva de contrapartes a CSV y XLSX
+Portal Interno de Contrapartes – App Pacífico (Cotizador Web)
+
+Las exportaciones se generan como flujos de bytes: la consulta se recorre por
+lotes (itico.conexiones.iterar_por_lotes, también detrás de PgBouncer) y cada fila se escribe en cuanto está disponible,
+por lo que la memoria usada no depende del número de contrapartes y la
+respuesta empieza a enviarse de inmediato (StreamingHttpResponse).
+
+- CSV: UTF-8 con BOM para que Excel respete los acentos. Los textos que
+  empiezan por =, +, -, @, tabulador o retorno se anteponen con ' para que
+  la hoja de cálculo no los ejecute como fórmulas
+- XLSX: libro de una hoja escrito directamente sobre un ZIP en streaming,
+  con cadenas en línea (sin tabla de cadenas compartidas), de modo que no
+  es necesario mantener el libro completo en memoria. Las cadenas en línea
+  (t="inlineStr") nunca se evalúan como fórmulas
+"""
+
+import csv
+import zipfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from itertools import islice
+from xml.sax.saxutils import escape
+
+from django.db.models import Count, Min, Prefetch, Q, Sum
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from itico.conexiones import iterar_por_lotes
+
+from .calificaciones import calificaciones_vigentes
+from .models import BalanceSheet, Contraparte, Documento, Miembro
+
+
+# Contrapartes por consulta (y por consulta de prefetch)
+TAMANO_LOTE_EXPORTACION = 500
+
+# Días de anticipación para considerar un documento "por vencer"
+DIAS_DOCUMENTO_POR_VENCER = 30
+
+TIPOS_CONTENIDO = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+ENCABEZADOS_CONTRAPARTES = [
+    'ID', 'Nombre', 'Razón social', 'Tipo', 'Estado', 'Nacionalidad',
+    'Próxima DD', 'Días hasta DD', 'Miembros activos', 'Miembros',
+    'PEP', 'Miembros PEP', 'Calificaciones vigentes',
+    'Documentos activos', 'Documentos vencidos', 'Documentos por vencer',
+    'Próxima expiración',
+]
+
+
+# =============================================================================
+# FILAS
+# =============================================================================
+
+def queryset_exportacion_contrapartes(queryset=None):
+    """
+    Prepara el queryset de contrapartes para exportar.
+
+    Los datos de una sola fila por contraparte (tipo, estado y conteos de
+    documentos) se resuelven en la consulta principal; los miembros activos
+    se precargan por lote.
+    """
+    hoy = timezone.now().date()
+    limite = hoy + timedelta(days=DIAS_DOCUMENTO_POR_VENCER)
+    documentos_activos = Q(documentos__activo=True)
+
+    if queryset is None:
+        queryset = Contraparte.objects.all()
+
+    return queryset.select_related('tipo', 'estado_nuevo').annotate(
+        documentos_activos=Count('documentos', filter=documentos_activos),
+        documentos_vencidos=Count(
+            'documentos', filter=documentos_activos & Q(documentos__fecha_expiracion__lt=hoy)
+        ),
+        documentos_por_vencer=Count(
+            'documentos',
+            filter=documentos_activos & Q(documentos__fecha_expiracion__range=(hoy, limite))
+        ),
+        proxima_expiracion=Min(
+            'documentos__fecha_expiracion',
+            filter=documentos_activos & Q(documentos__fecha_expiracion__gte=hoy)
+        ),
+    ).prefetch_related(
+        Prefetch(
+            'miembros',
+            queryset=Miembro.objects.only(
+                'id', 'contraparte_id', 'nombre', 'es_pep', 'posicion_pep'
+            ).order_by('nombre'),
+            to_attr='miembros_activos'
+        )
+    ).order_by('pk')
+
+
+def filas_contrapartes(queryset=None, tamano_lote=TAMANO_LOTE_EXPORTACION):
+    """
+    Genera las filas de exportación de contrapartes.
+
+    Args:
+        queryset: QuerySet de Contraparte ya filtrado (opcional)
+        tamano_lote: Contrapartes por consulta
+
+    Yields:
+        list: Valores de la fila en el orden de ENCABEZADOS_CONTRAPARTES
+    """
+    hoy = timezone.now().date()
+    contrapartes = iterar_por_lotes(queryset_exportacion_contrapartes(queryset), tamano_lote)
+
+    while True:
+        lote = list(islice(contrapartes, tamano_lote))
+        if not lote:
+            break
+
+        # Calificaciones vigentes del lote en una sola consulta
+        calificaciones = {}
+        for calificacion in calificaciones_vigentes([c.pk for c in lote]):
+            calificaciones.setdefault(calificacion.contraparte_id, []).append(
+                f'{calificacion.calificador.nombre}: {calificacion.calificacion} '
+                f'({calificacion.outlook.outlook}, {calificacion.fecha:%Y-%m-%d})'
+            )
+
+        for contraparte in lote:
+            miembros = contraparte.miembros_activos
+            peps = [m for m in miembros if m.es_pep]
+            yield [
+                contraparte.pk,
+                contraparte.nombre or '',
+                contraparte.full_company_name or '',
+                contraparte.tipo.nombre,
+                contraparte.estado_nuevo.nombre if contraparte.estado_nuevo else '',
+                contraparte.nacionalidad or contraparte.domicile or '',
+                contraparte.fecha_proxima_dd,
+                (contraparte.fecha_proxima_dd - hoy).days if contraparte.fecha_proxima_dd else None,
+                len(miembros),
+                '; '.join(m.nombre for m in miembros),
+                'Sí' if peps else 'No',
+                '; '.join(
+                    f'{m.nombre} ({m.posicion_pep})' if m.posicion_pep else m.nombre for m in peps
+                ),
+                '; '.join(calificaciones.get(contraparte.pk, [])),
+                contraparte.documentos_activos,
+                contraparte.documentos_vencidos,
+                contraparte.documentos_por_vencer,
+                contraparte.proxima_expiracion,
+            ]
+
+
+def filtrar_contrapartes(filtros):
+    """Aplica los filtros de exportación (tipo y estado por código) a las contrapartes"""
+    queryset = Contraparte.objects.all()
+    if filtros.get('tipo'):
+        queryset = queryset.filter(tipo__codigo=filtros['tipo'])
+    if filtros.get('estado'):
+        queryset = queryset.filter(estado_nuevo__codigo=filtros['estado'])
+    return queryset
+
+
+ENCABEZADOS_DOCUMENTOS = [
+    'ID', 'Contraparte', 'Tipo de documento', 'Categoría', 'Descripción',
+    'Fecha de emisión', 'Fecha de expiración', 'Estado de vigencia',
+    'Subido por', 'Fecha de subida', 'Archivo',
+]
+
+
+def filtrar_documentos(filtros):
+    """Filtra documentos activos por contraparte, tipo, categoría o vencimiento"""
+    queryset = Documento.objects.all()
+    if filtros.get('contraparte'):
+        queryset = queryset.filter(contraparte_id=filtros['contraparte'])
+    if filtros.get('tipo'):
+        queryset = queryset.filter(tipo_id=filtros['tipo'])
+    if filtros.get('categoria'):
+        queryset = queryset.filter(categoria=filtros['categoria'])
+    if filtros.get('vencidos') == '1':
+        queryset = queryset.filter(fecha_expiracion__lt=timezone.now().date())
+    return queryset
+
+
+def filas_documentos(queryset, tamano_lote=TAMANO_LOTE_EXPORTACION):
+    """Genera las filas de exportación de documentos"""
+    hoy = timezone.now().date()
+    limite = hoy + timedelta(days=DIAS_DOCUMENTO_POR_VENCER)
+    documentos = queryset.select_related('contraparte', 'tipo', 'subido_por').order_by('pk')
+
+    for documento in iterar_por_lotes(documentos, tamano_lote):
+        if not documento.fecha_expiracion:
+            vigencia = 'Sin expiración'
+        elif documento.fecha_expiracion < hoy:
+            vigencia = 'Vencido'
+        elif documento.fecha_expiracion <= limite:
+            vigencia = 'Por vencer'
+        else:
+            vigencia = 'Vigente'
+        yield [
+            documento.pk,
+            documento.contraparte.nombre or documento.contraparte.full_company_name or '',
+            documento.tipo.nombre,
+            documento.get_categoria_display(),
+            documento.descripcion or '',
+            documento.fecha_emision,
+            documento.fecha_expiracion,
+            vigencia,
+            documento.subido_por.get_username(),
+            timezone.localtime(documento.fecha_subida).replace(tzinfo=None),
+            documento.archivo.name,
+        ]
+
+
+ENCABEZADOS_BALANCE_SHEETS = [
+    'ID', 'Contraparte', 'Año', 'Moneda local', 'Tasa USD', 'Solo USD',
+    'Total activos USD', 'Total pasivos USD', 'Total patrimonio USD',
+]
+
+
+def filtrar_balance_sheets(filtros):
+    """Filtra balance sheets activos por contraparte o año"""
+    queryset = BalanceSheet.objects.all()
+    if filtros.get('contraparte'):
+        queryset = queryset.filter(contraparte_id=filtros['contraparte'])
+    if filtros.get('año'):
+        queryset = queryset.filter(año=filtros['año'])
+    return queryset
+
+
+def filas_balance_sheets(queryset, tamano_lote=TAMANO_LOTE_EXPORTACION):
+    """
+    Genera las filas de exportación de balance sheets.
+
+    Los totales por categoría se calculan en la misma consulta en lugar de
+    usar las propiedades total_*_usd (una consulta por propiedad y fila).
+    """
+    items_activos = Q(items__activo=True)
+    balance_sheets = queryset.select_related(
+        'contraparte', 'moneda_local', 'tipo_cambio'
+    ).annotate(
+        suma_activos=Sum('items__monto_usd', filter=items_activos & Q(items__categoria='assets')),
+        suma_pasivos=Sum('items__monto_usd', filter=items_activos & Q(items__categoria='liabilities')),
+        suma_patrimonio=Sum('items__monto_usd', filter=items_activos & Q(items__categoria='equity')),
+    ).order_by('pk')
+
+    for balance in iterar_por_lotes(balance_sheets, tamano_lote):
+        yield [
+            balance.pk,
+            balance.contraparte.nombre or balance.contraparte.full_company_name or '',
+            balance.año,
+            balance.moneda_local.codigo if balance.moneda_local else '',
+            balance.tipo_cambio.tasa_usd if balance.tipo_cambio else None,
+            balance.solo_usd,
+            balance.suma_activos or Decimal('0.00'),
+            balance.suma_pasivos or Decimal('0.00'),
+            balance.suma_patrimonio or Decimal('0.00'),
+        ]
+
+
+# =============================================================================
+# ESCRITORES
+# =============================================================================
+
+class _Buffer:
+    """Destino de escritura que acumula bytes hasta que se vacía"""
+
+    def __init__(self):
+        self.partes = []
+
+    def write(self, datos):
+        if isinstance(datos, str):
+            datos = datos.encode('utf-8')
+        self.partes.append(datos)
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b''.join(self.partes)
+        self.partes = []
+        return datos
+
+
+def _texto(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, bool):
+        return 'Sí' if valor else 'No'
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    return str(valor)
+
+
+# Primeros caracteres con los que Excel y LibreOffice interpretan una celda CSV como fórmula
+INICIOS_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _texto_csv(valor):
+    """Texto de la celda CSV; los textos del usuario nunca se interpretan como fórmula"""
+    texto = _texto(valor)
+    if isinstance(valor, str) and texto.startswith(INICIOS_FORMULA):
+        return "'" + texto
+    return texto
+
+
+def escribir_csv(encabezados, filas):
+    """
+    Genera un CSV en bloques de bytes.
+
+    Yields:
+        bytes: Encabezado y luego cada fila codificada
+    """
+    buffer = _Buffer()
+    escritor = csv.writer(buffer)
+    buffer.write('\ufeff')
+    escritor.writerow(encabezados)
+    yield buffer.vaciar()
+    for fila in filas:
+        escritor.writerow([_texto_csv(valor) for valor in fila])
+        yield buffer.vaciar()
+
+
+def _columna_excel(indice):
+    """Convierte un índice 0-based en letra de columna (0 -> A, 27 -> AB)"""
+    letras = ''
+    indice += 1
+    while indice:
+        indice, resto = divmod(indice - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+
+def _celda(referencia, valor):
+    if isinstance(valor, (int, float, Decimal)) and not isinstance(valor, bool):
+        return f'<c r="{referencia}"><v>{valor}</v></c>'
+    return (
+        f'<c r="{referencia}" t="inlineStr"><is><t xml:space="preserve">'
+        f'{escape(_texto(valor))}</t></is></c>'
+    )
+
+
+_XLSX_ESTATICOS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+        'Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/styles.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+        '<borders count="1"><border/></borders>'
+        '<cellStyleXfs count="1"><xf/></cellStyleXfs>'
+        '<cellXfs count="1"><xf xfId="0"/></cellXfs>'
+        '</styleSheet>'
+    ),
+}
+
+
+def escribir_xlsx(encabezados, filas, hoja='Datos'):
+    """
+    Genera un libro XLSX de una hoja en bloques de bytes.
+
+    El ZIP se escribe sobre un destino no posicionable, por lo que zipfile
+    usa descriptores de datos y nunca necesita volver atrás en el archivo.
+
+    Yields:
+        bytes: Fragmentos consecutivos del archivo .xlsx
+    """
+    buffer = _Buffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as libro:
+        for nombre, contenido in _XLSX_ESTATICOS.items():
+            libro.writestr(nombre, contenido)
+        libro.writestr('xl/workbook.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name="{escape(hoja[:31])}" sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'
+        ))
+        yield buffer.vaciar()
+
+        with libro.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as hoja_xml:
+            hoja_xml.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                b'<sheetData>'
+            )
+            for numero, fila in enumerate(_con_encabezados(encabezados, filas), start=1):
+                celdas = ''.join(
+                    _celda(f'{_columna_excel(i)}{numero}', valor) for i, valor in enumerate(fila)
+                )
+                hoja_xml.write(f'<row r="{numero}">{celdas}</row>'.encode('utf-8'))
+                datos = buffer.vaciar()
+                if datos:
+                    yield datos
+            hoja_xml.write(b'</sheetData></worksheet>')
+    yield buffer.vaciar()
+
+
+def _con_encabezados(encabezados, filas):
+    yield encabezados
+    yield from filas
+
+
+ESCRITORES = {
+    'csv': escribir_csv,
+    'xlsx': escribir_xlsx,
+}
+
+
+def respuesta_exportacion(encabezados, filas, formato, nombre_archivo):
+    """
+    Construye la StreamingHttpResponse de una exportación.
+
+    Args:
+        encabezados: Lista de títulos de columna
+        filas: Iterable (idealmente generador) de filas
+        formato: 'csv' o 'xlsx'
+        nombre_archivo: Nombre sin extensión del archivo descargado
+    """
+    response = StreamingHttpResponse(
+        ESCRITORES[formato](encabezados, filas),
+        content_type=TIPOS_CONTENIDO[formato]
+    )
+    response['Content-Disposition'] = f'attachment; filename="{nombre_archivo}.{formato}"'
+    return response
@@ -2,6 +2,7 @@
 Formularios para la aplicación de contrapartes
 """
 from django import forms
+from django.core.validators import FileExtensionValidator
 from .models import (
     TipoContraparte, EstadoContraparte, TipoDocumento, Contraparte, Miembro, 
     Documento, Comentario, Calificacion, Calificador, Outlook, BalanceSheet, 
@@ -9,6 +10,8 @@ from .models import (
 )
 from decimal import Decimal
 
+from .catalogos import MONEDAS, TIPOS_CONTRAPARTE, campo_catalogo
+
 
 class TipoContraparteForm(forms.ModelForm):
     """Formulario para crear/editar tipos de contraparte"""
@@ -171,12 +174,11 @@ class ContraparteForm(forms.ModelForm):
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # Solo mostrar tipos activos
-        self.fields['tipo'].queryset = TipoContraparte.objects.filter(activo=True)
-        # Agregar opción vacía
-        self.fields['tipo'].empty_label = "Seleccione un tipo"
-        # Hacer campo requerido
-        self.fields['tipo'].required = True
+        # Solo mostrar tipos activos (desde la caché de catálogos), con
+        # opción vacía y como campo requerido
+        self.fields['tipo'] = campo_catalogo(
+            self.fields['tipo'], TIPOS_CONTRAPARTE, empty_label="Seleccione un tipo", required=True
+        )
 
 
 class MiembroForm(forms.ModelForm):
@@ -341,7 +343,7 @@ class CargaDocumentoForm(forms.ModelForm):
         self.fields['categoria'].required = True
         
         # Order contrapartes by name
-        self.fields['contraparte'].queryset = Contraparte.objects.all().order_by('full_company_name', 'nombre')
+        self.fields['contraparte'].queryset = Contraparte.objects.select_related('tipo').order_by('full_company_name', 'nombre')
     
     def clean(self):
         cleaned_data = super().clean()
@@ -511,7 +513,27 @@ class TipoCambioForm(forms.ModelForm):
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['moneda'].queryset = Moneda.objects.filter(activo=True)
+        self.fields['moneda'] = campo_catalogo(self.fields['moneda'], MONEDAS)
+
+
+class TipoCambioImportarForm(forms.Form):
+    """Formulario para importar tipos de cambio desde un archivo CSV/XML"""
+
+    archivo = forms.FileField(
+        validators=[FileExtensionValidator(allowed_extensions=['csv', 'xml', 'txt'])],
+        widget=forms.FileInput(attrs={
+            'class': 'w-full px-4 py-3 border border-gray-300 rounded-xl focus:ring-2 focus:ring-blue-500 focus:border-transparent transition-all duration-200',
+            'accept': '.csv,.xml,.txt'
+        }),
+        help_text="Columnas: moneda, fecha, tasa_usd"
+    )
+    invertir = forms.BooleanField(
+        required=False,
+        widget=forms.CheckboxInput(attrs={
+            'class': 'h-4 w-4 text-blue-600 focus:ring-blue-500 border-gray-300 rounded'
+        }),
+        help_text="Marcar si el archivo expresa unidades de moneda por 1 USD"
+    )
 
 
 class BalanceSheetForm(forms.ModelForm):
@@ -543,7 +565,7 @@ class BalanceSheetForm(forms.ModelForm):
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['moneda_local'].queryset = Moneda.objects.filter(activo=True)
+        self.fields['moneda_local'] = campo_catalogo(self.fields['moneda_local'], MONEDAS)
         self.fields['tipo_cambio'].queryset = TipoCambio.objects.none()
         
         # If we have a moneda_local selected, filter tipo_cambio by that currency
@@ -630,11 +652,24 @@ class BalanceSheetItemForm(forms.ModelForm):
         return cleaned_data
 
 
+class BaseBalanceSheetItemFormSet(forms.BaseInlineFormSet):
+    """Asigna el balance sheet ya cargado a cada item existente"""
+    
+    def get_queryset(self):
+        if not hasattr(self, '_queryset'):
+            # BalanceSheetItemForm lee instance.balance_sheet.solo_usd: sin
+            # esto cada formulario consultaría de nuevo el balance sheet
+            for item in super().get_queryset():
+                item.balance_sheet = self.instance
+        return self._queryset
+
+
 # Formset for Balance Sheet Items
 BalanceSheetItemFormSet = forms.inlineformset_factory(
     BalanceSheet,
     BalanceSheetItem,
     form=BalanceSheetItemForm,
+    formset=BaseBalanceSheetItemFormSet,
     extra=1,
     can_delete=True,
     fields=['descripcion', 'nota', 'categoria', 'monto_usd', 'monto_local', 'orden']
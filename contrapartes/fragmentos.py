@@ -0,0 +1,105 @@
+"""
+Versiones de los fragmentos de plantilla en caché
+Portal Interno de Contrapartes – App Pacífico (Cotizador Web)
+
+detalle.html, lista.html, calendario.html y sidebar.html guardan sus partes
+más pesadas con {% cache %} en la caché 'template_fragments' (ver CACHES en
+settings). La clave de un fragmento de contraparte incluye su id, su
+fecha_actualizacion si muestra campos propios y la versión de cada sección
+que muestra:
+
+    {% cache 3600 contraparte_encabezado object.pk object.fecha_actualizacion
+       versiones_fragmentos.miembros versiones_fragmentos.catalogos using="template_fragments" %}
+    {% precargar object 'miembros' %}
+    ...
+    {% endcache %}
+
+{% precargar %} (templatetags/contrapartes_fragmentos.py) hace las consultas
+del fragmento solo cuando no está en caché.
+
+Editar la contraparte cambia fecha_actualizacion. Crear, editar o eliminar
+miembros, documentos, comentarios o calificaciones no la modifica: los
+signals (signals.py) incrementan la versión de la sección en itico/cache.py
+y el fragmento anterior deja de usarse en todos los procesos. Los cambios en
+los catálogos (nombres de tipos, estados, agencias) incrementan la versión
+'catalogos', común a todas las contrapartes.
+
+Igual que en itico/cache.py, cada proceso puede tardar hasta
+DURACION_VERSION_LOCAL segundos en ver una invalidación hecha en otro.
+"""
+
+from django.db import transaction
+
+from itico import cache as cache_itico
+
+SECCIONES = ('miembros', 'documentos', 'comentarios', 'calificaciones')
+
+# Nombres de catálogos mostrados en los fragmentos (tipo, estado, agencia...)
+ESPACIO_CATALOGOS = 'fragmentos:catalogos'
+
+# Eventos del calendario de DD: fechas de próxima DD y de expiración de documentos
+ESPACIO_CALENDARIO = 'fragmentos:calendario_dd'
+
+
+def espacio_seccion(contraparte_id, seccion):
+    return f'fragmentos:contraparte:{contraparte_id}:{seccion}'
+
+
+def versiones(contraparte_id, secciones=SECCIONES):
+    """
+    Versiones de las secciones de una contraparte y de los catálogos.
+
+    Returns:
+        dict: {seccion: versión, 'catalogos': versión}
+    """
+    espacios = {seccion: espacio_seccion(contraparte_id, seccion) for seccion in secciones}
+    actuales = cache_itico.versiones([ESPACIO_CATALOGOS, *espacios.values()])
+    resultado = {seccion: actuales[espacio] for seccion, espacio in espacios.items()}
+    resultado['catalogos'] = actuales[ESPACIO_CATALOGOS]
+    return resultado
+
+
+def adjuntar_versiones(contrapartes, secciones=SECCIONES):
+    """
+    Agrega a cada contraparte el atributo versiones_fragmentos
+    ({seccion: versión, 'catalogos': versión}) con una sola lectura de la
+    caché compartida para todas.
+
+    Returns:
+        list: Las mismas contrapartes
+    """
+    contrapartes = list(contrapartes)
+    espacios = [ESPACIO_CATALOGOS] + [
+        espacio_seccion(contraparte.pk, seccion) for contraparte in contrapartes for seccion in secciones
+    ]
+    actuales = cache_itico.versiones(espacios)
+    for contraparte in contrapartes:
+        contraparte.versiones_fragmentos = {
+            seccion: actuales[espacio_seccion(contraparte.pk, seccion)] for seccion in secciones
+        }
+        contraparte.versiones_fragmentos['catalogos'] = actuales[ESPACIO_CATALOGOS]
+    return contrapartes
+
+
+def versiones_calendario():
+    """
+    Versiones de los eventos del calendario de DD y de los catálogos.
+
+    Returns:
+        dict: {'calendario': versión, 'catalogos': versión}
+    """
+    actuales = cache_itico.versiones([ESPACIO_CALENDARIO, ESPACIO_CATALOGOS])
+    return {'calendario': actuales[ESPACIO_CALENDARIO], 'catalogos': actuales[ESPACIO_CATALOGOS]}
+
+
+def invalidar(*espacios):
+    """
+    Invalida los espacios de inmediato y otra vez al confirmar la
+    transacción (mismo criterio que cache_itico.registrar_modelo).
+    """
+    cache_itico.invalidar(*espacios)
+    transaction.on_commit(lambda: cache_itico.invalidar(*espacios))
+
+
+def invalidar_seccion(contraparte_id, seccion):
+    invalidar(espacio_seccion(contraparte_id, seccion))
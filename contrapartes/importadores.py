@@ -0,0 +1,293 @@
+"""
+Importación masiva de tipos de cambio desde archivos CSV/XML
+Portal Interno de Contrapartes – App Pacífico (Cotizador Web)
+
+Permite cargar años de historial de tasas (ej: volcados de bancos centrales)
+sin pasar fila por fila por TipoCambioCreateView. Los archivos se leen en
+streaming y se insertan por lotes con bulk_create(update_conflicts=True) sobre
+la restricción única (moneda, fecha) de TipoCambio.
+
+Formatos soportados:
+- CSV: columnas moneda/codigo, fecha y tasa_usd/tasa (separador ',' o ';')
+- XML: cualquier elemento con moneda y tasa como atributos o hijos; la fecha
+  puede venir en el propio elemento o en un ancestro (estilo BCE: <Cube time>)
+"""
+
+import csv
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from xml.etree import ElementTree
+
+from django.db import transaction
+
+from .models import Moneda, TipoCambio
+
+
+# Número de filas por lote de bulk_create
+TAMANO_LOTE = 5000
+
+# Máximo de errores detallados que se devuelven en el resultado
+MAX_ERRORES_DETALLE = 100
+
+FORMATOS_FECHA = ['%Y-%m-%d', '%d/%m/%Y', '%Y%m%d', '%d-%m-%Y']
+
+# Nombres de columna/atributo aceptados para cada campo
+ALIAS_MONEDA = {'moneda', 'codigo', 'currency', 'divisa'}
+ALIAS_FECHA = {'fecha', 'date', 'time'}
+ALIAS_TASA = {'tasa_usd', 'tasa', 'rate', 'valor', 'value'}
+
+# Límite impuesto por TipoCambio.tasa_usd (max_digits=15, decimal_places=6)
+TASA_MAXIMA = Decimal('999999999.999999')
+SEIS_DECIMALES = Decimal('0.000001')
+
+
+class ArchivoInvalido(ValueError):
+    """
+    El archivo no se puede seguir leyendo: codificación distinta de UTF-8,
+    CSV o XML mal formado. Se informa como error de la fila donde ocurre.
+    """
+
+    def __init__(self, fila, mensaje):
+        super().__init__(mensaje)
+        self.fila = fila
+
+
+def _normalizar_nombre(nombre):
+    """Quita namespace XML y normaliza a minúsculas"""
+    if '}' in nombre:
+        nombre = nombre.rsplit('}', 1)[1]
+    return nombre.strip().lower()
+
+
+def _extraer(campos, alias):
+    for clave in alias:
+        valor = campos.get(clave)
+        if valor not in (None, ''):
+            return valor.strip()
+    return None
+
+
+def _parsear_fecha(valor):
+    for formato in FORMATOS_FECHA:
+        try:
+            return datetime.strptime(valor, formato).date()
+        except ValueError:
+            continue
+    raise ValueError(f'Fecha inválida: {valor}')
+
+
+def _parsear_tasa(valor, invertir=False):
+    if ',' in valor and '.' not in valor:
+        # Separador decimal con coma (ej: "3950,25")
+        valor = valor.replace(',', '.')
+    try:
+        tasa = Decimal(valor)
+    except InvalidOperation:
+        raise ValueError(f'Tasa inválida: {valor}')
+    if not tasa.is_finite() or tasa <= 0:
+        raise ValueError(f'La tasa debe ser un número positivo: {valor}')
+    try:
+        if invertir:
+            tasa = Decimal(1) / tasa
+        if tasa > TASA_MAXIMA:
+            raise InvalidOperation
+        tasa = tasa.quantize(SEIS_DECIMALES)
+    except InvalidOperation:
+        # Valores que exceden la precisión decimal (ej: "1e30" o su inverso)
+        raise ValueError(f'Tasa fuera de rango: {valor}')
+    if tasa == 0:
+        raise ValueError(f'Tasa fuera de rango: {valor}')
+    return tasa
+
+
+def leer_filas_csv(lineas):
+    """
+    Lee un CSV línea a línea sin cargarlo completo en memoria.
+
+    Args:
+        lineas: Iterable de líneas (bytes o str), ej: un archivo abierto
+            o un UploadedFile de Django
+
+    Yields:
+        tuple: (número de línea, dict con los campos de la fila)
+    """
+    def _texto():
+        primera = True
+        for linea in lineas:
+            if isinstance(linea, bytes):
+                linea = linea.decode('utf-8-sig' if primera else 'utf-8')
+            elif primera:
+                linea = linea.lstrip('\ufeff')
+            primera = False
+            yield linea
+
+    texto = _texto()
+    lector = None
+    try:
+        encabezado = next(texto, None)
+        if encabezado is None:
+            return
+        delimitador = ';' if encabezado.count(';') > encabezado.count(',') else ','
+        columnas = [_normalizar_nombre(c) for c in next(csv.reader([encabezado], delimiter=delimitador))]
+
+        lector = csv.reader(texto, delimiter=delimitador)
+        for valores in lector:
+            if not any(v.strip() for v in valores):
+                continue
+            yield lector.line_num + 1, dict(zip(columnas, valores))
+    except UnicodeDecodeError:
+        raise ArchivoInvalido(_linea_actual(lector), 'El archivo no está codificado en UTF-8')
+    except csv.Error as e:
+        raise ArchivoInvalido(_linea_actual(lector), f'CSV mal formado: {e}')
+
+
+def _linea_actual(lector):
+    # Línea que se estaba leyendo (el encabezado es la línea 1)
+    return lector.line_num + 2 if lector is not None else 1
+
+
+def leer_filas_xml(archivo):
+    """
+    Lee un XML con iterparse liberando cada elemento procesado.
+
+    La fecha se hereda del ancestro más cercano que la defina, lo que cubre
+    volcados como los del BCE (<Cube time="..."><Cube currency rate/></Cube>).
+
+    Args:
+        archivo: Ruta o archivo binario con método read()
+
+    Yields:
+        tuple: (número de registro, dict con los campos del registro)
+    """
+    try:
+        yield from _registros_xml(archivo)
+    except ElementTree.ParseError as e:
+        raise ArchivoInvalido(e.position[0], f'XML mal formado: {e}')
+
+
+def _registros_xml(archivo):
+    pila_fechas = []
+    numero = 0
+    for evento, elemento in ElementTree.iterparse(archivo, events=('start', 'end')):
+        atributos = {_normalizar_nombre(k): v for k, v in elemento.attrib.items()}
+        if evento == 'start':
+            pila_fechas.append(_extraer(atributos, ALIAS_FECHA))
+            continue
+
+        pila_fechas.pop()
+        campos = dict(atributos)
+        for hijo in elemento:
+            if len(hijo) == 0 and hijo.text:
+                campos.setdefault(_normalizar_nombre(hijo.tag), hijo.text)
+
+        if _extraer(campos, ALIAS_MONEDA) and _extraer(campos, ALIAS_TASA):
+            if not _extraer(campos, ALIAS_FECHA):
+                fecha_heredada = next((f for f in reversed(pila_fechas) if f), None)
+                if fecha_heredada:
+                    campos['fecha'] = fecha_heredada
+            numero += 1
+            yield numero, campos
+            elemento.clear()
+        elif len(elemento):
+            # Contenedor ya procesado (ej: <Cube time>): liberar memoria
+            elemento.clear()
+
+
+def leer_filas(archivo, formato):
+    """Devuelve el lector adecuado según el formato ('csv' o 'xml')"""
+    if formato == 'xml':
+        return leer_filas_xml(archivo)
+    return leer_filas_csv(archivo)
+
+
+def detectar_formato(nombre_archivo):
+    """Detecta el formato a partir de la extensión del archivo"""
+    return 'xml' if str(nombre_archivo).lower().endswith('.xml') else 'csv'
+
+
+def _guardar_lote(lote, usuario, resultado):
+    """
+    Inserta o actualiza un lote de tasas en una sola transacción.
+
+    Antes del upsert se consultan las claves existentes para poder reportar
+    insertados vs. actualizados (bulk_create no distingue ambos casos).
+    """
+    if not lote:
+        return
+    monedas_ids = {moneda_id for moneda_id, _ in lote}
+    fechas = {fecha for _, fecha in lote}
+
+    with transaction.atomic():
+        existentes = {
+            clave for clave in TipoCambio.objects.filter(
+                moneda_id__in=monedas_ids, fecha__in=fechas
+            ).values_list('moneda_id', 'fecha').iterator()
+            if clave in lote
+        }
+        TipoCambio.objects.bulk_create(
+            [
+                TipoCambio(moneda_id=moneda_id, fecha=fecha, tasa_usd=tasa, creado_por=usuario)
+                for (moneda_id, fecha), tasa in lote.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['moneda', 'fecha'],
+            update_fields=['tasa_usd', 'fecha_actualizacion'],
+        )
+
+    resultado['actualizados'] += len(existentes)
+    resultado['insertados'] += len(lote) - len(existentes)
+    lote.clear()
+
+
+def importar_tipos_cambio(filas, usuario, invertir=False, tamano_lote=TAMANO_LOTE):
+    """
+    Importa tipos de cambio con upsert por lotes.
+
+    Las filas repetidas para la misma moneda y fecha dentro de un lote se
+    consolidan (gana la última), ya que un mismo INSERT ... ON CONFLICT no
+    puede tocar dos veces la misma fila.
+
+    Args:
+        filas: Iterable de (número, dict) producido por leer_filas()
+        usuario: Usuario que figura como creado_por de las tasas nuevas
+        invertir: True si el archivo expresa unidades de moneda por 1 USD
+        tamano_lote: Número de filas por transacción
+
+    Returns:
+        dict: Conteo de insertados, actualizados y rechazados, más el detalle
+        de los primeros errores encontrados
+    """
+    monedas = {codigo.upper(): pk for codigo, pk in Moneda.objects.values_list('codigo', 'id')}
+    resultado = {'insertados': 0, 'actualizados': 0, 'rechazados': 0, 'errores': []}
+    lote = {}
+
+    try:
+        for numero, campos in filas:
+            try:
+                codigo = _extraer(campos, ALIAS_MONEDA)
+                fecha = _extraer(campos, ALIAS_FECHA)
+                tasa = _extraer(campos, ALIAS_TASA)
+                if not (codigo and fecha and tasa):
+                    raise ValueError('Faltan columnas requeridas (moneda, fecha, tasa)')
+                moneda_id = monedas.get(codigo.upper())
+                if moneda_id is None:
+                    raise ValueError(f'Moneda no registrada: {codigo}')
+                lote[(moneda_id, _parsear_fecha(fecha))] = _parsear_tasa(tasa, invertir)
+            except ValueError as e:
+                _registrar_error(resultado, numero, str(e))
+                continue
+
+            if len(lote) >= tamano_lote:
+                _guardar_lote(lote, usuario, resultado)
+    except ArchivoInvalido as e:
+        # El resto del archivo no se puede leer: se guarda lo leído hasta aquí
+        _registrar_error(resultado, e.fila, str(e))
+
+    _guardar_lote(lote, usuario, resultado)
+    return resultado
+
+
+def _registrar_error(resultado, numero, mensaje):
+    resultado['rechazados'] += 1
+    if len(resultado['errores']) < MAX_ERRORES_DETALLE:
+        resultado['errores'].append({'fila': numero, 'error': mensaje})
@@ -0,0 +1,120 @@
+"""
+Comando de gestión Django para medir las vistas y endpoints principales.
+Registra consultas, latencia p50/p95 y memoria por escenario (ver
+itico/benchmark.py) y guarda el resultado en JSON para compararlo entre
+commits.
+
+Flujo habitual:
+    python manage.py generar_datos_volumen --reset --semilla 42
+    python manage.py benchmark_vistas                       # guarda benchmarks/<fecha>_<commit>.json
+    python manage.py benchmark_vistas --comparar benchmarks/20250901T120000_abc1234.json
+
+Con --comparar el comando termina con error si alguna métrica empeora
+(útil en CI). Las mediciones solo son comparables con el mismo volumen de
+datos y en la misma máquina.
+"""
+
+import json
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from itico import benchmark
+
+
+class Command(BaseCommand):
+    help = 'Mide consultas, latencia y memoria de las vistas principales y guarda el resultado en JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=10, help='Peticiones medidas por escenario (por defecto: 10)')
+        parser.add_argument('--calentamiento', type=int, default=2, help='Peticiones previas sin medir (por defecto: 2)')
+        parser.add_argument('--usuario', help='Usuario staff con el que se hacen las peticiones (por defecto: el primer superusuario)')
+        parser.add_argument(
+            '--solo',
+            nargs='+',
+            metavar='TEXTO',
+            help='Ejecutar solo los escenarios cuyo nombre contenga alguno de estos textos'
+        )
+        parser.add_argument('--salida', default='benchmarks', help='Directorio o archivo .json de salida (por defecto: benchmarks/)')
+        parser.add_argument('--comparar', help='Resultado JSON anterior con el que comparar')
+        parser.add_argument(
+            '--tolerancia',
+            type=float,
+            default=20,
+            help='Empeoramiento admitido en p95 y memoria, en porcentaje (por defecto: 20)'
+        )
+
+    def handle(self, *args, **options):
+        usuario = self._usuario(options['usuario'])
+
+        anterior = None
+        if options['comparar']:
+            try:
+                anterior = json.loads(Path(options['comparar']).read_text())
+            except (OSError, ValueError) as e:
+                raise CommandError(f'No se pudo leer {options["comparar"]}: {e}')
+
+        # Las URLs de {% static %} no forman parte de la medición: se evita
+        # depender de que se haya ejecutado collectstatic
+        with override_settings(
+            ALLOWED_HOSTS=['testserver'],
+            STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+        ):
+            resultado = benchmark.ejecutar(
+                usuario,
+                repeticiones=options['repeticiones'],
+                calentamiento=options['calentamiento'],
+                filtro=options['solo'],
+            )
+
+        self._mostrar(resultado)
+
+        salida = Path(options['salida'])
+        if salida.suffix != '.json':
+            salida = benchmark.ruta_resultado(salida, resultado)
+        salida.parent.mkdir(parents=True, exist_ok=True)
+        salida.write_text(json.dumps(resultado, indent=2, ensure_ascii=False))
+        self.stdout.write(self.style.SUCCESS(f'\nResultado guardado en {salida}'))
+
+        if anterior is not None:
+            self._comparar(anterior, resultado, options['tolerancia'] / 100)
+
+    def _usuario(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username, is_staff=True)
+            except User.DoesNotExist:
+                raise CommandError(f'No existe el usuario staff "{username}"')
+        usuario = User.objects.filter(is_superuser=True, is_active=True).order_by('id').first()
+        if usuario is None:
+            raise CommandError('No hay superusuarios activos; indique uno con --usuario')
+        return usuario
+
+    def _mostrar(self, resultado):
+        self.stdout.write(
+            f'Commit {resultado["commit"] or "-"} · {resultado["base_datos"]} · '
+            f'{resultado["repeticiones"]} repeticiones'
+        )
+        self.stdout.write(', '.join(f'{modelo}: {n}' for modelo, n in resultado['volumen'].items()))
+        self.stdout.write(f'\n{"escenario":32} {"estado":>6} {"consultas":>9} {"p50 ms":>9} {"p95 ms":>9} {"mem KB":>9}')
+        for nombre, datos in resultado['escenarios'].items():
+            if 'omitido' in datos:
+                self.stdout.write(f'{nombre:32} omitido: {datos["omitido"]}')
+                continue
+            linea = (
+                f'{nombre:32} {datos["estado"]:>6} {datos["consultas"]:>9} '
+                f'{datos["p50_ms"]:>9} {datos["p95_ms"]:>9} {datos["memoria_pico_kb"]:>9}'
+            )
+            self.stdout.write(linea if datos['estado'] < 400 else self.style.ERROR(linea))
+
+    def _comparar(self, anterior, resultado, tolerancia):
+        regresiones = benchmark.comparar(anterior, resultado, tolerancia)
+        self.stdout.write(f'\nComparación con el commit {anterior.get("commit") or "-"} ({anterior.get("fecha", "")})')
+        if not regresiones:
+            self.stdout.write(self.style.SUCCESS('Sin regresiones'))
+            return
+        for r in regresiones:
+            self.stdout.write(self.style.WARNING(f'- {r["escenario"]}: {r["metrica"]} {r["antes"]} -> {r["despues"]}'))
+        raise CommandError(f'{len(regresiones)} regresiones respecto de {anterior.get("commit") or "el resultado anterior"}')
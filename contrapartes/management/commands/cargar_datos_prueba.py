@@ -26,7 +26,7 @@ class Command(BaseCommand):
             Notificacion.objects.all().delete()
             Busqueda.objects.all().delete()
             DebidaDiligencia.objects.all().delete()
-            Miembro.objects.all().delete()
+            Miembro.all_objects.all().delete()
             Contraparte.objects.all().delete()
             
         self.stdout.write('Cargando datos de prueba...')
@@ -0,0 +1,305 @@
+"""
+Comando de gestión Django para generar datos sintéticos en volumen.
+
+Crea con bulk_create una cartera realista para pruebas de rendimiento:
+contrapartes con sus miembros, documentos, comentarios, calificaciones,
+balance sheets con items, debidas diligencias con búsquedas y el
+historial de tipos de cambio. Con la misma --semilla y los mismos
+parámetros los datos generados son idénticos, de modo que los resultados
+de benchmark_vistas son comparables entre commits.
+
+Las contrapartes generadas llevan el prefijo PREFIJO en el nombre; --reset
+elimina solo esas (y lo que depende de ellas).
+
+Ejemplos:
+    python manage.py generar_datos_volumen --contrapartes 5000 --miembros 8
+    python manage.py generar_datos_volumen --reset --semilla 7
+"""
+
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from contrapartes.calificaciones import ESCALA_SP, invalidar_calificaciones_vigentes
+from contrapartes.models import (
+    BalanceSheet, BalanceSheetItem, Calificacion, Calificador, Comentario, Contraparte,
+    Documento, EstadoContraparte, Miembro, Moneda, Outlook, TipoCambio, TipoContraparte,
+    TipoDocumento,
+)
+from debida_diligencia.models import Busqueda, DebidaDiligencia
+
+PREFIJO = '[VOL] '
+ARCHIVO_DOCUMENTO = 'volumen/documento.txt'
+
+PAISES = [
+    'Panamá', 'Colombia', 'México', 'España', 'Estados Unidos', 'Reino Unido',
+    'Alemania', 'Suiza', 'Chile', 'Perú', 'Bermudas', 'Francia',
+]
+NOMBRES = ['Ana', 'Carlos', 'María', 'José', 'Lucía', 'Pedro', 'Elena', 'Jorge', 'Sofía', 'Luis']
+APELLIDOS = ['García', 'Rodríguez', 'Martínez', 'López', 'Pérez', 'Gómez', 'Díaz', 'Torres']
+SUFIJOS_EMPRESA = ['S.A.', 'Re Ltd.', 'Insurance Corp', 'Seguros S.A.', 'Holdings Inc.', 'AG']
+
+# Catálogos que se crean si no existen (se usan también los que ya haya activos)
+TIPOS_CONTRAPARTE = [('reaseguradora', 'Reaseguradora'), ('aseguradora', 'Aseguradora'), ('corredor', 'Corredor')]
+TIPOS_DOCUMENTO = [('estados_financieros', 'Estados financieros'), ('kyc', 'Formulario KYC'), ('licencia', 'Licencia')]
+MONEDAS = [('USD', 'Dólar estadounidense', '$'), ('EUR', 'Euro', '€'), ('COP', 'Peso colombiano', '$'), ('MXN', 'Peso mexicano', '$')]
+CALIFICADORES = ["S&P", "Moody's", 'Fitch', 'AM Best']
+OUTLOOKS = ['Estable', 'Positivo', 'Negativo']
+
+ITEMS_BALANCE = {
+    'assets': ['Efectivo', 'Inversiones', 'Primas por cobrar', 'Otros activos'],
+    'liabilities': ['Reservas técnicas', 'Cuentas por pagar', 'Otros pasivos'],
+    'equity': ['Capital social', 'Utilidades retenidas'],
+}
+
+
+class Command(BaseCommand):
+    help = 'Genera datos sintéticos en volumen para pruebas de rendimiento'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--contrapartes', type=int, default=1000, help='Número de contrapartes (por defecto: 1000)')
+        parser.add_argument('--miembros', type=int, default=5, help='Miembros por contraparte (por defecto: 5)')
+        parser.add_argument('--documentos', type=int, default=4, help='Documentos por contraparte (por defecto: 4)')
+        parser.add_argument('--comentarios', type=int, default=3, help='Comentarios por contraparte (por defecto: 3)')
+        parser.add_argument('--calificaciones', type=int, default=4, help='Calificaciones por contraparte (por defecto: 4)')
+        parser.add_argument('--balances', type=int, default=3, help='Años de balance sheet por contraparte (por defecto: 3)')
+        parser.add_argument(
+            '--dd',
+            type=float,
+            default=0.3,
+            help='Fracción de miembros con debida diligencia (por defecto: 0.3)'
+        )
+        parser.add_argument('--dias-tipo-cambio', type=int, default=365, help='Días de historial de tipos de cambio (por defecto: 365)')
+        parser.add_argument('--semilla', type=int, default=42, help='Semilla aleatoria (por defecto: 42)')
+        parser.add_argument('--lote', type=int, default=500, help='Contrapartes por transacción (por defecto: 500)')
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help=f'Eliminar antes las contrapartes generadas (prefijo "{PREFIJO}")'
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        self.azar = random.Random(options['semilla'])
+        self.hoy = timezone.now().date()
+
+        if options['reset']:
+            eliminadas, _ = Contraparte.objects.filter(nombre__startswith=PREFIJO).delete()
+            self.stdout.write(f'Registros eliminados: {eliminadas}')
+
+        self.usuario = self._usuario()
+        self.usuarios = list(User.objects.filter(is_active=True).order_by('id')[:20]) or [self.usuario]
+        self._catalogos()
+        self.archivo = self._archivo_documento()
+
+        historial = self._tipos_cambio(options['dias_tipo_cambio'])
+        self.stdout.write(f'- Tipos de cambio: {historial}')
+
+        totales = {}
+        total = options['contrapartes']
+        desde = Contraparte.objects.filter(nombre__startswith=PREFIJO).count()
+        for inicio_lote in range(0, total, options['lote']):
+            cantidad = min(options['lote'], total - inicio_lote)
+            with transaction.atomic():
+                creados = self._lote(desde + inicio_lote, cantidad, options)
+            for modelo, n in creados.items():
+                totales[modelo] = totales.get(modelo, 0) + n
+            self.stdout.write(f'  {inicio_lote + cantidad}/{total} contrapartes')
+
+        for modelo, n in totales.items():
+            self.stdout.write(f'- {modelo}: {n}')
+        self.stdout.write(self.style.SUCCESS(f'\nDatos generados en {time.monotonic() - inicio:.1f}s'))
+
+    # ====== CATÁLOGOS ======
+
+    def _usuario(self):
+        usuario, creado = User.objects.get_or_create(
+            username='volumen',
+            defaults={'first_name': 'Datos', 'last_name': 'Volumen', 'is_staff': True},
+        )
+        if creado:
+            usuario.set_unusable_password()
+            usuario.save()
+        return usuario
+
+    def _catalogos(self):
+        # get_or_create guarda uno a uno: los signals invalidan la caché de catálogos
+        for codigo, nombre in TIPOS_CONTRAPARTE:
+            TipoContraparte.objects.get_or_create(codigo=codigo, defaults={'nombre': nombre, 'creado_por': self.usuario})
+        for codigo, nombre in TIPOS_DOCUMENTO:
+            TipoDocumento.objects.get_or_create(codigo=codigo, defaults={'nombre': nombre, 'creado_por': self.usuario})
+        for codigo, nombre, simbolo in MONEDAS:
+            Moneda.objects.get_or_create(codigo=codigo, defaults={'nombre': nombre, 'simbolo': simbolo, 'creado_por': self.usuario})
+        for nombre in CALIFICADORES:
+            Calificador.objects.get_or_create(nombre=nombre, defaults={'creado_por': self.usuario})
+        for nombre in OUTLOOKS:
+            Outlook.objects.get_or_create(outlook=nombre, defaults={'creado_por': self.usuario})
+
+        self.tipos = list(TipoContraparte.objects.filter(activo=True).order_by('id'))
+        self.estados = list(EstadoContraparte.objects.filter(activo=True).order_by('id'))
+        self.tipos_documento = list(TipoDocumento.objects.filter(activo=True).order_by('id'))
+        self.monedas = list(Moneda.objects.filter(activo=True).exclude(codigo='USD').order_by('id'))
+        self.calificadores = list(Calificador.objects.filter(activo=True).order_by('id'))
+        self.outlooks = list(Outlook.objects.filter(activo=True).order_by('id'))
+
+    def _archivo_documento(self):
+        """Un único archivo real compartido por todos los documentos generados"""
+        if not default_storage.exists(ARCHIVO_DOCUMENTO):
+            return default_storage.save(ARCHIVO_DOCUMENTO, ContentFile(b'Documento generado para pruebas de volumen.\n'))
+        return ARCHIVO_DOCUMENTO
+
+    def _tipos_cambio(self, dias):
+        creados = 0
+        for moneda in self.monedas:
+            tasa = Decimal(str(round(self.azar.uniform(0.0002, 1.3), 6)))
+            registros = []
+            for dia in range(dias):
+                tasa = max(tasa * Decimal(str(round(self.azar.uniform(0.99, 1.01), 6))), Decimal('0.000001'))
+                registros.append(TipoCambio(
+                    moneda=moneda,
+                    tasa_usd=tasa.quantize(Decimal('0.000001')),
+                    fecha=self.hoy - timedelta(days=dia),
+                    creado_por=self.usuario,
+                ))
+            # Las fechas que ya existan (unique moneda/fecha) se conservan
+            creados += len(TipoCambio.objects.bulk_create(registros, batch_size=1000, ignore_conflicts=True))
+        return creados
+
+    # ====== GENERACIÓN POR LOTES ======
+
+    def _lote(self, desplazamiento, cantidad, options):
+        azar = self.azar
+        contrapartes = Contraparte.objects.bulk_create([
+            Contraparte(
+                nombre=f'{PREFIJO}{azar.choice(APELLIDOS)} {azar.choice(SUFIJOS_EMPRESA)} {desplazamiento + i:06d}',
+                full_company_name=f'{azar.choice(APELLIDOS)} {azar.choice(APELLIDOS)} {azar.choice(SUFIJOS_EMPRESA)}',
+                nacionalidad=azar.choice(PAISES),
+                tipo=azar.choice(self.tipos),
+                estado_nuevo=azar.choice(self.estados) if self.estados else None,
+                # bulk_create no llama a save(): la fecha de próxima DD se asigna aquí
+                fecha_proxima_dd=self.hoy + timedelta(days=azar.randint(-60, 365)),
+                creado_por=self.usuario,
+            )
+            for i in range(cantidad)
+        ])
+
+        miembros = Miembro.objects.bulk_create([
+            Miembro(
+                contraparte=contraparte,
+                tipo_persona='natural' if azar.random() < 0.8 else 'juridica',
+                nombre=f'{azar.choice(NOMBRES)} {azar.choice(APELLIDOS)} {azar.choice(APELLIDOS)}',
+                numero_identificacion=f'VOL-{contraparte.pk}-{j}',
+                nacionalidad=azar.choice(PAISES),
+                fecha_nacimiento=self.hoy - timedelta(days=azar.randint(25 * 365, 75 * 365)),
+                categoria=azar.choice(Miembro.CATEGORIAS)[0],
+                es_pep=azar.random() < 0.05,
+            )
+            for contraparte in contrapartes for j in range(options['miembros'])
+        ])
+
+        documentos = Documento.objects.bulk_create([
+            Documento(
+                contraparte=contraparte,
+                tipo=azar.choice(self.tipos_documento),
+                categoria=azar.choice(Documento.CATEGORIAS)[0],
+                archivo=self.archivo,
+                fecha_emision=self.hoy - timedelta(days=azar.randint(0, 900)),
+                fecha_expiracion=self.hoy + timedelta(days=azar.randint(-90, 720)) if azar.random() < 0.6 else None,
+                subido_por=azar.choice(self.usuarios),
+            )
+            for contraparte in contrapartes for _ in range(options['documentos'])
+        ])
+
+        comentarios = Comentario.objects.bulk_create([
+            Comentario(
+                contraparte=contraparte,
+                usuario=azar.choice(self.usuarios),
+                contenido=f'Revisión de seguimiento {k + 1} de {contraparte.nombre}.',
+            )
+            for contraparte in contrapartes for k in range(options['comentarios'])
+        ])
+
+        calificaciones = Calificacion.objects.bulk_create([
+            Calificacion(
+                contraparte=contraparte,
+                calificador=azar.choice(self.calificadores),
+                outlook=azar.choice(self.outlooks),
+                calificacion=azar.choice(ESCALA_SP[:10]),
+                tipo=azar.choice(Calificacion.TIPOS_CALIFICACION)[0],
+                fecha=self.hoy - timedelta(days=azar.randint(0, 1500)),
+                creado_por=self.usuario,
+            )
+            for contraparte in contrapartes for _ in range(options['calificaciones'])
+        ])
+        # bulk_create no envía post_save (ver contrapartes/signals.py)
+        for contraparte in contrapartes:
+            invalidar_calificaciones_vigentes(contraparte.pk)
+
+        balances = BalanceSheet.objects.bulk_create([
+            BalanceSheet(
+                contraparte=contraparte,
+                año=self.hoy.year - 1 - k,
+                moneda_local=azar.choice(self.monedas) if self.monedas else None,
+                solo_usd=azar.random() < 0.3,
+                creado_por=self.usuario,
+            )
+            for contraparte in contrapartes for k in range(options['balances'])
+        ])
+        items = BalanceSheetItem.objects.bulk_create([
+            BalanceSheetItem(
+                balance_sheet=balance,
+                descripcion=descripcion,
+                categoria=categoria,
+                monto_usd=Decimal(azar.randint(10_000, 50_000_000)),
+                orden=orden,
+                creado_por=self.usuario,
+            )
+            for balance in balances
+            for categoria, descripciones in ITEMS_BALANCE.items()
+            for orden, descripcion in enumerate(descripciones)
+        ], batch_size=2000)
+
+        debidas = []
+        for miembro in miembros:
+            if azar.random() >= options['dd']:
+                continue
+            estado = azar.choice(DebidaDiligencia.ESTADOS)[0]
+            debidas.append(DebidaDiligencia(
+                miembro=miembro,
+                estado=estado,
+                nivel_riesgo=azar.choice(DebidaDiligencia.NIVELES_RIESGO)[0],
+                solicitado_por=azar.choice(self.usuarios),
+                makito_request_id=None if estado == 'pendiente' else f'MK-{miembro.pk}',
+                # Lo que haría DebidaDiligencia.save() al completarse
+                fecha_resultado=timezone.now() if estado == 'completada' else None,
+            ))
+        debidas = DebidaDiligencia.objects.bulk_create(debidas)
+        fuentes = [fuente for fuente, _ in Busqueda.FUENTES[:6]]
+        busquedas = Busqueda.objects.bulk_create([
+            Busqueda(
+                debida_diligencia=dd,
+                fuente=fuente,
+                estado='coincidencia_positiva' if azar.random() < 0.05 else 'sin_coincidencias',
+            )
+            for dd in debidas for fuente in fuentes
+        ], batch_size=2000)
+
+        return {
+            'Contrapartes': len(contrapartes),
+            'Miembros': len(miembros),
+            'Documentos': len(documentos),
+            'Comentarios': len(comentarios),
+            'Calificaciones': len(calificaciones),
+            'Balance sheets': len(balances),
+            'Items de balance': len(items),
+            'Debidas diligencias': len(debidas),
+            'Búsquedas': len(busquedas),
+        }
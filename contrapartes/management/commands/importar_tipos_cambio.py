@@ -0,0 +1,84 @@
+"""
+Comando de gestión Django para importar historial de tipos de cambio.
+Carga archivos CSV/XML grandes (ej: volcados de bancos centrales) por lotes.
+
+Ejemplos:
+    python manage.py importar_tipos_cambio tasas.csv
+    python manage.py importar_tipos_cambio eurofxref-hist.xml --invertir
+"""
+
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from contrapartes.importadores import (
+    TAMANO_LOTE, detectar_formato, importar_tipos_cambio, leer_filas
+)
+
+
+class Command(BaseCommand):
+    help = 'Importa tipos de cambio desde un archivo CSV o XML (upsert por moneda y fecha)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo CSV o XML')
+        parser.add_argument(
+            '--formato',
+            choices=['csv', 'xml'],
+            help='Formato del archivo (por defecto se detecta por la extensión)'
+        )
+        parser.add_argument(
+            '--invertir',
+            action='store_true',
+            help='El archivo expresa unidades de moneda por 1 USD (se guarda 1/tasa)'
+        )
+        parser.add_argument(
+            '--usuario',
+            default='system',
+            help='Usuario que figura como creador de las tasas nuevas (por defecto: system)'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=TAMANO_LOTE,
+            help=f'Filas por transacción (por defecto: {TAMANO_LOTE})'
+        )
+
+    def handle(self, *args, **options):
+        formato = options['formato'] or detectar_formato(options['archivo'])
+
+        if options['usuario'] == 'system':
+            usuario, _ = User.objects.get_or_create(
+                username='system',
+                defaults={'email': 'system@itico.com', 'first_name': 'System', 'last_name': 'User'}
+            )
+        else:
+            try:
+                usuario = User.objects.get(username=options['usuario'])
+            except User.DoesNotExist:
+                raise CommandError(f'El usuario "{options["usuario"]}" no existe')
+
+        inicio = time.monotonic()
+        try:
+            with open(options['archivo'], 'rb') as archivo:
+                resultado = importar_tipos_cambio(
+                    leer_filas(archivo, formato),
+                    usuario,
+                    invertir=options['invertir'],
+                    tamano_lote=options['lote'],
+                )
+        except OSError as e:
+            raise CommandError(f'No se pudo leer el archivo: {e}')
+        duracion = time.monotonic() - inicio
+
+        for error in resultado['errores']:
+            self.stdout.write(self.style.WARNING(f'Fila {error["fila"]}: {error["error"]}'))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'\nResumen ({duracion:.2f}s):\n'
+                f'- Insertados: {resultado["insertados"]}\n'
+                f'- Actualizados: {resultado["actualizados"]}\n'
+                f'- Rechazados: {resultado["rechazados"]}'
+            )
+        )
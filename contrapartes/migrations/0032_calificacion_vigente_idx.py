@@ -0,0 +1,19 @@
+# Generated by Django 5.0.7 on 2026-10-19 14:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contrapartes', '0031_alter_calificacion_fecha'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='calificacion',
+            index=models.Index(fields=['contraparte', 'calificador', '-fecha'], name='calif_vigente_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.7 on 2026-10-19 15:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contrapartes', '0032_calificacion_vigente_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tipocambio',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Última actualización'),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.7 on 2026-10-19 15:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contrapartes', '0033_tipocambio_fecha_actualizacion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='balancesheetitem',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['balance_sheet', 'categoria', 'orden'], name='bs_item_activos_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='calificacion',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['contraparte', '-fecha'], name='calif_activas_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comentario',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['contraparte', '-fecha_creacion'], name='comentario_activos_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contraparte',
+            index=models.Index(fields=['fecha_proxima_dd'], name='contraparte_proxima_dd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='documento',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['contraparte', 'categoria', '-fecha_subida'], name='documento_activos_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='documento',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['fecha_expiracion'], name='documento_expiracion_idx'),
+        ),
+    ]
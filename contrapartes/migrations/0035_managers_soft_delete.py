@@ -0,0 +1,74 @@
+# Generated by Django 5.0.7 on 2026-10-19 15:27
+
+import django.db.models.manager
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contrapartes', '0034_indices_acceso'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='balancesheet',
+            options={'default_manager_name': 'all_objects', 'ordering': ['-año'], 'verbose_name': 'Balance Sheet', 'verbose_name_plural': 'Balance Sheets'},
+        ),
+        migrations.AlterModelOptions(
+            name='balancesheetitem',
+            options={'default_manager_name': 'all_objects', 'ordering': ['categoria', 'orden', 'descripcion'], 'verbose_name': 'Item de Balance Sheet', 'verbose_name_plural': 'Items de Balance Sheet'},
+        ),
+        migrations.AlterModelOptions(
+            name='calificacion',
+            options={'default_manager_name': 'all_objects', 'ordering': ['-fecha'], 'verbose_name': 'Calificación', 'verbose_name_plural': 'Calificaciones'},
+        ),
+        migrations.AlterModelOptions(
+            name='comentario',
+            options={'default_manager_name': 'all_objects', 'ordering': ['-fecha_creacion'], 'verbose_name': 'Comentario', 'verbose_name_plural': 'Comentarios'},
+        ),
+        migrations.AlterModelOptions(
+            name='documento',
+            options={'default_manager_name': 'all_objects', 'ordering': ['-fecha_subida'], 'verbose_name': 'Documento', 'verbose_name_plural': 'Documentos'},
+        ),
+        migrations.AlterModelOptions(
+            name='miembro',
+            options={'default_manager_name': 'all_objects', 'ordering': ['nombre'], 'verbose_name': 'Miembro', 'verbose_name_plural': 'Miembros'},
+        ),
+        migrations.AlterModelManagers(
+            name='balancesheet',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='balancesheetitem',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='calificacion',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='comentario',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='documento',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='miembro',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+    ]
@@ -54,6 +54,47 @@ def documento_upload_path(instance, filename):
     return f'contrapartes/{contraparte_id}/documentos/{name}{ext}'
 
 
+# =============================================================================
+# SOFT DELETE
+# =============================================================================
+
+class ActiveManager(models.Manager):
+    """
+    Manager que solo devuelve los registros activos (activo=True).
+
+    Los modelos con soft delete lo declaran como objects y conservan
+    all_objects como manager por defecto, de modo que el admin, la API
+    (filtro ?activo=) y las validaciones de unicidad siguen viendo también
+    los registros eliminados. Sus consultas coinciden con la condición de los
+    índices parciales declarados en Meta.indexes.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(activo=True)
+
+
+def prefetch_activos(modelo, relacion, *select_related):
+    """
+    Prefetch de una relación inversa limitado a los registros activos.
+
+    Con el prefetch, instancia.<relacion>.all/count/exists (en vistas y
+    plantillas) ya no incluyen los registros eliminados.
+
+    Args:
+        modelo: Modelo que declara la relación (p. ej. Contraparte)
+        relacion: Nombre de la relación inversa (p. ej. 'documentos')
+        select_related: Relaciones a incluir en la consulta del prefetch
+
+    Returns:
+        Prefetch
+    """
+    relacionado = modelo._meta.get_field(relacion).related_model
+    queryset = relacionado.objects.all()
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+    return models.Prefetch(relacion, queryset=queryset)
+
+
 # =============================================================================
 # MODELOS DE CONFIGURACIÓN
 # =============================================================================
@@ -391,6 +432,10 @@ class Contraparte(models.Model):
         verbose_name = "Contraparte"
         verbose_name_plural = "Contrapartes"
         ordering = ['-fecha_creacion']
+        indexes = [
+            # Calendario y alertas de próximas debidas diligencias
+            models.Index(fields=['fecha_proxima_dd'], name='contraparte_proxima_dd_idx'),
+        ]
     
     def __str__(self):
         return f"{self.nombre} ({self.tipo.nombre})"
@@ -418,17 +463,17 @@ class Contraparte(models.Model):
     @property
     def comentarios_activos_count(self):
         """Retorna el número de comentarios activos"""
-        return self.comentarios.filter(activo=True).count()
+        return self.comentarios(manager='objects').count()
     
     @property
     def calificaciones_activas_count(self):
         """Retorna el número de calificaciones activas"""
-        return self.calificaciones.filter(activo=True).count()
+        return self.calificaciones(manager='objects').count()
     
     def get_documentos_por_categoria(self):
         """Retorna los documentos agrupados por categoría"""
         from django.db.models import Q
-        documentos_activos = self.documentos.filter(activo=True).order_by('categoria', '-fecha_subida')
+        documentos_activos = self.documentos(manager='objects').order_by('categoria', '-fecha_subida')
         
         # Group by category
         categorias = {}
@@ -515,10 +560,14 @@ class Miembro(models.Model):
     fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de creación")
     fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name="Última actualización")
     activo = models.BooleanField(default=True, verbose_name="Activo")
+
+    objects = ActiveManager()
+    all_objects = models.Manager()
     
     class Meta:
         verbose_name = "Miembro"
         verbose_name_plural = "Miembros"
+        default_manager_name = 'all_objects'
         unique_together = ['contraparte', 'numero_identificacion']
         ordering = ['nombre']
     
@@ -643,11 +692,23 @@ class Comentario(models.Model):
         default=True,
         verbose_name="Activo"
     )
+
+    objects = ActiveManager()
+    all_objects = models.Manager()
     
     class Meta:
         verbose_name = "Comentario"
         verbose_name_plural = "Comentarios"
         ordering = ['-fecha_creacion']
+        default_manager_name = 'all_objects'
+        indexes = [
+            # Comentarios visibles de una contraparte; los eliminados (soft delete) quedan fuera
+            models.Index(
+                fields=['contraparte', '-fecha_creacion'],
+                name='comentario_activos_idx',
+                condition=models.Q(activo=True),
+            ),
+        ]
     
     def __str__(self):
         return f"Comentario de {self.usuario.get_full_name() or self.usuario.username} en {self.contraparte.nombre}"
@@ -756,6 +817,9 @@ class Documento(models.Model):
         default=True,
         verbose_name="Activo"
     )
+
+    objects = ActiveManager()
+    all_objects = models.Manager()
     
     class Meta:
         verbose_name = "Documento"
@@ -790,6 +854,21 @@ class Documento(models.Model):
         verbose_name = "Documento"
         verbose_name_plural = "Documentos"
         ordering = ['-fecha_subida']
+        default_manager_name = 'all_objects'
+        indexes = [
+            # Documentos activos de una contraparte agrupados por categoría
+            models.Index(
+                fields=['contraparte', 'categoria', '-fecha_subida'],
+                name='documento_activos_idx',
+                condition=models.Q(activo=True),
+            ),
+            # Vencimientos próximos (calendario, exportaciones)
+            models.Index(
+                fields=['fecha_expiracion'],
+                name='documento_expiracion_idx',
+                condition=models.Q(activo=True),
+            ),
+        ]
     
     def __str__(self):
         return f"{self.tipo.nombre} - {self.contraparte.nombre}"
@@ -1017,11 +1096,25 @@ class Calificacion(models.Model):
         default=True,
         verbose_name="Activo"
     )
+
+    objects = ActiveManager()
+    all_objects = models.Manager()
     
     class Meta:
         verbose_name = "Calificación"
         verbose_name_plural = "Calificaciones"
         ordering = ['-fecha']
+        default_manager_name = 'all_objects'
+        indexes = [
+            # Soporta la consulta de calificaciones vigentes por agencia
+            models.Index(fields=['contraparte', 'calificador', '-fecha'], name='calif_vigente_idx'),
+            # Historial de calificaciones activas de una contraparte
+            models.Index(
+                fields=['contraparte', '-fecha'],
+                name='calif_activas_idx',
+                condition=models.Q(activo=True),
+            ),
+        ]
     
     def __str__(self):
         return f"{self.calificador.nombre} - {self.contraparte.nombre} ({self.calificacion})"
@@ -1125,6 +1218,7 @@ class TipoCambio(models.Model):
         verbose_name="Creado por"
     )
     fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de creación")
+    fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name="Última actualización")
     
     class Meta:
         verbose_name = "Tipo de Cambio"
@@ -1136,6 +1230,25 @@ class TipoCambio(models.Model):
         return f"{self.moneda.codigo} - {self.tasa_usd} USD ({self.fecha})"
 
 
+_SIN_ANOTAR = object()
+
+
+class BalanceSheetQuerySet(models.QuerySet):
+
+    def con_totales(self):
+        """
+        Anota los totales USD por categoría (suma_assets, suma_liabilities,
+        suma_equity) para que total_*_usd no consulte los items por fila.
+        """
+        def total(categoria):
+            return models.Sum('items__monto_usd', filter=models.Q(items__categoria=categoria, items__activo=True))
+        return self.annotate(
+            suma_assets=total('assets'),
+            suma_liabilities=total('liabilities'),
+            suma_equity=total('equity'),
+        )
+
+
 class BalanceSheet(models.Model):
     """
     Modelo para gestionar los balance sheets de contrapartes.
@@ -1195,35 +1308,42 @@ class BalanceSheet(models.Model):
     fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name="Última actualización")
     activo = models.BooleanField(default=True, verbose_name="Activo")
     
+    objects = ActiveManager.from_queryset(BalanceSheetQuerySet)()
+    all_objects = BalanceSheetQuerySet.as_manager()
+    
     class Meta:
         verbose_name = "Balance Sheet"
         verbose_name_plural = "Balance Sheets"
+        default_manager_name = 'all_objects'
         ordering = ['-año']
         unique_together = ['contraparte', 'año']
     
     def __str__(self):
         return f"Balance Sheet {self.año} - {self.contraparte.nombre or self.contraparte.full_company_name}"
     
+    def _total_categoria(self, categoria):
+        # Anotado por BalanceSheetQuerySet.con_totales() o calculado aquí
+        anotado = getattr(self, f'suma_{categoria}', _SIN_ANOTAR)
+        if anotado is _SIN_ANOTAR:
+            anotado = self.items(manager='objects').filter(categoria=categoria).aggregate(
+                total=models.Sum('monto_usd')
+            )['total']
+        return anotado or Decimal('0.00')
+    
     @property
     def total_assets_usd(self):
         """Calcula el total de activos en USD"""
-        return self.items.filter(categoria='assets', activo=True).aggregate(
-            total=models.Sum('monto_usd')
-        )['total'] or Decimal('0.00')
+        return self._total_categoria('assets')
     
     @property
     def total_liabilities_usd(self):
         """Calcula el total de pasivos en USD"""
-        return self.items.filter(categoria='liabilities', activo=True).aggregate(
-            total=models.Sum('monto_usd')
-        )['total'] or Decimal('0.00')
+        return self._total_categoria('liabilities')
     
     @property
     def total_equity_usd(self):
         """Calcula el total de patrimonio en USD"""
-        return self.items.filter(categoria='equity', activo=True).aggregate(
-            total=models.Sum('monto_usd')
-        )['total'] or Decimal('0.00')
+        return self._total_categoria('equity')
 
 
 class BalanceSheetItem(models.Model):
@@ -1303,11 +1423,23 @@ class BalanceSheetItem(models.Model):
     fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de creación")
     fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name="Última actualización")
     activo = models.BooleanField(default=True, verbose_name="Activo")
+
+    objects = ActiveManager()
+    all_objects = models.Manager()
     
     class Meta:
         verbose_name = "Item de Balance Sheet"
         verbose_name_plural = "Items de Balance Sheet"
+        default_manager_name = 'all_objects'
         ordering = ['categoria', 'orden', 'descripcion']
+        indexes = [
+            # Partidas activas de un balance en el orden en que se muestran y suman
+            models.Index(
+                fields=['balance_sheet', 'categoria', 'orden'],
+                name='bs_item_activos_idx',
+                condition=models.Q(activo=True),
+            ),
+        ]
     
     def __str__(self):
         return f"{self.descripcion} - {self.get_categoria_display()}"
@@ -0,0 +1,71 @@
+"""
+Signals de la aplicación de contrapartes
+Portal Interno de Contrapartes – App Pacífico (Cotizador Web)
+
+Mantienen coherentes los datos derivados que se guardan en caché cuando
+cambian los modelos de origen. Se conectan en ContrapartesConfig.ready().
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from itico import cache as cache_itico
+
+from . import fragmentos
+from .calificaciones import invalidar_calificaciones_vigentes
+from .models import (
+    Calificacion, Calificador, Comentario, Contraparte, Documento, EstadoContraparte, Miembro, Moneda,
+    Outlook, TipoContraparte, TipoDocumento,
+)
+
+# Catálogos servidos desde itico/cache.py; se invalidan al guardar o eliminar
+# junto con los fragmentos de plantilla que muestran sus nombres
+MODELOS_REFERENCIA = (TipoContraparte, EstadoContraparte, TipoDocumento, Moneda, Outlook, Calificador)
+
+for _modelo in MODELOS_REFERENCIA:
+    cache_itico.registrar_modelo(_modelo, fragmentos.ESPACIO_CATALOGOS)
+
+
+@receiver([post_save, post_delete], sender=Calificacion)
+def invalidar_cache_calificaciones(sender, instance, **kwargs):
+    """
+    Invalida las calificaciones vigentes en caché de la contraparte.
+
+    Se ejecuta al crear, editar, desactivar o eliminar una calificación.
+    """
+    invalidar_calificaciones_vigentes(instance.contraparte_id)
+    fragmentos.invalidar_seccion(instance.contraparte_id, 'calificaciones')
+
+
+@receiver([post_save, post_delete], sender=Miembro)
+def invalidar_fragmentos_miembros(sender, instance, **kwargs):
+    """Invalida los fragmentos con los miembros de la contraparte (lista y contadores)"""
+    fragmentos.invalidar_seccion(instance.contraparte_id, 'miembros')
+
+
+@receiver([post_save, post_delete], sender=Comentario)
+def invalidar_fragmentos_comentarios(sender, instance, **kwargs):
+    """Invalida los fragmentos con los comentarios de la contraparte"""
+    fragmentos.invalidar_seccion(instance.contraparte_id, 'comentarios')
+
+
+@receiver([post_save, post_delete], sender=Documento)
+def invalidar_fragmentos_documentos(sender, instance, **kwargs):
+    """
+    Invalida los fragmentos con los documentos de la contraparte y el
+    calendario de DD, que muestra sus fechas de expiración.
+    """
+    fragmentos.invalidar(
+        fragmentos.espacio_seccion(instance.contraparte_id, 'documentos'), fragmentos.ESPACIO_CALENDARIO
+    )
+
+
+@receiver([post_save, post_delete], sender=Contraparte)
+def invalidar_fragmentos_calendario(sender, instance, **kwargs):
+    """
+    Invalida el calendario de DD (nombres y fechas de próxima DD).
+
+    Los fragmentos de la ficha y de la lista incluyen fecha_actualizacion
+    en su clave y no necesitan invalidarse.
+    """
+    fragmentos.invalidar(fragmentos.ESPACIO_CALENDARIO)
@@ -0,0 +1,25 @@
+"""
+Etiquetas para los fragmentos en caché de la ficha de contraparte
+
+{% precargar object 'miembros' %} dentro de un bloque {% cache %} carga las
+relaciones que recorre ese bloque solo con sus registros activos. Si el
+fragmento está en caché el bloque no se ejecuta y la consulta no se hace.
+"""
+
+from django import template
+from django.db.models import prefetch_related_objects
+
+from ..models import Contraparte, prefetch_activos
+from ..views import LISTAS_PARCIALES
+
+register = template.Library()
+
+
+@register.simple_tag
+def precargar(contraparte, *relaciones):
+    """Precarga las relaciones indicadas; las ya cargadas no se repiten"""
+    prefetch_related_objects(
+        [contraparte],
+        *[prefetch_activos(Contraparte, relacion, *LISTAS_PARCIALES[relacion]) for relacion in relaciones]
+    )
+    return ''
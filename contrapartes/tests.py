@@ -1,3 +1,495 @@
-from django.test import TestCase
+import copy
+import io
+import shutil
+import tempfile
+import zipfile
+from decimal import Decimal
+from datetime import date
 
-# Create your tests here.
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.contrib.auth.models import User
+
+from itico import benchmark
+from itico import cache as cache_itico
+
+from .models import (
+    BalanceSheet, BalanceSheetItem, Calificacion, Calificador, Comentario, Contraparte, Miembro, Moneda,
+    Outlook, TipoCambio, TipoContraparte, prefetch_activos
+)
+from .catalogos import MONEDAS, TIPOS_CONTRAPARTE
+from .forms import ContraparteForm, TipoCambioForm
+from .calificaciones import (
+    adjuntar_calificaciones_vigentes, calificaciones_vigentes, matriz_migracion, nivel_calificacion
+)
+from .exportadores import ENCABEZADOS_CONTRAPARTES, escribir_csv, escribir_xlsx, filas_contrapartes
+from .importadores import importar_tipos_cambio, leer_filas_csv, leer_filas_xml
+
+
+class ImportarTiposCambioTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.eur = Moneda.objects.create(codigo='EUR', nombre='Euro', simbolo='€', creado_por=self.user)
+        self.cop = Moneda.objects.create(codigo='COP', nombre='Peso colombiano', simbolo='$', creado_por=self.user)
+
+    def test_importar_csv_inserta_actualiza_y_rechaza(self):
+        """Test that CSV rows are upserted on (moneda, fecha) and invalid rows are reported"""
+        TipoCambio.objects.create(
+            moneda=self.eur, fecha=date(2024, 1, 1), tasa_usd=Decimal('1.0'), creado_por=self.user
+        )
+        contenido = (
+            b'moneda;fecha;tasa_usd\n'
+            b'EUR;2024-01-01;1,10\n'
+            b'EUR;02/01/2024;1.09\n'
+            b'XXX;2024-01-01;1.00\n'
+            b'COP;2024-13-01;0.00025\n'
+        )
+
+        resultado = importar_tipos_cambio(leer_filas_csv(io.BytesIO(contenido)), self.user)
+
+        self.assertEqual(resultado['insertados'], 1)
+        self.assertEqual(resultado['actualizados'], 1)
+        self.assertEqual(resultado['rechazados'], 2)
+        self.assertEqual(
+            TipoCambio.objects.get(moneda=self.eur, fecha=date(2024, 1, 1)).tasa_usd,
+            Decimal('1.10')
+        )
+
+    def test_importar_xml_hereda_fecha_e_invierte(self):
+        """Test ECB-style XML where the date lives on the parent element"""
+        contenido = (
+            b'<Envelope><Cube>'
+            b'<Cube time="2024-01-02"><Cube currency="COP" rate="4000"/></Cube>'
+            b'<Cube time="2024-01-03"><Cube currency="COP" rate="3950"/></Cube>'
+            b'</Cube></Envelope>'
+        )
+
+        resultado = importar_tipos_cambio(
+            leer_filas_xml(io.BytesIO(contenido)), self.user, invertir=True, tamano_lote=1
+        )
+
+        self.assertEqual(resultado['insertados'], 2)
+        self.assertEqual(resultado['rechazados'], 0)
+        self.assertEqual(
+            TipoCambio.objects.get(moneda=self.cop, fecha=date(2024, 1, 2)).tasa_usd,
+            Decimal('0.000250')
+        )
+
+    def test_archivos_y_tasas_invalidos(self):
+        """Test that out-of-range rates, bad encodings and malformed XML are reported as rejected rows"""
+        contenido = b'moneda;fecha;tasa_usd\nEUR;2024-01-01;1e30\nEUR;2024-01-02;1.1\nEUR;2024-01-03;\xe9\n'
+        resultado = importar_tipos_cambio(leer_filas_csv(io.BytesIO(contenido)), self.user)
+
+        self.assertEqual((resultado['insertados'], resultado['rechazados']), (1, 2))
+        self.assertEqual([error['fila'] for error in resultado['errores']], [2, 4])
+
+        resultado = importar_tipos_cambio(
+            leer_filas_xml(io.BytesIO(b'<Cube><Cube currency="EUR" rate="1.1" time="2024-01-05"/><Cube')), self.user
+        )
+        self.assertEqual((resultado['insertados'], resultado['rechazados']), (1, 1))
+        self.assertIn('XML', resultado['errores'][0]['error'])
+
+
+class CalificacionesVigentesTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        tipo = TipoContraparte.objects.create(codigo='banco', nombre='Banco', creado_por=self.user)
+        self.contraparte = Contraparte.objects.create(nombre='Banco Uno', tipo=tipo, creado_por=self.user)
+        self.fitch = Calificador.objects.create(nombre='Fitch', creado_por=self.user)
+        self.sp = Calificador.objects.create(nombre='S&P', creado_por=self.user)
+        self.estable = Outlook.objects.create(outlook='Estable', creado_por=self.user)
+
+    def calificar(self, calificador, calificacion, fecha, activo=True):
+        return Calificacion.objects.create(
+            contraparte=self.contraparte, calificador=calificador, outlook=self.estable,
+            calificacion=calificacion, fecha=fecha, activo=activo, creado_por=self.user
+        )
+
+    def test_ultima_calificacion_activa_por_agencia(self):
+        """Test that only the latest active rating per agency is returned"""
+        self.calificar(self.fitch, 'A', date(2023, 1, 1))
+        self.calificar(self.fitch, 'AA', date(2024, 1, 1))
+        self.calificar(self.fitch, 'AAA', date(2024, 6, 1), activo=False)
+        self.calificar(self.sp, 'BBB', date(2022, 1, 1))
+
+        vigentes = {c.calificador.nombre: c.calificacion for c in calificaciones_vigentes([self.contraparte])}
+
+        self.assertEqual(vigentes, {'Fitch': 'AA', 'S&P': 'BBB'})
+
+    def test_adjuntar_usa_cache_e_invalida_al_guardar(self):
+        """Test that cached current ratings are invalidated by the Calificacion signals"""
+        self.calificar(self.fitch, 'A', date(2023, 1, 1))
+        adjuntar_calificaciones_vigentes([self.contraparte])
+
+        with self.assertNumQueries(0):
+            adjuntar_calificaciones_vigentes([self.contraparte])
+
+        self.calificar(self.fitch, 'A+', date(2024, 1, 1))
+        contraparte = adjuntar_calificaciones_vigentes([Contraparte.objects.get(pk=self.contraparte.pk)])[0]
+
+        self.assertEqual([c.calificacion for c in contraparte.calificaciones_vigentes], ['A+'])
+
+    def test_matriz_migracion_entre_fechas(self):
+        """Test rating scale mapping and the portfolio migration matrix"""
+        self.assertEqual(nivel_calificacion('Baa2'), nivel_calificacion('BBB'))
+        self.assertEqual(nivel_calificacion('AA+(col)'), 2)
+        self.assertIsNone(nivel_calificacion('N/A'))
+
+        self.calificar(self.fitch, 'A-', date(2023, 1, 1))
+        self.calificar(self.fitch, 'BBB+', date(2023, 6, 1))
+        self.calificar(self.sp, 'AA', date(2023, 3, 1))
+
+        resultado = matriz_migracion(date(2023, 1, 31), date(2023, 12, 31))
+        etiquetas = resultado['etiquetas']
+        matriz = resultado['matriz']
+
+        self.assertEqual(matriz[etiquetas.index('A'), etiquetas.index('BBB')], 1)
+        self.assertEqual(matriz[etiquetas.index('NR'), etiquetas.index('AA')], 1)
+        self.assertEqual(resultado['resumen'], {'pares': 2, 'estables': 0, 'mejoras': 0, 'deterioros': 1})
+
+        self.client.force_login(self.user)
+        url = reverse('contrapartes:calificacion_migracion')
+        response = self.client.get(url, {'fecha_inicio': '2023-01-31', 'calificador': self.fitch.pk})
+        self.assertEqual(response.json()['resumen']['pares'], 1)
+        response = self.client.get(url, {'fecha_inicio': '2023-01-31', 'calificador': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ExportarContrapartesTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        tipo = TipoContraparte.objects.create(codigo='banco', nombre='Banco', creado_por=self.user)
+        for numero in range(5):
+            contraparte = Contraparte.objects.create(
+                nombre=f'Banco {numero}', tipo=tipo, creado_por=self.user
+            )
+            Miembro.objects.create(
+                contraparte=contraparte, nombre=f'Director {numero}', nacionalidad='CO',
+                fecha_nacimiento=date(1970, 1, 1), es_pep=numero % 2 == 0, posicion_pep='Ministro'
+            )
+
+    def test_filas_con_consultas_constantes(self):
+        """Test that export rows are built with a fixed number of queries per batch"""
+        with self.assertNumQueries(3):
+            filas = list(filas_contrapartes(tamano_lote=10))
+
+        self.assertEqual(len(filas), 5)
+        self.assertEqual(len(filas[0]), len(ENCABEZADOS_CONTRAPARTES))
+        self.assertEqual(filas[0][10:12], ['Sí', 'Director 0 (Ministro)'])
+
+    def test_escritores_csv_y_xlsx(self):
+        """Test that the CSV and XLSX writers produce readable files"""
+        filas = [[1, 'Banco & Co', date(2024, 1, 31), None]]
+
+        contenido_csv = b''.join(escribir_csv(['ID', 'Nombre', 'Fecha', 'Vacío'], filas)).decode('utf-8-sig')
+        self.assertEqual(contenido_csv.splitlines()[1], '1,Banco & Co,2024-01-31,')
+
+        contenido_xlsx = b''.join(escribir_xlsx(['ID', 'Nombre', 'Fecha', 'Vacío'], filas))
+        with zipfile.ZipFile(io.BytesIO(contenido_xlsx)) as libro:
+            hoja = libro.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        self.assertIn('<c r="A2"><v>1</v></c>', hoja)
+        self.assertIn('Banco &amp; Co', hoja)
+
+    def test_csv_no_exporta_formulas(self):
+        """Test that user text starting like a formula is escaped in CSV while numbers are kept"""
+        filas = [['=HYPERLINK("http://x")', '@SUM(A1)', '-2+3', Decimal('-5.00')]]
+
+        contenido = b''.join(escribir_csv(['A', 'B', 'C', 'D'], filas)).decode('utf-8-sig')
+
+        self.assertEqual(contenido.splitlines()[1], '"\'=HYPERLINK(""http://x"")",\'@SUM(A1),\'-2+3,-5.00')
+
+
+class CacheReferenciaTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        cache_itico.limpiar_local()
+        self.user = User.objects.create_user(username='catalogos', password='testpass123')
+
+    def _monedas(self):
+        return cache_itico.obtener(
+            cache_itico.espacio_modelo(Moneda), 'codigos',
+            lambda: sorted(Moneda.objects.values_list('codigo', flat=True)),
+        )
+
+    def test_dos_niveles_e_invalidacion_por_signal(self):
+        """Test that catalog values are served from cache and invalidated on save"""
+        Moneda.objects.create(codigo='USD', nombre='Dólar', simbolo='$', creado_por=self.user)
+        codigos = self._monedas()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self._monedas(), codigos)
+
+        # Sin la caché local se sirve desde la compartida
+        cache_itico.limpiar_local()
+        with self.assertNumQueries(0):
+            self.assertEqual(self._monedas(), codigos)
+
+        Moneda.objects.create(codigo='EUR', nombre='Euro', simbolo='€', creado_por=self.user)
+        self.assertIn('EUR', self._monedas())
+
+    def test_lru_descarta_las_entradas_menos_usadas(self):
+        """Test that the process-local LRU keeps at most max_entradas values"""
+        local = cache_itico.CacheLocal(max_entradas=2)
+        local.set('a', 1, 60)
+        local.set('b', 2, 60)
+        local.get('a')
+        local.set('c', 3, 60)
+
+        self.assertEqual(local.get('a'), 1)
+        self.assertIsNone(local.get('b'))
+        self.assertEqual(len(local), 2)
+
+
+class CatalogosTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        cache_itico.limpiar_local()
+        self.user = User.objects.create_user(username='catalogos', password='testpass123')
+        self.usd = Moneda.objects.create(codigo='USD', nombre='Dólar', simbolo='$', creado_por=self.user)
+        Moneda.objects.create(codigo='XXX', nombre='Inactiva', simbolo='X', activo=False, creado_por=self.user)
+
+    def test_formularios_sin_consultas_de_catalogo(self):
+        """Test that catalog choices are rendered from cache after the first form"""
+        str(ContraparteForm()['tipo'])
+        str(TipoCambioForm()['moneda'])
+
+        with self.assertNumQueries(0):
+            html = str(ContraparteForm()['tipo'])
+            opciones = str(TipoCambioForm()['moneda'])
+
+        for tipo in TipoContraparte.objects.filter(activo=True):
+            self.assertIn(tipo.nombre, html)
+        self.assertIn('USD - Dólar', opciones)
+        self.assertNotIn('Inactiva', opciones)
+        self.assertEqual(MONEDAS.opciones(), ((self.usd.pk, 'USD - Dólar'),))
+
+    def test_validacion_contra_catalogo(self):
+        """Test that catalog fields validate against active cached records"""
+        inactiva = Moneda.objects.get(codigo='XXX')
+        form = TipoCambioForm(data={'moneda': self.usd.pk, 'tasa_usd': '1', 'fecha': '2024-01-31'})
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data['moneda'], self.usd)
+
+        form = TipoCambioForm(data={'moneda': inactiva.pk, 'tasa_usd': '1', 'fecha': '2024-01-31'})
+        self.assertIn('moneda', form.errors)
+
+    def test_invalidacion_al_guardar(self):
+        """Test that saving a catalog record refreshes its cached list"""
+        version = TIPOS_CONTRAPARTE.version()
+        nombres = [tipo.nombre for tipo in TIPOS_CONTRAPARTE.registros()]
+
+        TipoContraparte.objects.create(codigo='FONDO', nombre='Fondo de inversión', creado_por=self.user)
+
+        self.assertNotEqual(TIPOS_CONTRAPARTE.version(), version)
+        self.assertEqual(len(TIPOS_CONTRAPARTE.registros()), len(nombres) + 1)
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class AdminChangelistTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(username='admin', password='testpass123')
+        self.client.force_login(self.user)
+        self.tipo = TipoContraparte.objects.create(codigo='banco', nombre='Banco', creado_por=self.user)
+        self.fitch = Calificador.objects.create(nombre='Fitch', creado_por=self.user)
+        self.estable = Outlook.objects.create(outlook='Estable', creado_por=self.user)
+        self.creadas = 0
+
+    def _crear_contrapartes(self, cantidad):
+        for _ in range(cantidad):
+            self.creadas += 1
+            contraparte = Contraparte.objects.create(
+                nombre=f'Banco {self.creadas}', tipo=self.tipo, creado_por=self.user
+            )
+            Calificacion.objects.create(
+                contraparte=contraparte, calificador=self.fitch, outlook=self.estable,
+                calificacion='AA', fecha=date(2024, 1, 1), creado_por=self.user
+            )
+            balance = BalanceSheet.objects.create(contraparte=contraparte, año=2024, creado_por=self.user)
+            BalanceSheetItem.objects.create(
+                balance_sheet=balance, descripcion='Caja', categoria='assets',
+                monto_usd=Decimal('10.00'), creado_por=self.user
+            )
+
+    def _consultas(self, url):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        return len(consultas)
+
+    def test_consultas_constantes_por_changelist(self):
+        """Test that admin changelists run the same number of queries for more rows"""
+        urls = [
+            reverse(f'admin:contrapartes_{modelo}_changelist')
+            for modelo in ('tipocontraparte', 'contraparte', 'calificacion', 'balancesheet', 'balancesheetitem')
+        ]
+        self._crear_contrapartes(2)
+        antes = [self._consultas(url) for url in urls]
+        self._crear_contrapartes(5)
+        despues = [self._consultas(url) for url in urls]
+
+        self.assertEqual(antes, despues)
+        respuesta = self.client.get(reverse('admin:contrapartes_balancesheet_changelist'))
+        self.assertContains(respuesta, 'field-total_assets_usd">10<', count=7)
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class BenchmarkTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        cache_itico.limpiar_local()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+
+    def _generar(self, **opciones):
+        with self.settings(MEDIA_ROOT=self.media):
+            call_command(
+                'generar_datos_volumen', contrapartes=3, miembros=2, documentos=1, comentarios=1,
+                calificaciones=2, balances=2, dias_tipo_cambio=5, dd=1.0, stdout=io.StringIO(), **opciones
+            )
+
+    def test_generar_datos_volumen(self):
+        """Test that the generator creates the requested volumes reproducibly"""
+        self._generar()
+        nombres = list(Contraparte.objects.order_by('id').values_list('nombre', flat=True))
+        self.assertEqual(len(nombres), 3)
+        self.assertEqual(Miembro.objects.count(), 6)
+        self.assertEqual(BalanceSheet.objects.count(), 6)
+        self.assertEqual(BalanceSheetItem.objects.count(), 6 * 9)
+        self.assertEqual(Calificacion.objects.count(), 6)
+
+        self._generar(reset=True)
+        self.assertEqual(list(Contraparte.objects.order_by('id').values_list('nombre', flat=True)), nombres)
+
+    def test_ejecutar_y_comparar(self):
+        """Test that the benchmark measures the scenarios and detects regressions"""
+        self._generar()
+        usuario = User.objects.get(username='volumen')
+        with self.settings(MEDIA_ROOT=self.media):
+            resultado = benchmark.ejecutar(
+                usuario, repeticiones=2, calentamiento=0, filtro=['contraparte_detalle', 'api_contrapartes']
+            )
+
+        self.assertEqual(set(resultado['escenarios']), {'contraparte_detalle', 'api_contrapartes'})
+        for datos in resultado['escenarios'].values():
+            self.assertEqual(datos['estado'], 200)
+            self.assertGreater(datos['consultas'], 0)
+        self.assertEqual(resultado['volumen']['contrapartes.contraparte'], 3)
+
+        self.assertEqual(benchmark.comparar(resultado, resultado), [])
+        peor = copy.deepcopy(resultado)
+        peor['escenarios']['api_contrapartes']['consultas'] += 1
+        self.assertEqual(
+            [(r['escenario'], r['metrica']) for r in benchmark.comparar(resultado, peor)],
+            [('api_contrapartes', 'consultas')],
+        )
+
+
+class SoftDeleteTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123', is_staff=True)
+        tipo = TipoContraparte.objects.create(codigo='banco', nombre='Banco', creado_por=self.user)
+        self.contraparte = Contraparte.objects.create(nombre='Banco Uno', tipo=tipo, creado_por=self.user)
+        self.visible = Comentario.objects.create(contraparte=self.contraparte, usuario=self.user, contenido='Visible')
+        self.eliminado = Comentario.objects.create(
+            contraparte=self.contraparte, usuario=self.user, contenido='Eliminado', activo=False
+        )
+
+    def test_managers_y_prefetch_activos(self):
+        """Test that objects and prefetch_activos exclude soft-deleted rows and all_objects keeps them"""
+        self.assertEqual(list(Comentario.objects.all()), [self.visible])
+        self.assertEqual(Comentario.all_objects.count(), 2)
+        # La relación inversa usa el manager por defecto (all_objects)
+        self.assertEqual(self.contraparte.comentarios.count(), 2)
+        self.assertEqual(self.contraparte.comentarios_activos_count, 1)
+
+        contraparte = Contraparte.objects.prefetch_related(
+            prefetch_activos(Contraparte, 'comentarios', 'usuario')
+        ).get(pk=self.contraparte.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(list(contraparte.comentarios.all()), [self.visible])
+            self.assertEqual(contraparte.comentarios.count(), 1)
+
+    def test_lista_parcial_sin_eliminados(self):
+        """Test that the AJAX partial and counter exclude soft-deleted comments"""
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('contrapartes:comentario_eliminar_ajax', args=[self.visible.pk]))
+
+        datos = response.json()
+        self.assertEqual(datos['comentarios_count'], 0)
+        self.assertNotIn('Eliminado', datos['comentarios_html'])
+        self.assertNotIn('Visible', datos['comentarios_html'])
+
+        # Un comentario ya eliminado no se puede volver a eliminar ni editar
+        response = self.client.post(reverse('contrapartes:comentario_eliminar_ajax', args=[self.eliminado.pk]))
+        self.assertEqual(response.status_code, 404)
+
+
+class ValidarArchivoAsyncTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        tipo = TipoContraparte.objects.create(codigo='banco', nombre='Banco', creado_por=self.user)
+        self.contraparte = Contraparte.objects.create(nombre='Banco Uno', tipo=tipo, creado_por=self.user)
+
+    async def test_valida_extension_del_archivo(self):
+        """Test that the async upload check accepts allowed extensions and rejects others"""
+        url = reverse('contrapartes:documento_validar_ajax', args=[self.contraparte.pk])
+        await self.async_client.aforce_login(self.user)
+
+        response = await self.async_client.post(url, {'archivo': SimpleUploadedFile('informe.pdf', b'%PDF')})
+        self.assertEqual(response.json()['file_type'], 'pdf')
+
+        response = await self.async_client.post(url, {'archivo': SimpleUploadedFile('script.exe', b'MZ')})
+        self.assertFalse(response.json()['success'])
+
+        response = await self.async_client.post(
+            reverse('contrapartes:documento_validar_ajax', args=[0]),
+            {'archivo': SimpleUploadedFile('informe.pdf', b'%PDF')},
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class FragmentosDetalleTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches['template_fragments'].clear()
+        cache_itico.limpiar_local()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        tipo = TipoContraparte.objects.create(codigo='banco', nombre='Banco', creado_por=self.user)
+        self.contraparte = Contraparte.objects.create(nombre='Banco Uno', tipo=tipo, creado_por=self.user)
+        Miembro.objects.create(
+            contraparte=self.contraparte, nombre='Director Uno', numero_identificacion='D-1', nacionalidad='CO',
+            fecha_nacimiento=date(1970, 1, 1)
+        )
+        self.url = reverse('contrapartes:detalle', args=[self.contraparte.pk])
+        self.client.force_login(self.user)
+
+    def _detalle(self):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode(), len(consultas)
+
+    def test_fragmentos_en_cache_e_invalidacion_por_seccion(self):
+        """Test that a repeat view renders from cached fragments and section changes invalidate them"""
+        html, en_frio = self._detalle()
+        self.assertIn('Director Uno', html)
+
+        html, en_cache = self._detalle()
+        self.assertIn('Director Uno', html)
+        self.assertLess(en_cache, en_frio)
+
+        Miembro.objects.create(
+            contraparte=self.contraparte, nombre='Director Dos', numero_identificacion='D-2', nacionalidad='CO',
+            fecha_nacimiento=date(1975, 1, 1)
+        )
+        Comentario.objects.create(contraparte=self.contraparte, usuario=self.user, contenido='Revisar balance')
+        html, _ = self._detalle()
+        self.assertIn('Director Dos', html)
+        self.assertIn('Revisar balance', html)
@@ -2,7 +2,7 @@
 URLs para la aplicación de contrapartes
 """
 from django.urls import path
-from . import views
+from . import apiDocumentos, views
 
 app_name = 'contrapartes'
 
@@ -55,6 +55,7 @@ urlpatterns = [
     path('<int:contraparte_pk>/documentos/ajax/crear/', views.DocumentoCreateAjaxView.as_view(), name='documento_crear_ajax'),
     path('documentos/<int:pk>/ajax/editar/', views.DocumentoUpdateAjaxView.as_view(), name='documento_editar_ajax'),
     path('documentos/<int:pk>/eliminar/', views.DocumentoDeleteView.as_view(), name='documento_eliminar'),
+    path('<int:contraparte_pk>/documentos/ajax/validar/', apiDocumentos.upload_progress, name='documento_validar_ajax'),
     
     # Gestión de comentarios
     path('<int:contraparte_pk>/comentarios/ajax/crear/', views.ComentarioCreateAjaxView.as_view(), name='comentario_crear_ajax'),
@@ -68,6 +69,8 @@ urlpatterns = [
     path('<int:contraparte_pk>/calificaciones/ajax/crear/', views.CalificacionCreateAjaxView.as_view(), name='calificacion_crear_ajax'),
     path('calificaciones/<int:pk>/ajax/editar/', views.CalificacionUpdateAjaxView.as_view(), name='calificacion_editar_ajax'),
     path('calificaciones/<int:pk>/ajax/eliminar/', views.CalificacionDeleteAjaxView.as_view(), name='calificacion_eliminar_ajax'),
+    path('<int:contraparte_pk>/calificaciones/trayectoria/', views.CalificacionTrayectoriaView.as_view(), name='calificacion_trayectoria'),
+    path('calificaciones/migracion/', views.CalificacionMigracionView.as_view(), name='calificacion_migracion'),
     
     # Búsqueda y filtros
     path('buscar/', views.ContraparteBuscarView.as_view(), name='buscar'),
@@ -97,6 +100,7 @@ urlpatterns = [
     # Gestión de tipos de cambio
     path('tipos-cambio/', views.TipoCambioListView.as_view(), name='tipo_cambio_lista'),
     path('tipos-cambio/crear/', views.TipoCambioCreateView.as_view(), name='tipo_cambio_crear'),
+    path('tipos-cambio/importar/', views.TipoCambioImportarView.as_view(), name='tipo_cambio_importar'),
     path('tipos-cambio/<int:pk>/editar/', views.TipoCambioUpdateView.as_view(), name='tipo_cambio_editar'),
     path('tipos-cambio/<int:pk>/eliminar/', views.TipoCambioDeleteView.as_view(), name='tipo_cambio_eliminar'),
 ]
@@ -6,25 +6,94 @@ from django.views.generic import (
 )
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
-from django.db.models import Q, Count
+from django.db.models import Q, Count, prefetch_related_objects
 from django.urls import reverse_lazy, reverse
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from datetime import timedelta
 from django.http import JsonResponse
 from django.views import View
+from django.utils.decorators import method_decorator
 from django.shortcuts import get_object_or_404, redirect
 from django.template.loader import render_to_string
 from .models import (
     TipoContraparte, EstadoContraparte, TipoDocumento, Contraparte, Miembro, 
     Documento, Comentario, Calificacion, Calificador, Outlook, BalanceSheet, 
-    BalanceSheetItem, Moneda, TipoCambio
+    BalanceSheetItem, Moneda, TipoCambio, prefetch_activos
 )
 from .forms import (
     TipoContraparteForm, EstadoContraparteForm, ContraparteForm, MiembroForm, 
     DocumentoForm, ComentarioForm, CalificacionForm, CargaDocumentoForm, 
     BalanceSheetForm, BalanceSheetItemForm, BalanceSheetItemFormSet, MonedaForm, 
-    TipoCambioForm
+    TipoCambioForm, TipoCambioImportarForm
 )
+from itico.condicional import condicional, huella, huella_formulario, version_queryset
+from .catalogos import ESTADOS_CONTRAPARTE, TIPOS_CONTRAPARTE, TIPOS_DOCUMENTO, version_modelo
+from .importadores import detectar_formato, importar_tipos_cambio, leer_filas
+from .exportadores import (
+    ENCABEZADOS_CONTRAPARTES, ESCRITORES, filas_contrapartes, filtrar_contrapartes,
+    respuesta_exportacion
+)
+from .calificaciones import (
+    adjuntar_calificaciones_vigentes, matriz_migracion, trayectoria_calificaciones
+)
+from . import fragmentos
+
+
+# ====== RESPUESTAS CONDICIONALES (ETag) ======
+
+def _huella_formulario_contraparte(*catalogos):
+    """Huella de un formulario de alta: la contraparte y los catálogos del formulario"""
+    def funcion(request, contraparte_pk):
+        return huella_formulario(
+            request,
+            version_queryset(Contraparte.objects.filter(pk=contraparte_pk)),
+            *[version_modelo(modelo) for modelo in catalogos]
+        )
+    return funcion
+
+
+def _huella_formulario_instancia(modelo, *catalogos):
+    """Huella de un formulario de edición: el objeto editado y los catálogos del formulario"""
+    def funcion(request, pk):
+        return huella_formulario(
+            request,
+            version_queryset(modelo.objects.filter(pk=pk)),
+            *[version_modelo(catalogo) for catalogo in catalogos]
+        )
+    return funcion
+
+
+def _huella_tipos_cambio(request):
+    return huella(
+        version_queryset(TipoCambio.objects.filter(moneda_id=request.GET.get('moneda_id') or None)),
+        extra=(request.GET.get('moneda_id'),)
+    )
+
+
+# ====== LISTAS PARCIALES DE LA FICHA ======
+
+# Relaciones que recorren las listas parciales de detalle.html
+# (object.<relación>.all/count/exists) y lo que muestra cada fila
+LISTAS_PARCIALES = {
+    'miembros': (),
+    'documentos': ('tipo', 'subido_por'),
+    'comentarios': ('usuario__profile',),
+    'calificaciones': ('calificador', 'outlook', 'creado_por__profile'),
+}
+
+
+def _con_activos(contraparte, *relaciones):
+    """
+    Carga en la contraparte las relaciones indicadas solo con sus registros
+    activos: la lista parcial y el contador de la respuesta AJAX no incluyen
+    los eliminados y salen de una única consulta por relación.
+    """
+    prefetch_related_objects(
+        [contraparte],
+        *[prefetch_activos(Contraparte, relacion, *LISTAS_PARCIALES[relacion]) for relacion in relaciones]
+    )
+    return contraparte
 
 
 # ====== VISTAS PARA TIPO CONTRAPARTE ======
@@ -35,7 +104,8 @@ class TipoContraparteListView(LoginRequiredMixin, ListView):
     paginate_by = 20
     
     def get_queryset(self):
-        queryset = TipoContraparte.objects.all()
+        # Con GROUP BY no se aplica Meta.ordering: el orden se indica explícitamente
+        queryset = TipoContraparte.objects.annotate(num_contrapartes=Count('contrapartes')).order_by('nombre')
         search = self.request.GET.get('search')
         if search:
             queryset = queryset.filter(
@@ -62,6 +132,11 @@ class TipoContraparteUpdateView(LoginRequiredMixin, UpdateView):
     form_class = TipoContraparteForm
     template_name = 'contrapartes/tipo_editar.html'
     success_url = reverse_lazy('contrapartes:tipo_lista')
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['contrapartes_count'] = self.object.contrapartes.count()
+        return context
 
 
 class TipoContraparteDeleteView(LoginRequiredMixin, DeleteView):
@@ -83,7 +158,7 @@ class EstadoContraparteListView(LoginRequiredMixin, ListView):
     paginate_by = 20
     
     def get_queryset(self):
-        queryset = EstadoContraparte.objects.all()
+        queryset = EstadoContraparte.objects.annotate(num_contrapartes=Count('contrapartes')).order_by('nombre')
         search = self.request.GET.get('search')
         if search:
             queryset = queryset.filter(
@@ -131,7 +206,7 @@ class TipoDocumentoListView(LoginRequiredMixin, ListView):
     paginate_by = 20
     
     def get_queryset(self):
-        queryset = TipoDocumento.objects.all()
+        queryset = TipoDocumento.objects.annotate(num_documentos=Count('documentos')).order_by('nombre')
         search = self.request.GET.get('search')
         if search:
             queryset = queryset.filter(
@@ -158,6 +233,11 @@ class TipoDocumentoUpdateView(LoginRequiredMixin, UpdateView):
     template_name = 'contrapartes/tipo_documento_editar.html'
     fields = ['codigo', 'nombre', 'descripcion', 'requiere_expiracion', 'activo']
     success_url = reverse_lazy('contrapartes:tipo_documento_lista')
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['documentos_count'] = self.object.documentos.count()
+        return context
 
 
 class TipoDocumentoDeleteView(LoginRequiredMixin, DeleteView):
@@ -180,9 +260,20 @@ class ContraparteListView(LoginRequiredMixin, ListView):
     context_object_name = 'object_list'
     paginate_by = 20
     
+    def get_queryset(self):
+        return Contraparte.objects.select_related('tipo', 'estado_nuevo').annotate(
+            num_miembros=Count('miembros', filter=Q(miembros__activo=True))
+        ).order_by('-fecha_creacion')
+    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
+        # Calificaciones vigentes de la página actual en una sola consulta
+        adjuntar_calificaciones_vigentes(context['object_list'])
+        # Versiones de las secciones para las claves de los fragmentos por fila
+        fragmentos.adjuntar_versiones(context['object_list'], ('miembros', 'calificaciones'))
+        context['hoy'] = timezone.localdate()
+        
         # Estadísticas para los cards
         total = Contraparte.objects.count()
         activas = Contraparte.objects.filter(estado_nuevo__codigo='activa').count()
@@ -203,10 +294,10 @@ class ContraparteListView(LoginRequiredMixin, ListView):
         }
         
         # Tipos de contraparte para filtros
-        context['tipos_contraparte'] = TipoContraparte.objects.filter(activo=True).order_by('nombre')
+        context['tipos_contraparte'] = TIPOS_CONTRAPARTE.registros()
         
         # Estados de contraparte para filtros
-        context['estados_contraparte'] = EstadoContraparte.objects.filter(activo=True).order_by('nombre')
+        context['estados_contraparte'] = ESTADOS_CONTRAPARTE.registros()
         
         return context
 
@@ -215,6 +306,22 @@ class ContraparteDetailView(LoginRequiredMixin, DetailView):
     model = Contraparte
     template_name = 'contrapartes/detalle.html'
 
+    def get_queryset(self):
+        # Las listas parciales (miembros, documentos, comentarios,
+        # calificaciones) se precargan desde la plantilla con {% precargar %},
+        # solo cuando su fragmento no está en caché
+        return Contraparte.objects.select_related('tipo', 'estado_nuevo', 'creado_por')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Última calificación activa por agencia (desde caché)
+        adjuntar_calificaciones_vigentes([self.object])
+        context['calificaciones_vigentes'] = self.object.calificaciones_vigentes
+        # Versiones de las secciones para las claves de los fragmentos
+        context['versiones_fragmentos'] = fragmentos.versiones(self.object.pk)
+        context['hoy'] = timezone.localdate()
+        return context
+
 
 class ContraparteCreateView(LoginRequiredMixin, CreateView):
     model = Contraparte
@@ -290,6 +397,7 @@ class MiembroDeleteView(LoginRequiredMixin, DeleteView):
         return reverse_lazy('contrapartes:detalle', kwargs={'pk': self.object.contraparte.pk})
 
 
+@method_decorator(condicional(_huella_formulario_contraparte()), name='get')
 class MiembroCreateAjaxView(LoginRequiredMixin, View):
     """Vista AJAX para crear miembros desde modal"""
     
@@ -320,6 +428,7 @@ class MiembroCreateAjaxView(LoginRequiredMixin, View):
             miembro.save()
             
             # Render updated member list
+            _con_activos(contraparte, 'miembros')
             miembros_html = render_to_string('contrapartes/miembros_list_partial.html', {
                 'object': contraparte,
             }, request=request)
@@ -344,6 +453,7 @@ class MiembroCreateAjaxView(LoginRequiredMixin, View):
             })
 
 
+@method_decorator(condicional(_huella_formulario_contraparte(TipoDocumento)), name='get')
 class DocumentoCreateAjaxView(LoginRequiredMixin, View):
     """Vista AJAX para subir documentos desde modal"""
     
@@ -354,7 +464,7 @@ class DocumentoCreateAjaxView(LoginRequiredMixin, View):
         form = DocumentoForm()
         
         # Get tipos de documento with requiere_expiracion info for JavaScript
-        tipos_documento = TipoDocumento.objects.filter(activo=True).order_by('nombre')
+        tipos_documento = TIPOS_DOCUMENTO.registros()
         
         form_html = render_to_string('contrapartes/documento_form_modal.html', {
             'form': form,
@@ -380,6 +490,7 @@ class DocumentoCreateAjaxView(LoginRequiredMixin, View):
             documento.save()
             
             # Render updated documents list
+            _con_activos(contraparte, 'documentos')
             documentos_html = render_to_string('contrapartes/documentos_list_partial.html', {
                 'object': contraparte,
             }, request=request)
@@ -388,11 +499,11 @@ class DocumentoCreateAjaxView(LoginRequiredMixin, View):
                 'success': True,
                 'message': 'Documento subido exitosamente',
                 'documentos_html': documentos_html,
-                'documentos_count': contraparte.documentos.filter(activo=True).count()
+                'documentos_count': contraparte.documentos.count()
             })
         else:
             # Return form with errors
-            tipos_documento = TipoDocumento.objects.filter(activo=True).order_by('nombre')
+            tipos_documento = TIPOS_DOCUMENTO.registros()
             form_html = render_to_string('contrapartes/documento_form_modal.html', {
                 'form': form,
                 'contraparte': contraparte,
@@ -410,7 +521,7 @@ class DocumentoDeleteView(LoginRequiredMixin, View):
     """Vista AJAX para eliminar documentos"""
     
     def post(self, request, pk):
-        documento = get_object_or_404(Documento, pk=pk)
+        documento = get_object_or_404(Documento.objects, pk=pk)
         contraparte = documento.contraparte
         
         # Soft delete - mark as inactive
@@ -418,6 +529,7 @@ class DocumentoDeleteView(LoginRequiredMixin, View):
         documento.save()
         
         # Render updated documents list
+        _con_activos(contraparte, 'documentos')
         documentos_html = render_to_string('contrapartes/documentos_list_partial.html', {
             'object': contraparte,
         }, request=request)
@@ -426,15 +538,16 @@ class DocumentoDeleteView(LoginRequiredMixin, View):
             'success': True,
             'message': 'Documento eliminado exitosamente',
             'documentos_html': documentos_html,
-            'documentos_count': contraparte.documentos.filter(activo=True).count()
+            'documentos_count': contraparte.documentos.count()
         })
 
 
+@method_decorator(condicional(_huella_formulario_instancia(Documento, TipoDocumento)), name='get')
 class DocumentoUpdateAjaxView(LoginRequiredMixin, View):
     """Vista AJAX para editar documentos"""
     
     def get(self, request, pk):
-        documento = get_object_or_404(Documento, pk=pk)
+        documento = get_object_or_404(Documento.objects, pk=pk)
         
         # Check if user can edit this document
         if documento.subido_por != request.user and not request.user.is_staff:
@@ -446,7 +559,7 @@ class DocumentoUpdateAjaxView(LoginRequiredMixin, View):
         form = DocumentoForm(instance=documento)
         
         # Get tipos de documento with requiere_expiracion info for JavaScript
-        tipos_documento = TipoDocumento.objects.filter(activo=True).order_by('nombre')
+        tipos_documento = TIPOS_DOCUMENTO.registros()
         
         form_html = render_to_string('contrapartes/documento_form_modal.html', {
             'form': form,
@@ -461,7 +574,7 @@ class DocumentoUpdateAjaxView(LoginRequiredMixin, View):
         })
     
     def post(self, request, pk):
-        documento = get_object_or_404(Documento, pk=pk)
+        documento = get_object_or_404(Documento.objects, pk=pk)
         
         # Check if user can edit this document
         if documento.subido_por != request.user and not request.user.is_staff:
@@ -476,19 +589,20 @@ class DocumentoUpdateAjaxView(LoginRequiredMixin, View):
             form.save()
             
             # Render updated documents list
+            contraparte = _con_activos(documento.contraparte, 'documentos')
             documentos_html = render_to_string('contrapartes/documentos_list_partial.html', {
-                'object': documento.contraparte,
+                'object': contraparte,
             }, request=request)
             
             return JsonResponse({
                 'success': True,
                 'message': 'Documento actualizado exitosamente',
                 'documentos_html': documentos_html,
-                'documentos_count': documento.contraparte.documentos.filter(activo=True).count()
+                'documentos_count': contraparte.documentos.count()
             })
         else:
             # Return form with errors
-            tipos_documento = TipoDocumento.objects.filter(activo=True).order_by('nombre')
+            tipos_documento = TIPOS_DOCUMENTO.registros()
             form_html = render_to_string('contrapartes/documento_form_modal.html', {
                 'form': form,
                 'contraparte': documento.contraparte,
@@ -507,8 +621,27 @@ class ContraparteBuscarView(LoginRequiredMixin, TemplateView):
     template_name = 'contrapartes/buscar.html'
 
 
-class ExportarContrapartesView(LoginRequiredMixin, TemplateView):
-    template_name = 'contrapartes/exportar.html'
+class ExportarContrapartesView(LoginRequiredMixin, View):
+    """
+    Exportación completa de contrapartes en CSV o XLSX (?formato=csv|xlsx).
+    
+    Admite los filtros ?tipo=<codigo> y ?estado=<codigo>. El archivo se
+    genera en streaming, fila a fila, sin cargar la cartera en memoria.
+    """
+    
+    def get(self, request):
+        formato = request.GET.get('formato', 'csv')
+        if formato not in ESCRITORES:
+            return JsonResponse({
+                'success': False,
+                'message': 'Formato no soportado. Use csv o xlsx.'
+            }, status=400)
+        
+        queryset = filtrar_contrapartes(request.GET)
+        nombre_archivo = f"contrapartes_{timezone.now():%Y%m%d_%H%M}"
+        return respuesta_exportacion(
+            ENCABEZADOS_CONTRAPARTES, filas_contrapartes(queryset), formato, nombre_archivo
+        )
 
 
 class ComentarioCreateAjaxView(LoginRequiredMixin, View):
@@ -526,6 +659,7 @@ class ComentarioCreateAjaxView(LoginRequiredMixin, View):
             comentario.save()
             
             # Render updated comments list
+            _con_activos(contraparte, 'comentarios')
             comentarios_html = render_to_string('contrapartes/comentarios_list_partial.html', {
                 'object': contraparte,
             }, request=request)
@@ -534,7 +668,7 @@ class ComentarioCreateAjaxView(LoginRequiredMixin, View):
                 'success': True,
                 'message': 'Comentario agregado exitosamente',
                 'comentarios_html': comentarios_html,
-                'comentarios_count': contraparte.comentarios.filter(activo=True).count()
+                'comentarios_count': contraparte.comentarios.count()
             })
         else:
             return JsonResponse({
@@ -547,7 +681,7 @@ class ComentarioUpdateAjaxView(LoginRequiredMixin, View):
     """Vista AJAX para editar comentarios"""
     
     def get(self, request, pk):
-        comentario = get_object_or_404(Comentario, pk=pk)
+        comentario = get_object_or_404(Comentario.objects, pk=pk)
         
         # Check if user can edit this comment
         if comentario.usuario != request.user and not request.user.is_staff:
@@ -562,7 +696,7 @@ class ComentarioUpdateAjaxView(LoginRequiredMixin, View):
         })
     
     def post(self, request, pk):
-        comentario = get_object_or_404(Comentario, pk=pk)
+        comentario = get_object_or_404(Comentario.objects, pk=pk)
         
         # Check if user can edit this comment
         if comentario.usuario != request.user and not request.user.is_staff:
@@ -577,8 +711,9 @@ class ComentarioUpdateAjaxView(LoginRequiredMixin, View):
             form.save()
             
             # Render updated comments list
+            contraparte = _con_activos(comentario.contraparte, 'comentarios')
             comentarios_html = render_to_string('contrapartes/comentarios_list_partial.html', {
-                'object': comentario.contraparte,
+                'object': contraparte,
             }, request=request)
             
             return JsonResponse({
@@ -597,7 +732,7 @@ class ComentarioDeleteAjaxView(LoginRequiredMixin, View):
     """Vista AJAX para eliminar comentarios"""
     
     def post(self, request, pk):
-        comentario = get_object_or_404(Comentario, pk=pk)
+        comentario = get_object_or_404(Comentario.objects, pk=pk)
         contraparte = comentario.contraparte
         
         # Soft delete - mark as inactive
@@ -605,6 +740,7 @@ class ComentarioDeleteAjaxView(LoginRequiredMixin, View):
         comentario.save()
         
         # Render updated comments list
+        _con_activos(contraparte, 'comentarios')
         comentarios_html = render_to_string('contrapartes/comentarios_list_partial.html', {
             'object': contraparte,
         }, request=request)
@@ -613,7 +749,7 @@ class ComentarioDeleteAjaxView(LoginRequiredMixin, View):
             'success': True,
             'message': 'Comentario eliminado exitosamente',
             'comentarios_html': comentarios_html,
-            'comentarios_count': contraparte.comentarios.filter(activo=True).count()
+            'comentarios_count': contraparte.comentarios.count()
         })
 
 
@@ -689,6 +825,7 @@ class ContraparteFechaDDUpdateView(LoginRequiredMixin, View):
 
 # ====== VISTAS PARA CALIFICACIONES ======
 
+@method_decorator(condicional(_huella_formulario_contraparte(Calificador, Outlook)), name='get')
 class CalificacionCreateAjaxView(LoginRequiredMixin, View):
     """Vista AJAX para crear calificaciones desde modal"""
     
@@ -720,6 +857,7 @@ class CalificacionCreateAjaxView(LoginRequiredMixin, View):
             calificacion.save()
             
             # Render updated calificaciones list
+            _con_activos(contraparte, 'calificaciones')
             calificaciones_html = render_to_string('contrapartes/calificaciones_list_partial.html', {
                 'object': contraparte,
             }, request=request)
@@ -728,7 +866,7 @@ class CalificacionCreateAjaxView(LoginRequiredMixin, View):
                 'success': True,
                 'message': 'Calificación creada exitosamente',
                 'calificaciones_html': calificaciones_html,
-                'calificaciones_count': contraparte.calificaciones.filter(activo=True).count()
+                'calificaciones_count': contraparte.calificaciones.count()
             })
         else:
             # Return form with errors
@@ -744,11 +882,12 @@ class CalificacionCreateAjaxView(LoginRequiredMixin, View):
             })
 
 
+@method_decorator(condicional(_huella_formulario_instancia(Calificacion, Calificador, Outlook)), name='get')
 class CalificacionUpdateAjaxView(LoginRequiredMixin, View):
     """Vista AJAX para editar calificaciones"""
     
     def get(self, request, pk):
-        calificacion = get_object_or_404(Calificacion, pk=pk)
+        calificacion = get_object_or_404(Calificacion.objects, pk=pk)
         
         # Check if user can edit this certification
         if calificacion.creado_por != request.user and not request.user.is_staff:
@@ -770,7 +909,7 @@ class CalificacionUpdateAjaxView(LoginRequiredMixin, View):
         })
     
     def post(self, request, pk):
-        calificacion = get_object_or_404(Calificacion, pk=pk)
+        calificacion = get_object_or_404(Calificacion.objects, pk=pk)
         
         # Check if user can edit this certification
         if calificacion.creado_por != request.user and not request.user.is_staff:
@@ -785,8 +924,9 @@ class CalificacionUpdateAjaxView(LoginRequiredMixin, View):
             form.save()
             
             # Render updated calificaciones list
+            contraparte = _con_activos(calificacion.contraparte, 'calificaciones')
             calificaciones_html = render_to_string('contrapartes/calificaciones_list_partial.html', {
-                'object': calificacion.contraparte,
+                'object': contraparte,
             }, request=request)
             
             return JsonResponse({
@@ -805,7 +945,7 @@ class CalificacionDeleteAjaxView(LoginRequiredMixin, View):
     """Vista AJAX para eliminar calificaciones"""
     
     def post(self, request, pk):
-        calificacion = get_object_or_404(Calificacion, pk=pk)
+        calificacion = get_object_or_404(Calificacion.objects, pk=pk)
         
         # Check if user can delete this certification
         if calificacion.creado_por != request.user and not request.user.is_staff:
@@ -821,6 +961,7 @@ class CalificacionDeleteAjaxView(LoginRequiredMixin, View):
         calificacion.save()
         
         # Render updated calificaciones list
+        _con_activos(contraparte, 'calificaciones')
         calificaciones_html = render_to_string('contrapartes/calificaciones_list_partial.html', {
             'object': contraparte,
         }, request=request)
@@ -829,7 +970,79 @@ class CalificacionDeleteAjaxView(LoginRequiredMixin, View):
             'success': True,
             'message': 'Calificación eliminada exitosamente',
             'calificaciones_html': calificaciones_html,
-            'calificaciones_count': contraparte.calificaciones.filter(activo=True).count()
+            'calificaciones_count': contraparte.calificaciones.count()
+        })
+
+
+class CalificacionTrayectoriaView(LoginRequiredMixin, View):
+    """Vista AJAX con la trayectoria de calificaciones de una contraparte por agencia"""
+    
+    def get(self, request, contraparte_pk):
+        contraparte = get_object_or_404(Contraparte, pk=contraparte_pk)
+        trayectorias = trayectoria_calificaciones(contraparte)
+        
+        return JsonResponse({
+            'success': True,
+            'contraparte': str(contraparte),
+            'trayectorias': [{
+                'calificador': calificador,
+                'puntos': [{
+                    'fecha': punto['fecha'].strftime('%Y-%m-%d'),
+                    'calificacion': punto['calificacion'],
+                    'nivel': punto['nivel'],
+                    'outlook': punto['outlook'],
+                } for punto in puntos],
+            } for calificador, puntos in trayectorias.items()],
+        })
+
+
+class CalificacionMigracionView(LoginRequiredMixin, View):
+    """
+    Vista AJAX con la matriz de migración de calificaciones de la cartera.
+    
+    Parámetros GET: fecha_inicio y fecha_fin (YYYY-MM-DD), calificador (ID,
+    opcional) y detalle=1 para usar notches en lugar de categorías.
+    """
+    
+    def get(self, request):
+        try:
+            fecha_inicio = parse_date(request.GET.get('fecha_inicio', ''))
+            fecha_fin = parse_date(request.GET.get('fecha_fin', '')) or timezone.now().date()
+        except ValueError:
+            fecha_inicio = None
+        
+        if not fecha_inicio or fecha_inicio > fecha_fin:
+            return JsonResponse({
+                'success': False,
+                'message': 'Rango de fechas inválido (formato YYYY-MM-DD)'
+            }, status=400)
+        
+        calificador = request.GET.get('calificador') or None
+        if calificador is not None:
+            try:
+                calificador = int(calificador)
+            except ValueError:
+                return JsonResponse({
+                    'success': False,
+                    'message': 'El calificador debe ser un ID numérico'
+                }, status=400)
+        
+        resultado = matriz_migracion(
+            fecha_inicio,
+            fecha_fin,
+            calificador=calificador,
+            detalle=request.GET.get('detalle') == '1'
+        )
+        
+        return JsonResponse({
+            'success': True,
+            'fecha_inicio': fecha_inicio.strftime('%Y-%m-%d'),
+            'fecha_fin': fecha_fin.strftime('%Y-%m-%d'),
+            'etiquetas': resultado['etiquetas'],
+            'matriz': resultado['matriz'].tolist(),
+            'outlooks': resultado['outlooks'],
+            'matriz_outlook': resultado['matriz_outlook'].tolist(),
+            'resumen': resultado['resumen'],
         })
 
 
@@ -842,7 +1055,9 @@ class CalificadorListView(LoginRequiredMixin, ListView):
     paginate_by = 20
     
     def get_queryset(self):
-        queryset = Calificador.objects.all()
+        queryset = Calificador.objects.select_related('creado_por').annotate(
+            num_calificaciones=Count('calificaciones')
+        ).order_by('nombre')
         search = self.request.GET.get('search')
         if search:
             queryset = queryset.filter(
@@ -889,7 +1104,9 @@ class OutlookListView(LoginRequiredMixin, ListView):
     paginate_by = 20
     
     def get_queryset(self):
-        queryset = Outlook.objects.all()
+        queryset = Outlook.objects.select_related('creado_por').annotate(
+            num_calificaciones=Count('calificaciones')
+        ).order_by('outlook')
         search = self.request.GET.get('search')
         if search:
             queryset = queryset.filter(
@@ -972,15 +1189,13 @@ class CargaDocumentosView(LoginRequiredMixin, CreateView):
         # Add statistics for the dashboard-like view
         context['stats'] = {
             'total_contrapartes': Contraparte.objects.count(),
-            'total_documentos': Documento.objects.filter(activo=True).count(),
-            'tipos_documento': TipoDocumento.objects.filter(activo=True).count(),
+            'total_documentos': Documento.objects.count(),
+            'tipos_documento': len(TIPOS_DOCUMENTO.registros()),
         }
         
         # Get recent uploads for display
-        context['recent_uploads'] = Documento.objects.filter(
-            activo=True
-        ).select_related(
-            'contraparte', 'tipo', 'subido_por'
+        context['recent_uploads'] = Documento.objects.select_related(
+            'contraparte__tipo', 'tipo', 'subido_por'
         ).order_by('-fecha_subida')[:10]
         
         return context
@@ -998,9 +1213,8 @@ class BalanceSheetListView(LoginRequiredMixin, ListView):
     def get_queryset(self):
         self.contraparte = get_object_or_404(Contraparte, pk=self.kwargs['contraparte_pk'])
         return BalanceSheet.objects.filter(
-            contraparte=self.contraparte,
-            activo=True
-        ).order_by('-año')
+            contraparte=self.contraparte
+        ).con_totales().select_related('moneda_local', 'creado_por').order_by('-año')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -1019,7 +1233,7 @@ class BalanceSheetDetailView(LoginRequiredMixin, DetailView):
         
         # Group items by category
         items_by_category = {}
-        for item in self.object.items.filter(activo=True).order_by('categoria', 'orden', 'descripcion'):
+        for item in self.object.items(manager='objects').order_by('categoria', 'orden', 'descripcion'):
             category = item.get_categoria_display()
             if category not in items_by_category:
                 items_by_category[category] = []
@@ -1124,6 +1338,7 @@ class BalanceSheetDeleteView(LoginRequiredMixin, DeleteView):
 
 # ====== VISTAS AJAX PARA BALANCE SHEETS ======
 
+@method_decorator(condicional(_huella_tipos_cambio), name='get')
 class TipoCambioAjaxView(LoginRequiredMixin, View):
     """Vista AJAX para obtener tipos de cambio por moneda"""
     
@@ -1151,7 +1366,10 @@ class MonedaListView(LoginRequiredMixin, ListView):
     paginate_by = 20
     
     def get_queryset(self):
-        queryset = Moneda.objects.all()
+        queryset = Moneda.objects.select_related('creado_por').annotate(
+            num_tipos_cambio=Count('tipos_cambio', distinct=True),
+            num_balance_sheets=Count('balance_sheets_moneda_local', distinct=True),
+        ).order_by('codigo')
         search = self.request.GET.get('search')
         if search:
             queryset = queryset.filter(
@@ -1227,6 +1445,35 @@ class TipoCambioCreateView(LoginRequiredMixin, CreateView):
         return super().form_valid(form)
 
 
+class TipoCambioImportarView(LoginRequiredMixin, View):
+    """Vista AJAX para importar historial de tipos de cambio desde CSV/XML"""
+    
+    def post(self, request):
+        form = TipoCambioImportarForm(request.POST, request.FILES)
+        
+        if not form.is_valid():
+            return JsonResponse({
+                'success': False,
+                'errors': form.errors
+            }, status=400)
+        
+        archivo = form.cleaned_data['archivo']
+        resultado = importar_tipos_cambio(
+            leer_filas(archivo, detectar_formato(archivo.name)),
+            request.user,
+            invertir=form.cleaned_data['invertir'],
+        )
+        
+        return JsonResponse({
+            'success': True,
+            'message': (
+                f"Importación completada: {resultado['insertados']} insertados, "
+                f"{resultado['actualizados']} actualizados, {resultado['rechazados']} rechazados"
+            ),
+            **resultado
+        })
+
+
 class TipoCambioUpdateView(LoginRequiredMixin, UpdateView):
     """Vista para editar un tipo de cambio"""
     model = TipoCambio
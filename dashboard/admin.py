@@ -1,3 +1,28 @@
+"""
+Configuración del Django Admin para el Dashboard
+"""
 from django.contrib import admin
+from .models import TrabajoExportacion
 
-# Register your models here.
+
+@admin.register(TrabajoExportacion)
+class TrabajoExportacionAdmin(admin.ModelAdmin):
+    list_display = [
+        'id',
+        'tipo',
+        'formato',
+        'usuario',
+        'estado',
+        'progreso',
+        'total_filas',
+        'fecha_creacion',
+        'fecha_expiracion'
+    ]
+    list_filter = ['tipo', 'formato', 'estado', 'fecha_creacion']
+    search_fields = ['usuario__username', 'huella']
+    list_select_related = ['usuario']
+    ordering = ['-fecha_creacion']
+    readonly_fields = [
+        'huella', 'progreso', 'total_filas', 'filas_procesadas', 'error',
+        'fecha_creacion', 'fecha_inicio', 'fecha_fin'
+    ]
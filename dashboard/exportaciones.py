@@ -0,0 +1,315 @@
+"""
+Exportaciones en segundo plano
+Portal Interno de Contrapartes – App Pacífico (Cotizador Web)
+
+FLUJO:
+1. solicitar_exportacion() normaliza y valida los filtros, calcula la
+   huella y reutiliza un archivo vigente si existe uno idéntico dentro del
+   TTL (settings.EXPORTACIONES_TTL_SEGUNDOS); si no, crea el trabajo y lo
+   encola en Celery al confirmar la transacción.
+2. generar_exportacion() (ejecutado por dashboard.tasks) escribe el archivo
+   en un temporal con los escritores en streaming de contrapartes, reporta
+   el progreso y lo guarda en media storage.
+3. Al terminar se crea una Notificacion con el enlace de descarga.
+
+Un trabajo pendiente o en proceso más antiguo que
+settings.EXPORTACIONES_TIEMPO_MAXIMO_SEGUNDOS se considera abandonado
+(worker reiniciado, mensaje perdido): no se reutiliza y la tarea periódica
+marcar_exportaciones_abandonadas() lo marca como fallido.
+"""
+
+import logging
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+
+from contrapartes.exportadores import (
+    ENCABEZADOS_BALANCE_SHEETS, ENCABEZADOS_CONTRAPARTES, ENCABEZADOS_DOCUMENTOS, ESCRITORES,
+    filas_balance_sheets, filas_contrapartes, filas_documentos,
+    filtrar_balance_sheets, filtrar_contrapartes, filtrar_documentos,
+)
+from debida_diligencia.exportadores import (
+    ENCABEZADOS_DEBIDAS_DILIGENCIAS, filas_debidas_diligencias, filtrar_debidas_diligencias,
+)
+from notificaciones.models import Notificacion
+
+from .models import TrabajoExportacion
+
+logger = logging.getLogger(__name__)
+
+
+# Registro de exportaciones: encabezados, filtros admitidos, queryset y filas
+EXPORTACIONES = {
+    'contrapartes': {
+        'encabezados': ENCABEZADOS_CONTRAPARTES,
+        'filtros': ['tipo', 'estado'],
+        'queryset': filtrar_contrapartes,
+        'filas': filas_contrapartes,
+    },
+    'documentos': {
+        'encabezados': ENCABEZADOS_DOCUMENTOS,
+        'filtros': ['contraparte', 'tipo', 'categoria', 'vencidos'],
+        'queryset': filtrar_documentos,
+        'filas': filas_documentos,
+    },
+    'debidas_diligencias': {
+        'encabezados': ENCABEZADOS_DEBIDAS_DILIGENCIAS,
+        'filtros': ['estado', 'nivel_riesgo', 'contraparte', 'desde', 'hasta'],
+        'queryset': filtrar_debidas_diligencias,
+        'filas': filas_debidas_diligencias,
+    },
+    'balance_sheets': {
+        'encabezados': ENCABEZADOS_BALANCE_SHEETS,
+        'filtros': ['contraparte', 'año'],
+        'queryset': filtrar_balance_sheets,
+        'filas': filas_balance_sheets,
+    },
+}
+
+# Filas entre actualizaciones de progreso (como mínimo)
+INTERVALO_PROGRESO = 500
+
+
+def normalizar_filtros(tipo, datos):
+    """
+    Conserva solo los filtros admitidos por el tipo, como texto y sin vacíos.
+
+    Dos solicitudes con los mismos filtros en distinto orden o con campos
+    vacíos adicionales producen la misma huella.
+    """
+    filtros = {}
+    for clave in EXPORTACIONES[tipo]['filtros']:
+        valor = datos.get(clave)
+        if valor not in (None, ''):
+            filtros[clave] = str(valor).strip()
+    return filtros
+
+
+def validar_filtros(tipo, filtros):
+    """
+    Construye el queryset de cada filtro por separado (sin consultar la base
+    de datos) para rechazar valores no válidos al recibir la solicitud y no
+    cuando el worker ya procesa el trabajo.
+
+    Raises:
+        ValueError: Con el nombre del primer filtro no válido
+    """
+    for clave, valor in filtros.items():
+        try:
+            EXPORTACIONES[tipo]['queryset']({clave: valor})
+        except (ValidationError, TypeError, ValueError):
+            raise ValueError(f'Valor no válido para {clave}: {valor}') from None
+
+
+def _limite_en_curso(ahora):
+    return ahora - timedelta(seconds=settings.EXPORTACIONES_TIEMPO_MAXIMO_SEGUNDOS)
+
+
+def _abandonados(ahora):
+    """Trabajos pendientes o en proceso que superaron el tiempo máximo"""
+    limite = _limite_en_curso(ahora)
+    return TrabajoExportacion.objects.filter(
+        Q(estado='pendiente', fecha_creacion__lt=limite) | Q(estado='en_proceso', fecha_inicio__lt=limite)
+    )
+
+
+def solicitar_exportacion(usuario, tipo, formato, datos):
+    """
+    Crea (o reutiliza) un trabajo de exportación.
+
+    Args:
+        usuario: Usuario que solicita la exportación
+        tipo: Clave de EXPORTACIONES
+        formato: 'csv' o 'xlsx'
+        datos: Diccionario (o QueryDict) con los filtros
+
+    Returns:
+        tuple: (TrabajoExportacion, reutilizado)
+
+    Raises:
+        ValueError: Si el tipo, el formato o algún filtro no son válidos
+    """
+    if tipo not in EXPORTACIONES:
+        raise ValueError(f'Tipo de exportación no soportado: {tipo}')
+    if formato not in ESCRITORES:
+        raise ValueError(f'Formato no soportado: {formato}')
+
+    filtros = normalizar_filtros(tipo, datos)
+    validar_filtros(tipo, filtros)
+    huella = TrabajoExportacion.calcular_huella(tipo, formato, filtros)
+    ahora = timezone.now()
+
+    # Archivo idéntico aún vigente: se comparte sin regenerarlo
+    vigente = TrabajoExportacion.objects.filter(
+        huella=huella, estado='completado', fecha_expiracion__gt=ahora
+    ).exclude(Q(archivo='') | Q(archivo__isnull=True)).order_by('-fecha_fin').first()
+    if vigente:
+        trabajo = TrabajoExportacion.objects.create(
+            usuario=usuario, tipo=tipo, formato=formato, filtros=filtros, huella=huella,
+            estado='completado', progreso=100, total_filas=vigente.total_filas,
+            filas_procesadas=vigente.filas_procesadas, archivo=vigente.archivo.name,
+            fecha_inicio=ahora, fecha_fin=ahora, fecha_expiracion=vigente.fecha_expiracion,
+        )
+        return trabajo, True
+
+    # El mismo usuario ya tiene esta exportación en curso (y no abandonada)
+    en_curso = TrabajoExportacion.objects.filter(
+        usuario=usuario, huella=huella, estado__in=['pendiente', 'en_proceso']
+    ).exclude(pk__in=_abandonados(ahora).values('pk')).first()
+    if en_curso:
+        return en_curso, False
+
+    trabajo = TrabajoExportacion.objects.create(
+        usuario=usuario, tipo=tipo, formato=formato, filtros=filtros, huella=huella
+    )
+    transaction.on_commit(lambda: encolar_exportacion(trabajo.pk))
+    return trabajo, False
+
+
+def encolar_exportacion(trabajo_id):
+    """Envía el trabajo a Celery; si el broker no responde lo marca como fallido"""
+    from .tasks import generar_exportacion_task
+
+    try:
+        generar_exportacion_task.delay(trabajo_id)
+    except Exception as exc:
+        logger.error(f'No fue posible encolar la exportación {trabajo_id}: {exc}')
+        TrabajoExportacion.objects.filter(pk=trabajo_id).update(
+            estado='fallido', error='No fue posible encolar la exportación', fecha_fin=timezone.now()
+        )
+
+
+def _con_progreso(trabajo, filas, total):
+    """Reenvía las filas actualizando el progreso del trabajo periódicamente"""
+    intervalo = max(INTERVALO_PROGRESO, total // 100)
+    procesadas = 0
+    for fila in filas:
+        yield fila
+        procesadas += 1
+        if procesadas % intervalo == 0:
+            TrabajoExportacion.objects.filter(pk=trabajo.pk).update(
+                filas_procesadas=procesadas,
+                progreso=min(99, procesadas * 100 // total) if total else 0
+            )
+    trabajo.filas_procesadas = procesadas
+
+
+def generar_exportacion(trabajo_id):
+    """
+    Genera el archivo de un trabajo de exportación pendiente.
+
+    Args:
+        trabajo_id: ID del TrabajoExportacion
+
+    Returns:
+        TrabajoExportacion | None: El trabajo procesado, o None si no estaba pendiente
+    """
+    # Tomar el trabajo de forma atómica para que dos workers no lo procesen
+    tomado = TrabajoExportacion.objects.filter(pk=trabajo_id, estado='pendiente').update(
+        estado='en_proceso', fecha_inicio=timezone.now()
+    )
+    if not tomado:
+        return None
+
+    trabajo = TrabajoExportacion.objects.get(pk=trabajo_id)
+    exportacion = EXPORTACIONES[trabajo.tipo]
+
+    try:
+        queryset = exportacion['queryset'](trabajo.filtros)
+        trabajo.total_filas = queryset.count()
+        trabajo.save(update_fields=['total_filas'])
+
+        filas = _con_progreso(trabajo, exportacion['filas'](queryset), trabajo.total_filas)
+        with tempfile.TemporaryFile() as temporal:
+            for fragmento in ESCRITORES[trabajo.formato](exportacion['encabezados'], filas):
+                temporal.write(fragmento)
+            temporal.seek(0)
+            trabajo.archivo.save(trabajo.nombre_descarga, File(temporal), save=False)
+    except Exception as exc:
+        logger.exception(f'Error generando la exportación {trabajo_id}')
+        trabajo.estado = 'fallido'
+        trabajo.error = str(exc)
+        trabajo.fecha_fin = timezone.now()
+        trabajo.save(update_fields=['estado', 'error', 'fecha_fin'])
+        Notificacion.objects.create(
+            usuario=trabajo.usuario,
+            tipo='sistema',
+            titulo='Error en exportación',
+            mensaje=f'No fue posible generar la exportación de {trabajo.get_tipo_display().lower()}.',
+            prioridad='alta',
+        )
+        return trabajo
+
+    trabajo.estado = 'completado'
+    trabajo.progreso = 100
+    trabajo.fecha_fin = timezone.now()
+    trabajo.fecha_expiracion = trabajo.fecha_fin + timedelta(seconds=settings.EXPORTACIONES_TTL_SEGUNDOS)
+    trabajo.save(update_fields=[
+        'estado', 'progreso', 'filas_procesadas', 'archivo', 'fecha_fin', 'fecha_expiracion'
+    ])
+
+    Notificacion.objects.create(
+        usuario=trabajo.usuario,
+        tipo='sistema',
+        titulo='Exportación lista',
+        mensaje=(
+            f'La exportación de {trabajo.get_tipo_display().lower()} '
+            f'({trabajo.filas_procesadas} registros) está lista para descargar.'
+        ),
+        url_accion=reverse('dashboard:exportacion_descargar', kwargs={'pk': trabajo.pk}),
+    )
+    return trabajo
+
+
+def limpiar_exportaciones_expiradas():
+    """
+    Elimina los archivos de exportaciones expiradas.
+
+    Los trabajos reutilizados comparten archivo con el original y expiran a
+    la vez, por lo que cada archivo se borra una sola vez.
+
+    Returns:
+        int: Número de archivos eliminados
+    """
+    expirados = TrabajoExportacion.objects.filter(
+        fecha_expiracion__lte=timezone.now()
+    ).exclude(Q(archivo='') | Q(archivo__isnull=True))
+
+    nombres = set(expirados.values_list('archivo', flat=True))
+    for nombre in nombres:
+        TrabajoExportacion._meta.get_field('archivo').storage.delete(nombre)
+    TrabajoExportacion.objects.filter(archivo__in=nombres).update(archivo='')
+    return len(nombres)
+
+
+def marcar_exportaciones_abandonadas():
+    """
+    Marca como fallidos los trabajos pendientes o en proceso que superaron
+    EXPORTACIONES_TIEMPO_MAXIMO_SEGUNDOS y avisa a sus usuarios.
+
+    Returns:
+        int: Número de trabajos marcados
+    """
+    ahora = timezone.now()
+    trabajos = list(_abandonados(ahora).select_related('usuario'))
+    marcados = _abandonados(ahora).filter(pk__in=[trabajo.pk for trabajo in trabajos]).update(
+        estado='fallido', error='La exportación no terminó en el tiempo esperado', fecha_fin=ahora
+    )
+    for trabajo in trabajos:
+        Notificacion.objects.create(
+            usuario=trabajo.usuario,
+            tipo='sistema',
+            titulo='Error en exportación',
+            mensaje=f'La exportación de {trabajo.get_tipo_display().lower()} no terminó; solicítela de nuevo.',
+            prioridad='alta',
+        )
+    if marcados:
+        logger.warning(f'Exportaciones abandonadas marcadas como fallidas: {marcados}')
+    return marcados
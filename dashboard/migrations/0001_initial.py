@@ -0,0 +1,44 @@
+# Generated by Django 5.0.7 on 2026-10-19 14:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoExportacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('contrapartes', 'Contrapartes'), ('documentos', 'Documentos'), ('debidas_diligencias', 'Debidas Diligencias'), ('balance_sheets', 'Balance Sheets')], max_length=30, verbose_name='Tipo de exportación')),
+                ('formato', models.CharField(choices=[('csv', 'CSV'), ('xlsx', 'Excel (XLSX)')], default='csv', max_length=10, verbose_name='Formato')),
+                ('filtros', models.JSONField(blank=True, default=dict, verbose_name='Filtros')),
+                ('huella', models.CharField(help_text='Hash de tipo, formato y filtros para reutilizar exportaciones', max_length=64, verbose_name='Huella')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_proceso', 'En Proceso'), ('completado', 'Completado'), ('fallido', 'Fallido')], default='pendiente', max_length=20, verbose_name='Estado')),
+                ('progreso', models.PositiveSmallIntegerField(default=0, verbose_name='Progreso (%)')),
+                ('total_filas', models.PositiveIntegerField(default=0, verbose_name='Total de filas')),
+                ('filas_procesadas', models.PositiveIntegerField(default=0, verbose_name='Filas procesadas')),
+                ('archivo', models.FileField(blank=True, null=True, upload_to='exportaciones/%Y/%m/', verbose_name='Archivo')),
+                ('error', models.TextField(blank=True, verbose_name='Error')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de inicio')),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de finalización')),
+                ('fecha_expiracion', models.DateTimeField(blank=True, help_text='Hasta cuándo el archivo puede reutilizarse y descargarse', null=True, verbose_name='Fecha de expiración')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trabajos_exportacion', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Trabajo de exportación',
+                'verbose_name_plural': 'Trabajos de exportación',
+                'ordering': ['-fecha_creacion'],
+                'indexes': [models.Index(fields=['huella', 'estado'], name='dashboard_t_huella_57dc40_idx'), models.Index(fields=['usuario', 'fecha_creacion'], name='dashboard_t_usuario_a74453_idx')],
+            },
+        ),
+    ]
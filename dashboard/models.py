@@ -1,3 +1,138 @@
+"""
+Modelos del dashboard
+Portal Interno de Contrapartes – App Pacífico (Cotizador Web)
+
+ESTRUCTURA DE MODELOS:
+1. TrabajoExportacion: Exportaciones y reportes generados en segundo plano
+
+FUNCIONALIDADES PRINCIPALES:
+- Exportaciones encoladas en Celery con seguimiento de progreso
+- Archivo resultante en media storage con fecha de expiración
+- Reutilización del archivo para solicitudes idénticas dentro del TTL
+"""
+
+import hashlib
+import json
+
+from django.contrib.auth.models import User
 from django.db import models
+from django.utils import timezone
+
+
+class TrabajoExportacion(models.Model):
+    """
+    Trabajo de exportación generado en segundo plano.
+
+    Cada solicitud de exportación crea un trabajo que un worker de Celery
+    procesa escribiendo el archivo en media storage. La huella identifica
+    la combinación tipo + formato + filtros para reutilizar archivos
+    vigentes en lugar de regenerarlos.
+
+    Estados del trabajo:
+    - pendiente: Encolado, esperando un worker
+    - en_proceso: Generándose el archivo
+    - completado: Archivo disponible para descarga
+    - fallido: Error durante la generación o al encolar
+    """
+    TIPOS = [
+        ('contrapartes', 'Contrapartes'),
+        ('documentos', 'Documentos'),
+        ('debidas_diligencias', 'Debidas Diligencias'),
+        ('balance_sheets', 'Balance Sheets'),
+    ]
+
+    FORMATOS = [
+        ('csv', 'CSV'),
+        ('xlsx', 'Excel (XLSX)'),
+    ]
+
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('en_proceso', 'En Proceso'),
+        ('completado', 'Completado'),
+        ('fallido', 'Fallido'),
+    ]
+
+    usuario = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='trabajos_exportacion',
+        verbose_name="Usuario"
+    )
+    tipo = models.CharField(max_length=30, choices=TIPOS, verbose_name="Tipo de exportación")
+    formato = models.CharField(max_length=10, choices=FORMATOS, default='csv', verbose_name="Formato")
+    filtros = models.JSONField(default=dict, blank=True, verbose_name="Filtros")
+    huella = models.CharField(
+        max_length=64,
+        verbose_name="Huella",
+        help_text="Hash de tipo, formato y filtros para reutilizar exportaciones"
+    )
+    estado = models.CharField(
+        max_length=20,
+        choices=ESTADOS,
+        default='pendiente',
+        verbose_name="Estado"
+    )
+    progreso = models.PositiveSmallIntegerField(default=0, verbose_name="Progreso (%)")
+    total_filas = models.PositiveIntegerField(default=0, verbose_name="Total de filas")
+    filas_procesadas = models.PositiveIntegerField(default=0, verbose_name="Filas procesadas")
+    archivo = models.FileField(
+        upload_to='exportaciones/%Y/%m/',
+        blank=True,
+        null=True,
+        verbose_name="Archivo"
+    )
+    error = models.TextField(blank=True, verbose_name="Error")
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de creación")
+    fecha_inicio = models.DateTimeField(null=True, blank=True, verbose_name="Fecha de inicio")
+    fecha_fin = models.DateTimeField(null=True, blank=True, verbose_name="Fecha de finalización")
+    fecha_expiracion = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Fecha de expiración",
+        help_text="Hasta cuándo el archivo puede reutilizarse y descargarse"
+    )
+
+    class Meta:
+        verbose_name = "Trabajo de exportación"
+        verbose_name_plural = "Trabajos de exportación"
+        ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['huella', 'estado']),
+            models.Index(fields=['usuario', 'fecha_creacion']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} ({self.formato}) - {self.get_estado_display()}"
+
+    @staticmethod
+    def calcular_huella(tipo, formato, filtros):
+        """
+        Calcula la huella de una solicitud de exportación.
+
+        Args:
+            tipo: Tipo de exportación
+            formato: 'csv' o 'xlsx'
+            filtros: Diccionario de filtros ya normalizado
+
+        Returns:
+            str: SHA-256 hexadecimal
+        """
+        contenido = json.dumps([tipo, formato, filtros], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+    @property
+    def esta_vigente(self):
+        """Retorna True si el archivo está completo y no ha expirado"""
+        return (
+            self.estado == 'completado'
+            and bool(self.archivo)
+            and self.fecha_expiracion is not None
+            and self.fecha_expiracion > timezone.now()
+        )
 
-# Create your models here.
+    @property
+    def nombre_descarga(self):
+        """Nombre del archivo para la descarga"""
+        fecha = timezone.localtime(self.fecha_fin or self.fecha_creacion)
+        return f"{self.tipo}_{fecha:%Y%m%d_%H%M}.{self.formato}"
@@ -0,0 +1,27 @@
+"""
+Tareas Celery del dashboard
+Portal Interno de Contrapartes – App Pacífico (Cotizador Web)
+"""
+
+from celery import shared_task
+
+from .exportaciones import generar_exportacion, limpiar_exportaciones_expiradas, marcar_exportaciones_abandonadas
+
+
+@shared_task(name='dashboard.generar_exportacion')
+def generar_exportacion_task(trabajo_id):
+    """Genera el archivo de un TrabajoExportacion pendiente"""
+    trabajo = generar_exportacion(trabajo_id)
+    return trabajo.estado if trabajo else None
+
+
+@shared_task(name='dashboard.limpiar_exportaciones_expiradas')
+def limpiar_exportaciones_expiradas_task():
+    """Tarea periódica: elimina archivos de exportaciones expiradas"""
+    return limpiar_exportaciones_expiradas()
+
+
+@shared_task(name='dashboard.marcar_exportaciones_abandonadas')
+def marcar_exportaciones_abandonadas_task():
+    """Tarea periódica: marca como fallidas las exportaciones que no terminaron"""
+    return marcar_exportaciones_abandonadas()
@@ -1,3 +1,145 @@
-from django.test import TestCase
+import json
+import shutil
+import tempfile
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from contrapartes.models import Contraparte, TipoContraparte
+from itico.middleware import Medicion, forma_sql, obtener_registro
+from notificaciones.models import Notificacion
+
+from .exportaciones import generar_exportacion, marcar_exportaciones_abandonadas, solicitar_exportacion
+from .models import TrabajoExportacion
+
+
+class TrabajoExportacionTest(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.otro = User.objects.create_user(username='otro', password='testpass123')
+        tipo = TipoContraparte.objects.create(codigo='banco', nombre='Banco', creado_por=self.user)
+        Contraparte.objects.create(nombre='Banco Uno', tipo=tipo, creado_por=self.user)
+
+    def test_generar_y_reutilizar_exportacion(self):
+        """Test that a job writes its file, notifies the user and is reused within the TTL"""
+        trabajo, reutilizado = solicitar_exportacion(
+            self.user, 'contrapartes', 'csv', {'tipo': 'banco', 'estado': ''}
+        )
+        self.assertFalse(reutilizado)
+
+        trabajo = generar_exportacion(trabajo.pk)
+
+        self.assertEqual(trabajo.estado, 'completado')
+        self.assertEqual(trabajo.filas_procesadas, 1)
+        self.assertIn('Banco Uno', trabajo.archivo.read().decode('utf-8-sig'))
+        self.assertTrue(Notificacion.objects.filter(usuario=self.user, titulo='Exportación lista').exists())
+
+        copia, reutilizado = solicitar_exportacion(self.otro, 'contrapartes', 'csv', {'tipo': 'banco'})
+
+        self.assertTrue(reutilizado)
+        self.assertEqual(copia.archivo.name, trabajo.archivo.name)
+        self.assertEqual(TrabajoExportacion.objects.filter(estado='pendiente').count(), 0)
+
+    def test_trabajo_solo_se_procesa_una_vez(self):
+        """Test that a job already taken by a worker is not processed again"""
+        trabajo, _ = solicitar_exportacion(self.user, 'balance_sheets', 'xlsx', {})
+
+        self.assertIsNotNone(generar_exportacion(trabajo.pk))
+        self.assertIsNone(generar_exportacion(trabajo.pk))
+
+    def test_trabajo_abandonado_no_se_reutiliza(self):
+        """Test that a job stuck in progress is not reused and is marked failed by the periodic task"""
+        trabajo, _ = solicitar_exportacion(self.user, 'contrapartes', 'csv', {})
+        TrabajoExportacion.objects.filter(pk=trabajo.pk).update(
+            estado='en_proceso', fecha_inicio=timezone.now() - timedelta(hours=2)
+        )
+
+        nuevo, _ = solicitar_exportacion(self.user, 'contrapartes', 'csv', {})
+        self.assertNotEqual(nuevo.pk, trabajo.pk)
+        self.assertEqual(solicitar_exportacion(self.user, 'contrapartes', 'csv', {})[0].pk, nuevo.pk)
+
+        self.assertEqual(marcar_exportaciones_abandonadas(), 1)
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, 'fallido')
+        self.assertTrue(Notificacion.objects.filter(usuario=self.user, titulo='Error en exportación').exists())
+
+    def test_filtros_no_validos_responden_400(self):
+        """Test that invalid filters are rejected when the export is requested, before enqueuing"""
+        self.client.force_login(self.user)
+        url = reverse('dashboard:exportacion_solicitar')
+
+        for datos in (
+            {'tipo': 'documentos', 'contraparte': 'abc'},
+            {'tipo': 'debidas_diligencias', 'desde': '2024-13-45'},
+            {'tipo': 'debidas_diligencias', 'hasta': 'ayer'},
+            {'tipo': 'balance_sheets', 'año': 'dos mil'},
+        ):
+            response = self.client.post(url, datos)
+            self.assertEqual(response.status_code, 400, datos)
+        self.assertFalse(TrabajoExportacion.objects.exists())
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class InstrumentacionTest(TestCase):
+    def setUp(self):
+        obtener_registro().limpiar()
+        self.staff = User.objects.create_user(username='staff', password='testpass123', is_staff=True)
+        self.client.force_login(self.staff)
+
+    def test_registra_consultas_plantillas_y_percentiles(self):
+        """Test that each request logs its SQL, template and view metrics"""
+        with self.assertLogs('itico.peticiones', level='INFO') as logs:
+            self.client.get(reverse('dashboard:index'))
+
+        datos = json.loads(logs.records[0].getMessage())
+        self.assertEqual(datos['vista'], 'dashboard:index')
+        self.assertGreater(datos['consultas'], 0)
+        self.assertGreater(datos['plantillas_ms'], 0)
+
+        respuesta = self.client.get(reverse('dashboard:metricas'))
+        vistas = {fila['vista']: fila for fila in respuesta.json()['vistas']}
+        self.assertEqual(vistas['dashboard:index']['peticiones'], 1)
+        self.assertEqual(vistas['dashboard:index']['consultas']['max'], datos['consultas'])
+
+    async def test_registra_consultas_de_vistas_sincronas_con_asgi(self):
+        """Test that queries of a sync view served through the async handler are counted"""
+        await self.async_client.aforce_login(self.staff)
+        with self.assertLogs('itico.peticiones', level='INFO') as logs:
+            response = await self.async_client.get(reverse('contrapartes:lista'))
+
+        self.assertEqual(response.status_code, 200)
+        datos = json.loads(logs.records[0].getMessage())
+        self.assertEqual(datos['vista'], 'contrapartes:lista')
+        self.assertGreater(datos['consultas'], 0)
+
+    def test_metricas_solo_staff(self):
+        """Test that the metrics endpoint is restricted to staff users"""
+        User.objects.create_user(username='normal', password='testpass123')
+        self.client.login(username='normal', password='testpass123')
+
+        self.assertEqual(self.client.get(reverse('dashboard:metricas')).status_code, 403)
+
+    def test_detecta_consultas_repetidas(self):
+        """Test that repeated query shapes are flagged as N+1"""
+        medicion = Medicion()
+        with connection.execute_wrapper(medicion):
+            for numero in range(5):
+                list(Contraparte.objects.filter(pk=numero))
+            list(Contraparte.objects.filter(pk__in=[1, 2, 3]))
+            list(Contraparte.objects.filter(pk__in=[4, 5]))
+
+        repetidas = medicion.repetidas(5)
+        self.assertEqual(len(repetidas), 1)
+        self.assertEqual(repetidas[0][1], 5)
+        self.assertEqual(medicion.consultas, 7)
+        self.assertEqual(forma_sql('SELECT 1 WHERE id IN (%s, %s,  %s)'), 'SELECT 1 WHERE id IN (...)')
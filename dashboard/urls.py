@@ -19,4 +19,12 @@ urlpatterns = [
     # Reportes
     path('reportes/', views.ReportesView.as_view(), name='reportes'),
     path('reportes/exportar/', views.ExportarReporteView.as_view(), name='exportar_reporte'),
+    
+    # Exportaciones en segundo plano
+    path('exportaciones/solicitar/', views.ExportacionSolicitarView.as_view(), name='exportacion_solicitar'),
+    path('exportaciones/<int:pk>/estado/', views.ExportacionEstadoView.as_view(), name='exportacion_estado'),
+    path('exportaciones/<int:pk>/descargar/', views.ExportacionDescargarView.as_view(), name='exportacion_descargar'),
+    
+    # Métricas de rendimiento por vista (staff)
+    path('metricas/', views.MetricasVistasView.as_view(), name='metricas'),
 ]
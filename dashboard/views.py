@@ -3,11 +3,19 @@ Vistas del dashboard - implementación básica temporal
 """
 from django.shortcuts import render
 from django.views.generic import TemplateView
-from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.utils import timezone
 from datetime import timedelta
 from django.db.models import Count, Q
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views import View
+from contrapartes.exportadores import TIPOS_CONTENIDO
 from contrapartes.models import Contraparte
+from itico.middleware import resumen_metricas
+from .exportaciones import solicitar_exportacion
+from .models import TrabajoExportacion
 
 
 class DashboardView(LoginRequiredMixin, TemplateView):
@@ -71,3 +79,93 @@ class ReportesView(LoginRequiredMixin, TemplateView):
 
 class ExportarReporteView(LoginRequiredMixin, TemplateView):
     template_name = 'dashboard/exportar.html'
+
+
+# ====== EXPORTACIONES EN SEGUNDO PLANO ======
+
+def _trabajo_a_dict(trabajo):
+    """Representación JSON de un trabajo de exportación"""
+    return {
+        'id': trabajo.pk,
+        'tipo': trabajo.tipo,
+        'formato': trabajo.formato,
+        'filtros': trabajo.filtros,
+        'estado': trabajo.estado,
+        'estado_display': trabajo.get_estado_display(),
+        'progreso': trabajo.progreso,
+        'total_filas': trabajo.total_filas,
+        'filas_procesadas': trabajo.filas_procesadas,
+        'error': trabajo.error,
+        'url_estado': reverse('dashboard:exportacion_estado', kwargs={'pk': trabajo.pk}),
+        'url_descarga': (
+            reverse('dashboard:exportacion_descargar', kwargs={'pk': trabajo.pk})
+            if trabajo.esta_vigente else None
+        ),
+    }
+
+
+class ExportacionSolicitarView(LoginRequiredMixin, View):
+    """
+    Encola una exportación (POST: tipo, formato y filtros del tipo).
+    
+    Si existe un archivo idéntico vigente se reutiliza de inmediato.
+    """
+    
+    def post(self, request):
+        try:
+            trabajo, reutilizado = solicitar_exportacion(
+                request.user,
+                request.POST.get('tipo', ''),
+                request.POST.get('formato', 'csv'),
+                request.POST
+            )
+        except ValueError as exc:
+            return JsonResponse({'success': False, 'message': str(exc)}, status=400)
+        
+        return JsonResponse({
+            'success': True,
+            'reutilizado': reutilizado,
+            'message': (
+                'Exportación disponible para descargar' if reutilizado
+                else 'Exportación en proceso. Recibirá una notificación al finalizar.'
+            ),
+            'trabajo': _trabajo_a_dict(trabajo),
+        }, status=200 if reutilizado else 202)
+
+
+class ExportacionEstadoView(LoginRequiredMixin, View):
+    """Estado y progreso de un trabajo de exportación del usuario"""
+    
+    def get(self, request, pk):
+        trabajo = get_object_or_404(TrabajoExportacion, pk=pk, usuario=request.user)
+        return JsonResponse({'success': True, 'trabajo': _trabajo_a_dict(trabajo)})
+
+
+class ExportacionDescargarView(LoginRequiredMixin, View):
+    """Descarga el archivo de un trabajo completado (propio o, para staff, de cualquier usuario)"""
+    
+    def get(self, request, pk):
+        trabajos = TrabajoExportacion.objects.all()
+        if not request.user.is_staff:
+            trabajos = trabajos.filter(usuario=request.user)
+        trabajo = get_object_or_404(trabajos, pk=pk)
+        
+        if not trabajo.esta_vigente:
+            raise Http404('La exportación no está disponible o ha expirado')
+        
+        return FileResponse(
+            trabajo.archivo.open('rb'),
+            as_attachment=True,
+            filename=trabajo.nombre_descarga,
+            content_type=TIPOS_CONTENIDO[trabajo.formato]
+        )
+
+
+class MetricasVistasView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """Percentiles de tiempo y consultas por vista (itico.middleware), solo para staff"""
+    
+    def test_func(self):
+        return self.request.user.is_staff
+    
+    def get(self, request):
+        return JsonResponse({'success': True, 'vistas': resumen_metricas()})
@@ -0,0 +1,73 @@
+"""
+Exportación de resultados de debida diligencia
+Portal Interno de Contrapartes – App Pacífico (Cotizador Web)
+
+Filas para los escritores CSV/XLSX de contrapartes/exportadores.py. Los
+conteos de búsquedas y coincidencias se agregan en la consulta principal.
+"""
+
+from django.db.models import Count, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from contrapartes.exportadores import TAMANO_LOTE_EXPORTACION
+from itico.conexiones import iterar_por_lotes
+
+from .models import DebidaDiligencia
+
+
+ENCABEZADOS_DEBIDAS_DILIGENCIAS = [
+    'ID', 'Miembro', 'Identificación', 'Contraparte', 'Estado', 'Nivel de riesgo',
+    'Fecha de solicitud', 'Fecha de resultado', 'Aprobado', 'Aprobado por',
+    'Búsquedas', 'Coincidencias', 'Solicitado por',
+]
+
+
+def filtrar_debidas_diligencias(filtros):
+    """Filtra DD por estado, nivel de riesgo, contraparte y rango de fechas de solicitud"""
+    queryset = DebidaDiligencia.objects.all()
+    if filtros.get('estado'):
+        queryset = queryset.filter(estado=filtros['estado'])
+    if filtros.get('nivel_riesgo'):
+        queryset = queryset.filter(nivel_riesgo=filtros['nivel_riesgo'])
+    if filtros.get('contraparte'):
+        queryset = queryset.filter(miembro__contraparte_id=filtros['contraparte'])
+    for clave, lookup in (('desde', 'fecha_solicitud__date__gte'), ('hasta', 'fecha_solicitud__date__lte')):
+        if filtros.get(clave):
+            fecha = parse_date(filtros[clave])
+            if fecha is None:
+                raise ValueError(f'Fecha no válida: {filtros[clave]}')
+            queryset = queryset.filter(**{lookup: fecha})
+    return queryset
+
+
+def _fecha_local(valor):
+    return timezone.localtime(valor).replace(tzinfo=None) if valor else None
+
+
+def filas_debidas_diligencias(queryset, tamano_lote=TAMANO_LOTE_EXPORTACION):
+    """Genera las filas de exportación de debidas diligencias"""
+    debidas_diligencias = queryset.select_related(
+        'miembro__contraparte', 'aprobado_por', 'solicitado_por'
+    ).annotate(
+        total_busquedas=Count('busquedas'),
+        total_coincidencias=Sum('busquedas__coincidencias_encontradas'),
+    ).order_by('pk')
+
+    for dd in iterar_por_lotes(debidas_diligencias, tamano_lote):
+        contraparte = dd.miembro.contraparte
+        yield [
+            dd.pk,
+            dd.miembro.nombre,
+            dd.miembro.numero_identificacion,
+            contraparte.nombre or contraparte.full_company_name or '',
+            dd.get_estado_display(),
+            dd.get_nivel_riesgo_display() if dd.nivel_riesgo else '',
+            _fecha_local(dd.fecha_solicitud),
+            _fecha_local(dd.fecha_resultado),
+            '' if dd.aprobado is None else dd.aprobado,
+            dd.aprobado_por.get_username() if dd.aprobado_por else '',
+            dd.total_busquedas,
+            dd.total_coincidencias or 0,
+            dd.solicitado_por.get_username(),
+        ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.7 on 2026-10-19 15:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('debida_diligencia', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='busqueda',
+            index=models.Index(fields=['debida_diligencia', 'estado'], name='busqueda_dd_estado_idx'),
+        ),
+    ]
@@ -267,6 +267,10 @@ class Busqueda(models.Model):
         verbose_name = "Búsqueda"
         verbose_name_plural = "Búsquedas"
         ordering = ['-fecha_busqueda']
+        indexes = [
+            # Búsquedas de una debida diligencia por estado (coincidencias positivas)
+            models.Index(fields=['debida_diligencia', 'estado'], name='busqueda_dd_estado_idx'),
+        ]
     
     def __str__(self):
         return f"{self.get_fuente_display()} - {self.debida_diligencia.miembro.nombre}"
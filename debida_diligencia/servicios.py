@@ -0,0 +1,297 @@
+"""
+Integración asíncrona con los servicios externos
+Portal Interno de Contrapartes – App Pacífico (Cotizador Web)
+
+- Makito (RPA): recibe la solicitud de búsquedas de una debida diligencia,
+  informa su estado y devuelve los resultados por webhook.
+- Servicio de IA: analiza el texto de los resultados y propone resumen y
+  nivel de riesgo.
+
+Las llamadas usan httpx.AsyncClient y el ORM async de Django, de modo que
+las vistas que las hacen (debida_diligencia/views.py) esperan la respuesta
+sin bloquear un hilo del worker cuando se sirven con ASGI. Se mantiene un
+cliente por event loop para reutilizar las conexiones con cada servicio.
+"""
+
+import asyncio
+import hmac
+import weakref
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AnalisisIA, Busqueda, DebidaDiligencia
+
+# Estados que Makito puede informar para una solicitud
+ESTADOS_MAKITO = {'en_proceso', 'completada', 'fallida'}
+
+# Estados de la debida diligencia desde los que se puede (re)enviar a Makito
+ESTADOS_ENVIABLES = {'pendiente', 'fallida'}
+
+# Campos de Busqueda que informa Makito; un reenvío del mismo resultado los
+# actualiza en lugar de duplicar la búsqueda
+CAMPOS_BUSQUEDA = ['estado', 'resultado', 'url_fuente', 'coincidencias_encontradas']
+
+_clientes = weakref.WeakKeyDictionary()
+
+
+class ServicioNoDisponible(Exception):
+    """El servicio externo no respondió o devolvió un error"""
+
+
+class TransicionNoValida(Exception):
+    """El estado actual de la debida diligencia no admite el cambio pedido"""
+
+
+def _cliente():
+    bucle = asyncio.get_running_loop()
+    cliente = _clientes.get(bucle)
+    if cliente is None or cliente.is_closed:
+        cliente = httpx.AsyncClient(timeout=settings.SERVICIOS_EXTERNOS_TIMEOUT)
+        _clientes[bucle] = cliente
+    return cliente
+
+
+async def _peticion(metodo, url, clave, **kwargs):
+    try:
+        respuesta = await _cliente().request(metodo, url, headers={'X-API-Key': clave}, **kwargs)
+        respuesta.raise_for_status()
+        return respuesta.json()
+    except (httpx.HTTPError, ValueError) as e:
+        raise ServicioNoDisponible(f'{metodo} {url}: {e}') from e
+
+
+def clave_valida(clave):
+    """Compara la clave recibida en un webhook con MAKITO_API_KEY"""
+    return bool(settings.MAKITO_API_KEY) and hmac.compare_digest(clave or '', settings.MAKITO_API_KEY)
+
+
+# =============================================================================
+# MAKITO (RPA)
+# =============================================================================
+
+async def solicitar_busquedas(dd):
+    """
+    Envía a Makito la solicitud de búsquedas de la debida diligencia.
+
+    Args:
+        dd: DebidaDiligencia con su miembro cargado (select_related)
+
+    Returns:
+        str: ID de la solicitud en Makito
+    """
+    miembro = dd.miembro
+    datos = await _peticion(
+        'POST', f'{settings.MAKITO_API_URL}/solicitudes', settings.MAKITO_API_KEY,
+        json={
+            'referencia': dd.pk,
+            'nombre': miembro.nombre,
+            'numero_identificacion': miembro.numero_identificacion,
+            'nacionalidad': miembro.nacionalidad,
+            'fecha_nacimiento': miembro.fecha_nacimiento.isoformat(),
+            'fuentes': [fuente for fuente, _ in Busqueda.FUENTES],
+        },
+    )
+    if not isinstance(datos, dict) or not datos.get('id'):
+        raise ServicioNoDisponible(f'Makito respondió sin ID de solicitud: {datos!r:.200}')
+    return str(datos['id'])
+
+
+async def consultar_estado(makito_request_id):
+    """Estado de una solicitud en Makito ({'estado': ..., 'progreso': ...})"""
+    return await _peticion(
+        'GET', f'{settings.MAKITO_API_URL}/solicitudes/{makito_request_id}', settings.MAKITO_API_KEY
+    )
+
+
+def _busquedas(datos):
+    """
+    Valida las búsquedas del resultado.
+
+    Returns:
+        dict: {fuente: {campo: valor}} con los CAMPOS_BUSQUEDA de cada una
+
+    Raises:
+        ValueError: Si alguna búsqueda no es válida o hay fuentes repetidas
+    """
+    items = datos.get('busquedas') or []
+    if not isinstance(items, list):
+        raise ValueError('busquedas debe ser una lista')
+    fuentes = {fuente for fuente, _ in Busqueda.FUENTES}
+    estados = {estado for estado, _ in Busqueda.ESTADOS_BUSQUEDA}
+    busquedas = {}
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValueError(f'Búsqueda no válida: {item}')
+        if item.get('fuente') not in fuentes or item.get('estado', 'exitosa') not in estados:
+            raise ValueError(f'Búsqueda no válida: {item}')
+        if item['fuente'] in busquedas:
+            raise ValueError(f'Fuente repetida: {item["fuente"]}')
+        busquedas[item['fuente']] = {
+            'estado': item.get('estado', 'exitosa'),
+            'resultado': item.get('resultado') or '',
+            'url_fuente': item.get('url_fuente') or None,
+            'coincidencias_encontradas': int(item.get('coincidencias_encontradas') or 0),
+        }
+    return busquedas
+
+
+@sync_to_async
+def _guardar_resultado(dd_pk, estado, busquedas):
+    """
+    Guarda búsquedas y estado en una sola transacción, con la debida
+    diligencia bloqueada para que dos entregas del mismo webhook no se
+    mezclen. Las búsquedas se identifican por (debida_diligencia, fuente).
+    """
+    with transaction.atomic():
+        dd = DebidaDiligencia.objects.select_for_update().get(pk=dd_pk)
+        # Solo una DD en proceso recibe resultados; las ya cerradas aceptan
+        # el reenvío del mismo resultado (reintento del webhook)
+        if dd.estado != 'en_proceso' and dd.estado != estado:
+            raise TransicionNoValida(
+                f'La debida diligencia está {dd.get_estado_display().lower()} y no admite el estado {estado}'
+            )
+
+        existentes = {
+            busqueda.fuente: busqueda
+            for busqueda in Busqueda.objects.filter(debida_diligencia=dd, fuente__in=list(busquedas))
+        }
+        nuevas, actualizadas = [], []
+        for fuente, campos in busquedas.items():
+            busqueda = existentes.get(fuente)
+            if busqueda is None:
+                nuevas.append(Busqueda(debida_diligencia=dd, fuente=fuente, **campos))
+            else:
+                for campo, valor in campos.items():
+                    setattr(busqueda, campo, valor)
+                actualizadas.append(busqueda)
+        Busqueda.objects.bulk_create(nuevas)
+        if actualizadas:
+            Busqueda.objects.bulk_update(actualizadas, CAMPOS_BUSQUEDA)
+
+        if dd.estado != estado:
+            dd.estado = estado
+            dd.save(update_fields=['estado', 'fecha_resultado', 'fecha_actualizacion'])
+    return dd
+
+
+async def registrar_resultado(dd, datos):
+    """
+    Guarda el resultado enviado por Makito: estado de la debida diligencia
+    y búsquedas realizadas. Es idempotente: un webhook reintentado
+    actualiza las búsquedas de cada fuente en lugar de duplicarlas.
+
+    Args:
+        dd: DebidaDiligencia
+        datos: {'estado': ..., 'busquedas': [{'fuente', 'estado', 'resultado',
+            'url_fuente', 'coincidencias_encontradas'}]}
+
+    Returns:
+        int: Búsquedas registradas
+
+    Raises:
+        ValueError: Si el estado o alguna búsqueda no son válidos
+        TransicionNoValida: Si la debida diligencia no está en proceso (p. ej.
+            cancelada) y el estado informado es otro
+    """
+    estado = datos.get('estado', 'completada')
+    if estado not in ESTADOS_MAKITO:
+        raise ValueError(f'Estado no válido: {estado}')
+    busquedas = _busquedas(datos)
+
+    guardada = await _guardar_resultado(dd.pk, estado, busquedas)
+    dd.estado, dd.fecha_resultado = guardada.estado, guardada.fecha_resultado
+    return len(busquedas)
+
+
+async def marcar_enviada(dd, makito_request_id):
+    """
+    Deja la debida diligencia en proceso con el ID de Makito, solo si sigue
+    en un estado enviable (otra petición pudo enviarla o cancelarla entretanto).
+
+    Returns:
+        bool: True si se actualizó
+    """
+    actualizadas = await DebidaDiligencia.objects.filter(pk=dd.pk, estado__in=ESTADOS_ENVIABLES).aupdate(
+        makito_request_id=makito_request_id, estado='en_proceso', fecha_actualizacion=timezone.now()
+    )
+    if actualizadas:
+        dd.makito_request_id, dd.estado = makito_request_id, 'en_proceso'
+    return bool(actualizadas)
+
+
+# =============================================================================
+# SERVICIO DE IA
+# =============================================================================
+
+def _analisis(datos):
+    """
+    Valida la respuesta del servicio de IA.
+
+    Una respuesta con otra forma (no es un objeto, confianza no numérica o
+    fuera de 0-1, palabras clave que no son lista) se trata como un fallo
+    del servicio: ServicioNoDisponible, que las vistas responden con 502.
+    """
+    if not isinstance(datos, dict):
+        raise ServicioNoDisponible(f'Respuesta de IA no válida: {datos!r:.200}')
+    confianza = datos.get('confianza')
+    if confianza is not None and (
+        isinstance(confianza, bool) or not isinstance(confianza, (int, float)) or not 0 <= confianza <= 1
+    ):
+        raise ServicioNoDisponible(f'Confianza no válida en la respuesta de IA: {confianza!r:.50}')
+    if not isinstance(datos.get('palabras_clave') or [], list):
+        raise ServicioNoDisponible('palabras_clave debe ser una lista')
+    if not isinstance(datos.get('resumen') or '', str):
+        raise ServicioNoDisponible('resumen debe ser texto')
+    return datos
+
+
+async def analizar_texto(texto, tipo_analisis='resumen'):
+    """
+    Envía un texto al servicio de IA.
+
+    Returns:
+        dict: {'resumen', 'nivel_riesgo', 'confianza', 'palabras_clave', ...}
+
+    Raises:
+        ServicioNoDisponible: Error de red o HTTP, o respuesta con otra forma
+    """
+    return _analisis(await _peticion(
+        'POST', f'{settings.AI_SERVICE_URL}/analisis', settings.AI_SERVICE_KEY,
+        json={'texto': texto, 'tipo': tipo_analisis},
+    ))
+
+
+async def analizar_debida_diligencia(dd):
+    """
+    Analiza con IA los resultados de las búsquedas de la debida diligencia y
+    guarda el análisis, el resumen y el nivel de riesgo propuesto.
+
+    Returns:
+        AnalisisIA
+    """
+    resultados = [
+        f'[{fuente}] {resultado}'
+        async for fuente, resultado in Busqueda.objects.filter(debida_diligencia=dd)
+        .exclude(resultado='').order_by('fuente').values_list('fuente', 'resultado')
+        if resultado
+    ]
+    texto = '\n'.join(resultados)
+    datos = await analizar_texto(texto)
+
+    analisis = await AnalisisIA.objects.acreate(
+        debida_diligencia=dd,
+        tipo_analisis='resumen',
+        texto_analizado=texto,
+        resultado_analisis=datos,
+        confianza=float(datos.get('confianza') or 0),
+        palabras_clave_detectadas=datos.get('palabras_clave') or [],
+    )
+    dd.resumen_ia = datos.get('resumen') or dd.resumen_ia
+    if datos.get('nivel_riesgo') in dict(DebidaDiligencia.NIVELES_RIESGO):
+        dd.nivel_riesgo = datos['nivel_riesgo']
+    await dd.asave(update_fields=['resumen_ia', 'nivel_riesgo', 'fecha_actualizacion'])
+    return analisis
@@ -1,3 +1,139 @@
-from django.test import TestCase
+import json
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+import httpx
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from contrapartes.models import Contraparte, Miembro, TipoContraparte
+
+from . import servicios
+from .models import AnalisisIA, Busqueda, DebidaDiligencia
+
+
+def _cliente_simulado(manejador):
+    """Cliente httpx que responde con manejador(request) sin salir a la red"""
+    return lambda: httpx.AsyncClient(transport=httpx.MockTransport(manejador))
+
+
+@override_settings(MAKITO_API_KEY='clave-makito', MAKITO_API_URL='http://makito.test/api')
+class IntegracionMakitoTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='analista', password='testpass123')
+        tipo = TipoContraparte.objects.create(codigo='banco', nombre='Banco', creado_por=cls.user)
+        contraparte = Contraparte.objects.create(nombre='Banco Uno', tipo=tipo, creado_por=cls.user)
+        miembro = Miembro.objects.create(
+            contraparte=contraparte, nombre='Director', nacionalidad='CO', fecha_nacimiento=date(1970, 1, 1)
+        )
+        cls.dd = DebidaDiligencia.objects.create(
+            miembro=miembro, solicitado_por=cls.user, makito_request_id='mk-1', estado='en_proceso'
+        )
+
+    async def _webhook(self, datos, clave='clave-makito'):
+        return await self.async_client.post(
+            reverse('debida_diligencia:makito_webhook'), json.dumps(datos),
+            content_type='application/json', headers={'X-API-Key': clave},
+        )
+
+    async def test_webhook_requiere_clave(self):
+        """Test that the webhook rejects requests without the Makito key"""
+        response = await self._webhook({'request_id': 'mk-1'}, clave='otra')
+
+        self.assertEqual(response.status_code, 403)
+
+    async def test_webhook_registra_busquedas_y_estado(self):
+        """Test that the webhook stores the searches and completes the due diligence"""
+        response = await self._webhook({
+            'request_id': 'mk-1',
+            'estado': 'completada',
+            'busquedas': [
+                {'fuente': 'ofac', 'estado': 'sin_coincidencias'},
+                {'fuente': 'pep', 'estado': 'coincidencia_positiva', 'coincidencias_encontradas': 2},
+            ],
+        })
+
+        self.assertEqual(response.json(), {'status': 'received', 'busquedas': 2})
+        dd = await DebidaDiligencia.objects.aget(pk=self.dd.pk)
+        self.assertEqual(dd.estado, 'completada')
+        self.assertIsNotNone(dd.fecha_resultado)
+        self.assertEqual(await Busqueda.objects.filter(debida_diligencia=dd).acount(), 2)
+
+        response = await self._webhook({'request_id': 'mk-1', 'busquedas': [{'fuente': 'desconocida'}]})
+        self.assertEqual(response.status_code, 400)
+        response = await self._webhook({'request_id': 'mk-1', 'busquedas': ['ofac']})
+        self.assertEqual(response.status_code, 400)
+
+    async def test_webhook_reintentado_no_duplica_ni_reabre(self):
+        """Test that a retried webhook updates searches per source and closed DDs keep their state"""
+        datos = {'request_id': 'mk-1', 'estado': 'completada', 'busquedas': [{'fuente': 'ofac'}]}
+        await self._webhook(datos)
+        datos['busquedas'][0]['estado'] = 'sin_coincidencias'
+
+        response = await self._webhook(datos)
+
+        self.assertEqual(response.status_code, 200)
+        busquedas = Busqueda.objects.filter(debida_diligencia=self.dd).values_list('fuente', 'estado')
+        self.assertEqual([busqueda async for busqueda in busquedas], [('ofac', 'sin_coincidencias')])
+
+        response = await self._webhook({'request_id': 'mk-1', 'estado': 'en_proceso'})
+        self.assertEqual(response.status_code, 409)
+        await DebidaDiligencia.objects.filter(pk=self.dd.pk).aupdate(estado='cancelada')
+        response = await self._webhook({'request_id': 'mk-1', 'estado': 'completada'})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual((await DebidaDiligencia.objects.aget(pk=self.dd.pk)).estado, 'cancelada')
+
+    async def test_enviar_a_makito_guarda_request_id(self):
+        """Test that sending to Makito stores the returned request id"""
+        enviados = []
+
+        def manejador(request):
+            enviados.append(json.loads(request.content))
+            return httpx.Response(201, json={'id': 'mk-2'})
+
+        url = reverse('debida_diligencia:makito_enviar', args=[self.dd.pk])
+        await self.async_client.aforce_login(self.user)
+        with mock.patch.object(servicios, '_cliente', _cliente_simulado(manejador)):
+            # En proceso: no se reenvía
+            self.assertEqual((await self.async_client.post(url)).status_code, 409)
+            await DebidaDiligencia.objects.filter(pk=self.dd.pk).aupdate(estado='fallida')
+            response = await self.async_client.post(url)
+
+        self.assertEqual(response.json(), {'success': True, 'makito_request_id': 'mk-2'})
+        self.assertEqual(len(enviados), 1)
+        self.assertEqual(enviados[0]['referencia'], self.dd.pk)
+        dd = await DebidaDiligencia.objects.aget(pk=self.dd.pk)
+        self.assertEqual((dd.makito_request_id, dd.estado), ('mk-2', 'en_proceso'))
+
+    async def test_servicio_no_disponible(self):
+        """Test that an external service error is reported as 502 without changes"""
+        await self.async_client.aforce_login(self.user)
+        with mock.patch.object(servicios, '_cliente', _cliente_simulado(lambda request: httpx.Response(503))), \
+                self.assertLogs('debida_diligencia.views', 'WARNING'):
+            response = await self.async_client.get(reverse('debida_diligencia:makito_estado', args=[self.dd.pk]))
+
+        self.assertEqual(response.status_code, 502)
+        self.assertFalse(response.json()['success'])
+
+    @override_settings(AI_SERVICE_URL='http://ia.test/api')
+    async def test_respuesta_de_ia_no_valida_responde_502(self):
+        """Test that a malformed AI payload is reported as 502 and stores no analysis"""
+        url = reverse('debida_diligencia:analisis_ia_ejecutar', args=[self.dd.pk])
+        await self.async_client.aforce_login(self.user)
+        for datos in (['resumen'], {'confianza': 'alta'}, {'confianza': 5}, {'palabras_clave': 'ofac'}):
+            with self.subTest(datos=datos):
+                manejador = _cliente_simulado(lambda request: httpx.Response(200, json=datos))
+                with mock.patch.object(servicios, '_cliente', manejador), \
+                        self.assertLogs('debida_diligencia.views', 'WARNING'):
+                    response = await self.async_client.post(url)
+
+                self.assertEqual(response.status_code, 502)
+        self.assertFalse(await AnalisisIA.objects.filter(debida_diligencia=self.dd).aexists())
+
+    async def test_vistas_async_requieren_login(self):
+        """Test that the async views redirect anonymous users to the login"""
+        response = await self.async_client.get(reverse('debida_diligencia:makito_estado', args=[self.dd.pk]))
+
+        self.assertEqual(response.status_code, 302)
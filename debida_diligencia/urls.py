@@ -23,6 +23,7 @@ urlpatterns = [
     path('<int:pk>/busquedas/', views.BusquedaListView.as_view(), name='busquedas'),
     path('busquedas/<int:pk>/', views.BusquedaDetailView.as_view(), name='busqueda_detalle'),
     path('<int:pk>/analisis-ia/', views.AnalisisIAView.as_view(), name='analisis_ia'),
+    path('<int:pk>/analisis-ia/ejecutar/', views.EjecutarAnalisisIAView.as_view(), name='analisis_ia_ejecutar'),
     
     # Calendario
     path('calendario/', views.CalendarioDDView.as_view(), name='calendario'),
@@ -33,4 +34,6 @@ urlpatterns = [
     # API endpoints para integración con RPA
     path('api/webhook/makito/', views.MakitoWebhookView.as_view(), name='makito_webhook'),
     path('api/resultado/<int:dd_pk>/', views.RecibirResultadoView.as_view(), name='recibir_resultado'),
+    path('<int:pk>/makito/enviar/', views.EnviarMakitoView.as_view(), name='makito_enviar'),
+    path('<int:pk>/makito/estado/', views.EstadoMakitoView.as_view(), name='makito_estado'),
 ]
@@ -1,10 +1,29 @@
 """
 Vistas para debida diligencia - implementación básica temporal
+
+Las vistas de integración con Makito y con el servicio de IA son
+asíncronas (ver servicios.py): mientras esperan al servicio externo no
+ocupan un hilo del worker si el proyecto se sirve con ASGI.
 """
+import json
+import logging
+
 from django.views.generic import ListView, DetailView, TemplateView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.http import JsonResponse
+from django.shortcuts import aget_object_or_404
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.utils.functional import SimpleLazyObject
 from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+
+from itico.asincrono import LoginRequeridoMixin
+
+from . import servicios
+from .models import DebidaDiligencia
+
+logger = logging.getLogger(__name__)
 
 
 class DebidaDiligenciaListView(LoginRequiredMixin, ListView):
@@ -57,12 +76,31 @@ class CalendarioDDView(LoginRequiredMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
+        # Import here to avoid circular imports
+        from contrapartes import fragmentos
+        
+        # Fecha local (TIME_ZONE): clave del fragmento y referencia de los eventos
+        self.hoy = timezone.localdate()
+        
+        # Los eventos se calculan solo si el fragmento de la plantilla no
+        # está en caché (ver contrapartes/fragmentos.py)
+        datos = SimpleLazyObject(self.datos_calendario)
+        context.update({
+            key: SimpleLazyObject(lambda key=key: datos[key])
+            for key in ('events', 'stats', 'upcoming_dd', 'upcoming_docs')
+        })
+        context['hoy'] = self.hoy
+        context['versiones_fragmentos'] = fragmentos.versiones_calendario()
+        
+        return context
+    
+    def datos_calendario(self):
         # Import here to avoid circular imports
         from contrapartes.models import Contraparte, Documento
         from datetime import datetime, timedelta
         
         # Get all contrapartes with upcoming DD dates
-        today = datetime.now().date()
+        today = self.hoy
         next_90_days = today + timedelta(days=90)
         
         upcoming_dd = Contraparte.objects.filter(
@@ -73,8 +111,7 @@ class CalendarioDDView(LoginRequiredMixin, TemplateView):
         # Get documents with upcoming expiration dates
         upcoming_docs = Documento.objects.filter(
             fecha_expiracion__gte=today,
-            fecha_expiracion__lte=next_90_days,
-            activo=True
+            fecha_expiracion__lte=next_90_days
         ).select_related('contraparte', 'tipo', 'subido_por').order_by('fecha_expiracion')
         
         # Prepare events data for the calendar
@@ -128,25 +165,113 @@ class CalendarioDDView(LoginRequiredMixin, TemplateView):
             'overdue': 0  # You can implement overdue logic here
         }
         
-        context.update({
+        return {
             'events': events,
             'stats': stats,
             'upcoming_dd': upcoming_dd,
             'upcoming_docs': upcoming_docs,
-        })
-        
-        return context
+        }
 
 
 class ReportesDDView(LoginRequiredMixin, TemplateView):
     template_name = 'debida_diligencia/reportes.html'
 
 
+def _error(mensaje, status):
+    return JsonResponse({'success': False, 'error': mensaje}, status=status)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
 class MakitoWebhookView(View):
-    def post(self, request, *args, **kwargs):
-        return JsonResponse({'status': 'received'})
+    """
+    Resultado de una solicitud enviado por Makito, identificada por su
+    request_id. Se autentica con la cabecera X-API-Key (MAKITO_API_KEY).
+    """
+
+    async def obtener_debida_diligencia(self, datos):
+        if not datos.get('request_id'):
+            return None
+        return await DebidaDiligencia.objects.filter(makito_request_id=str(datos['request_id'])).afirst()
+
+    async def post(self, request, *args, **kwargs):
+        if not servicios.clave_valida(request.headers.get('X-API-Key')):
+            return _error('Clave no válida', 403)
+        try:
+            datos = json.loads(request.body)
+        except ValueError:
+            datos = None
+        if not isinstance(datos, dict):
+            return _error('El cuerpo debe ser un objeto JSON', 400)
+
+        dd = await self.obtener_debida_diligencia(datos)
+        if dd is None:
+            return _error('Debida diligencia no encontrada', 404)
+        try:
+            registradas = await servicios.registrar_resultado(dd, datos)
+        except (ValueError, TypeError) as e:
+            return _error(str(e), 400)
+        except servicios.TransicionNoValida as e:
+            return _error(str(e), 409)
+        return JsonResponse({'status': 'received', 'busquedas': registradas})
+
+
+class RecibirResultadoView(MakitoWebhookView):
+    """Resultado de Makito para la debida diligencia indicada en la URL"""
+
+    async def obtener_debida_diligencia(self, datos):
+        return await DebidaDiligencia.objects.filter(pk=self.kwargs['dd_pk']).afirst()
 
 
-class RecibirResultadoView(View):
-    def post(self, request, *args, **kwargs):
-        return JsonResponse({'status': 'received'})
+class EnviarMakitoView(LoginRequeridoMixin, View):
+    """
+    Envía la debida diligencia a Makito y la deja en proceso. Solo las
+    pendientes o fallidas se pueden enviar (ESTADOS_ENVIABLES).
+    """
+
+    async def post(self, request, pk, *args, **kwargs):
+        dd = await aget_object_or_404(DebidaDiligencia.objects.select_related('miembro'), pk=pk)
+        if dd.estado not in servicios.ESTADOS_ENVIABLES:
+            return _error(f'No se puede enviar una debida diligencia {dd.get_estado_display().lower()}', 409)
+        try:
+            makito_request_id = await servicios.solicitar_busquedas(dd)
+        except servicios.ServicioNoDisponible as e:
+            logger.warning('No se pudo enviar la DD %s a Makito: %s', pk, e)
+            return _error('Makito no está disponible', 502)
+        if not await servicios.marcar_enviada(dd, makito_request_id):
+            logger.warning('La DD %s cambió de estado mientras se enviaba a Makito (%s)', pk, makito_request_id)
+            return _error('La debida diligencia cambió de estado durante el envío', 409)
+        return JsonResponse({'success': True, 'makito_request_id': dd.makito_request_id})
+
+
+class EstadoMakitoView(LoginRequeridoMixin, View):
+    """Estado de la solicitud en Makito"""
+
+    async def get(self, request, pk, *args, **kwargs):
+        dd = await aget_object_or_404(DebidaDiligencia, pk=pk)
+        if not dd.makito_request_id:
+            return _error('La debida diligencia no se ha enviado a Makito', 400)
+        try:
+            makito = await servicios.consultar_estado(dd.makito_request_id)
+        except servicios.ServicioNoDisponible as e:
+            logger.warning('No se pudo consultar la DD %s en Makito: %s', pk, e)
+            return _error('Makito no está disponible', 502)
+        return JsonResponse({'success': True, 'estado': dd.estado, 'makito': makito})
+
+
+class EjecutarAnalisisIAView(LoginRequeridoMixin, View):
+    """Analiza con IA los resultados de las búsquedas"""
+
+    async def post(self, request, pk, *args, **kwargs):
+        dd = await aget_object_or_404(DebidaDiligencia, pk=pk)
+        try:
+            analisis = await servicios.analizar_debida_diligencia(dd)
+        except servicios.ServicioNoDisponible as e:
+            logger.warning('No se pudo analizar la DD %s: %s', pk, e)
+            return _error('El servicio de IA no está disponible', 502)
+        return JsonResponse({
+            'success': True,
+            'analisis_id': analisis.pk,
+            'resumen': dd.resumen_ia,
+            'nivel_riesgo': dd.nivel_riesgo,
+            'confianza': analisis.confianza,
+        })
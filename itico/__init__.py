@@ -1,7 +1,6 @@
 # Esto asegurará que la app siempre se importe cuando Django se inicie.
 from __future__ import absolute_import, unicode_literals
 
-# Temporarily commented out until celery is properly installed
-# from .celery import app as celery_app
+from .celery import app as celery_app
 
-# __all__ = ('celery_app',)
\ No newline at end of file
+__all__ = ('celery_app',)
@@ -0,0 +1,15 @@
+from django.apps import AppConfig
+from django.conf import settings
+
+
+class IticoConfig(AppConfig):
+    name = 'itico'
+    verbose_name = 'ITICO'
+
+    def ready(self):
+        # Registrar los system checks del proyecto
+        from . import checks  # noqa: F401
+
+        # Los handlers de archivo de LOGGING escriben aquí (abren el archivo
+        # con delay, después de este punto)
+        settings.LOGS_DIR.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,99 @@
+"""
+Perfil de arranque
+Portal Interno de Contrapartes – App Pacífico (Cotizador Web)
+
+Mide cuánto tarda un proceso nuevo (worker de gunicorn o Celery, comando de
+gestión, ejecución de tests) en importar el proyecto y ejecutar
+django.setup(). La medición se hace en un subproceso limpio con
+python -X importtime, de modo que los módulos ya importados por el proceso
+actual no ocultan su coste.
+
+Usado por itico/management/commands/perfil_arranque.py.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from collections import namedtuple
+
+from django.conf import settings
+
+Importacion = namedtuple('Importacion', ['modulo', 'propio_us', 'acumulado_us', 'nivel'])
+
+# Script del subproceso: imprime en stdout la duración de django.setup()
+# (y opcionalmente de la carga de las URLs); -X importtime escribe en stderr
+_SCRIPT = """
+import json, time
+inicio = time.perf_counter()
+import django
+django.setup()
+setup = time.perf_counter() - inicio
+if {urls}:
+    from django.urls import get_resolver
+    get_resolver().url_patterns
+print(json.dumps({{'setup_s': setup, 'total_s': time.perf_counter() - inicio}}))
+"""
+
+
+def parsear_importtime(salida):
+    """
+    Líneas de python -X importtime.
+
+    Returns:
+        list: Importacion(modulo, propio_us, acumulado_us, nivel) en el orden
+        de la salida (cada módulo después de sus dependencias)
+    """
+    importaciones = []
+    for linea in salida.splitlines():
+        if not linea.startswith('import time:'):
+            continue
+        partes = linea[len('import time:'):].split('|')
+        if len(partes) != 3 or not partes[0].strip().isdigit():
+            continue  # encabezado
+        nombre = partes[2].rstrip()
+        importaciones.append(Importacion(
+            modulo=nombre.strip(),
+            propio_us=int(partes[0]),
+            acumulado_us=int(partes[1]),
+            nivel=(len(nombre) - len(nombre.lstrip())) // 2,
+        ))
+    return importaciones
+
+
+def medir(cargar_urls=True):
+    """
+    Arranca Django en un subproceso y mide sus importaciones.
+
+    Args:
+        cargar_urls: Importar también el URLconf (vistas, serializers), como
+            en la primera petición de un worker
+
+    Returns:
+        dict: setup_s, total_s (segundos) e importaciones (lista de Importacion)
+    """
+    entorno = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'itico.settings'))
+    proceso = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _SCRIPT.format(urls=bool(cargar_urls))],
+        cwd=settings.BASE_DIR, env=entorno, capture_output=True, text=True,
+    )
+    if proceso.returncode != 0:
+        raise RuntimeError(f'El subproceso de arranque falló:\n{proceso.stderr[-2000:]}')
+    tiempos = json.loads(proceso.stdout.strip().splitlines()[-1])
+    return {**tiempos, 'importaciones': parsear_importtime(proceso.stderr)}
+
+
+def por_paquete(importaciones):
+    """
+    Tiempo propio sumado por paquete de primer nivel (django, celery,
+    contrapartes...).
+
+    Returns:
+        list: (paquete, microsegundos, número de módulos), de mayor a menor
+    """
+    paquetes = {}
+    for importacion in importaciones:
+        paquete = importacion.modulo.split('.')[0]
+        total, modulos = paquetes.get(paquete, (0, 0))
+        paquetes[paquete] = (total + importacion.propio_us, modulos + 1)
+    return sorted(((p, t, n) for p, (t, n) in paquetes.items()), key=lambda fila: fila[1], reverse=True)
@@ -3,6 +3,16 @@ ASGI config for itico project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Las conexiones de notificaciones en tiempo real (Server-Sent Events) son
+vistas asíncronas y requieren servir el proyecto con ASGI, por ejemplo:
+
+    uvicorn itico.asgi:application --workers 4
+
+También son asíncronas las vistas que esperan por E/S (webhooks e
+integración con Makito y el servicio de IA, validación de archivos). Es el
+perfil de despliegue de render.yaml, con DB_CONN_MAX_AGE=0. Para comparar
+con WSGI: python manage.py comparar_servidores
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 """
@@ -0,0 +1,37 @@
+"""
+Utilidades para vistas asíncronas
+Portal Interno de Contrapartes – App Pacífico (Cotizador Web)
+
+Las vistas que esperan por E/S (servicios externos, webhooks, validación de
+archivos, flujos SSE) son async: servidas con ASGI (itico.asgi) no ocupan un
+hilo del worker mientras esperan.
+
+En Django 5.0 login_required y LoginRequiredMixin leen request.user de forma
+síncrona y no pueden envolver vistas async; estas variantes usan
+request.auser() y redirigen al login igual que ellas.
+"""
+
+from functools import wraps
+
+from django.contrib.auth.views import redirect_to_login
+
+
+def login_requerido(vista):
+    """login_required para vistas async basadas en funciones"""
+
+    @wraps(vista)
+    async def envoltura(request, *args, **kwargs):
+        if not (await request.auser()).is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await vista(request, *args, **kwargs)
+
+    return envoltura
+
+
+class LoginRequeridoMixin:
+    """LoginRequiredMixin para vistas basadas en clases con handlers async"""
+
+    async def dispatch(self, request, *args, **kwargs):
+        if not (await request.auser()).is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await super().dispatch(request, *args, **kwargs)
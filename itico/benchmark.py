@@ -0,0 +1,254 @@
+"""
+Benchmark de vistas y endpoints
+Portal Interno de Contrapartes – App Pacífico (Cotizador Web)
+
+Ejecuta las vistas y endpoints principales con el cliente de pruebas de
+Django sobre la base de datos configurada (idealmente con datos de
+contrapartes/management/commands/generar_datos_volumen.py) y mide por
+escenario:
+
+- Consultas SQL por petición (execute_wrapper, igual que
+  itico.middleware.Medicion; no requiere DEBUG).
+- Latencia p50/p95/máx sobre varias repeticiones, tras un calentamiento.
+- Pico de memoria Python asignada durante una petición (tracemalloc), en
+  una pasada aparte para no distorsionar la latencia.
+
+El resultado es un dict serializable a JSON con el commit, el motor de base
+de datos y el volumen de datos; comparar() lo contrasta con un resultado
+anterior para detectar regresiones entre commits.
+"""
+
+import subprocess
+import time
+import tracemalloc
+from contextlib import ExitStack
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from .middleware import Medicion, percentil
+
+
+class Escenario:
+    """Una petición GET a medir; la URL se resuelve con los datos de muestra"""
+
+    def __init__(self, nombre, url):
+        self.nombre = nombre
+        self._url = url
+
+    def url(self, muestra):
+        """URL del escenario, o None si faltan datos para construirla"""
+        try:
+            return self._url(muestra)
+        except (KeyError, TypeError):
+            return None
+
+
+def _con_pk(nombre_url, clave, consulta=''):
+    return lambda muestra: reverse(nombre_url, args=[muestra[clave]]) + consulta
+
+
+ESCENARIOS = [
+    Escenario('dashboard', lambda m: reverse('dashboard:index')),
+    Escenario('contrapartes_lista', lambda m: reverse('contrapartes:lista')),
+    Escenario('contrapartes_lista_pagina_10', lambda m: reverse('contrapartes:lista') + '?page=10'),
+    Escenario('contraparte_detalle', _con_pk('contrapartes:detalle', 'contraparte')),
+    Escenario('miembro_detalle', _con_pk('contrapartes:miembro_detalle', 'miembro')),
+    Escenario('modal_miembro', _con_pk('contrapartes:miembro_crear_ajax', 'contraparte')),
+    Escenario('modal_documento', _con_pk('contrapartes:documento_crear_ajax', 'contraparte')),
+    Escenario('modal_documento_editar', _con_pk('contrapartes:documento_editar_ajax', 'documento')),
+    Escenario('calificacion_trayectoria', _con_pk('contrapartes:calificacion_trayectoria', 'contraparte')),
+    Escenario('calificacion_migracion', lambda m: reverse('contrapartes:calificacion_migracion') + f'?fecha_inicio={m["hace_un_año"]}'),
+    Escenario('balance_sheet_lista', _con_pk('contrapartes:balance_sheet_lista', 'contraparte')),
+    Escenario('balance_sheet_detalle', _con_pk('contrapartes:balance_sheet_detalle', 'balance_sheet')),
+    Escenario('tipos_cambio_ajax', lambda m: reverse('contrapartes:tipos_cambio_ajax') + f'?moneda_id={m["moneda"]}'),
+    Escenario('exportar_csv', lambda m: reverse('contrapartes:exportar') + '?formato=csv'),
+    Escenario('notificaciones_contar', lambda m: reverse('notificaciones:api_contar')),
+    Escenario('api_contrapartes', lambda m: reverse('api:contraparte-list')),
+    Escenario('api_contraparte', _con_pk('api:contraparte-detail', 'contraparte')),
+    Escenario('api_documentos', lambda m: reverse('api:documento-list')),
+    Escenario('api_calificaciones', lambda m: reverse('api:calificacion-list')),
+    Escenario('api_balance_sheets', lambda m: reverse('api:balance_sheet-list')),
+]
+
+
+def muestra_datos():
+    """
+    IDs de registros representativos para construir las URLs: la contraparte
+    con más miembros y sus registros relacionados, siempre los mismos para
+    un mismo conjunto de datos.
+    """
+    from django.db.models import Count
+
+    from contrapartes.models import BalanceSheet, Contraparte, Documento, Miembro, TipoCambio
+
+    muestra = {'hace_un_año': (timezone.now().date() - timedelta(days=365)).isoformat()}
+    contraparte = (
+        Contraparte.objects.annotate(num_miembros=Count('miembros'))
+        .order_by('-num_miembros', 'id').values_list('id', flat=True).first()
+    )
+    if contraparte is None:
+        return muestra
+    muestra['contraparte'] = contraparte
+    muestra['miembro'] = Miembro.objects.filter(contraparte_id=contraparte).order_by('id').values_list('id', flat=True).first()
+    muestra['documento'] = Documento.objects.filter(contraparte_id=contraparte).order_by('id').values_list('id', flat=True).first()
+    muestra['balance_sheet'] = BalanceSheet.objects.filter(contraparte_id=contraparte).order_by('-año').values_list('id', flat=True).first()
+    muestra['moneda'] = TipoCambio.objects.order_by('moneda_id').values_list('moneda_id', flat=True).first()
+    return {clave: valor for clave, valor in muestra.items() if valor is not None}
+
+
+def volumen_datos():
+    """Número de filas de las tablas principales (contexto del resultado)"""
+    from contrapartes.models import BalanceSheetItem, Calificacion, Contraparte, Documento, Miembro, TipoCambio
+    from debida_diligencia.models import DebidaDiligencia
+
+    return {
+        modelo._meta.label_lower: modelo.objects.count()
+        for modelo in (Contraparte, Miembro, Documento, Calificacion, BalanceSheetItem, TipoCambio, DebidaDiligencia)
+    }
+
+
+def commit_actual():
+    """Hash corto del commit de trabajo, o cadena vacía fuera de git"""
+    try:
+        salida = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=5,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return ''
+    return salida.stdout.strip() if salida.returncode == 0 else ''
+
+
+def _peticion(cliente, url):
+    """Ejecuta la petición consumiendo también las respuestas en streaming"""
+    respuesta = cliente.get(url)
+    if respuesta.streaming:
+        for _ in respuesta.streaming_content:
+            pass
+    else:
+        respuesta.content
+    return respuesta
+
+
+def medir(cliente, url, repeticiones=10, calentamiento=2):
+    """
+    Mide un escenario.
+
+    Returns:
+        dict: estado HTTP, consultas, latencias en ms y pico de memoria en KB
+    """
+    for _ in range(calentamiento):
+        _peticion(cliente, url)
+
+    duraciones = []
+    consultas = []
+    for _ in range(repeticiones):
+        medicion = Medicion()
+        with ExitStack() as pila:
+            for alias in connections:
+                pila.enter_context(connections[alias].execute_wrapper(medicion))
+            inicio = time.perf_counter()
+            respuesta = _peticion(cliente, url)
+            duraciones.append((time.perf_counter() - inicio) * 1000)
+        consultas.append(medicion.consultas)
+
+    tracemalloc.start()
+    try:
+        _peticion(cliente, url)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    duraciones.sort()
+    return {
+        'url': url,
+        'estado': respuesta.status_code,
+        'consultas': max(consultas),
+        'p50_ms': round(percentil(duraciones, 50), 2),
+        'p95_ms': round(percentil(duraciones, 95), 2),
+        'max_ms': round(duraciones[-1], 2),
+        'memoria_pico_kb': round(pico / 1024, 1),
+    }
+
+
+def ejecutar(usuario, escenarios=None, repeticiones=10, calentamiento=2, filtro=None):
+    """
+    Ejecuta los escenarios autenticado como usuario.
+
+    Args:
+        usuario: Usuario staff con el que se hacen las peticiones
+        escenarios: Lista de Escenario (por defecto ESCENARIOS)
+        repeticiones: Peticiones medidas por escenario
+        calentamiento: Peticiones previas sin medir (cachés, conexiones)
+        filtro: Subcadenas; solo se ejecutan los escenarios que contengan alguna
+
+    Returns:
+        dict: Resultado serializable a JSON
+    """
+    # Un error en una vista se registra como estado 500 sin detener el resto
+    cliente = Client(raise_request_exception=False)
+    cliente.force_login(usuario)
+    muestra = muestra_datos()
+
+    resultados = {}
+    for escenario in escenarios or ESCENARIOS:
+        if filtro and not any(texto in escenario.nombre for texto in filtro):
+            continue
+        url = escenario.url(muestra)
+        if url is None:
+            resultados[escenario.nombre] = {'omitido': 'sin datos para construir la URL'}
+            continue
+        resultados[escenario.nombre] = medir(cliente, url, repeticiones, calentamiento)
+
+    return {
+        'fecha': timezone.now().isoformat(timespec='seconds'),
+        'commit': commit_actual(),
+        'base_datos': connections['default'].vendor,
+        'repeticiones': repeticiones,
+        'volumen': volumen_datos(),
+        'escenarios': resultados,
+    }
+
+
+def comparar(anterior, actual, tolerancia=0.2, margen_ms=2.0):
+    """
+    Regresiones de actual respecto de anterior.
+
+    Las consultas se comparan de forma exacta (son deterministas para un
+    mismo conjunto de datos); la latencia p95 y la memoria, con una
+    tolerancia relativa. margen_ms evita señalar variaciones de unos pocos
+    milisegundos en vistas muy rápidas.
+
+    Returns:
+        list: Un dict por métrica empeorada, con escenario, métrica, antes y después
+    """
+    regresiones = []
+    for nombre, despues in actual['escenarios'].items():
+        antes = anterior.get('escenarios', {}).get(nombre)
+        if not antes or 'omitido' in antes or 'omitido' in despues:
+            continue
+        if despues['estado'] != antes['estado']:
+            regresiones.append({'escenario': nombre, 'metrica': 'estado', 'antes': antes['estado'], 'despues': despues['estado']})
+        if despues['consultas'] > antes['consultas']:
+            regresiones.append({'escenario': nombre, 'metrica': 'consultas', 'antes': antes['consultas'], 'despues': despues['consultas']})
+        if despues['p95_ms'] > antes['p95_ms'] * (1 + tolerancia) + margen_ms:
+            regresiones.append({'escenario': nombre, 'metrica': 'p95_ms', 'antes': antes['p95_ms'], 'despues': despues['p95_ms']})
+        if despues['memoria_pico_kb'] > antes['memoria_pico_kb'] * (1 + tolerancia):
+            regresiones.append({
+                'escenario': nombre, 'metrica': 'memoria_pico_kb',
+                'antes': antes['memoria_pico_kb'], 'despues': despues['memoria_pico_kb'],
+            })
+    return regresiones
+
+
+def ruta_resultado(directorio, resultado):
+    """benchmarks/<fecha>_<commit>.json"""
+    fecha = resultado['fecha'][:19].replace(':', '').replace('-', '')
+    nombre = f"{fecha}_{resultado['commit']}.json" if resultado['commit'] else f'{fecha}.json'
+    return Path(directorio) / nombre
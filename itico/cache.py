@@ -0,0 +1,214 @@
+"""
+Caché en dos niveles para datos de referencia
+Portal Interno de Contrapartes – App Pacífico (Cotizador Web)
+
+Los catálogos (TipoContraparte, EstadoContraparte, TipoDocumento, Moneda,
+Outlook, Calificador) cambian muy poco y se leen en casi todas las páginas.
+Se guardan en dos niveles:
+
+1. Local: LRU en memoria del proceso, sin red ni serialización.
+2. Compartido: la caché de Django (Redis en producción, LocMemCache en
+   desarrollo y pruebas; ver CACHES en settings).
+
+Cada espacio (p.ej. un modelo) tiene un número de versión guardado en la
+caché compartida y las claves lo incluyen:
+
+    catalogo:contrapartes.moneda:v1718123456789012:activas
+
+Invalidar un espacio solo incrementa su versión: las entradas anteriores
+dejan de usarse en todos los procesos y expiran solas. Cada proceso
+consulta la versión como mucho cada DURACION_VERSION_LOCAL segundos.
+
+Uso:
+    from itico import cache as cache_itico
+    monedas = cache_itico.obtener(
+        cache_itico.espacio_modelo(Moneda), 'activas',
+        lambda: list(Moneda.objects.filter(activo=True)),
+    )
+
+    # En signals.py: invalidar al guardar o eliminar
+    cache_itico.registrar_modelo(Moneda)
+
+Sin Redis (LocMemCache) cada proceso tiene sus propias versiones: una
+invalidación solo alcanza al proceso que la hace. En producción con varios
+workers debe configurarse REDIS_URL.
+
+Los cambios con QuerySet.update() o bulk_create no envían signals; quien
+los haga debe llamar a invalidar() explícitamente.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+# Vida por defecto de las entradas (segundos)
+DURACION_CACHE = 60 * 60
+
+# Cada cuánto cada proceso vuelve a leer la versión de un espacio desde la
+# caché compartida: es el retraso máximo con el que ve una invalidación
+# hecha en otro proceso
+DURACION_VERSION_LOCAL = 5
+
+_AUSENTE = object()
+
+
+class CacheLocal:
+    """LRU en memoria con expiración, segura entre hilos"""
+
+    def __init__(self, max_entradas):
+        self.max_entradas = max_entradas
+        self._datos = OrderedDict()
+        self._bloqueo = threading.Lock()
+
+    def get(self, clave, default=None):
+        with self._bloqueo:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return default
+            valor, expira = entrada
+            if expira < time.monotonic():
+                del self._datos[clave]
+                return default
+            self._datos.move_to_end(clave)
+            return valor
+
+    def set(self, clave, valor, timeout):
+        with self._bloqueo:
+            self._datos[clave] = (valor, time.monotonic() + timeout)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+
+    def clear(self):
+        with self._bloqueo:
+            self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
+
+
+_local = CacheLocal(getattr(settings, 'CACHE_LOCAL_MAX_ENTRADAS', 512))
+
+
+def _clave_version(espacio):
+    return f'version:{espacio}'
+
+
+def _version_inicial():
+    # Basada en el reloj: si la clave de versión se pierde (reinicio o
+    # desalojo en Redis) la nueva nunca coincide con una anterior
+    return time.time_ns() // 1000
+
+
+def espacio_modelo(modelo):
+    """Espacio de caché asociado a un modelo"""
+    return f'catalogo:{modelo._meta.label_lower}'
+
+
+def version(espacio):
+    """Versión actual de un espacio (la crea si no existe)"""
+    clave_local = _clave_version(espacio)
+    actual = _local.get(clave_local, _AUSENTE)
+    if actual is _AUSENTE:
+        actual = cache.get(_clave_version(espacio))
+        if actual is None:
+            cache.add(_clave_version(espacio), _version_inicial(), None)
+            actual = cache.get(_clave_version(espacio))
+        _local.set(clave_local, actual, DURACION_VERSION_LOCAL)
+    return actual
+
+
+def versiones(espacios):
+    """
+    Versiones de varios espacios con una sola lectura de la caché compartida
+    para los que no están en la caché local.
+
+    Returns:
+        dict: {espacio: versión}
+    """
+    resultado = {}
+    faltantes = []
+    for espacio in espacios:
+        actual = _local.get(_clave_version(espacio), _AUSENTE)
+        if actual is _AUSENTE:
+            faltantes.append(espacio)
+        else:
+            resultado[espacio] = actual
+    if faltantes:
+        compartidas = cache.get_many([_clave_version(espacio) for espacio in faltantes])
+        for espacio in faltantes:
+            actual = compartidas.get(_clave_version(espacio))
+            if actual is None:
+                actual = version(espacio)
+            else:
+                _local.set(_clave_version(espacio), actual, DURACION_VERSION_LOCAL)
+            resultado[espacio] = actual
+    return resultado
+
+
+def obtener(espacio, clave, calcular, timeout=DURACION_CACHE):
+    """
+    Retorna un valor desde la caché local, la compartida o calculándolo.
+
+    Args:
+        espacio: Espacio de versionado (p.ej. espacio_modelo(Moneda))
+        clave: Clave dentro del espacio
+        calcular: Función sin argumentos que produce el valor
+        timeout: Vida de la entrada en segundos
+
+    Returns:
+        El valor en caché o el resultado de calcular()
+    """
+    clave_completa = f'{espacio}:v{version(espacio)}:{clave}'
+    valor = _local.get(clave_completa, _AUSENTE)
+    if valor is not _AUSENTE:
+        return valor
+
+    valor = cache.get(clave_completa, _AUSENTE)
+    if valor is _AUSENTE:
+        valor = calcular()
+        cache.set(clave_completa, valor, timeout)
+    _local.set(clave_completa, valor, timeout)
+    return valor
+
+
+def invalidar(*espacios):
+    """Descarta todas las entradas de los espacios en todos los procesos"""
+    for espacio in espacios:
+        clave = _clave_version(espacio)
+        try:
+            nueva = cache.incr(clave)
+        except ValueError:
+            nueva = _version_inicial()
+            cache.set(clave, nueva, None)
+        _local.set(clave, nueva, DURACION_VERSION_LOCAL)
+
+
+def limpiar_local():
+    """Vacía la caché del proceso (pruebas, recarga de configuración)"""
+    _local.clear()
+
+
+def registrar_modelo(modelo, *espacios):
+    """
+    Invalida el espacio del modelo (y los espacios adicionales indicados)
+    cada vez que se guarda o elimina una instancia.
+
+    La invalidación se hace de inmediato, para que la misma petición vea
+    el cambio, y otra vez al confirmar la transacción, para descartar lo
+    que otro proceso haya guardado en caché leyendo los datos anteriores.
+    """
+    espacios = (espacio_modelo(modelo), *espacios)
+
+    def invalidar_espacios(sender, **kwargs):
+        invalidar(*espacios)
+        transaction.on_commit(lambda: invalidar(*espacios))
+
+    uid = f'itico.cache:{modelo._meta.label_lower}'
+    post_save.connect(invalidar_espacios, sender=modelo, weak=False, dispatch_uid=uid)
+    post_delete.connect(invalidar_espacios, sender=modelo, weak=False, dispatch_uid=uid)
@@ -0,0 +1,297 @@
+"""
+Prueba de carga de conexiones
+Portal Interno de Contrapartes – App Pacífico (Cotizador Web)
+
+Lanza peticiones concurrentes contra un servidor en marcha (gunicorn,
+uvicorn o runserver) y, mientras tanto, muestrea las conexiones abiertas en
+PostgreSQL (pg_stat_activity). Sirve para comparar configuraciones de
+conexión (CONN_MAX_AGE, DB_POOL_MAX, DB_PGBOUNCER, número de workers e
+hilos) por latencia y por conexiones usadas.
+
+Las rutas se toman de los escenarios de itico/benchmark.py. Usado por
+itico/management/commands/prueba_carga.py.
+
+comparar_perfiles() arranca el proyecto con WSGI (gunicorn con hilos) y con
+ASGI (uvicorn) y lanza la misma carga contra ambos, con Makito y el servicio
+de IA sustituidos por ServicioSimulado (responde tras una latencia fija).
+Mide cuántas peticiones concurrentes que esperan por E/S atiende cada perfil
+con el mismo número de workers. Usado por
+itico/management/commands/comparar_servidores.py.
+"""
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from importlib import import_module
+
+import requests
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.db import connections
+
+from .middleware import percentil
+
+
+def conexiones_abiertas(alias='default'):
+    """
+    Conexiones a la base de datos actual por estado (active, idle, ...),
+    sin contar la propia. None si el motor no es PostgreSQL.
+    """
+    conexion = connections[alias]
+    if conexion.vendor != 'postgresql':
+        return None
+    with conexion.cursor() as cursor:
+        cursor.execute(
+            "SELECT COALESCE(state, ''), count(*) FROM pg_stat_activity "
+            "WHERE datname = current_database() AND pid <> pg_backend_pid() GROUP BY 1"
+        )
+        return dict(cursor.fetchall())
+
+
+def crear_sesion(usuario):
+    """Sesión autenticada para usuario; devuelve la clave para la cookie"""
+    sesion = import_module(settings.SESSION_ENGINE).SessionStore()
+    sesion[SESSION_KEY] = str(usuario.pk)
+    sesion[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+    sesion[HASH_SESSION_KEY] = usuario.get_session_auth_hash()
+    sesion.create()
+    return sesion.session_key
+
+
+def cerrar_sesion(clave):
+    import_module(settings.SESSION_ENGINE).SessionStore(clave).delete()
+
+
+class _Muestreo(threading.Thread):
+    """Muestrea conexiones_abiertas() cada intervalo hasta detener()"""
+
+    def __init__(self, intervalo):
+        super().__init__(daemon=True)
+        self.intervalo = intervalo
+        self.muestras = []
+        self._fin = threading.Event()
+
+    def run(self):
+        try:
+            while True:
+                muestra = conexiones_abiertas()
+                if muestra is None:
+                    return
+                self.muestras.append(muestra)
+                if self._fin.wait(self.intervalo):
+                    return
+        finally:
+            # La conexión del hilo de muestreo no debe quedar abierta
+            connections.close_all()
+
+    def detener(self):
+        self._fin.set()
+        self.join()
+
+
+def ejecutar(url_base, rutas, concurrencia=8, peticiones=50, sesion=None, intervalo=0.5, timeout=30):
+    """
+    Ejecuta la prueba.
+
+    Args:
+        url_base: URL del servidor, p. ej. http://127.0.0.1:8000
+        rutas: Rutas a pedir (cada worker las recorre en orden, en bucle)
+        concurrencia: Workers simultáneos, cada uno con su conexión HTTP
+        peticiones: Peticiones por worker
+        sesion: Clave de sesión de crear_sesion() (opcional)
+        intervalo: Segundos entre muestras de conexiones
+
+    Returns:
+        dict: Totales, latencias en ms y conexiones a la base de datos
+            (None si no es PostgreSQL)
+    """
+    url_base = url_base.rstrip('/')
+
+    def worker(indice):
+        cliente = requests.Session()
+        if sesion:
+            cliente.cookies.set(settings.SESSION_COOKIE_NAME, sesion)
+        duraciones, errores = [], 0
+        for n in range(peticiones):
+            ruta = rutas[(indice + n) % len(rutas)]
+            inicio = time.perf_counter()
+            try:
+                respuesta = cliente.get(url_base + ruta, timeout=timeout, allow_redirects=False)
+                respuesta.content
+                errores += respuesta.status_code >= 400
+            except requests.RequestException:
+                errores += 1
+            duraciones.append((time.perf_counter() - inicio) * 1000)
+        cliente.close()
+        return duraciones, errores
+
+    muestreo = _Muestreo(intervalo)
+    muestreo.start()
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+        resultados = list(pool.map(worker, range(concurrencia)))
+    duracion = time.perf_counter() - inicio
+    muestreo.detener()
+
+    duraciones = sorted(d for lista, _ in resultados for d in lista)
+    total = len(duraciones)
+    conexiones = None
+    if muestreo.muestras:
+        totales = [sum(muestra.values()) for muestra in muestreo.muestras]
+        estados = {estado for muestra in muestreo.muestras for estado in muestra}
+        conexiones = {
+            'min': min(totales),
+            'max': max(totales),
+            'max_por_estado': {
+                estado or 'desconocido': max(muestra.get(estado, 0) for muestra in muestreo.muestras)
+                for estado in sorted(estados)
+            },
+            'muestras': len(totales),
+        }
+    return {
+        'peticiones': total,
+        'errores': sum(errores for _, errores in resultados),
+        'duracion_s': round(duracion, 2),
+        'peticiones_s': round(total / duracion, 1) if duracion else None,
+        'p50_ms': round(percentil(duraciones, 50), 1) if duraciones else None,
+        'p95_ms': round(percentil(duraciones, 95), 1) if duraciones else None,
+        'max_ms': round(duraciones[-1], 1) if duraciones else None,
+        'conexiones': conexiones,
+    }
+
+
+# =============================================================================
+# COMPARACIÓN WSGI / ASGI
+# =============================================================================
+
+# Comando de cada perfil de despliegue ({puerto}, {workers}, {hilos})
+PERFILES = {
+    'wsgi': [
+        '-m', 'gunicorn', 'itico.wsgi:application', '--bind', '127.0.0.1:{puerto}',
+        '--workers', '{workers}', '--threads', '{hilos}',
+    ],
+    'asgi': [
+        '-m', 'uvicorn', 'itico.asgi:application', '--host', '127.0.0.1', '--port', '{puerto}',
+        '--workers', '{workers}', '--no-access-log',
+    ],
+}
+
+
+def _puerto_libre():
+    with socket.socket() as conexion:
+        conexion.bind(('127.0.0.1', 0))
+        return conexion.getsockname()[1]
+
+
+class ServicioSimulado:
+    """
+    Servidor HTTP local que responde a cualquier GET o POST con un JSON fijo
+    tras latencia segundos, como un Makito o un servicio de IA lentos.
+    """
+
+    def __init__(self, latencia=0.2):
+        latencia_respuesta = latencia
+
+        class Manejador(BaseHTTPRequestHandler):
+            def _responder(self):
+                self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                time.sleep(latencia_respuesta)
+                cuerpo = json.dumps({'id': 'simulado', 'estado': 'en_proceso', 'progreso': 50}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            do_GET = do_POST = _responder
+
+            def log_message(self, *args):
+                pass
+
+        self._servidor = ThreadingHTTPServer(('127.0.0.1', 0), Manejador)
+        self._servidor.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self._servidor.server_address[1]}'
+
+    def __enter__(self):
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+
+class Servidor:
+    """Proceso del proyecto servido con un perfil de PERFILES en un puerto libre"""
+
+    def __init__(self, perfil, workers=2, hilos=4, entorno=None, espera=30):
+        self.puerto = _puerto_libre()
+        self.url = f'http://127.0.0.1:{self.puerto}'
+        self._comando = [sys.executable] + [
+            argumento.format(puerto=self.puerto, workers=workers, hilos=hilos) for argumento in PERFILES[perfil]
+        ]
+        self._entorno = {**os.environ, **(entorno or {})}
+        self._espera = espera
+        self._proceso = None
+
+    def __enter__(self):
+        self._proceso = subprocess.Popen(
+            self._comando, cwd=settings.BASE_DIR, env=self._entorno,
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        )
+        limite = time.monotonic() + self._espera
+        while time.monotonic() < limite:
+            if self._proceso.poll() is not None:
+                error = self._proceso.stderr.read().decode(errors='replace')
+                raise RuntimeError(f'{" ".join(self._comando)} terminó al arrancar:\n{error[-2000:]}')
+            try:
+                socket.create_connection(('127.0.0.1', self.puerto), timeout=0.5).close()
+                return self
+            except OSError:
+                time.sleep(0.2)
+        self.__exit__()
+        raise RuntimeError(f'{" ".join(self._comando)} no aceptó conexiones en {self._espera} s')
+
+    def __exit__(self, *exc):
+        self._proceso.terminate()
+        try:
+            self._proceso.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self._proceso.kill()
+            self._proceso.wait()
+        self._proceso.stderr.close()
+
+
+def comparar_perfiles(rutas, perfiles=('wsgi', 'asgi'), workers=2, hilos=4, latencia=0.2,
+                      concurrencia=32, peticiones=20, sesion=None):
+    """
+    Misma carga contra cada perfil, con los servicios externos simulados.
+
+    Args:
+        rutas: Rutas a pedir (las vistas que llaman a Makito o a la IA)
+        perfiles: Claves de PERFILES
+        workers: Procesos de cada servidor
+        hilos: Hilos por proceso del perfil WSGI
+        latencia: Segundos que tarda en responder el servicio simulado
+        concurrencia, peticiones, sesion: Ver ejecutar()
+
+    Returns:
+        dict: {perfil: resultado de ejecutar()}
+    """
+    resultados = {}
+    with ServicioSimulado(latencia) as servicio:
+        entorno = {'MAKITO_API_URL': servicio.url, 'AI_SERVICE_URL': servicio.url}
+        for perfil in perfiles:
+            with Servidor(perfil, workers, hilos, entorno) as servidor:
+                # Calentamiento: importaciones, conexiones a la base de datos
+                ejecutar(servidor.url, rutas, concurrencia=workers * hilos, peticiones=1, sesion=sesion)
+                resultados[perfil] = ejecutar(
+                    servidor.url, rutas, concurrencia=concurrencia, peticiones=peticiones, sesion=sesion
+                )
+    return resultados
@@ -0,0 +1,70 @@
+"""
+System checks del proyecto
+Portal Interno de Contrapartes – App Pacífico (Cotizador Web)
+
+Validaciones de configuración que antes se imprimían al importar
+settings.py. Se ejecutan con python manage.py check (las de despliegue,
+con --deploy) y antes de runserver, migrate y los tests.
+"""
+
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.core.checks import Error, Warning, register
+
+
+def _escribible(ruta):
+    """True si se puede escribir en ruta o, si aún no existe, crearla"""
+    ruta = Path(ruta)
+    while not ruta.exists():
+        if ruta.parent == ruta:
+            return False
+        ruta = ruta.parent
+    return ruta.is_dir() and os.access(ruta, os.W_OK)
+
+
+@register('itico')
+def verificar_directorios(app_configs, **kwargs):
+    """MEDIA_ROOT y el directorio de logs deben poder escribirse"""
+    errores = []
+    for nombre, ruta in (('MEDIA_ROOT', settings.MEDIA_ROOT), ('LOGS_DIR', settings.LOGS_DIR)):
+        if not _escribible(ruta):
+            errores.append(Error(
+                f'No se puede escribir en {nombre} ({ruta}).',
+                hint='Revise los permisos del usuario que ejecuta la aplicación.',
+                id='itico.E001',
+            ))
+    return errores
+
+
+@register('itico', deploy=True)
+def verificar_base_datos(app_configs, **kwargs):
+    """En producción se espera PostgreSQL"""
+    motor = settings.DATABASES['default'].get('ENGINE', '')
+    if not settings.DEBUG and 'postgresql' not in motor:
+        return [Warning(
+            f'La base de datos por defecto no es PostgreSQL ({motor}).',
+            hint='Configure DATABASE_URL con una URL postgresql:// en producción.',
+            id='itico.W001',
+        )]
+    return []
+
+
+@register('itico', deploy=True)
+def verificar_pool_conexiones(app_configs, **kwargs):
+    """DB_POOL_MAX solo tiene efecto con Django >= 5.1, psycopg 3 y sin PgBouncer"""
+    if not settings.DB_POOL_MAX:
+        return []
+    if settings.DB_PGBOUNCER:
+        return [Warning(
+            'DB_POOL_MAX se ignora con DB_PGBOUNCER: el pool lo gestiona PgBouncer.',
+            id='itico.W002',
+        )]
+    if not settings.DB_POOL_DISPONIBLE:
+        return [Warning(
+            'DB_POOL_MAX requiere Django >= 5.1 con psycopg 3 y psycopg-pool; se usan '
+            f'conexiones persistentes (CONN_MAX_AGE={settings.DATABASES["default"].get("CONN_MAX_AGE")}).',
+            id='itico.W002',
+        )]
+    return []
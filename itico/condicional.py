@@ -0,0 +1,158 @@
+"""
+Respuestas condicionales (ETag / Last-Modified)
+Portal Interno de Contrapartes – App Pacífico (Cotizador Web)
+
+Las vistas de lectura calculan una huella barata de los datos que van a
+devolver, antes de serializar o renderizar nada:
+
+    SELECT COUNT(id), MAX(id), MAX(fecha_actualizacion) FROM ... WHERE ...
+
+Si el cliente envía If-None-Match / If-Modified-Since y la huella coincide,
+se responde 304 sin ejecutar la vista. La huella incluye además
+settings.VERSION_DESPLIEGUE (el commit desplegado, igual en todos los
+workers), de modo que un despliegue (plantillas o serializers nuevos)
+invalida las respuestas guardadas por los clientes.
+
+Uso:
+- Vistas Django: @condicional(funcion) / method_decorator(condicional(funcion), name='get')
+  donde funcion(request, *args, **kwargs) retorna huella(...)
+- API REST: api.views.RespuestaCondicionalMixin
+"""
+
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def campo_version(modelo):
+    """Campo de fecha que refleja la última modificación de un modelo"""
+    for nombre in ('fecha_actualizacion', 'fecha_creacion'):
+        try:
+            modelo._meta.get_field(nombre)
+            return nombre
+        except FieldDoesNotExist:
+            continue
+    return None
+
+
+def version_queryset(queryset, relaciones=()):
+    """
+    Calcula la versión de un conjunto de registros en una sola consulta.
+
+    Args:
+        queryset: QuerySet del recurso o colección
+        relaciones: Relaciones directas (FK) cuya última modificación
+            también afecta a la respuesta (ej: catálogos expandidos)
+
+    Returns:
+        tuple: (texto de versión, fecha de última modificación o None)
+    """
+    agregados = {'total': Count('pk'), 'max_id': Max('pk')}
+    campo = campo_version(queryset.model)
+    if campo:
+        agregados['ultima'] = Max(campo)
+    for i, relacion in enumerate(relaciones):
+        campo_relacion = campo_version(queryset.model._meta.get_field(relacion).related_model)
+        if campo_relacion:
+            agregados[f'relacion_{i}'] = Max(f'{relacion}__{campo_relacion}')
+
+    resultado = queryset.order_by().aggregate(**agregados)
+    fechas = [valor for clave, valor in resultado.items() if clave.startswith(('ultima', 'relacion_')) and valor]
+    texto = f'{queryset.model._meta.label}:' + ':'.join(str(resultado[clave]) for clave in sorted(resultado))
+    return texto, max(fechas) if fechas else None
+
+
+def huella(*versiones, extra=(), con_fecha=True):
+    """
+    Combina versiones de querysets en un ETag y una fecha de modificación.
+
+    Args:
+        *versiones: Tuplas retornadas por version_queryset()
+        extra: Valores adicionales que distinguen la respuesta (usuario,
+            parámetros de la URL, cookie CSRF...)
+        con_fecha: False para no emitir Last-Modified (respuestas por
+            usuario, donde solo el ETag es seguro)
+
+    Returns:
+        tuple: (etag, last_modified o None)
+    """
+    partes = [settings.VERSION_DESPLIEGUE] + [texto for texto, _ in versiones] + [str(valor) for valor in extra]
+    etag = hashlib.md5('|'.join(partes).encode('utf-8')).hexdigest()
+    fechas = [fecha for _, fecha in versiones if fecha]
+    return etag, (max(fechas) if fechas and con_fecha else None)
+
+
+def aplicar_cabeceras(respuesta, etag, ultima_modificacion=None):
+    """Agrega ETag, Last-Modified y las cabeceras de revalidación a la respuesta"""
+    if etag and not respuesta.has_header('ETag'):
+        respuesta['ETag'] = quote_etag(etag)
+    if ultima_modificacion and not respuesta.has_header('Last-Modified'):
+        respuesta['Last-Modified'] = http_date(ultima_modificacion.timestamp())
+    # El navegador puede guardar la respuesta pero debe revalidarla siempre
+    patch_cache_control(respuesta, private=True, no_cache=True)
+    patch_vary_headers(respuesta, ['Cookie'])
+    return respuesta
+
+
+def respuesta_no_modificada(request, etag, ultima_modificacion=None):
+    """
+    Retorna un 304 si las precondiciones del cliente coinciden, o None.
+    """
+    respuesta = get_conditional_response(
+        request,
+        etag=quote_etag(etag),
+        last_modified=int(ultima_modificacion.timestamp()) if ultima_modificacion else None,
+    )
+    if respuesta is not None:
+        aplicar_cabeceras(respuesta, etag, ultima_modificacion)
+    return respuesta
+
+
+def condicional(funcion_huella):
+    """
+    Decorador de vistas GET con respuesta condicional.
+
+    Args:
+        funcion_huella: funcion(request, *args, **kwargs) -> (etag, last_modified)
+            o None para responder sin condicionales
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return vista(request, *args, **kwargs)
+
+            resultado = funcion_huella(request, *args, **kwargs)
+            if resultado is None:
+                return vista(request, *args, **kwargs)
+
+            etag, ultima_modificacion = resultado
+            respuesta = respuesta_no_modificada(request, etag, ultima_modificacion)
+            if respuesta is not None:
+                return respuesta
+
+            respuesta = vista(request, *args, **kwargs)
+            if respuesta.status_code == 200:
+                aplicar_cabeceras(respuesta, etag, ultima_modificacion)
+            return respuesta
+        return envoltura
+    return decorador
+
+
+def huella_formulario(request, *versiones):
+    """
+    Huella para endpoints que devuelven formularios HTML.
+
+    El formulario lleva el token CSRF y depende del usuario, por lo que la
+    huella incluye ambos y no se emite Last-Modified.
+    """
+    return huella(
+        *versiones,
+        extra=(request.user.pk, request.META.get('CSRF_COOKIE', ''), request.get_full_path()),
+        con_fecha=False
+    )
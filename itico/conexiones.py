@@ -0,0 +1,54 @@
+"""
+Conexiones a la base de datos
+Portal Interno de Contrapartes – App Pacífico (Cotizador Web)
+
+Con PgBouncer en pool_mode=transaction (DB_PGBOUNCER=True en settings) no
+se pueden usar cursores del servidor: Django los desactiva
+(DISABLE_SERVER_SIDE_CURSORS) y QuerySet.iterator() pasa a recibir todo el
+resultado en memoria del cliente antes de devolver la primera fila.
+iterar_por_lotes() conserva el consumo de memoria acotado en ese modo
+paginando la consulta; con cursores del servidor equivale a .iterator().
+"""
+
+from django.db import connections
+from django.db.models.query import ModelIterable
+
+
+def cursores_servidor(alias='default'):
+    """True si .iterator() lee el resultado por lotes desde el servidor"""
+    conexion = connections[alias]
+    return conexion.vendor != 'postgresql' or not conexion.settings_dict.get('DISABLE_SERVER_SIDE_CURSORS')
+
+
+def iterar_por_lotes(queryset, tamano_lote=2000):
+    """
+    Itera un queryset con memoria acotada a un lote.
+
+    Sin cursores del servidor, los querysets de modelos ordenados por pk se
+    paginan por clave (pk > último); el resto, por OFFSET, por lo que su
+    orden debe ser total (terminar en un campo único). prefetch_related se
+    aplica a cada lote.
+
+    Args:
+        queryset: QuerySet a recorrer
+        tamano_lote: Filas por consulta (chunk_size de .iterator())
+
+    Yields:
+        Los elementos del queryset, en su orden
+    """
+    if cursores_servidor(queryset.db):
+        yield from queryset.iterator(chunk_size=tamano_lote)
+        return
+
+    por_clave = queryset._iterable_class is ModelIterable and tuple(queryset.query.order_by) in (('pk',), ('id',))
+    ultimo, desde = None, 0
+    while True:
+        if por_clave:
+            pagina = queryset if ultimo is None else queryset.filter(pk__gt=ultimo)
+            lote = list(pagina[:tamano_lote])
+        else:
+            lote = list(queryset[desde:desde + tamano_lote])
+        yield from lote
+        if len(lote) < tamano_lote:
+            return
+        ultimo, desde = lote[-1].pk if por_clave else None, desde + tamano_lote
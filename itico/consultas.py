@@ -0,0 +1,223 @@
+"""
+Presupuesto de consultas por vista
+Portal Interno de Contrapartes – App Pacífico (Cotizador Web)
+
+Utilidades para pruebas que recorren todas las rutas de un módulo de URLs,
+las piden con GET y cuentan las consultas SQL de cada una. Se usan en
+itico/tests.py para detectar dos tipos de regresión:
+
+- Crecimiento: la vista ejecuta más consultas con más datos (N+1).
+- Exceso: la vista supera su presupuesto en presupuestos_consultas.json.
+
+Los parámetros de cada ruta (pk, contraparte_pk, ...) se completan con
+los IDs de una muestra {model_name: pk}. El modelo de un pk se deduce de la
+vista (model o queryset, incluidos los ViewSets de DRF); para las vistas
+que no lo declaran se indica en el argumento parametros.
+
+Cada respuesta medida debe ser 2xx o 3xx: contar las consultas de una
+página de error no dice nada de la vista. Las rutas que no admiten GET se
+omiten, y las que fallan por un motivo conocido se declaran en el argumento
+rotas: no se presupuestan y se verifica que sigan fallando, para que al
+corregirlas se quiten de la lista y se midan.
+
+Para regenerar el archivo de presupuestos tras un cambio intencionado:
+    ACTUALIZAR_PRESUPUESTOS=1 python manage.py test itico
+"""
+
+import json
+from collections import namedtuple
+from contextlib import ExitStack
+from importlib import import_module
+from pathlib import Path
+
+from django.core.cache import caches
+from django.db import connections
+from django.urls import URLPattern, URLResolver, reverse
+
+from .middleware import Medicion
+
+ARCHIVO_PRESUPUESTOS = Path(__file__).resolve().parent / 'presupuestos_consultas.json'
+
+# Parámetros de URL que siempre se refieren al mismo modelo
+PARAMETROS_COMUNES = {
+    'contraparte_pk': 'contraparte',
+    'miembro_pk': 'miembro',
+    'dd_pk': 'debidadiligencia',
+}
+
+Ruta = namedtuple('Ruta', ['nombre', 'parametros', 'vista', 'metodos'])
+
+
+def _clase_vista(callback):
+    return getattr(callback, 'view_class', None) or getattr(callback, 'cls', None)
+
+
+def _metodos(callback):
+    """Métodos HTTP que atiende la vista, o None si no se pueden deducir (vistas función)"""
+    acciones = getattr(callback, 'actions', None)
+    if acciones:
+        # Ruta de un ViewSet de DRF: {'get': 'list', 'post': 'create'}
+        return set(acciones)
+    vista = _clase_vista(callback)
+    if vista is None:
+        return None
+    return {metodo for metodo in vista.http_method_names if hasattr(vista, metodo)}
+
+
+def rutas(modulo_urls):
+    """
+    Rutas con nombre de un módulo de URLs, una por nombre.
+
+    Las variantes con sufijo de formato de DRF (.json) se omiten.
+
+    Returns:
+        list: Ruta(nombre 'namespace:nombre', parámetros, clase de la vista,
+        métodos HTTP o None)
+    """
+    modulo = import_module(modulo_urls)
+    espacio = getattr(modulo, 'app_name', None)
+    resultado = {}
+
+    def recorrer(patrones):
+        for patron in patrones:
+            if isinstance(patron, URLResolver):
+                recorrer(patron.url_patterns)
+                continue
+            if not isinstance(patron, URLPattern) or not patron.name:
+                continue
+            parametros = list(patron.pattern.regex.groupindex)
+            if 'format' in parametros:
+                continue
+            nombre = f'{espacio}:{patron.name}' if espacio else patron.name
+            resultado.setdefault(
+                nombre, Ruta(nombre, parametros, _clase_vista(patron.callback), _metodos(patron.callback))
+            )
+
+    recorrer(modulo.urlpatterns)
+    return list(resultado.values())
+
+
+def _modelo_vista(vista):
+    modelo = getattr(vista, 'model', None)
+    if modelo is None and getattr(vista, 'queryset', None) is not None:
+        modelo = vista.queryset.model
+    return modelo._meta.model_name if modelo is not None else None
+
+
+def construir_url(ruta, muestra, parametros=None):
+    """
+    URL de una ruta con sus parámetros tomados de la muestra.
+
+    Args:
+        ruta: Ruta de rutas()
+        muestra: {model_name: pk}
+        parametros: {nombre_ruta: {parametro: model_name}} para las vistas
+            que no declaran su modelo; la clave '?' agrega una cadena de
+            consulta fija (parámetros GET obligatorios)
+
+    Returns:
+        str o None si falta en la muestra algún modelo necesario
+    """
+    indicados = dict((parametros or {}).get(ruta.nombre, {}))
+    cadena = indicados.pop('?', '')
+    kwargs = {}
+    for parametro in ruta.parametros:
+        modelo = indicados.get(parametro) or PARAMETROS_COMUNES.get(parametro)
+        if modelo is None and parametro == 'pk':
+            modelo = _modelo_vista(ruta.vista)
+        if modelo not in muestra:
+            return None
+        kwargs[parametro] = muestra[modelo]
+    url = reverse(ruta.nombre, kwargs=kwargs)
+    return f'{url}?{cadena}' if cadena else url
+
+
+def contar_consultas(cliente, url):
+    """
+    Pide la URL con GET y cuenta sus consultas (respuestas en streaming
+    incluidas).
+
+    Returns:
+        tuple: (estado HTTP, número de consultas)
+    """
+    medicion = Medicion()
+    with ExitStack() as pila:
+        for alias in connections:
+            pila.enter_context(connections[alias].execute_wrapper(medicion))
+        respuesta = cliente.get(url)
+        if respuesta.streaming:
+            for _ in respuesta.streaming_content:
+                pass
+    return respuesta.status_code, medicion.consultas
+
+
+def _es_exitoso(estado):
+    return 200 <= estado < 400
+
+
+def medir_rutas(cliente, lista_rutas, muestra, parametros=None, omitir=(), rotas=()):
+    """
+    Consultas de cada ruta tras una petición de calentamiento (cachés de
+    catálogos, sesión), para que el resultado no dependa del orden. Los
+    fragmentos de plantilla en caché se descartan antes de medir: se cuenta
+    el render completo, donde aparecería un N+1.
+
+    Se omiten las rutas de omitir y las que no admiten GET.
+
+    Args:
+        rotas: {nombre_ruta: motivo} de las rutas que hoy responden con error
+
+    Returns:
+        tuple: ({nombre_ruta: consultas}, lista de mensajes de error por
+        rutas que fallan sin estar en rotas o que ya no fallan)
+    """
+    resultado = {}
+    errores = []
+    for ruta in lista_rutas:
+        if ruta.nombre in omitir or (ruta.metodos is not None and 'get' not in ruta.metodos):
+            continue
+        url = construir_url(ruta, muestra, parametros)
+        if url is None:
+            raise ValueError(f'Faltan datos en la muestra para construir {ruta.nombre} {ruta.parametros}')
+        contar_consultas(cliente, url)
+        caches['template_fragments'].clear()
+        estado, numero = contar_consultas(cliente, url)
+
+        if ruta.nombre in rotas:
+            if _es_exitoso(estado):
+                errores.append(f'{ruta.nombre}: responde {estado}; quitarla de las rutas con errores conocidos')
+        elif not _es_exitoso(estado):
+            errores.append(f'{ruta.nombre}: GET {url} responde {estado}')
+        else:
+            resultado[ruta.nombre] = numero
+    return resultado, errores
+
+
+def cargar_presupuestos(archivo=ARCHIVO_PRESUPUESTOS):
+    try:
+        return json.loads(Path(archivo).read_text())
+    except FileNotFoundError:
+        return {}
+
+
+def guardar_presupuestos(presupuestos, archivo=ARCHIVO_PRESUPUESTOS):
+    Path(archivo).write_text(json.dumps(dict(sorted(presupuestos.items())), indent=2, ensure_ascii=False) + '\n')
+
+
+def verificar(pequeno, grande, presupuestos):
+    """
+    Compara las consultas medidas con dos tamaños de datos y con el
+    presupuesto de cada vista.
+
+    Returns:
+        list: Mensajes de error (vacía si todo está dentro del presupuesto)
+    """
+    errores = []
+    for nombre, consultas in grande.items():
+        if consultas > pequeno.get(nombre, consultas):
+            errores.append(f'{nombre}: crece con los datos ({pequeno[nombre]} -> {consultas} consultas)')
+        if nombre not in presupuestos:
+            errores.append(f'{nombre}: sin presupuesto ({consultas} consultas)')
+        elif consultas > presupuestos[nombre]:
+            errores.append(f'{nombre}: {consultas} consultas, presupuesto {presupuestos[nombre]}')
+    return errores
@@ -0,0 +1 @@
+# Archivo __init__.py para el paquete management
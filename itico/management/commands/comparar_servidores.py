@@ -0,0 +1,92 @@
+"""
+Comando de gestión Django que compara el rendimiento concurrente del
+proyecto servido con WSGI (gunicorn con hilos) y con ASGI (uvicorn) en las
+vistas que esperan por servicios externos (ver itico/carga.py).
+
+Uso:
+    python manage.py comparar_servidores --workers 2 --hilos 4 --concurrencia 32 --latencia 0.2
+
+Los servidores se arrancan en puertos libres con la configuración actual;
+Makito y el servicio de IA se sustituyen por un servicio local que responde
+tras --latencia segundos. Con WSGI cada petición ocupa un hilo mientras
+espera (como máximo workers × hilos a la vez); con ASGI la espera no ocupa
+hilos.
+"""
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from debida_diligencia.models import DebidaDiligencia
+from itico import carga
+
+
+class Command(BaseCommand):
+    help = 'Compara peticiones por segundo con WSGI y con ASGI en las vistas que esperan por servicios externos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--perfiles', nargs='+', choices=sorted(carga.PERFILES), default=['wsgi', 'asgi'],
+            help='Perfiles a comparar (por defecto: wsgi asgi)'
+        )
+        parser.add_argument('--workers', type=int, default=2, help='Procesos de cada servidor (por defecto: 2)')
+        parser.add_argument('--hilos', type=int, default=4, help='Hilos por proceso con WSGI (por defecto: 4)')
+        parser.add_argument('--concurrencia', type=int, default=32, help='Peticiones simultáneas (por defecto: 32)')
+        parser.add_argument('--peticiones', type=int, default=20, help='Peticiones por cliente concurrente (por defecto: 20)')
+        parser.add_argument(
+            '--latencia', type=float, default=0.2,
+            help='Segundos que tarda en responder el servicio externo simulado (por defecto: 0.2)'
+        )
+        parser.add_argument('--usuario', help='Usuario con el que se autentican las peticiones (por defecto: el primer superusuario)')
+
+    def handle(self, *args, **options):
+        usuario = self._usuario(options['usuario'])
+        rutas = [
+            reverse('debida_diligencia:makito_estado', args=[pk])
+            for pk in DebidaDiligencia.objects.exclude(makito_request_id__isnull=True)
+            .exclude(makito_request_id='').order_by('pk').values_list('pk', flat=True)[:20]
+        ]
+        if not rutas:
+            raise CommandError(
+                'No hay debidas diligencias enviadas a Makito; genere datos con generar_datos_volumen'
+            )
+
+        clave = carga.crear_sesion(usuario)
+        try:
+            resultados = carga.comparar_perfiles(
+                rutas,
+                perfiles=options['perfiles'],
+                workers=options['workers'],
+                hilos=options['hilos'],
+                latencia=options['latencia'],
+                concurrencia=options['concurrencia'],
+                peticiones=options['peticiones'],
+                sesion=clave,
+            )
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        finally:
+            carga.cerrar_sesion(clave)
+
+        self.stdout.write(
+            f'{options["workers"]} workers · {options["hilos"]} hilos (WSGI) · {options["concurrencia"]} clientes · '
+            f'servicio externo {int(options["latencia"] * 1000)} ms · {len(rutas)} rutas'
+        )
+        self.stdout.write(f'\n{"perfil":8} {"pet./s":>8} {"p50 ms":>9} {"p95 ms":>9} {"máx ms":>9} {"errores":>8}')
+        for perfil, resultado in resultados.items():
+            linea = (
+                f'{perfil:8} {resultado["peticiones_s"]:>8} {resultado["p50_ms"]:>9} '
+                f'{resultado["p95_ms"]:>9} {resultado["max_ms"]:>9} {resultado["errores"]:>8}'
+            )
+            self.stdout.write(self.style.ERROR(linea) if resultado['errores'] else linea)
+
+    def _usuario(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username, is_active=True)
+            except User.DoesNotExist:
+                raise CommandError(f'No existe el usuario activo "{username}"')
+        usuario = User.objects.filter(is_superuser=True, is_active=True).order_by('id').first()
+        if usuario is None:
+            raise CommandError('No hay superusuarios activos; indique uno con --usuario')
+        return usuario
@@ -0,0 +1,58 @@
+"""
+Comando de gestión Django para perfilar el arranque de un proceso.
+Muestra cuánto tarda django.setup() en un proceso nuevo y qué módulos
+cuestan más de importar (ver itico/arranque.py).
+
+Uso:
+    python manage.py perfil_arranque                # top 25 módulos por tiempo acumulado
+    python manage.py perfil_arranque --por-paquete  # tiempo propio por paquete
+    python manage.py perfil_arranque --sin-urls --repeticiones 5
+
+Para comparar antes y después de un cambio, usar --repeticiones: el primer
+arranque incluye la compilación de .pyc y la caché fría del disco.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from itico import arranque
+
+
+class Command(BaseCommand):
+    help = 'Mide el tiempo de arranque de Django y el tiempo de importación por módulo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=25, help='Módulos o paquetes a mostrar (por defecto: 25)')
+        parser.add_argument('--por-paquete', action='store_true', help='Agrupar el tiempo propio por paquete de primer nivel')
+        parser.add_argument('--sin-urls', action='store_true', help='No importar el URLconf (solo django.setup())')
+        parser.add_argument(
+            '--repeticiones',
+            type=int,
+            default=3,
+            help='Arranques medidos; se muestra el más rápido (por defecto: 3)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            mediciones = [arranque.medir(not options['sin_urls']) for _ in range(max(options['repeticiones'], 1))]
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        mejor = min(mediciones, key=lambda m: m['total_s'])
+        importaciones = mejor['importaciones']
+
+        self.stdout.write(
+            f'django.setup(): {mejor["setup_s"] * 1000:.0f} ms · '
+            f'total{"" if options["sin_urls"] else " con URLs"}: {mejor["total_s"] * 1000:.0f} ms · '
+            f'{len(importaciones)} módulos importados'
+        )
+
+        if options['por_paquete']:
+            self.stdout.write(f'\n{"paquete":40} {"propio ms":>10} {"módulos":>8}')
+            for paquete, microsegundos, modulos in arranque.por_paquete(importaciones)[:options['top']]:
+                self.stdout.write(f'{paquete:40} {microsegundos / 1000:>10.1f} {modulos:>8}')
+            return
+
+        self.stdout.write(f'\n{"módulo":56} {"propio ms":>10} {"acumulado ms":>13}')
+        for importacion in sorted(importaciones, key=lambda i: i.acumulado_us, reverse=True)[:options['top']]:
+            self.stdout.write(
+                f'{importacion.modulo:56} {importacion.propio_us / 1000:>10.1f} {importacion.acumulado_us / 1000:>13.1f}'
+            )
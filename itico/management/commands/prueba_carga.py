@@ -0,0 +1,87 @@
+"""
+Comando de gestión Django para una prueba de carga con muestreo de
+conexiones a la base de datos (ver itico/carga.py).
+
+Uso, con el servidor en marcha en otra terminal:
+    gunicorn itico.wsgi:application --workers 2 --threads 4
+    python manage.py prueba_carga --url http://127.0.0.1:8000 --concurrencia 16 --peticiones 100
+
+Repetir con distintos valores de DB_CONN_MAX_AGE, DB_POOL_MAX, DB_PGBOUNCER,
+workers e hilos para comparar latencia y conexiones abiertas. Las conexiones
+solo se muestrean con PostgreSQL.
+"""
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from itico import benchmark, carga
+
+
+class Command(BaseCommand):
+    help = 'Peticiones concurrentes contra un servidor en marcha, con latencia y conexiones a la base de datos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='URL del servidor (por defecto: http://127.0.0.1:8000)')
+        parser.add_argument('--concurrencia', type=int, default=8, help='Workers simultáneos (por defecto: 8)')
+        parser.add_argument('--peticiones', type=int, default=50, help='Peticiones por worker (por defecto: 50)')
+        parser.add_argument('--usuario', help='Usuario con el que se autentican las peticiones (por defecto: el primer superusuario)')
+        parser.add_argument(
+            '--solo',
+            nargs='+',
+            metavar='TEXTO',
+            help='Usar solo los escenarios del benchmark cuyo nombre contenga alguno de estos textos'
+        )
+        parser.add_argument('--intervalo', type=float, default=0.5, help='Segundos entre muestras de conexiones (por defecto: 0.5)')
+
+    def handle(self, *args, **options):
+        usuario = self._usuario(options['usuario'])
+        muestra = benchmark.muestra_datos()
+        rutas = [
+            url for url in (
+                escenario.url(muestra) for escenario in benchmark.ESCENARIOS
+                if not options['solo'] or any(texto in escenario.nombre for texto in options['solo'])
+            ) if url
+        ]
+        if not rutas:
+            raise CommandError('No hay escenarios con datos para construir sus URLs')
+
+        clave = carga.crear_sesion(usuario)
+        try:
+            resultado = carga.ejecutar(
+                options['url'], rutas,
+                concurrencia=options['concurrencia'],
+                peticiones=options['peticiones'],
+                sesion=clave,
+                intervalo=options['intervalo'],
+            )
+        finally:
+            carga.cerrar_sesion(clave)
+
+        self.stdout.write(
+            f'{resultado["peticiones"]} peticiones en {resultado["duracion_s"]} s '
+            f'({resultado["peticiones_s"]}/s) · {options["concurrencia"]} workers · {len(rutas)} rutas'
+        )
+        self.stdout.write(f'Latencia p50 {resultado["p50_ms"]} ms · p95 {resultado["p95_ms"]} ms · máx {resultado["max_ms"]} ms')
+        if resultado['errores']:
+            self.stdout.write(self.style.ERROR(f'Errores: {resultado["errores"]}'))
+
+        conexiones = resultado['conexiones']
+        if conexiones is None:
+            self.stdout.write('Conexiones: solo se muestrean con PostgreSQL')
+            return
+        por_estado = ', '.join(f'{estado}: {n}' for estado, n in conexiones['max_por_estado'].items())
+        self.stdout.write(
+            f'Conexiones a la base de datos: mín {conexiones["min"]} · máx {conexiones["max"]} '
+            f'({por_estado}) · {conexiones["muestras"]} muestras'
+        )
+
+    def _usuario(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username, is_active=True)
+            except User.DoesNotExist:
+                raise CommandError(f'No existe el usuario activo "{username}"')
+        usuario = User.objects.filter(is_superuser=True, is_active=True).order_by('id').first()
+        if usuario is None:
+            raise CommandError('No hay superusuarios activos; indique uno con --usuario')
+        return usuario
@@ -0,0 +1,338 @@
+"""
+Instrumentación de peticiones
+Portal Interno de Contrapartes – App Pacífico (Cotizador Web)
+
+InstrumentacionMiddleware mide cada petición sin depender de DEBUG:
+
+- Consultas SQL: número y tiempo, con un execute_wrapper instalado una vez
+  en cada conexión del hilo que atiende la petición; el wrapper suma a la
+  medición de la variable de contexto, que sync_to_async copia a sus hilos
+  (no requiere DEBUG ni guarda el texto de cada consulta).
+- Plantillas: tiempo de render, medido por el backend de plantillas
+  itico.plantillas.DjangoTemplates.
+- Tiempo total y nombre de la vista resuelta.
+- N+1: las consultas se agrupan por forma (el SQL con parámetros y las
+  listas IN (...) colapsadas); una forma que se repite
+  INSTRUMENTACION_UMBRAL_REPETIDAS veces o más se marca como sospechosa.
+
+Cada petición produce una línea JSON en el logger 'itico.peticiones'
+(WARNING si es lenta o tiene N+1) y una muestra en el registro de métricas.
+Con Redis (INSTRUMENTACION_REDIS_URL) las muestras de todos los procesos se
+guardan juntas; sin él cada proceso conserva las suyas. Los percentiles por
+vista se consultan en dashboard:metricas (solo staff).
+
+Con ASGI las vistas síncronas y el ORM async corren en el hilo de
+sync_to_async de la petición, no en el del event loop: __acall__ instala
+el wrapper en ese hilo antes de llamar a la vista.
+"""
+
+import contextvars
+import json
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+logger_peticiones = logging.getLogger('itico.peticiones')
+
+_medicion = contextvars.ContextVar('itico_medicion', default=None)
+
+# Listas de parámetros: IN (%s, %s, %s) y VALUES (%s, %s), (%s, %s)
+_PATRON_LISTA = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+_PATRON_VALUES = re.compile(r'(\(\.\.\.\))(?:\s*,\s*\(\.\.\.\))+')
+_PATRON_ESPACIOS = re.compile(r'\s+')
+
+
+def forma_sql(sql):
+    """SQL normalizado para agrupar consultas que solo difieren en parámetros"""
+    sql = _PATRON_LISTA.sub('(...)', sql)
+    sql = _PATRON_VALUES.sub(r'\1', sql)
+    return _PATRON_ESPACIOS.sub(' ', sql).strip()
+
+
+class Medicion:
+    """Contadores de una petición; se usa también como execute_wrapper"""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.tiempo_sql = 0.0
+        self.tiempo_plantillas = 0.0
+        self.formas = Counter()
+        self._profundidad_plantillas = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tiempo_sql += time.perf_counter() - inicio
+            self.consultas += 1
+            self.formas[forma_sql(sql)] += 1
+
+    @contextmanager
+    def plantilla(self):
+        """Mide un render; los renders anidados no se suman dos veces"""
+        self._profundidad_plantillas += 1
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._profundidad_plantillas -= 1
+            if self._profundidad_plantillas == 0:
+                self.tiempo_plantillas += time.perf_counter() - inicio
+
+    def repetidas(self, umbral):
+        """Formas de consulta ejecutadas umbral veces o más"""
+        return [(forma, veces) for forma, veces in self.formas.most_common() if veces >= umbral]
+
+
+def medicion_actual():
+    """Medición de la petición en curso, o None fuera del middleware"""
+    return _medicion.get()
+
+
+def _medir_consulta(execute, sql, params, many, context):
+    """execute_wrapper permanente: mide solo dentro de una petición instrumentada"""
+    medicion = _medicion.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    return medicion(execute, sql, params, many, context)
+
+
+def _instalar_en_hilo():
+    """Agrega _medir_consulta a las conexiones del hilo actual que no lo tengan"""
+    for alias in connections:
+        wrappers = connections[alias].execute_wrappers
+        if _medir_consulta not in wrappers:
+            wrappers.append(_medir_consulta)
+
+
+# ====== REGISTRO DE MUESTRAS ======
+
+class RegistroLocal:
+    """Últimas muestras por vista en la memoria del proceso"""
+
+    def __init__(self, muestras):
+        self.max_muestras = muestras
+        self._datos = defaultdict(lambda: deque(maxlen=self.max_muestras))
+        self._bloqueo = threading.Lock()
+
+    def agregar(self, vista, muestra):
+        with self._bloqueo:
+            self._datos[vista].append(muestra)
+
+    def muestras(self):
+        """
+        Returns:
+            dict: {vista: [[duracion_ms, consultas, sql_ms, plantillas_ms], ...]}
+        """
+        with self._bloqueo:
+            return {vista: list(valores) for vista, valores in self._datos.items()}
+
+    def limpiar(self):
+        with self._bloqueo:
+            self._datos.clear()
+
+
+class RegistroRedis(RegistroLocal):
+    """Muestras compartidas por todos los procesos en listas de Redis"""
+
+    PREFIJO = 'itico:metricas:'
+    VISTAS = 'itico:metricas:vistas'
+    DURACION = 60 * 60 * 24
+
+    def __init__(self, url, muestras):
+        super().__init__(muestras)
+        self.url = url
+        self._cliente = None
+
+    def _redis(self):
+        with self._bloqueo:
+            if self._cliente is None:
+                import redis
+                self._cliente = redis.Redis.from_url(self.url)
+            return self._cliente
+
+    def agregar(self, vista, muestra):
+        clave = self.PREFIJO + vista
+        try:
+            with self._redis().pipeline(transaction=False) as tuberia:
+                tuberia.lpush(clave, json.dumps(muestra))
+                tuberia.ltrim(clave, 0, self.max_muestras - 1)
+                tuberia.expire(clave, self.DURACION)
+                tuberia.sadd(self.VISTAS, vista)
+                tuberia.execute()
+        except Exception:
+            # Sin Redis la muestra se conserva solo en este proceso
+            super().agregar(vista, muestra)
+
+    def muestras(self):
+        try:
+            cliente = self._redis()
+            vistas = sorted(v.decode() for v in cliente.smembers(self.VISTAS))
+            with cliente.pipeline(transaction=False) as tuberia:
+                for vista in vistas:
+                    tuberia.lrange(self.PREFIJO + vista, 0, -1)
+                listas = tuberia.execute()
+        except Exception:
+            logger.warning('No se pudieron leer las métricas de Redis', exc_info=True)
+            return super().muestras()
+        return {
+            vista: [json.loads(valor) for valor in valores]
+            for vista, valores in zip(vistas, listas) if valores
+        }
+
+    def limpiar(self):
+        super().limpiar()
+        cliente = self._redis()
+        vistas = cliente.smembers(self.VISTAS)
+        cliente.delete(self.VISTAS, *[self.PREFIJO + v.decode() for v in vistas])
+
+
+_registro = None
+_registro_bloqueo = threading.Lock()
+
+
+def obtener_registro():
+    """Registro de muestras del proceso según la configuración"""
+    global _registro
+    if _registro is None:
+        with _registro_bloqueo:
+            if _registro is None:
+                url = getattr(settings, 'INSTRUMENTACION_REDIS_URL', '')
+                muestras = getattr(settings, 'INSTRUMENTACION_MUESTRAS', 500)
+                _registro = RegistroRedis(url, muestras) if url else RegistroLocal(muestras)
+    return _registro
+
+
+def percentil(valores_ordenados, p):
+    """Percentil p (0-100) por rango más cercano de una lista ya ordenada"""
+    if not valores_ordenados:
+        return None
+    rango = math.ceil(p / 100 * len(valores_ordenados))
+    return valores_ordenados[min(max(rango, 1), len(valores_ordenados)) - 1]
+
+
+def resumen_metricas():
+    """
+    Percentiles por vista de las muestras registradas.
+
+    Returns:
+        list: Un dict por vista, ordenado por p95 de duración descendente
+    """
+    resultado = []
+    for vista, muestras in obtener_registro().muestras().items():
+        duraciones = sorted(m[0] for m in muestras)
+        consultas = sorted(m[1] for m in muestras)
+        sql = sorted(m[2] for m in muestras)
+        plantillas = sorted(m[3] for m in muestras)
+        resultado.append({
+            'vista': vista,
+            'peticiones': len(muestras),
+            'duracion_ms': {f'p{p}': percentil(duraciones, p) for p in (50, 95, 99)},
+            'sql_ms': {f'p{p}': percentil(sql, p) for p in (50, 95)},
+            'plantillas_ms': {f'p{p}': percentil(plantillas, p) for p in (50, 95)},
+            'consultas': {'p50': percentil(consultas, 50), 'p95': percentil(consultas, 95), 'max': consultas[-1]},
+        })
+    resultado.sort(key=lambda fila: fila['duracion_ms']['p95'], reverse=True)
+    return resultado
+
+
+# ====== MIDDLEWARE ======
+
+def _nombre_vista(request):
+    coincidencia = getattr(request, 'resolver_match', None)
+    if coincidencia is None:
+        return 'sin_resolver'
+    return coincidencia.view_name or coincidencia._func_path
+
+
+class InstrumentacionMiddleware:
+    """Mide consultas, plantillas y tiempo total de cada petición"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.activa = getattr(settings, 'INSTRUMENTACION_ACTIVA', True)
+        self.excluir = tuple(getattr(settings, 'INSTRUMENTACION_EXCLUIR', ()))
+        self.umbral_lenta = getattr(settings, 'INSTRUMENTACION_UMBRAL_LENTA_MS', 500)
+        self.umbral_repetidas = getattr(settings, 'INSTRUMENTACION_UMBRAL_REPETIDAS', 5)
+        self.server_timing = getattr(settings, 'INSTRUMENTACION_SERVER_TIMING', False)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _instrumentar(self, request):
+        return self.activa and not request.path.startswith(self.excluir)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._instrumentar(request):
+            return self.get_response(request)
+
+        _instalar_en_hilo()
+        medicion = Medicion()
+        token = _medicion.set(medicion)
+        try:
+            response = self.get_response(request)
+        finally:
+            _medicion.reset(token)
+        self._registrar(request, response, medicion)
+        return response
+
+    async def __acall__(self, request):
+        if not self._instrumentar(request):
+            return await self.get_response(request)
+
+        # Mismo hilo (thread_sensitive) en el que correrán la vista síncrona
+        # o las consultas del ORM async de esta petición
+        await sync_to_async(_instalar_en_hilo)()
+        medicion = Medicion()
+        token = _medicion.set(medicion)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _medicion.reset(token)
+        self._registrar(request, response, medicion)
+        return response
+
+    def _registrar(self, request, response, medicion):
+        duracion_ms = round((time.perf_counter() - medicion.inicio) * 1000, 1)
+        sql_ms = round(medicion.tiempo_sql * 1000, 1)
+        plantillas_ms = round(medicion.tiempo_plantillas * 1000, 1)
+        vista = _nombre_vista(request)
+        repetidas = medicion.repetidas(self.umbral_repetidas)
+
+        obtener_registro().agregar(vista, [duracion_ms, medicion.consultas, sql_ms, plantillas_ms])
+
+        datos = {
+            'vista': vista,
+            'metodo': request.method,
+            'ruta': request.path,
+            'estado': response.status_code,
+            'duracion_ms': duracion_ms,
+            'consultas': medicion.consultas,
+            'sql_ms': sql_ms,
+            'plantillas_ms': plantillas_ms,
+        }
+        if repetidas:
+            datos['n_mas_1'] = [{'veces': veces, 'sql': forma[:300]} for forma, veces in repetidas[:3]]
+        nivel = logging.WARNING if repetidas or duracion_ms >= self.umbral_lenta else logging.INFO
+        logger_peticiones.log(nivel, json.dumps(datos, ensure_ascii=False))
+
+        if self.server_timing:
+            response['Server-Timing'] = (
+                f'sql;desc="{medicion.consultas} consultas";dur={sql_ms}, '
+                f'tpl;dur={plantillas_ms}, total;dur={duracion_ms}'
+            )
@@ -0,0 +1,61 @@
+"""
+Paginación con conteo estimado
+Portal Interno de Contrapartes – App Pacífico (Cotizador Web)
+
+Paginator.count ejecuta un SELECT COUNT(*) que en PostgreSQL recorre toda
+la tabla. En los listados sin filtros de tablas grandes (changelists del
+admin) se usa en su lugar la estimación que mantiene el planificador
+(pg_class.reltuples, actualizada por VACUUM/ANALYZE): la última página
+puede no coincidir exactamente, a cambio de un conteo instantáneo.
+
+Con filtros o búsquedas, en tablas pequeñas y en otros motores (SQLite en
+desarrollo y pruebas) se cuenta de forma exacta.
+
+Uso en el admin:
+    class ContraparteAdmin(admin.ModelAdmin):
+        paginator = PaginadorEstimado
+        show_full_result_count = False
+"""
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+# Por debajo de este número de filas estimadas se cuenta de forma exacta
+UMBRAL_ESTIMACION = 10000
+
+
+def estimar_filas(modelo, alias='default'):
+    """
+    Número aproximado de filas de la tabla de un modelo.
+
+    Returns:
+        int o None si el motor no ofrece estimación (o la tabla nunca se
+        ha analizado)
+    """
+    conexion = connections[alias]
+    if conexion.vendor != 'postgresql':
+        return None
+    with conexion.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [conexion.ops.quote_name(modelo._meta.db_table)],
+        )
+        fila = cursor.fetchone()
+    if fila is None or fila[0] < 0:
+        return None
+    return fila[0]
+
+
+class PaginadorEstimado(Paginator):
+    """Paginator que usa la estimación de PostgreSQL en listados sin filtros"""
+
+    @cached_property
+    def count(self):
+        lista = self.object_list
+        if isinstance(lista, QuerySet) and not lista.query.where:
+            estimado = estimar_filas(lista.model, lista.db)
+            if estimado is not None and estimado >= UMBRAL_ESTIMACION:
+                return estimado
+        return super().count
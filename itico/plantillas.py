@@ -0,0 +1,36 @@
+"""
+Backend de plantillas con medición de tiempo
+Portal Interno de Contrapartes – App Pacífico (Cotizador Web)
+
+Igual que django.template.backends.django.DjangoTemplates, pero cada
+render suma su duración a la medición de la petición en curso
+(itico.middleware.InstrumentacionMiddleware). Fuera de una petición
+instrumentada no agrega trabajo.
+"""
+
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as backend_django
+
+from .middleware import medicion_actual
+
+
+class Template(backend_django.Template):
+
+    def render(self, context=None, request=None):
+        medicion = medicion_actual()
+        if medicion is None:
+            return super().render(context, request)
+        with medicion.plantilla():
+            return super().render(context, request)
+
+
+class DjangoTemplates(backend_django.DjangoTemplates):
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            backend_django.reraise(exc, self)
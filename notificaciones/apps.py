@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class NotificacionesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'notificaciones'
+
+    def ready(self):
+        # Conectar signals de publicación en tiempo real
+        from . import signals  # noqa: F401
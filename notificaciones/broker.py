@@ -0,0 +1,202 @@
+"""
+Broker de notificaciones en tiempo real
+Portal Interno de Contrapartes – App Pacífico (Cotizador Web)
+
+Entrega a los usuarios conectados (Server-Sent Events) las notificaciones
+nuevas y los cambios en su contador de no leídas.
+
+FUNCIONAMIENTO:
+- Cada conexión SSE se suscribe con una cola asyncio por usuario; las
+  conexiones inactivas solo ocupan esa cola, no un hilo ni una consulta.
+- BrokerLocal: reparte los eventos dentro del proceso. Sirve cuando las
+  vistas que crean notificaciones y las conexiones SSE viven en el mismo
+  proceso ASGI (desarrollo, un solo worker).
+- BrokerRedis: publica en un canal de Redis (pub/sub). Cada proceso ASGI
+  mantiene UNA suscripción al canal y reparte localmente, de modo que los
+  eventos generados en workers WSGI o en Celery llegan a cualquier worker
+  ASGI sin abrir una conexión a Redis por cliente.
+
+Se usa BrokerRedis cuando NOTIFICACIONES_REDIS_URL está configurado.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+
+from .contadores import obtener_no_leidas
+
+logger = logging.getLogger(__name__)
+
+# Canal de Redis compartido por todos los procesos
+CANAL = 'itico:notificaciones'
+
+# Eventos pendientes por conexión; si un cliente no los consume se
+# descartan los más antiguos en lugar de acumular memoria
+TAMANO_COLA = 100
+
+
+class BrokerLocal:
+    """Reparte eventos a las colas de los usuarios conectados en este proceso"""
+
+    def __init__(self):
+        self._suscriptores = defaultdict(set)
+        self._loop = None
+
+    def suscribir(self, usuario_id):
+        """
+        Registra una conexión del usuario. Debe llamarse desde el event loop.
+
+        Returns:
+            asyncio.Queue: Cola por la que llegarán los eventos
+        """
+        self._loop = asyncio.get_running_loop()
+        cola = asyncio.Queue(maxsize=TAMANO_COLA)
+        self._suscriptores[usuario_id].add(cola)
+        return cola
+
+    def cancelar(self, usuario_id, cola):
+        """Elimina la cola de una conexión cerrada"""
+        colas = self._suscriptores.get(usuario_id)
+        if colas is not None:
+            colas.discard(cola)
+            if not colas:
+                del self._suscriptores[usuario_id]
+
+    @property
+    def conexiones(self):
+        return sum(len(colas) for colas in self._suscriptores.values())
+
+    def escuchando(self, usuario_id):
+        """Indica si vale la pena preparar eventos para el usuario"""
+        return usuario_id in self._suscriptores
+
+    def entregar(self, usuario_id, evento):
+        """Coloca el evento en las colas del usuario (en el event loop)"""
+        for cola in self._suscriptores.get(usuario_id, ()):
+            if cola.full():
+                cola.get_nowait()
+            cola.put_nowait(evento)
+
+    def publicar(self, usuario_id, tipo, datos):
+        """
+        Publica un evento para un usuario. Puede llamarse desde código
+        síncrono (vistas, signals, tareas) en cualquier hilo.
+        """
+        loop = self._loop
+        if loop is None or loop.is_closed() or usuario_id not in self._suscriptores:
+            return
+        evento = {'tipo': tipo, 'datos': datos}
+        try:
+            if _en_loop(loop):
+                self.entregar(usuario_id, evento)
+            else:
+                loop.call_soon_threadsafe(self.entregar, usuario_id, evento)
+        except RuntimeError:
+            # El loop se cerró entre la comprobación y la llamada
+            pass
+
+
+class BrokerRedis(BrokerLocal):
+    """
+    Publica en Redis y reparte localmente lo que llega por la suscripción.
+
+    La tarea de escucha se inicia con la primera conexión SSE del proceso y
+    se reconecta sola si Redis se reinicia.
+    """
+
+    def __init__(self, url):
+        super().__init__()
+        self.url = url
+        self._cliente = None
+        self._escucha = None
+        self._bloqueo = threading.Lock()
+
+    def _cliente_sync(self):
+        with self._bloqueo:
+            if self._cliente is None:
+                import redis
+                self._cliente = redis.Redis.from_url(self.url)
+            return self._cliente
+
+    def suscribir(self, usuario_id):
+        cola = super().suscribir(usuario_id)
+        if self._escucha is None or self._escucha.done():
+            self._escucha = self._loop.create_task(self._escuchar())
+        return cola
+
+    def escuchando(self, usuario_id):
+        # Las conexiones pueden estar en otro proceso
+        return True
+
+    def publicar(self, usuario_id, tipo, datos):
+        mensaje = json.dumps({'usuario': usuario_id, 'tipo': tipo, 'datos': datos}, default=str)
+        try:
+            self._cliente_sync().publish(CANAL, mensaje)
+        except Exception:
+            # La notificación ya está guardada; el cliente la verá al reconectar
+            logger.warning('No se pudo publicar la notificación en Redis', exc_info=True)
+
+    async def _escuchar(self):
+        import redis.asyncio as aioredis
+
+        espera = 1
+        while True:
+            cliente = aioredis.Redis.from_url(self.url)
+            try:
+                async with cliente.pubsub() as pubsub:
+                    await pubsub.subscribe(CANAL)
+                    espera = 1
+                    async for mensaje in pubsub.listen():
+                        if mensaje.get('type') != 'message':
+                            continue
+                        evento = json.loads(mensaje['data'])
+                        self.entregar(evento['usuario'], {'tipo': evento['tipo'], 'datos': evento['datos']})
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning('Suscripción de notificaciones a Redis interrumpida', exc_info=True)
+                await asyncio.sleep(espera)
+                espera = min(espera * 2, 30)
+            finally:
+                await cliente.aclose()
+
+
+def _en_loop(loop):
+    try:
+        return asyncio.get_running_loop() is loop
+    except RuntimeError:
+        return False
+
+
+_broker = None
+_broker_bloqueo = threading.Lock()
+
+
+def obtener_broker():
+    """Retorna el broker del proceso según la configuración"""
+    global _broker
+    if _broker is None:
+        with _broker_bloqueo:
+            if _broker is None:
+                url = getattr(settings, 'NOTIFICACIONES_REDIS_URL', '')
+                _broker = BrokerRedis(url) if url else BrokerLocal()
+    return _broker
+
+
+def publicar_notificacion(notificacion):
+    """Envía una notificación nueva y el contador actualizado a su usuario"""
+    broker = obtener_broker()
+    if broker.escuchando(notificacion.usuario_id):
+        broker.publicar(notificacion.usuario_id, 'notificacion', notificacion.como_diccionario())
+        publicar_contador(notificacion.usuario_id)
+
+
+def publicar_contador(usuario_id):
+    """Envía al usuario su número actual de notificaciones no leídas"""
+    broker = obtener_broker()
+    if broker.escuchando(usuario_id):
+        broker.publicar(usuario_id, 'contador', {'no_leidas': obtener_no_leidas(usuario_id)})
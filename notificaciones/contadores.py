@@ -0,0 +1,142 @@
+"""
+Contadores de notificaciones no leídas
+Portal Interno de Contrapartes – App Pacífico (Cotizador Web)
+
+El badge de notificaciones aparece en todas las páginas, por lo que el
+número de no leídas se mantiene en caché por usuario en lugar de contarlo
+en cada petición:
+
+- Crear una notificación incrementa el contador (cache.incr, atómico en
+  Redis y en la caché local).
+- Marcarla como leída lo decrementa; "marcar todas" lo deja en 0.
+- Cualquier otro cambio (edición en el admin, eliminación) lo invalida y
+  la siguiente lectura vuelve a contar.
+- Si la clave no existe, incr/decr no hacen nada: el valor se recalcula
+  con una consulta sobre el índice (usuario, leida) en la siguiente lectura.
+- reconciliar() recalcula los contadores con una sola consulta agrupada;
+  se ejecuta periódicamente para corregir cualquier desviación.
+"""
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Count
+
+# Tiempo máximo de vida del contador; la reconciliación lo renueva
+DURACION_CONTADOR = 60 * 60 * 24
+
+
+def _clave(usuario_id):
+    return f'notificaciones:no_leidas:{usuario_id}'
+
+
+def contar_no_leidas(usuario_id):
+    """Cuenta las no leídas en la base de datos (usa el índice usuario, leida)"""
+    from .models import Notificacion
+    return Notificacion.objects.filter(usuario_id=usuario_id, leida=False).count()
+
+
+def obtener_no_leidas(usuario_id):
+    """
+    Número de notificaciones no leídas del usuario, desde la caché.
+
+    Returns:
+        int: Contador del usuario (0 para usuarios anónimos)
+    """
+    if usuario_id is None:
+        return 0
+    valor = cache.get(_clave(usuario_id))
+    if valor is None:
+        valor = contar_no_leidas(usuario_id)
+        # add() no pisa un valor que otra petición haya guardado o incrementado
+        if not cache.add(_clave(usuario_id), valor, DURACION_CONTADOR):
+            valor = cache.get(_clave(usuario_id), valor)
+    return max(valor, 0)
+
+
+async def aobtener_no_leidas(usuario_id):
+    """Versión async de obtener_no_leidas para las vistas async (flujo SSE)"""
+    from .models import Notificacion
+
+    if usuario_id is None:
+        return 0
+    valor = await cache.aget(_clave(usuario_id))
+    if valor is None:
+        valor = await Notificacion.objects.filter(usuario_id=usuario_id, leida=False).acount()
+        if not await cache.aadd(_clave(usuario_id), valor, DURACION_CONTADOR):
+            valor = await cache.aget(_clave(usuario_id), valor)
+    return max(valor, 0)
+
+
+def incrementar(usuario_id, cantidad=1):
+    """Suma notificaciones nuevas al contador, si está en caché"""
+    try:
+        cache.incr(_clave(usuario_id), cantidad)
+    except ValueError:
+        # Sin contador en caché: se calculará en la siguiente lectura
+        pass
+
+
+def decrementar(usuario_id, cantidad=1):
+    """Resta notificaciones leídas del contador, si está en caché"""
+    try:
+        if cache.decr(_clave(usuario_id), cantidad) < 0:
+            invalidar(usuario_id)
+    except ValueError:
+        pass
+
+
+def establecer(usuario_id, valor):
+    cache.set(_clave(usuario_id), valor, DURACION_CONTADOR)
+
+
+def registrar_lectura(usuario_id, cantidad=1, todas=False):
+    """
+    Descuenta notificaciones leídas y publica el nuevo contador al usuario.
+
+    Args:
+        usuario_id: ID del usuario
+        cantidad: Notificaciones marcadas como leídas
+        todas: True si se marcaron todas (el contador queda en 0)
+    """
+    from .broker import publicar_contador
+
+    if todas:
+        establecer(usuario_id, 0)
+    else:
+        decrementar(usuario_id, cantidad)
+    publicar_contador(usuario_id)
+
+
+def invalidar(usuario_id):
+    cache.delete(_clave(usuario_id))
+
+
+def reconciliar(usuario_ids=None):
+    """
+    Recalcula los contadores contra la base de datos.
+
+    Args:
+        usuario_ids: IDs a reconciliar (todos los usuarios activos si es None)
+
+    Returns:
+        int: Número de contadores corregidos
+    """
+    from .models import Notificacion
+
+    if usuario_ids is None:
+        usuario_ids = list(User.objects.filter(is_active=True).values_list('pk', flat=True))
+    usuario_ids = list(usuario_ids)
+
+    conteos = dict(
+        Notificacion.objects.filter(usuario_id__in=usuario_ids, leida=False)
+        .values('usuario_id').annotate(total=Count('id')).values_list('usuario_id', 'total')
+    )
+    claves = {_clave(usuario_id): usuario_id for usuario_id in usuario_ids}
+    actuales = cache.get_many(list(claves))
+
+    nuevos = {clave: conteos.get(usuario_id, 0) for clave, usuario_id in claves.items()}
+    corregidos = sum(
+        1 for clave, valor in nuevos.items() if clave in actuales and actuales[clave] != valor
+    )
+    cache.set_many(nuevos, DURACION_CONTADOR)
+    return corregidos
@@ -0,0 +1,33 @@
+"""
+Procesadores de contexto de notificaciones
+Portal Interno de Contrapartes – App Pacífico (Cotizador Web)
+"""
+
+from functools import partial
+
+from django.core.handlers.asgi import ASGIRequest
+
+from .contadores import obtener_no_leidas
+
+
+def notificaciones_no_leidas(request):
+    """
+    Agrega `notificaciones_no_leidas` (contador del badge) a los templates.
+
+    Se entrega como callable: el template solo lo evalúa si lo usa y el
+    valor sale de la caché (ver contadores.py), sin consultar la base de
+    datos en cada página.
+
+    `notificaciones_tiempo_real` indica si la página puede abrir el flujo
+    SSE: solo cuando se sirve con ASGI. Con WSGI cada flujo ocuparía un
+    worker mientras la pestaña siga abierta, así que se consulta el
+    contador periódicamente.
+    """
+    tiempo_real = isinstance(request, ASGIRequest)
+    usuario = getattr(request, 'user', None)
+    if usuario is None or not usuario.is_authenticated:
+        return {'notificaciones_no_leidas': 0, 'notificaciones_tiempo_real': tiempo_real}
+    return {
+        'notificaciones_no_leidas': partial(obtener_no_leidas, usuario.pk),
+        'notificaciones_tiempo_real': tiempo_real,
+    }
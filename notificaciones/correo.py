@@ -0,0 +1,293 @@
+"""
+Envío de notificaciones por correo electrónico
+Portal Interno de Contrapartes – App Pacífico (Cotizador Web)
+
+Las notificaciones que el usuario quiere recibir por correo (según su
+ConfiguracionNotificacion) generan un HistorialNotificacion con
+canal='email' y estado='pendiente'. Las tareas periódicas los envían:
+
+- enviar_correos_pendientes(): un mensaje por notificación, para usuarios
+  sin resumen diario.
+- enviar_resumenes_diarios(): un solo mensaje por usuario que agrupa todas
+  sus notificaciones pendientes (email_resumen_diario=True).
+
+En ambos casos los pendientes se procesan por lotes. Una transacción corta
+reserva las filas del lote (reservado_hasta; en PostgreSQL con SKIP LOCKED
+para que dos workers no tomen las mismas) y se confirma antes de hablar con
+el servidor SMTP, de modo que no se mantienen bloqueos durante el envío.
+Luego el lote abre UNA conexión SMTP (get_connection) para todos sus
+mensajes y registra el resultado de cada fila con un solo bulk_update.
+
+Los errores transitorios (desconexiones, códigos 4xx) dejan la fila
+pendiente con un reintento programado; solo tras CORREOS_MAX_INTENTOS o
+ante un error permanente (5xx) se marca como fallida. Si el servidor no
+acepta la conexión se liberan las reservas y se propaga el error para que
+la tarea Celery se reintente (ver tasks.py).
+"""
+
+import logging
+import smtplib
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import ConfiguracionNotificacion, HistorialNotificacion
+
+logger = logging.getLogger(__name__)
+
+# Preferencia de ConfiguracionNotificacion que habilita el correo por tipo
+PREFERENCIAS_EMAIL = {
+    'dd_completada': 'email_dd_completada',
+    'dd_fallida': 'email_dd_completada',
+    'coincidencia_encontrada': 'email_coincidencias',
+    'dd_proxima': 'email_dd_proxima',
+    'dd_vencida': 'email_dd_proxima',
+}
+
+# Tiempo que un lote queda reservado para el worker que lo envía; si el
+# worker muere, las filas vuelven a la cola al vencer
+RESERVA_LOTE = timedelta(minutes=15)
+
+# Espera antes del primer reintento de un envío fallido; se duplica en cada intento
+ESPERA_REINTENTO = timedelta(minutes=5)
+
+
+def encolar_correos(notificaciones):
+    """
+    Crea los envíos por correo pendientes de las notificaciones dadas.
+
+    Args:
+        notificaciones: Notificaciones ya guardadas (con pk)
+
+    Returns:
+        int: Número de correos encolados
+    """
+    notificaciones = [n for n in notificaciones if n.tipo in PREFERENCIAS_EMAIL]
+    if not notificaciones:
+        return 0
+
+    usuarios = (
+        User.objects.filter(pk__in={n.usuario_id for n in notificaciones}, is_active=True)
+        .exclude(email='')
+        .select_related('config_notificaciones')
+    )
+    por_defecto = ConfiguracionNotificacion()
+    destinatarios = {}
+    for usuario in usuarios:
+        try:
+            destinatarios[usuario.pk] = (usuario.email, usuario.config_notificaciones)
+        except ConfiguracionNotificacion.DoesNotExist:
+            destinatarios[usuario.pk] = (usuario.email, por_defecto)
+
+    envios = []
+    for notificacion in notificaciones:
+        if notificacion.usuario_id not in destinatarios:
+            continue
+        email, configuracion = destinatarios[notificacion.usuario_id]
+        if getattr(configuracion, PREFERENCIAS_EMAIL[notificacion.tipo]):
+            envios.append(HistorialNotificacion(
+                notificacion=notificacion, canal='email', estado='pendiente', destinatario=email
+            ))
+    HistorialNotificacion.objects.bulk_create(envios)
+    return len(envios)
+
+
+def _url_absoluta(url):
+    if url and url.startswith('/'):
+        return settings.PORTAL_URL.rstrip('/') + url
+    return url
+
+
+def _mensaje_individual(envio):
+    notificacion = envio.notificacion
+    cuerpo = render_to_string('notificaciones/email/notificacion.txt', {
+        'notificacion': notificacion,
+        'url': _url_absoluta(notificacion.url_accion),
+    })
+    return EmailMessage(subject=f'[ITICO] {notificacion.titulo}', body=cuerpo, to=[envio.destinatario])
+
+
+def _mensaje_resumen(envios):
+    notificaciones = [envio.notificacion for envio in envios]
+    for notificacion in notificaciones:
+        notificacion.url_absoluta = _url_absoluta(notificacion.url_accion)
+    cuerpo = render_to_string('notificaciones/email/resumen_diario.txt', {
+        'notificaciones': notificaciones,
+        'fecha': timezone.localdate(),
+        'url_portal': settings.PORTAL_URL,
+    })
+    return EmailMessage(
+        subject=f'[ITICO] Resumen diario: {len(notificaciones)} notificaciones',
+        body=cuerpo,
+        to=[envios[0].destinatario],
+    )
+
+
+def _es_transitorio(exc):
+    """Indica si vale la pena reintentar el envío más tarde"""
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return all(400 <= codigo < 500 for codigo, _ in exc.recipients.values())
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return 400 <= exc.smtp_code < 500
+    if isinstance(exc, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(exc, smtplib.SMTPException):
+        return False
+    # Errores de red: timeouts, conexiones rechazadas o cortadas
+    return isinstance(exc, OSError)
+
+
+def _registrar_resultado(fila, exc, ahora):
+    """Actualiza la fila según el resultado del envío. Returns: estado final"""
+    if exc is None:
+        fila.estado, fila.mensaje_error, fila.fecha_entrega = 'enviada', None, ahora
+        fila.reservado_hasta = None
+        return fila.estado
+
+    fila.intentos += 1
+    fila.mensaje_error = str(exc)
+    if _es_transitorio(exc) and fila.intentos < settings.CORREOS_MAX_INTENTOS:
+        fila.reservado_hasta = ahora + ESPERA_REINTENTO * 2 ** (fila.intentos - 1)
+    else:
+        fila.estado, fila.reservado_hasta = 'fallida', None
+    return fila.estado
+
+
+def _reservar(queryset):
+    """
+    Reserva las filas para este worker en una transacción propia.
+
+    Args:
+        queryset: Pendientes a bloquear (ya ordenados y limitados)
+
+    Returns:
+        list: Filas reservadas, con su notificación
+    """
+    with transaction.atomic():
+        filas = list(queryset.select_related('notificacion').select_for_update(skip_locked=True, of=('self',)))
+        if filas:
+            reservado_hasta = timezone.now() + RESERVA_LOTE
+            for fila in filas:
+                fila.reservado_hasta = reservado_hasta
+            HistorialNotificacion.objects.bulk_update(filas, ['reservado_hasta'])
+    return filas
+
+
+def _liberar(filas):
+    HistorialNotificacion.objects.filter(pk__in=[fila.pk for fila in filas]).update(reservado_hasta=None)
+
+
+def _enviar_lote(grupos):
+    """
+    Envía los mensajes de un lote por una sola conexión SMTP.
+
+    Se llama fuera de cualquier transacción, con las filas ya reservadas.
+
+    Args:
+        grupos: Lista de (mensaje, filas de HistorialNotificacion que cubre)
+
+    Returns:
+        tuple: (enviados, fallidos)
+
+    Raises:
+        OSError: Si no se puede abrir la conexión SMTP (las filas se liberan)
+    """
+    filas = [fila for _, grupo in grupos for fila in grupo]
+    conexion = get_connection(fail_silently=False)
+    try:
+        conexion.open()
+    except OSError:
+        _liberar(filas)
+        raise
+
+    ahora = timezone.now()
+    enviados = fallidos = 0
+    try:
+        for mensaje, grupo in grupos:
+            try:
+                conexion.send_messages([mensaje])
+            except Exception as exc:
+                logger.warning(f'No se pudo enviar el correo a {mensaje.to}: {exc}')
+                error = exc
+            else:
+                error = None
+            estados = {_registrar_resultado(fila, error, ahora) for fila in grupo}
+            enviados += 'enviada' in estados
+            fallidos += 'fallida' in estados
+    finally:
+        try:
+            conexion.close()
+        except OSError as exc:
+            logger.warning(f'Error al cerrar la conexión SMTP: {exc}')
+
+    HistorialNotificacion.objects.bulk_update(
+        filas, ['estado', 'mensaje_error', 'fecha_entrega', 'intentos', 'reservado_hasta']
+    )
+    return enviados, fallidos
+
+
+def _pendientes():
+    """Envíos pendientes no reservados por otro worker ni esperando un reintento"""
+    return HistorialNotificacion.objects.filter(canal='email', estado='pendiente').filter(
+        Q(reservado_hasta__isnull=True) | Q(reservado_hasta__lte=timezone.now())
+    )
+
+
+def enviar_correos_pendientes(tamano_lote=None):
+    """
+    Envía un correo por notificación a los usuarios sin resumen diario.
+
+    Los envíos con error transitorio se reintentan en ejecuciones
+    posteriores (ver docstring del módulo).
+
+    Returns:
+        dict: Correos enviados y fallidos definitivamente
+    """
+    tamano_lote = tamano_lote or settings.CORREOS_POR_LOTE
+    total = {'enviados': 0, 'fallidos': 0}
+    while True:
+        pendientes = _pendientes().exclude(notificacion__usuario__config_notificaciones__email_resumen_diario=True)
+        filas = _reservar(pendientes.order_by('id')[:tamano_lote])
+        if not filas:
+            break
+        enviados, fallidos = _enviar_lote([(_mensaje_individual(fila), [fila]) for fila in filas])
+        total['enviados'] += enviados
+        total['fallidos'] += fallidos
+    return total
+
+
+def enviar_resumenes_diarios(tamano_lote=None):
+    """
+    Envía a cada usuario con resumen diario un solo correo con todas sus
+    notificaciones pendientes.
+
+    Returns:
+        dict: Resúmenes enviados y fallidos definitivamente
+    """
+    tamano_lote = tamano_lote or settings.CORREOS_POR_LOTE
+    pendientes = _pendientes().filter(notificacion__usuario__config_notificaciones__email_resumen_diario=True)
+    usuarios = sorted(set(pendientes.values_list('notificacion__usuario_id', flat=True)))
+
+    total = {'enviados': 0, 'fallidos': 0}
+    for inicio in range(0, len(usuarios), tamano_lote):
+        filas = _reservar(
+            pendientes.filter(notificacion__usuario_id__in=usuarios[inicio:inicio + tamano_lote])
+            .order_by('notificacion__usuario_id', 'notificacion__fecha_creacion')
+        )
+        grupos = []
+        for _, envios in groupby(filas, key=lambda fila: fila.notificacion.usuario_id):
+            envios = list(envios)
+            grupos.append((_mensaje_resumen(envios), envios))
+        if not grupos:
+            continue
+        enviados, fallidos = _enviar_lote(grupos)
+        total['enviados'] += enviados
+        total['fallidos'] += fallidos
+    return total
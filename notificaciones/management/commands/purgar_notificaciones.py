@@ -0,0 +1,65 @@
+"""
+Comando de gestión Django para aplicar la retención de notificaciones.
+Archiva por lotes las notificaciones antiguas según su tipo y elimina el
+archivo vencido (ver notificaciones/retencion.py).
+
+Ejemplos:
+    python manage.py purgar_notificaciones --simular
+    python manage.py purgar_notificaciones --lote 500 --pausa 0.5
+    python manage.py purgar_notificaciones --sin-archivo
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from notificaciones.retencion import TAMANO_LOTE_RETENCION, aplicar_retencion
+
+
+class Command(BaseCommand):
+    help = 'Archiva y purga notificaciones según NOTIFICACIONES_RETENCION_DIAS'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=TAMANO_LOTE_RETENCION,
+            help=f'Notificaciones por transacción (por defecto: {TAMANO_LOTE_RETENCION})'
+        )
+        parser.add_argument(
+            '--pausa',
+            type=float,
+            default=0,
+            help='Segundos de espera entre lotes para reducir la carga'
+        )
+        parser.add_argument(
+            '--sin-archivo',
+            action='store_true',
+            help='Eliminar sin copiar a NotificacionArchivada'
+        )
+        parser.add_argument(
+            '--simular',
+            action='store_true',
+            help='Solo mostrar cuántos registros se procesarían'
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        resultado = aplicar_retencion(
+            tamano_lote=options['lote'],
+            pausa=options['pausa'],
+            archivar=not options['sin_archivo'],
+            simular=options['simular'],
+        )
+        duracion = time.monotonic() - inicio
+
+        accion = 'Se procesarían' if options['simular'] else 'Procesadas'
+        for tipo, total in resultado['notificaciones'].items():
+            self.stdout.write(f'- {tipo}: {total}')
+        total = sum(resultado['notificaciones'].values())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'\n{accion} {total} notificaciones ({duracion:.2f}s)\n'
+                f'- Archivo eliminado: {resultado["archivo_eliminado"]}'
+            )
+        )
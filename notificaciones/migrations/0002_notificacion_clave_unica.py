@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-19 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notificaciones', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificacion',
+            name='clave_unica',
+            field=models.CharField(blank=True, help_text='Ej: dd_proxima:<usuario>:<contraparte>:<fecha DD>', max_length=150, null=True, unique=True, verbose_name='Clave única'),
+        ),
+    ]
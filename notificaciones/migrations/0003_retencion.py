@@ -0,0 +1,61 @@
+# Generated by Django 5.0.7 on 2026-10-19 15:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notificaciones', '0002_notificacion_clave_unica'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificacionArchivada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notificacion_id', models.BigIntegerField(db_index=True, verbose_name='ID original')),
+                ('usuario_id', models.IntegerField(db_index=True, verbose_name='ID de usuario')),
+                ('tipo', models.CharField(choices=[('dd_completada', 'Debida Diligencia Completada'), ('dd_fallida', 'Debida Diligencia Fallida'), ('coincidencia_encontrada', 'Coincidencia Encontrada'), ('dd_proxima', 'Debida Diligencia Próxima a Vencer'), ('dd_vencida', 'Debida Diligencia Vencida'), ('revision_requerida', 'Revisión Requerida'), ('aprobacion_pendiente', 'Aprobación Pendiente'), ('sistema', 'Notificación del Sistema'), ('recordatorio', 'Recordatorio')], max_length=30, verbose_name='Tipo de notificación')),
+                ('titulo', models.CharField(max_length=255, verbose_name='Título')),
+                ('mensaje', models.TextField(verbose_name='Mensaje')),
+                ('prioridad', models.CharField(choices=[('baja', 'Baja'), ('normal', 'Normal'), ('alta', 'Alta'), ('urgente', 'Urgente')], max_length=20, verbose_name='Prioridad')),
+                ('leida', models.BooleanField(verbose_name='¿Leída?')),
+                ('fecha_creacion', models.DateTimeField(verbose_name='Fecha de creación')),
+                ('fecha_lectura', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de lectura')),
+                ('contraparte_id', models.PositiveIntegerField(blank=True, null=True, verbose_name='ID de Contraparte')),
+                ('miembro_id', models.PositiveIntegerField(blank=True, null=True, verbose_name='ID de Miembro')),
+                ('debida_diligencia_id', models.PositiveIntegerField(blank=True, null=True, verbose_name='ID de Debida Diligencia')),
+                ('url_accion', models.CharField(blank=True, max_length=200, null=True, verbose_name='URL de acción')),
+                ('historial', models.JSONField(default=list, help_text='Lista de envíos (canal, estado, destinatario, fechas, error)', verbose_name='Historial de envíos')),
+                ('fecha_archivo', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Fecha de archivo')),
+            ],
+            options={
+                'verbose_name': 'Notificación Archivada',
+                'verbose_name_plural': 'Notificaciones Archivadas',
+                'ordering': ['-fecha_creacion'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='historialnotificacion',
+            index=models.Index(fields=['fecha_envio'], name='notificacio_fecha_e_cc4e41_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='historialnotificacion',
+            index=models.Index(fields=['estado'], name='notificacio_estado_9529e5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='historialnotificacion',
+            index=models.Index(condition=models.Q(('estado', 'pendiente')), fields=['canal', 'id'], name='hist_pendientes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(condition=models.Q(('leida', False)), fields=['usuario', '-fecha_creacion'], name='notif_no_leidas_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['tipo', 'fecha_creacion'], name='notif_retencion_idx'),
+        ),
+    ]
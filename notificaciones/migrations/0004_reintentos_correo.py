@@ -0,0 +1,23 @@
+# Generated by Django 5.0.7 on 2026-10-19 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notificaciones', '0003_retencion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historialnotificacion',
+            name='intentos',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Intentos fallidos'),
+        ),
+        migrations.AddField(
+            model_name='historialnotificacion',
+            name='reservado_hasta',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Reservado hasta'),
+        ),
+    ]
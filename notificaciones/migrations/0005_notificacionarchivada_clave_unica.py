@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-19 16:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notificaciones', '0004_reintentos_correo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificacionarchivada',
+            name='clave_unica',
+            field=models.CharField(blank=True, db_index=True, max_length=150, null=True, verbose_name='Clave única'),
+        ),
+    ]
@@ -6,6 +6,8 @@ ESTRUCTURA DE MODELOS:
 1. Notificacion: Notificaciones del sistema con diferentes tipos y prioridades
 2. ConfiguracionNotificacion: Configuraciones personalizadas por usuario
 3. HistorialNotificacion: Auditoría de notificaciones enviadas
+4. NotificacionArchivada: Notificaciones retiradas de la tabla principal
+   por la política de retención (ver retencion.py)
 
 FUNCIONALIDADES PRINCIPALES:
 - Sistema de notificaciones multi-canal (sistema, email, SMS, webhook)
@@ -16,10 +18,12 @@ FUNCIONALIDADES PRINCIPALES:
 - Enlaces a objetos relacionados (contrapartes, miembros, DD)
 """
 
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 
+from .contadores import registrar_lectura
+
 
 # =============================================================================
 # MODELO PRINCIPAL DE NOTIFICACIONES
@@ -120,6 +124,16 @@ class Notificacion(models.Model):
         verbose_name="URL de acción"
     )
     
+    # Identifica notificaciones generadas automáticamente para no repetirlas
+    clave_unica = models.CharField(
+        max_length=150,
+        unique=True,
+        null=True,
+        blank=True,
+        verbose_name="Clave única",
+        help_text="Ej: dd_proxima:<usuario>:<contraparte>:<fecha DD>"
+    )
+    
     class Meta:
         verbose_name = "Notificación"
         verbose_name_plural = "Notificaciones"
@@ -128,6 +142,14 @@ class Notificacion(models.Model):
             models.Index(fields=['usuario', 'leida']),
             models.Index(fields=['fecha_creacion']),
             models.Index(fields=['tipo']),
+            # Solo las no leídas: se mantiene pequeño aunque la tabla crezca
+            models.Index(
+                fields=['usuario', '-fecha_creacion'],
+                name='notif_no_leidas_idx',
+                condition=models.Q(leida=False),
+            ),
+            # Selección de registros vencidos por la retención
+            models.Index(fields=['tipo', 'fecha_creacion'], name='notif_retencion_idx'),
         ]
     
     def __str__(self):
@@ -138,12 +160,38 @@ class Notificacion(models.Model):
         Marca la notificación como leída y actualiza la fecha de lectura.
         
         Actualiza los campos 'leida' y 'fecha_lectura' solo si la notificación
-        no estaba previamente marcada como leída.
+        no estaba previamente marcada como leída. La actualización es
+        condicional (leida=False), de modo que dos peticiones simultáneas
+        solo descuentan una vez el contador de no leídas.
+        """
+        if self.leida:
+            return
+        self.leida = True
+        self.fecha_lectura = timezone.now()
+        actualizadas = Notificacion.objects.filter(pk=self.pk, leida=False).update(
+            leida=True, fecha_lectura=self.fecha_lectura
+        )
+        if actualizadas:
+            transaction.on_commit(lambda: registrar_lectura(self.usuario_id, actualizadas))
+    
+    def como_diccionario(self):
+        """
+        Representación JSON de la notificación para la API y los eventos en tiempo real.
+        
+        Returns:
+            dict: Datos básicos de la notificación
         """
-        if not self.leida:
-            self.leida = True
-            self.fecha_lectura = timezone.now()
-            self.save(update_fields=['leida', 'fecha_lectura'])
+        return {
+            'id': self.pk,
+            'tipo': self.tipo,
+            'titulo': self.titulo,
+            'mensaje': self.mensaje,
+            'prioridad': self.prioridad,
+            'leida': self.leida,
+            'url_accion': self.url_accion,
+            'fecha_creacion': self.fecha_creacion.isoformat() if self.fecha_creacion else None,
+            'hace_cuanto': self.hace_cuanto,
+        }
     
     @property
     def hace_cuanto(self):
@@ -311,11 +359,75 @@ class HistorialNotificacion(models.Model):
         null=True,
         verbose_name="Mensaje de error"
     )
+    intentos = models.PositiveSmallIntegerField(default=0, verbose_name="Intentos fallidos")
+    # Un envío pendiente con esta fecha en el futuro está reservado por un
+    # worker o esperando su próximo reintento (ver correo.py)
+    reservado_hasta = models.DateTimeField(null=True, blank=True, verbose_name="Reservado hasta")
     
     class Meta:
         verbose_name = "Historial de Notificación"
         verbose_name_plural = "Historial de Notificaciones"
         ordering = ['-fecha_envio']
+        indexes = [
+            models.Index(fields=['fecha_envio']),
+            models.Index(fields=['estado']),
+            # Cola de correos pendientes (ver correo.py)
+            models.Index(
+                fields=['canal', 'id'],
+                name='hist_pendientes_idx',
+                condition=models.Q(estado='pendiente'),
+            ),
+        ]
     
     def __str__(self):
         return f"{self.canal} - {self.notificacion.titulo} - {self.estado}"
+
+
+# =============================================================================
+# ARCHIVO DE NOTIFICACIONES
+# =============================================================================
+
+class NotificacionArchivada(models.Model):
+    """
+    Copia de una notificación retirada de la tabla principal.
+    
+    La política de retención (retencion.py) mueve aquí las notificaciones
+    antiguas junto con su historial de envíos, de modo que Notificacion y
+    HistorialNotificacion solo contengan datos recientes y sus índices se
+    mantengan pequeños. Los registros no tienen claves foráneas: el archivo
+    se conserva aunque se eliminen usuarios o contrapartes.
+    """
+    notificacion_id = models.BigIntegerField(verbose_name="ID original", db_index=True)
+    usuario_id = models.IntegerField(verbose_name="ID de usuario", db_index=True)
+    tipo = models.CharField(max_length=30, choices=Notificacion.TIPOS, verbose_name="Tipo de notificación")
+    titulo = models.CharField(max_length=255, verbose_name="Título")
+    mensaje = models.TextField(verbose_name="Mensaje")
+    prioridad = models.CharField(max_length=20, choices=Notificacion.PRIORIDADES, verbose_name="Prioridad")
+    leida = models.BooleanField(verbose_name="¿Leída?")
+    fecha_creacion = models.DateTimeField(verbose_name="Fecha de creación")
+    fecha_lectura = models.DateTimeField(null=True, blank=True, verbose_name="Fecha de lectura")
+    contraparte_id = models.PositiveIntegerField(null=True, blank=True, verbose_name="ID de Contraparte")
+    miembro_id = models.PositiveIntegerField(null=True, blank=True, verbose_name="ID de Miembro")
+    debida_diligencia_id = models.PositiveIntegerField(
+        null=True, blank=True, verbose_name="ID de Debida Diligencia"
+    )
+    url_accion = models.CharField(max_length=200, blank=True, null=True, verbose_name="URL de acción")
+    # Se conserva para que los recordatorios archivados no se vuelvan a generar
+    # (ver recordatorios.py)
+    clave_unica = models.CharField(
+        max_length=150, null=True, blank=True, db_index=True, verbose_name="Clave única"
+    )
+    historial = models.JSONField(
+        default=list,
+        verbose_name="Historial de envíos",
+        help_text="Lista de envíos (canal, estado, destinatario, fechas, error)"
+    )
+    fecha_archivo = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de archivo", db_index=True)
+    
+    class Meta:
+        verbose_name = "Notificación Archivada"
+        verbose_name_plural = "Notificaciones Archivadas"
+        ordering = ['-fecha_creacion']
+    
+    def __str__(self):
+        return f"{self.titulo} (archivada)"
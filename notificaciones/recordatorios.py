@@ -0,0 +1,206 @@
+"""
+Recordatorios de vencimiento de debida diligencia
+Portal Interno de Contrapartes – App Pacífico (Cotizador Web)
+
+Genera las notificaciones dd_proxima y dd_vencida para cada usuario según
+su ConfiguracionNotificacion (dias_aviso_dd y notif_dd_proxima; los
+usuarios sin configuración usan los valores por defecto del modelo).
+
+FUNCIONAMIENTO:
+- Una sola consulta calcula todos los pares (usuario, contraparte) cuya
+  fecha de próxima DD cruza el umbral personal del usuario, excluyendo con
+  NOT EXISTS los pares ya notificados.
+- Cada notificación lleva una clave_unica (tipo, usuario, contraparte y
+  fecha de DD). La restricción UNIQUE impide duplicados aunque la tarea se
+  ejecute dos veces, y una DD renovada (fecha nueva) vuelve a avisar. El
+  NOT EXISTS revisa también NotificacionArchivada, para que la retención
+  (retencion.py) no haga repetir los avisos ya archivados.
+- En PostgreSQL cada ejecución toma un advisory lock de transacción. Si
+  otra ejecución lo tiene (beat solapado, ejecución manual), esta termina
+  sin hacer nada: de otro modo ambas pasarían el NOT EXISTS y la segunda
+  fallaría con la restricción UNIQUE al insertar.
+- Los resultados se recorren por lotes e insertan con bulk_create, junto
+  con su HistorialNotificacion (y el envío por correo pendiente para los
+  usuarios que lo tienen activado); como bulk_create no envía post_save,
+  los contadores y el canal en tiempo real se actualizan por usuario al
+  final.
+"""
+
+import logging
+import zlib
+from collections import Counter
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from contrapartes.models import Contraparte
+
+from . import contadores
+from .broker import publicar_contador
+from .correo import encolar_correos
+from .models import ConfiguracionNotificacion, HistorialNotificacion, Notificacion, NotificacionArchivada
+
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE_RECORDATORIOS = 1000
+
+# Días restantes a partir de los cuales el aviso se marca como prioridad alta
+DIAS_PRIORIDAD_ALTA = 7
+
+# Clave del advisory lock que serializa las ejecuciones (PostgreSQL)
+BLOQUEO_RECORDATORIOS = zlib.crc32(b'notificaciones.generar_recordatorios_dd')
+
+
+def _tomar_bloqueo(cursor):
+    """
+    Toma el bloqueo de la ejecución hasta el fin de la transacción.
+
+    Returns:
+        bool: False si otra ejecución lo tiene. En otros motores siempre
+        True (SQLite ya serializa las escrituras con el bloqueo de la base)
+    """
+    if connection.vendor != 'postgresql':
+        return True
+    cursor.execute('SELECT pg_try_advisory_xact_lock(%s)', [BLOQUEO_RECORDATORIOS])
+    return cursor.fetchone()[0]
+
+
+def _fecha_limite_sql():
+    """Fecha de la DD + días de aviso del usuario, según el motor de base de datos"""
+    if connection.vendor == 'sqlite':
+        return "date(%s, '+' || COALESCE(cfg.dias_aviso_dd, %s) || ' days')"
+    return 'CAST(%s AS date) + COALESCE(cfg.dias_aviso_dd, %s)'
+
+
+def _consulta_pendientes(hoy):
+    """
+    SQL y parámetros de los recordatorios pendientes.
+
+    Returns:
+        tuple: (sql, params). Cada fila es (tipo, usuario_id, username,
+        contraparte_id, nombre, fecha_proxima_dd, clave_unica)
+    """
+    opciones_config = ConfiguracionNotificacion._meta
+    defecto_dias = opciones_config.get_field('dias_aviso_dd').default
+    defecto_activo = opciones_config.get_field('notif_dd_proxima').default
+
+    tipo = "CASE WHEN c.fecha_proxima_dd < %s THEN 'dd_vencida' ELSE 'dd_proxima' END"
+    clave = (
+        f"({tipo}) || ':' || CAST(u.id AS TEXT) || ':' || CAST(c.id AS TEXT)"
+        " || ':' || CAST(c.fecha_proxima_dd AS TEXT)"
+    )
+    sql = f"""
+        SELECT pendientes.* FROM (
+            SELECT {tipo} AS tipo, u.id AS usuario_id, u.username, c.id AS contraparte_id,
+                   c.nombre, c.fecha_proxima_dd, {clave} AS clave_unica
+            FROM {User._meta.db_table} u
+            LEFT JOIN {opciones_config.db_table} cfg ON cfg.usuario_id = u.id
+            INNER JOIN {Contraparte._meta.db_table} c
+                ON c.fecha_proxima_dd IS NOT NULL AND c.fecha_proxima_dd <= {_fecha_limite_sql()}
+            WHERE u.is_active AND COALESCE(cfg.notif_dd_proxima, %s)
+        ) pendientes
+        WHERE NOT EXISTS (
+            SELECT 1 FROM {Notificacion._meta.db_table} n WHERE n.clave_unica = pendientes.clave_unica
+        ) AND NOT EXISTS (
+            SELECT 1 FROM {NotificacionArchivada._meta.db_table} a WHERE a.clave_unica = pendientes.clave_unica
+        )
+    """
+    params = [hoy, hoy, hoy, defecto_dias, defecto_activo]
+    return sql, params
+
+
+def _construir_notificacion(fila, hoy, urls):
+    tipo, usuario_id, _, contraparte_id, nombre, fecha_dd, clave = fila
+    if isinstance(fecha_dd, str):
+        # SQLite devuelve las fechas como texto en consultas SQL directas
+        fecha_dd = date.fromisoformat(fecha_dd)
+    dias = (fecha_dd - hoy).days
+
+    if contraparte_id not in urls:
+        urls[contraparte_id] = reverse('contrapartes:detalle', kwargs={'pk': contraparte_id})
+
+    if tipo == 'dd_vencida':
+        titulo = 'Debida diligencia vencida'
+        mensaje = f'La debida diligencia de {nombre} venció el {fecha_dd:%d/%m/%Y}.'
+        prioridad = 'urgente'
+    else:
+        titulo = 'Debida diligencia próxima a vencer'
+        mensaje = (
+            f'La debida diligencia de {nombre} vence el {fecha_dd:%d/%m/%Y} '
+            f'({dias} día{"s" if dias != 1 else ""}).'
+        )
+        prioridad = 'alta' if dias <= DIAS_PRIORIDAD_ALTA else 'normal'
+
+    return Notificacion(
+        usuario_id=usuario_id,
+        tipo=tipo,
+        titulo=titulo,
+        mensaje=mensaje,
+        prioridad=prioridad,
+        contraparte_id=contraparte_id,
+        url_accion=urls[contraparte_id],
+        clave_unica=clave,
+    )
+
+
+def generar_recordatorios_dd(hoy=None, tamano_lote=TAMANO_LOTE_RECORDATORIOS):
+    """
+    Crea las notificaciones de DD próxima a vencer y vencida que falten.
+
+    Args:
+        hoy: Fecha de referencia (por defecto la fecha actual)
+        tamano_lote: Filas leídas e insertadas por lote
+
+    Returns:
+        dict: Notificaciones creadas por tipo y usuarios notificados
+    """
+    hoy = hoy or timezone.localdate()
+    sql, params = _consulta_pendientes(hoy)
+    por_usuario = Counter()
+    por_tipo = Counter()
+    urls = {}
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            if not _tomar_bloqueo(cursor):
+                logger.info('Recordatorios de DD en curso en otra ejecución; se omite esta')
+                return {'dd_proxima': 0, 'dd_vencida': 0, 'usuarios': 0}
+            cursor.execute(sql, params)
+            while True:
+                filas = cursor.fetchmany(tamano_lote)
+                if not filas:
+                    break
+
+                notificaciones = Notificacion.objects.bulk_create(
+                    [_construir_notificacion(fila, hoy, urls) for fila in filas]
+                )
+                destinatarios = {fila[1]: fila[2] for fila in filas}
+                HistorialNotificacion.objects.bulk_create([
+                    HistorialNotificacion(
+                        notificacion=notificacion,
+                        canal='sistema',
+                        estado='enviada',
+                        destinatario=destinatarios[notificacion.usuario_id],
+                    )
+                    for notificacion in notificaciones
+                ])
+                encolar_correos(notificaciones)
+                por_usuario.update(notificacion.usuario_id for notificacion in notificaciones)
+                por_tipo.update(notificacion.tipo for notificacion in notificaciones)
+
+        def actualizar_contadores():
+            for usuario_id, cantidad in por_usuario.items():
+                contadores.incrementar(usuario_id, cantidad)
+                publicar_contador(usuario_id)
+        transaction.on_commit(actualizar_contadores)
+
+    resultado = {
+        'dd_proxima': por_tipo['dd_proxima'],
+        'dd_vencida': por_tipo['dd_vencida'],
+        'usuarios': len(por_usuario),
+    }
+    logger.info(f'Recordatorios de DD generados: {resultado}')
+    return resultado
@@ -0,0 +1,150 @@
+"""
+Retención y archivo de notificaciones
+Portal Interno de Contrapartes – App Pacífico (Cotizador Web)
+
+Las notificaciones más antiguas que la retención de su tipo
+(NOTIFICACIONES_RETENCION_DIAS) se mueven a NotificacionArchivada junto con
+su historial de envíos, y el archivo se elimina definitivamente pasados
+NOTIFICACIONES_RETENCION_ARCHIVO_DIAS.
+
+FUNCIONAMIENTO:
+- Se trabaja por lotes de IDs (índice tipo, fecha_creacion) y cada lote es
+  una transacción corta: copiar al archivo, borrar historial, borrar
+  notificaciones. Nunca se bloquea la tabla completa ni se mantiene una
+  transacción abierta durante toda la purga.
+- Entre lotes puede hacerse una pausa para no saturar la base de datos.
+- Las notificaciones con correos pendientes se conservan hasta enviarse.
+- Los recordatorios con clave_unica (dd_proxima, dd_vencida) conservan la
+  clave en el archivo, donde recordatorios.py también la busca para no
+  volver a generarlos. Sin archivo (archivar=False) no se eliminan.
+- Si se archivan notificaciones no leídas, se invalida el contador en
+  caché de sus usuarios.
+"""
+
+import logging
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import contadores
+from .models import HistorialNotificacion, Notificacion, NotificacionArchivada
+
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE_RETENCION = 1000
+
+CAMPOS_ARCHIVO = [
+    'usuario_id', 'tipo', 'titulo', 'mensaje', 'prioridad', 'leida', 'fecha_creacion',
+    'fecha_lectura', 'contraparte_id', 'miembro_id', 'debida_diligencia_id', 'url_accion', 'clave_unica',
+]
+
+
+def limites_retencion(ahora=None):
+    """
+    Fecha límite por tipo según NOTIFICACIONES_RETENCION_DIAS.
+
+    Returns:
+        dict: {tipo: datetime}; las notificaciones anteriores se archivan
+    """
+    ahora = ahora or timezone.now()
+    retencion = settings.NOTIFICACIONES_RETENCION_DIAS
+    por_defecto = retencion.get('default', 365)
+    return {
+        tipo: ahora - timedelta(days=retencion.get(tipo, por_defecto))
+        for tipo, _ in Notificacion.TIPOS
+    }
+
+
+def _archivar_lote(ids, archivar):
+    """Mueve un lote de notificaciones al archivo en una transacción corta"""
+    with transaction.atomic():
+        notificaciones = list(Notificacion.objects.filter(pk__in=ids).values('id', *CAMPOS_ARCHIVO))
+        if archivar:
+            historial = defaultdict(list)
+            for envio in HistorialNotificacion.objects.filter(notificacion_id__in=ids).values(
+                'notificacion_id', 'canal', 'estado', 'destinatario', 'fecha_envio',
+                'fecha_entrega', 'mensaje_error', 'intentos',
+            ):
+                historial[envio.pop('notificacion_id')].append({
+                    clave: valor.isoformat() if hasattr(valor, 'isoformat') else valor
+                    for clave, valor in envio.items()
+                })
+            NotificacionArchivada.objects.bulk_create([
+                NotificacionArchivada(
+                    notificacion_id=datos['id'],
+                    historial=historial.get(datos['id'], []),
+                    **{campo: datos[campo] for campo in CAMPOS_ARCHIVO},
+                )
+                for datos in notificaciones
+            ])
+        HistorialNotificacion.objects.filter(notificacion_id__in=ids).delete()
+        Notificacion.objects.filter(pk__in=ids).delete()
+
+    return notificaciones
+
+
+def aplicar_retencion(ahora=None, tamano_lote=TAMANO_LOTE_RETENCION, pausa=0, archivar=True, simular=False):
+    """
+    Archiva (o elimina) las notificaciones vencidas por lotes.
+
+    Args:
+        ahora: Fecha de referencia
+        tamano_lote: Notificaciones por transacción
+        pausa: Segundos de espera entre lotes
+        archivar: False para eliminar sin copiar al archivo (excepto los
+            recordatorios con clave_unica)
+        simular: Solo contar, sin modificar nada
+
+    Returns:
+        dict: Notificaciones procesadas por tipo y archivo eliminado
+    """
+    ahora = ahora or timezone.now()
+    resultado = {}
+    usuarios_no_leidas = set()
+
+    for tipo, limite in limites_retencion(ahora).items():
+        vencidas = (
+            Notificacion.objects.filter(tipo=tipo, fecha_creacion__lt=limite)
+            .exclude(historial__canal='email', historial__estado='pendiente')
+        )
+        if not archivar:
+            vencidas = vencidas.filter(clave_unica__isnull=True)
+        if simular:
+            total = vencidas.count()
+        else:
+            total = 0
+            while True:
+                ids = list(vencidas.order_by('id').values_list('id', flat=True)[:tamano_lote])
+                if not ids:
+                    break
+                procesadas = _archivar_lote(ids, archivar)
+                usuarios_no_leidas.update(datos['usuario_id'] for datos in procesadas if not datos['leida'])
+                total += len(procesadas)
+                if pausa:
+                    time.sleep(pausa)
+        if total:
+            resultado[tipo] = total
+
+    for usuario_id in usuarios_no_leidas:
+        contadores.invalidar(usuario_id)
+
+    limite_archivo = ahora - timedelta(days=settings.NOTIFICACIONES_RETENCION_ARCHIVO_DIAS)
+    antiguas = NotificacionArchivada.objects.filter(fecha_archivo__lt=limite_archivo)
+    if simular:
+        eliminadas_archivo = antiguas.count()
+    else:
+        eliminadas_archivo = 0
+        while True:
+            ids = list(antiguas.order_by('id').values_list('id', flat=True)[:tamano_lote])
+            if not ids:
+                break
+            eliminadas_archivo += NotificacionArchivada.objects.filter(pk__in=ids).delete()[0]
+            if pausa:
+                time.sleep(pausa)
+
+    logger.info(f'Retención de notificaciones: {resultado}, archivo eliminado: {eliminadas_archivo}')
+    return {'notificaciones': resultado, 'archivo_eliminado': eliminadas_archivo}
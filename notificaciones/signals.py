@@ -0,0 +1,49 @@
+"""
+Signals de la aplicación de notificaciones
+Portal Interno de Contrapartes – App Pacífico (Cotizador Web)
+
+Mantienen el contador de no leídas en caché (ver contadores.py) y
+publican en tiempo real (ver broker.py) las notificaciones nuevas y los
+cambios de estado, una vez confirmada la transacción que los guarda.
+Se conectan en NotificacionesConfig.ready().
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import contadores
+from .broker import publicar_contador, publicar_notificacion
+from .correo import PREFERENCIAS_EMAIL, encolar_correos
+from .models import Notificacion
+
+
+@receiver(post_save, sender=Notificacion)
+def publicar_cambio_notificacion(sender, instance, created, **kwargs):
+    """
+    Incrementa el contador, envía la notificación nueva y encola su correo
+    si el usuario lo tiene activado. Otras ediciones (admin, formularios)
+    pueden cambiar el estado de lectura, por lo que invalidan el contador
+    en lugar de ajustarlo.
+    """
+    if created:
+        def al_confirmar():
+            if not instance.leida:
+                contadores.incrementar(instance.usuario_id)
+            publicar_notificacion(instance)
+            if instance.tipo in PREFERENCIAS_EMAIL:
+                encolar_correos([instance])
+    else:
+        def al_confirmar():
+            contadores.invalidar(instance.usuario_id)
+            publicar_contador(instance.usuario_id)
+    transaction.on_commit(al_confirmar)
+
+
+@receiver(post_delete, sender=Notificacion)
+def publicar_eliminacion_notificacion(sender, instance, **kwargs):
+    """Recalcula el contador del usuario al eliminar una notificación"""
+    def al_confirmar():
+        contadores.invalidar(instance.usuario_id)
+        publicar_contador(instance.usuario_id)
+    transaction.on_commit(al_confirmar)
@@ -0,0 +1,46 @@
+"""
+Tareas Celery de notificaciones
+Portal Interno de Contrapartes – App Pacífico (Cotizador Web)
+"""
+
+from celery import shared_task
+
+from .contadores import reconciliar
+from .correo import enviar_correos_pendientes, enviar_resumenes_diarios
+from .recordatorios import generar_recordatorios_dd
+from .retencion import aplicar_retencion
+
+
+@shared_task(name='notificaciones.reconciliar_contadores')
+def reconciliar_contadores_task():
+    """Tarea periódica: corrige los contadores de no leídas en caché"""
+    return reconciliar()
+
+
+@shared_task(name='notificaciones.generar_recordatorios_dd')
+def generar_recordatorios_dd_task():
+    """Tarea periódica: avisos de DD próxima a vencer y vencida"""
+    return generar_recordatorios_dd()
+
+
+# Si el servidor SMTP no acepta la conexión, la tarea se reintenta con
+# espera creciente en lugar de esperar a la próxima ejecución programada
+REINTENTOS_SMTP = {'autoretry_for': (OSError,), 'retry_backoff': 60, 'max_retries': 3}
+
+
+@shared_task(name='notificaciones.enviar_correos_pendientes', **REINTENTOS_SMTP)
+def enviar_correos_pendientes_task():
+    """Tarea periódica: envía por lotes los correos de notificaciones pendientes"""
+    return enviar_correos_pendientes()
+
+
+@shared_task(name='notificaciones.enviar_resumenes_diarios', **REINTENTOS_SMTP)
+def enviar_resumenes_diarios_task():
+    """Tarea periódica: envía el resumen diario por correo"""
+    return enviar_resumenes_diarios()
+
+
+@shared_task(name='notificaciones.aplicar_retencion')
+def aplicar_retencion_task():
+    """Tarea periódica: archiva y purga notificaciones antiguas"""
+    return aplicar_retencion()
@@ -1,3 +1,303 @@
-from django.test import TestCase
+import asyncio
+import smtplib
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from . import contadores
+from .broker import obtener_broker, publicar_notificacion
+from .context_processors import notificaciones_no_leidas
+from .correo import enviar_correos_pendientes, enviar_resumenes_diarios
+from .models import ConfiguracionNotificacion, HistorialNotificacion, Notificacion, NotificacionArchivada
+from .recordatorios import generar_recordatorios_dd
+from .retencion import aplicar_retencion
+
+
+class NotificacionesTiempoRealTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='testuser', password='testpass123')
+        Notificacion.objects.create(usuario=cls.user, tipo='sistema', titulo='Uno', mensaje='x')
+        Notificacion.objects.create(usuario=cls.user, tipo='sistema', titulo='Dos', mensaje='x', leida=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_contar_y_listar_no_leidas(self):
+        """Test that the unread APIs return the user's unread notifications"""
+        self.client.force_login(self.user)
+
+        self.assertEqual(self.client.get(reverse('notificaciones:api_contar')).json(), {'count': 1})
+        datos = self.client.get(reverse('notificaciones:api_no_leidas')).json()
+        self.assertEqual([n['titulo'] for n in datos['unread']], ['Uno'])
+
+    async def test_broker_entrega_eventos_publicados_desde_otro_hilo(self):
+        """Test that a notification published from sync code reaches the user's queue"""
+        broker = obtener_broker()
+        cola = broker.suscribir(self.user.pk)
+        try:
+            notificacion = await Notificacion.objects.acreate(
+                usuario=self.user, tipo='recordatorio', titulo='Nueva', mensaje='x'
+            )
+            await sync_to_async(publicar_notificacion)(notificacion)
+
+            evento = await asyncio.wait_for(cola.get(), timeout=1)
+            self.assertEqual(evento['tipo'], 'notificacion')
+            self.assertEqual(evento['datos']['titulo'], 'Nueva')
+            evento = await asyncio.wait_for(cola.get(), timeout=1)
+            self.assertEqual(evento, {'tipo': 'contador', 'datos': {'no_leidas': 2}})
+        finally:
+            broker.cancelar(self.user.pk, cola)
+
+    async def test_flujo_sse_envia_contador_inicial(self):
+        """Test that the event stream starts with the unread counter"""
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('notificaciones:api_eventos'))
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        flujo = aiter(response.streaming_content)
+        self.assertEqual(await anext(flujo), b'retry: 5000\n\n')
+        self.assertEqual(await anext(flujo), b'event: contador\ndata: {"no_leidas": 1}\n\n')
+        self.assertTrue(obtener_broker().escuchando(self.user.pk))
+        await flujo.aclose()
+
+    def test_sin_asgi_no_abre_el_flujo(self):
+        """Test that under WSGI the stream answers 204 and pages fall back to polling"""
+        self.client.force_login(self.user)
+
+        self.assertEqual(self.client.get(reverse('notificaciones:api_eventos')).status_code, 204)
+        request = RequestFactory().get('/')
+        request.user = self.user
+        self.assertFalse(notificaciones_no_leidas(request)['notificaciones_tiempo_real'])
+
+
+class ContadoresNoLeidasTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='testuser', password='testpass123')
+        for numero in range(3):
+            Notificacion.objects.create(usuario=cls.user, tipo='sistema', titulo=f'N{numero}', mensaje='x')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_contador_se_mantiene_sin_consultas(self):
+        """Test that creating and reading notifications keeps the cached counter exact"""
+        self.assertEqual(contadores.obtener_no_leidas(self.user.pk), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Notificacion.objects.create(usuario=self.user, tipo='sistema', titulo='Nueva', mensaje='x')
+        with self.captureOnCommitCallbacks(execute=True):
+            Notificacion.objects.first().marcar_como_leida()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(contadores.obtener_no_leidas(self.user.pk), 3)
+
+    def test_marcar_dos_veces_descuenta_una(self):
+        """Test that marking the same notification twice only decrements once"""
+        contadores.obtener_no_leidas(self.user.pk)
+        primera = Notificacion.objects.first()
+        segunda = Notificacion.objects.get(pk=primera.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            primera.marcar_como_leida()
+            segunda.marcar_como_leida()
+
+        self.assertEqual(contadores.obtener_no_leidas(self.user.pk), 2)
+
+    def test_marcar_todas_y_reconciliar(self):
+        """Test that mark-all zeroes the counter and reconciliation repairs drift"""
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('notificaciones:marcar_todas_leidas'))
+        self.assertEqual(response.json()['marked'], 3)
+        self.assertEqual(contadores.obtener_no_leidas(self.user.pk), 0)
+
+        # Cambio fuera de los puntos instrumentados
+        Notificacion.objects.update(leida=False)
+        self.assertEqual(contadores.reconciliar([self.user.pk]), 1)
+        self.assertEqual(contadores.obtener_no_leidas(self.user.pk), 3)
+
+    def test_badge_sin_consultas(self):
+        """Test that the context processor serves the badge from the cache"""
+        contadores.obtener_no_leidas(self.user.pk)
+        request = RequestFactory().get('/')
+        request.user = self.user
+
+        with self.assertNumQueries(0):
+            self.assertEqual(notificaciones_no_leidas(request)['notificaciones_no_leidas'](), 3)
+
+
+class RecordatoriosDDTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        from contrapartes.models import Contraparte, TipoContraparte
+
+        cls.hoy = date(2026, 3, 1)
+        # Usuarios creados por las migraciones de datos
+        User.objects.update(is_active=False)
+        cls.por_defecto = User.objects.create_user(username='defecto')
+        cls.diez_dias = User.objects.create_user(username='diez')
+        ConfiguracionNotificacion.objects.create(usuario=cls.diez_dias, dias_aviso_dd=10)
+        sin_avisos = User.objects.create_user(username='sin_avisos')
+        ConfiguracionNotificacion.objects.create(usuario=sin_avisos, notif_dd_proxima=False)
+        User.objects.create_user(username='inactivo', is_active=False)
+
+        tipo = TipoContraparte.objects.create(codigo='banco', nombre='Banco', creado_por=cls.por_defecto)
+        for nombre, dias in [('Cinco', 5), ('Veinte', 20), ('Vencida', -3), ('Lejana', 100)]:
+            Contraparte.objects.create(
+                nombre=nombre, tipo=tipo, creado_por=cls.por_defecto,
+                fecha_proxima_dd=cls.hoy + timedelta(days=dias)
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_umbral_por_usuario_y_sin_duplicados(self):
+        """Test that each user is notified per personal threshold and only once"""
+        with self.captureOnCommitCallbacks(execute=True):
+            resultado = generar_recordatorios_dd(hoy=self.hoy, tamano_lote=2)
+
+        self.assertEqual(resultado, {'dd_proxima': 3, 'dd_vencida': 2, 'usuarios': 2})
+        avisos = set(Notificacion.objects.values_list('usuario__username', 'titulo', 'prioridad'))
+        self.assertIn(('diez', 'Debida diligencia próxima a vencer', 'alta'), avisos)
+        self.assertIn(('defecto', 'Debida diligencia vencida', 'urgente'), avisos)
+        self.assertEqual(Notificacion.objects.filter(usuario=self.diez_dias).count(), 2)
+        self.assertEqual(HistorialNotificacion.objects.count(), 5)
+        self.assertEqual(contadores.obtener_no_leidas(self.por_defecto.pk), 3)
+
+        self.assertEqual(generar_recordatorios_dd(hoy=self.hoy)['usuarios'], 0)
+        self.assertEqual(Notificacion.objects.count(), 5)
+
+    def test_recordatorios_archivados_no_se_repiten(self):
+        """Test that archived reminders keep their key and are not generated again"""
+        generar_recordatorios_dd(hoy=self.hoy)
+        Notificacion.objects.update(fecha_creacion=timezone.now() - timedelta(days=400))
+
+        self.assertEqual(aplicar_retencion(archivar=False)['notificaciones'], {})
+        self.assertEqual(sum(aplicar_retencion()['notificaciones'].values()), 5)
+        self.assertEqual(NotificacionArchivada.objects.exclude(clave_unica=None).count(), 5)
+
+        self.assertEqual(generar_recordatorios_dd(hoy=self.hoy)['usuarios'], 0)
+        self.assertFalse(Notificacion.objects.exists())
+
+
+class CorreoNotificacionesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.inmediato = User.objects.create_user(username='inmediato', email='inmediato@example.com')
+        cls.resumen = User.objects.create_user(username='resumen', email='resumen@example.com')
+        ConfiguracionNotificacion.objects.create(usuario=cls.resumen, email_resumen_diario=True)
+
+    def _crear_notificaciones(self, usuario, cantidad):
+        with self.captureOnCommitCallbacks(execute=True):
+            for numero in range(cantidad):
+                Notificacion.objects.create(
+                    usuario=usuario, tipo='dd_proxima', titulo=f'DD {numero}', mensaje='Vence pronto',
+                    url_accion='/contrapartes/1/'
+                )
+
+    def test_envio_por_lotes_registra_estado(self):
+        """Test that pending emails are sent in batches and marked as sent"""
+        self._crear_notificaciones(self.inmediato, 3)
+        # Tipos sin preferencia de correo no se encolan
+        Notificacion.objects.create(usuario=self.inmediato, tipo='sistema', titulo='Otro', mensaje='x')
+
+        self.assertEqual(enviar_correos_pendientes(tamano_lote=2), {'enviados': 3, 'fallidos': 0})
+
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertIn('http://localhost:8000/contrapartes/1/', mail.outbox[0].body)
+        estados = set(HistorialNotificacion.objects.filter(canal='email').values_list('estado', flat=True))
+        self.assertEqual(estados, {'enviada'})
+        self.assertEqual(enviar_correos_pendientes(), {'enviados': 0, 'fallidos': 0})
+
+    def test_resumen_diario_agrupa_por_usuario(self):
+        """Test that digest users get one message with all their notifications"""
+        self._crear_notificaciones(self.resumen, 3)
+
+        self.assertEqual(enviar_correos_pendientes(), {'enviados': 0, 'fallidos': 0})
+        self.assertEqual(enviar_resumenes_diarios(), {'enviados': 1, 'fallidos': 0})
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['resumen@example.com'])
+        for numero in range(3):
+            self.assertIn(f'DD {numero}', mail.outbox[0].body)
+        self.assertFalse(HistorialNotificacion.objects.filter(canal='email', estado='pendiente').exists())
+
+    def test_error_transitorio_se_reintenta_antes_de_fallar(self):
+        """Test that transient SMTP errors are retried later and only the last attempt marks the email failed"""
+        self._crear_notificaciones(self.inmediato, 1)
+        envio = HistorialNotificacion.objects.get(canal='email')
+        desconexion = smtplib.SMTPServerDisconnected('Conexión cerrada')
+
+        with self.settings(CORREOS_MAX_INTENTOS=2), \
+                mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=desconexion):
+            self.assertEqual(enviar_correos_pendientes(), {'enviados': 0, 'fallidos': 0})
+            envio.refresh_from_db()
+            self.assertEqual((envio.estado, envio.intentos), ('pendiente', 1))
+            # Esperando el reintento: no se vuelve a tomar todavía
+            self.assertEqual(enviar_correos_pendientes(), {'enviados': 0, 'fallidos': 0})
+
+            HistorialNotificacion.objects.update(reservado_hasta=timezone.now())
+            self.assertEqual(enviar_correos_pendientes(), {'enviados': 0, 'fallidos': 1})
+        envio.refresh_from_db()
+        self.assertEqual((envio.estado, envio.intentos), ('fallida', 2))
+
+    def test_conexion_rechazada_libera_el_lote(self):
+        """Test that a refused SMTP connection releases the batch and raises for the task to retry"""
+        self._crear_notificaciones(self.inmediato, 2)
+
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.open', side_effect=ConnectionRefusedError):
+            with self.assertRaises(ConnectionRefusedError):
+                enviar_correos_pendientes()
+
+        self.assertEqual(enviar_correos_pendientes(), {'enviados': 2, 'fallidos': 0})
+
+
+class RetencionNotificacionesTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.usuario = User.objects.create_user(username='retencion', email='retencion@example.com')
+
+    def _crear(self, tipo, dias, leida=True):
+        notificacion = Notificacion.objects.create(
+            usuario=self.usuario, tipo=tipo, titulo=f'{tipo} {dias}', mensaje='x', leida=leida
+        )
+        Notificacion.objects.filter(pk=notificacion.pk).update(
+            fecha_creacion=timezone.now() - timedelta(days=dias)
+        )
+        return notificacion
+
+    def test_archiva_por_tipo_y_conserva_pendientes(self):
+        """Test that expired notifications are archived per type in batches"""
+        antigua = self._crear('sistema', 100)
+        HistorialNotificacion.objects.create(
+            notificacion=antigua, canal='sistema', estado='enviada', destinatario='retencion'
+        )
+        self._crear('sistema', 100, leida=False)
+        self._crear('sistema', 30)
+        self._crear('dd_completada', 100)
+        con_correo = self._crear('recordatorio', 100)
+        HistorialNotificacion.objects.create(
+            notificacion=con_correo, canal='email', estado='pendiente', destinatario='retencion@example.com'
+        )
+        self.assertEqual(contadores.obtener_no_leidas(self.usuario.pk), 1)
+
+        self.assertEqual(aplicar_retencion(simular=True)['notificaciones'], {'sistema': 2})
+        self.assertEqual(Notificacion.objects.count(), 5)
+
+        resultado = aplicar_retencion(tamano_lote=1)
+
+        self.assertEqual(resultado['notificaciones'], {'sistema': 2})
+        self.assertEqual(Notificacion.objects.count(), 3)
+        archivada = NotificacionArchivada.objects.get(notificacion_id=antigua.pk)
+        self.assertEqual(archivada.historial[0]['canal'], 'sistema')
+        self.assertFalse(HistorialNotificacion.objects.filter(notificacion_id=antigua.pk).exists())
+        self.assertEqual(contadores.obtener_no_leidas(self.usuario.pk), 0)
@@ -21,4 +21,5 @@ urlpatterns = [
     # API para notificaciones en tiempo real
     path('api/no-leidas/', views.NotificacionesNoLeidasAPIView.as_view(), name='api_no_leidas'),
     path('api/contar/', views.ContarNotificacionesAPIView.as_view(), name='api_contar'),
+    path('api/eventos/', views.EventosNotificacionesView.as_view(), name='api_eventos'),
 ]
@@ -1,11 +1,34 @@
 """
 Vistas para notificaciones - implementación básica temporal
+
+EventosNotificacionesView es asíncrona: mantiene abierta una conexión
+Server-Sent Events por pestaña sin ocupar un hilo, por lo que debe
+servirse con ASGI (uvicorn itico.asgi:application). Con WSGI responde 204
+y las páginas consultan el contador periódicamente en su lugar.
 """
+import asyncio
+import json
+
 from django.views.generic import ListView, DetailView, TemplateView
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from django.views import View
 
+from .broker import obtener_broker
+from .contadores import aobtener_no_leidas, obtener_no_leidas, registrar_lectura
+from .models import Notificacion
+
+# Segundos entre comentarios de latido en el flujo SSE (mantiene la
+# conexión viva a través de proxies y detecta clientes desconectados)
+INTERVALO_LATIDO = 25
+
+# Notificaciones devueltas por la API de no leídas
+LIMITE_NO_LEIDAS = 20
+
 
 class NotificacionListView(LoginRequiredMixin, ListView):
     template_name = 'notificaciones/lista.html'
@@ -21,12 +44,22 @@ class NotificacionDetailView(LoginRequiredMixin, DetailView):
 
 class MarcarLeidaView(LoginRequiredMixin, View):
     def post(self, request, *args, **kwargs):
-        return JsonResponse({'status': 'marked_read'})
+        notificacion = get_object_or_404(Notificacion, pk=kwargs['pk'], usuario=request.user)
+        with transaction.atomic():
+            notificacion.marcar_como_leida()
+        return JsonResponse({'status': 'marked_read', 'count': obtener_no_leidas(request.user.pk)})
 
 
 class MarcarTodasLeidasView(LoginRequiredMixin, View):
     def post(self, request, *args, **kwargs):
-        return JsonResponse({'status': 'all_marked_read'})
+        """Marca todas con un solo UPDATE y deja el contador en 0"""
+        usuario_id = request.user.pk
+        with transaction.atomic():
+            marcadas = Notificacion.objects.filter(usuario_id=usuario_id, leida=False).update(
+                leida=True, fecha_lectura=timezone.now()
+            )
+            transaction.on_commit(lambda: registrar_lectura(usuario_id, marcadas, todas=True))
+        return JsonResponse({'status': 'all_marked_read', 'marked': marcadas, 'count': 0})
 
 
 class ConfiguracionNotificacionView(LoginRequiredMixin, TemplateView):
@@ -34,10 +67,68 @@ class ConfiguracionNotificacionView(LoginRequiredMixin, TemplateView):
 
 
 class NotificacionesNoLeidasAPIView(LoginRequiredMixin, View):
+    """Últimas notificaciones no leídas del usuario"""
+
     def get(self, request, *args, **kwargs):
-        return JsonResponse({'unread': []})
+        notificaciones = Notificacion.objects.filter(
+            usuario=request.user, leida=False
+        ).order_by('-fecha_creacion')[:LIMITE_NO_LEIDAS]
+        return JsonResponse({
+            'unread': [notificacion.como_diccionario() for notificacion in notificaciones],
+            'count': obtener_no_leidas(request.user.pk),
+        })
 
 
 class ContarNotificacionesAPIView(LoginRequiredMixin, View):
+    """Número de notificaciones no leídas del usuario"""
+
     def get(self, request, *args, **kwargs):
-        return JsonResponse({'count': 0})
+        return JsonResponse({'count': obtener_no_leidas(request.user.pk)})
+
+
+def _evento_sse(tipo, datos):
+    return f'event: {tipo}\ndata: {json.dumps(datos, default=str)}\n\n'
+
+
+class EventosNotificacionesView(View):
+    """
+    Flujo Server-Sent Events con las notificaciones del usuario.
+
+    Eventos:
+    - contador: {"no_leidas": n}, al conectar y cada vez que cambia
+    - notificacion: datos de cada notificación nueva
+
+    Con WSGI el flujo nunca termina y bloquearía un worker por pestaña:
+    responde 204, con lo que el navegador deja de reconectar.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        usuario = await request.auser()
+        if not usuario.is_authenticated:
+            return HttpResponseForbidden()
+        if not isinstance(request, ASGIRequest):
+            return HttpResponse(status=204)
+
+        async def flujo():
+            # Se suscribe antes de contar para no perder cambios intermedios
+            broker = obtener_broker()
+            cola = broker.suscribir(usuario.pk)
+            try:
+                no_leidas = await aobtener_no_leidas(usuario.pk)
+                yield 'retry: 5000\n\n'
+                yield _evento_sse('contador', {'no_leidas': no_leidas})
+                while True:
+                    try:
+                        evento = await asyncio.wait_for(cola.get(), timeout=INTERVALO_LATIDO)
+                    except asyncio.TimeoutError:
+                        yield ': latido\n\n'
+                        continue
+                    yield _evento_sse(evento['tipo'], evento['datos'])
+            finally:
+                broker.cancelar(usuario.pk, cola)
+
+        respuesta = StreamingHttpResponse(flujo(), content_type='text/event-stream')
+        respuesta['Cache-Control'] = 'no-cache'
+        # Evita que nginx acumule el flujo en su buffer
+        respuesta['X-Accel-Buffering'] = 'no'
+        return respuesta
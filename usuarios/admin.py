@@ -19,6 +19,7 @@ class UserAdmin(BaseUserAdmin):
     list_filter = ('is_staff', 'is_superuser', 'is_active', 'groups')
     search_fields = ('username', 'first_name', 'last_name', 'email')
     ordering = ('username',)
+    list_select_related = ('profile',)
 
     def get_department(self, obj):
         """Obtener el departamento del perfil del usuario"""